@@ -19,6 +19,7 @@ from pathlib import Path
 from telethon import TelegramClient, events
 from telethon.errors import SessionPasswordNeededError
 from dotenv import load_dotenv
+from plugin_loader import CommandRouter
 
 # Load environment variables
 load_dotenv()
@@ -54,6 +55,9 @@ class PluginManager:
         self.client = client
         self.plugins_dir = Path(plugins_dir)
         self.loaded_plugins = {}
+        # Router attributes every handler/task to its plugin so reload can remove them
+        self.router = getattr(client, 'command_router', None) or CommandRouter(client)
+        self.router.install()
         
     async def load_plugins(self):
         """Load all plugins from plugins directory"""
@@ -88,19 +92,29 @@ class PluginManager:
         plugin_name = plugin_file.stem
         module_path = f"{self.plugins_dir.name}.{plugin_name}"
         
+        # Loading again (.reload/.loadall): drop the old handlers first
+        if plugin_name in self.loaded_plugins:
+            await self.unload_plugin(plugin_name)
+        
         try:
-            # Import or reload module
-            if module_path in sys.modules:
-                module = importlib.reload(sys.modules[module_path])
-            else:
-                module = importlib.import_module(module_path)
-                
-            # Initialize plugin if it has setup function
-            if hasattr(module, 'setup'):
-                await module.setup(self.client)
-                logger.info(f"✅ Plugin '{plugin_name}' loaded and initialized")
-            else:
-                logger.info(f"✅ Plugin '{plugin_name}' loaded")
+            self.router.current_plugin = plugin_name
+            try:
+                # Import or reload module
+                if module_path in sys.modules:
+                    module = importlib.reload(sys.modules[module_path])
+                else:
+                    module = importlib.import_module(module_path)
+                # Tasks created from this file belong to the plugin (cancelled on unload)
+                self.router.plugin_files[plugin_name] = module.__file__
+                    
+                # Initialize plugin if it has setup function
+                if hasattr(module, 'setup'):
+                    await module.setup(self.client)
+                    logger.info(f"✅ Plugin '{plugin_name}' loaded and initialized")
+                else:
+                    logger.info(f"✅ Plugin '{plugin_name}' loaded")
+            finally:
+                self.router.current_plugin = None
                 
             # Store plugin info
             self.loaded_plugins[plugin_name] = {
@@ -111,6 +125,7 @@ class PluginManager:
             }
             
         except Exception as e:
+            self.router.remove_plugin(plugin_name)
             logger.error(f"❌ Error loading plugin {plugin_name}: {e}")
             raise
             
@@ -136,10 +151,22 @@ class PluginManager:
         logger.info(f"🔄 Plugin '{plugin_name}' reloaded successfully")
         
     async def unload_plugin(self, plugin_name):
-        """Unload specific plugin"""
-        if plugin_name in self.loaded_plugins:
-            del self.loaded_plugins[plugin_name]
-            logger.info(f"🗑️ Plugin '{plugin_name}' unloaded")
+        """Unload specific plugin: remove handlers, cancel its tasks, run cleanup_plugin"""
+        info = self.loaded_plugins.pop(plugin_name, None)
+        if info is None:
+            return
+        
+        removed = self.router.remove_plugin(plugin_name)
+        cleanup = getattr(info['module'], 'cleanup_plugin', None)
+        if cleanup:
+            try:
+                result = cleanup()
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as e:
+                logger.warning(f"⚠️ Plugin '{plugin_name}' cleanup error: {e}")
+        logger.info(f"🗑️ Plugin '{plugin_name}' unloaded "
+                    f"({removed['handlers']} handlers removed, {removed['tasks']} tasks cancelled)")
         
     async def create_sample_plugins(self):
         """Create sample plugins for demonstration"""
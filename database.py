@@ -9,15 +9,209 @@ Description: Unified SQLite database operations for all plugins
 import sqlite3
 import os
 import logging
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import contextmanager
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, Callable, Dict, List, Optional, Union
 from datetime import datetime
 import threading
+import contextvars
+import queue
+import time
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Connections checked out by the running code, keyed by (resolved db path, readonly).
+# A ContextVar is per thread *and* per asyncio task, so coroutines on the loop
+# thread never see each other's connections.
+_held_connections = contextvars.ContextVar('held_connections', default={})
+
+# Connection pool settings
+POOL_READERS = int(os.getenv("DB_POOL_READERS", "4"))
+POOL_TIMEOUT = 60.0  # seconds
+
+class ConnectionPool:
+    """Long-lived connections for one database file: one writer, N readers"""
+    
+    def __init__(self, db_path: str, max_readers: int = POOL_READERS):
+        self.db_path = db_path
+        self.max_readers = max(1, max_readers)
+        self._lock = threading.Lock()
+        self._writer = None
+        self._writer_lock = threading.Lock()
+        self._readers = queue.LifoQueue()
+        self._reader_count = 0
+        self._closed = False
+        self.stats = {
+            'checkouts': 0,
+            'writer_checkouts': 0,
+            'reader_checkouts': 0,
+            'waits': 0,
+            'wait_time': 0.0,
+            'max_wait': 0.0,
+            'opened': 0
+        }
+    
+    def _connect(self) -> sqlite3.Connection:
+        """Open a new connection and apply PRAGMAs once"""
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=POOL_TIMEOUT,
+            check_same_thread=False
+        )
+        conn.row_factory = sqlite3.Row
+        
+        # Configure database settings for better concurrency
+        conn.execute("PRAGMA busy_timeout = 60000")  # 60 seconds
+        conn.execute("PRAGMA foreign_keys = ON")
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        conn.execute("PRAGMA wal_autocheckpoint = 1000")
+        
+        self.stats['opened'] += 1
+        return conn
+    
+    def _record_checkout(self, started: float, kind: str):
+        waited = time.monotonic() - started
+        with self._lock:
+            self.stats['checkouts'] += 1
+            self.stats[f'{kind}_checkouts'] += 1
+            if waited > 0.001:
+                self.stats['waits'] += 1
+                self.stats['wait_time'] += waited
+                self.stats['max_wait'] = max(self.stats['max_wait'], waited)
+    
+    def acquire(self, readonly: bool = False) -> sqlite3.Connection:
+        """Check out a connection (blocks until one is available)"""
+        if self._closed:
+            raise sqlite3.ProgrammingError(f"Connection pool for {self.db_path} is closed")
+        
+        started = time.monotonic()
+        if not readonly:
+            if not self._writer_lock.acquire(timeout=POOL_TIMEOUT):
+                raise sqlite3.OperationalError("database is locked (writer checkout timed out)")
+            try:
+                if self._writer is None:
+                    with self._lock:
+                        self._writer = self._connect()
+            except Exception:
+                self._writer_lock.release()
+                raise
+            self._record_checkout(started, 'writer')
+            return self._writer
+        
+        try:
+            conn = self._readers.get_nowait()
+        except queue.Empty:
+            conn = None
+            with self._lock:
+                if self._reader_count < self.max_readers:
+                    self._reader_count += 1
+                    try:
+                        conn = self._connect()
+                    except Exception:
+                        self._reader_count -= 1
+                        raise
+            if conn is None:
+                try:
+                    conn = self._readers.get(timeout=POOL_TIMEOUT)
+                except queue.Empty:
+                    raise sqlite3.OperationalError("database is locked (reader checkout timed out)")
+        
+        self._record_checkout(started, 'reader')
+        return conn
+    
+    def release(self, conn: sqlite3.Connection):
+        """Return a connection to the pool, discarding any uncommitted work"""
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except Exception:
+            pass
+        
+        if conn is self._writer:
+            self._writer_lock.release()
+        elif self._closed:
+            # Checked out while close() ran: it never saw this reader
+            try:
+                conn.close()
+            except Exception:
+                pass
+            with self._lock:
+                self._reader_count -= 1
+        else:
+            self._readers.put(conn)
+    
+    def close(self):
+        """Close all idle connections in the pool"""
+        self._closed = True
+        with self._writer_lock:
+            if self._writer is not None:
+                try:
+                    self._writer.close()
+                except Exception:
+                    pass
+                self._writer = None
+        while True:
+            try:
+                conn = self._readers.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                conn.close()
+            except Exception:
+                pass
+            with self._lock:
+                self._reader_count -= 1
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get pool statistics"""
+        with self._lock:
+            stats = dict(self.stats)
+            stats['open_connections'] = self._reader_count + (1 if self._writer is not None else 0)
+            stats['readers'] = self._reader_count
+            stats['idle_readers'] = self._readers.qsize()
+            stats['avg_wait_ms'] = (stats['wait_time'] / stats['waits'] * 1000) if stats['waits'] else 0.0
+            return stats
+
+# Shared pools, keyed by absolute database path so every DatabaseManager
+# instance (main.py, PluginDatabaseManager, ...) reuses the same connections
+_pools: Dict[str, ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+def get_pool(db_path: str) -> ConnectionPool:
+    """Get shared connection pool for database path"""
+    db_path = os.path.realpath(db_path)
+    pool = _pools.get(db_path)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(db_path)
+            if pool is None:
+                pool = _pools[db_path] = ConnectionPool(db_path)
+    return pool
+
+def get_pool_stats() -> Dict[str, Dict[str, Any]]:
+    """Get statistics for all connection pools"""
+    with _pools_lock:
+        pools = list(_pools.items())
+    return {os.path.basename(path): pool.get_stats() for path, pool in pools}
+
+def close_all_pools():
+    """Close every pooled connection (call on shutdown)"""
+    # Drain async executors first so queued writes are not lost
+    if 'async_db' in globals():
+        async_db.shutdown(wait=True)
+    
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
+    logger.info(f"Closed {len(pools)} database connection pools")
+
 class DatabaseManager:
     """Centralized database management for all plugins"""
     
@@ -25,7 +219,6 @@ class DatabaseManager:
         self.db_dir = os.path.abspath(db_dir)
         self.base_dir = os.path.dirname(os.path.abspath(__file__))  # vzoelfox directory
         os.makedirs(self.db_dir, exist_ok=True)
-        self._connections = threading.local()
         
         # Initialize config table on startup
         self._init_config_table()
@@ -93,6 +286,11 @@ class DatabaseManager:
         
     def get_db_path(self, db_name: str) -> str:
         """Get full path for database file"""
+        # Explicit file paths (e.g. legacy "plugins/sudo.db") are used as-is,
+        # relative to the vzoelfox directory, so plugins can migrate in place
+        if os.sep in db_name or '/' in db_name:
+            return os.path.join(self.base_dir, db_name)
+        
         if not db_name.endswith('.db'):
             db_name += '.db'
             
@@ -103,83 +301,55 @@ class DatabaseManager:
         # Use data directory for other databases
         return os.path.join(self.db_dir, db_name)
     
+    def _get_pool(self, db_name: str) -> "ConnectionPool":
+        """Get (or lazily create) the shared pool for a database"""
+        return get_pool(self.get_db_path(db_name))
+    
+    def resolve_db_path(self, db_name: str) -> str:
+        """Canonical file path for db_name ("main", "main.db" and the full path agree)"""
+        return os.path.realpath(self.get_db_path(db_name))
+    
     @contextmanager
-    def get_connection(self, db_name: str = "main"):
-        """Get database connection with automatic cleanup and better locking"""
-        conn = None
+    def get_connection(self, db_name: str = "main", readonly: bool = False):
+        """Get pooled database connection (writer by default, reader if readonly)"""
+        # Re-entrant: nested calls in the same thread/task reuse the connection
+        # already checked out instead of taking a second one from the pool.
+        # A held writer also serves reads; a held reader never serves writes.
+        db_path = self.resolve_db_path(db_name)
+        held = _held_connections.get()
+        conn = held.get((db_path, False)) or (held.get((db_path, True)) if readonly else None)
+        if conn is not None:
+            yield conn
+            return
+        
+        pool = get_pool(db_path)
+        conn = pool.acquire(readonly=readonly)
+        token = _held_connections.set({**held, (db_path, readonly): conn})
         try:
-            db_path = self.get_db_path(db_name)
-            
-            # Clean up any stale lock files before connecting
-            for suffix in ['-wal', '-shm']:
-                lock_file = db_path + suffix
-                if os.path.exists(lock_file):
-                    try:
-                        os.remove(lock_file)
-                        logger.info(f"Removed stale lock file: {lock_file}")
-                    except OSError:
-                        pass  # File may be in use by another process
-            
-            conn = sqlite3.connect(
-                db_path, 
-                timeout=60.0,  # Increase timeout
-                check_same_thread=False
-            )
-            conn.row_factory = sqlite3.Row
-            
-            # Configure database settings for better concurrency
-            conn.execute("PRAGMA busy_timeout = 60000")  # 60 seconds
-            conn.execute("PRAGMA foreign_keys = ON")
-            conn.execute("PRAGMA journal_mode = WAL")
-            conn.execute("PRAGMA synchronous = NORMAL")
-            conn.execute("PRAGMA wal_autocheckpoint = 1000")
-            
             yield conn
-            
         except sqlite3.OperationalError as e:
             if "database is locked" in str(e):
-                logger.warning(f"Database {db_name} is locked, retrying...")
-                # Try to force unlock by cleaning WAL files again
-                try:
-                    import time
-                    time.sleep(1)  # Wait briefly
-                    
-                    # Force cleanup
-                    for suffix in ['-wal', '-shm']:
-                        lock_file = self.get_db_path(db_name) + suffix
-                        if os.path.exists(lock_file):
-                            os.remove(lock_file)
-                    
-                    # Retry connection
-                    if conn:
-                        conn.close()
-                    conn = sqlite3.connect(self.get_db_path(db_name), timeout=60.0)
-                    conn.row_factory = sqlite3.Row
-                    conn.execute("PRAGMA busy_timeout = 60000")
-                    yield conn
-                except Exception as retry_error:
-                    logger.error(f"Retry failed for {db_name}: {retry_error}")
-                    raise e
+                logger.warning(f"Database {db_name} is locked (busy_timeout exceeded)")
             else:
                 logger.error(f"Database connection error for {db_name}: {e}")
-                raise
+            raise
         except Exception as e:
             logger.error(f"Database connection error for {db_name}: {e}")
-            if conn:
-                conn.rollback()
             raise
         finally:
-            if conn:
-                try:
-                    conn.close()
-                except Exception:
-                    pass  # Ignore close errors
+            _held_connections.reset(token)
+            pool.release(conn)
+    
+    def get_pool_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Get connection pool statistics for all open databases"""
+        return get_pool_stats()
     
     def execute_query(self, query: str, params: tuple = (), db_name: str = "main", 
                      fetch: str = None) -> Union[List[sqlite3.Row], sqlite3.Row, int, None]:
         """Execute SQL query with automatic connection management"""
         try:
-            with self.get_connection(db_name) as conn:
+            readonly = fetch in ("all", "one") and query.lstrip().upper().startswith(('SELECT', 'PRAGMA', 'WITH'))
+            with self.get_connection(db_name, readonly=readonly) as conn:
                 cursor = conn.execute(query, params)
                 
                 if fetch == "all":
@@ -356,6 +526,133 @@ def count(table: str, where: str = None, where_params: tuple = (), db_name: str
     """Count rows"""
     return db_manager.count(table, where, where_params, db_name)
 
+# Async Database Facade
+class AsyncDatabaseManager:
+    """
+    Non-blocking wrapper around DatabaseManager for use inside event handlers.
+    Every database file gets its own single-thread executor for writes, so
+    writes for one file run in order, plus a small reader executor so readonly
+    queries use the pool's reader connections in parallel. The asyncio event
+    loop never blocks on disk I/O. A read is not ordered after a write that
+    has not been awaited yet.
+    """
+    
+    def __init__(self, manager: DatabaseManager):
+        self.manager = manager
+        self._executors: Dict[tuple, ThreadPoolExecutor] = {}
+        self._lock = threading.Lock()
+    
+    def _get_executor(self, db_name: str, readonly: bool = False) -> ThreadPoolExecutor:
+        """Get (or create) the writer thread / reader threads for a database file"""
+        key = (self.manager.resolve_db_path(db_name), readonly)
+        executor = self._executors.get(key)
+        if executor is None:
+            with self._lock:
+                executor = self._executors.get(key)
+                if executor is None:
+                    thread_name = os.path.splitext(os.path.basename(key[0]))[0]
+                    if readonly:
+                        executor = ThreadPoolExecutor(max_workers=POOL_READERS,
+                                                      thread_name_prefix=f"db-{thread_name}-read")
+                    else:
+                        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"db-{thread_name}")
+                    self._executors[key] = executor
+        return executor
+    
+    async def run(self, db_name: str, func: Callable, *args, **kwargs) -> Any:
+        """Run a blocking callable on the writer executor of db_name"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._get_executor(db_name),
+            functools.partial(func, *args, **kwargs)
+        )
+    
+    async def _run_read(self, db_name: str, func: Callable, *args, **kwargs) -> Any:
+        """Run a readonly callable on the reader executor of db_name"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._get_executor(db_name, readonly=True),
+            functools.partial(func, *args, **kwargs)
+        )
+    
+    async def run_in_connection(self, func: Callable[[sqlite3.Connection], Any],
+                                db_name: str = "main", readonly: bool = False) -> Any:
+        """Run func(conn) with a pooled connection (reader threads if readonly)"""
+        def _call():
+            with self.manager.get_connection(db_name, readonly=readonly) as conn:
+                return func(conn)
+        if readonly:
+            return await self._run_read(db_name, _call)
+        return await self.run(db_name, _call)
+    
+    async def execute_query(self, query: str, params: tuple = (), db_name: str = "main",
+                           fetch: str = None):
+        """Execute SQL query (SELECTs with fetch go to the reader threads)"""
+        if fetch in ("all", "one") and query.lstrip().upper().startswith(('SELECT', 'PRAGMA', 'WITH')):
+            return await self._run_read(db_name, self.manager.execute_query, query, params, db_name, fetch)
+        return await self.run(db_name, self.manager.execute_query, query, params, db_name, fetch)
+    
+    async def executemany(self, query: str, seq_of_params: List[tuple], db_name: str = "main") -> Optional[int]:
+        """Execute query for every params tuple in a single transaction (None on error, like execute_query)"""
+        def _executemany(conn):
+            try:
+                cursor = conn.executemany(query, seq_of_params)
+                conn.commit()
+                return cursor.rowcount
+            except Exception as e:
+                logger.error(f"Executemany error: {e}")
+                logger.error(f"Query: {query}")
+                return None
+        return await self.run_in_connection(_executemany, db_name)
+    
+    async def create_table(self, table_name: str, schema: str, db_name: str = "main") -> bool:
+        """Create table"""
+        return await self.run(db_name, self.manager.create_table, table_name, schema, db_name)
+    
+    async def insert(self, table: str, data: Dict[str, Any], db_name: str = "main") -> Optional[int]:
+        """Insert data"""
+        return await self.run(db_name, self.manager.insert, table, data, db_name)
+    
+    async def update(self, table: str, data: Dict[str, Any], where: str, where_params: tuple = (),
+                    db_name: str = "main") -> int:
+        """Update data"""
+        return await self.run(db_name, self.manager.update, table, data, where, where_params, db_name)
+    
+    async def select(self, table: str, columns: str = "*", where: str = None, where_params: tuple = (),
+                    order_by: str = None, limit: int = None, db_name: str = "main") -> List[sqlite3.Row]:
+        """Select data"""
+        return await self._run_read(db_name, self.manager.select, table, columns, where, where_params,
+                                    order_by, limit, db_name)
+    
+    async def select_one(self, table: str, columns: str = "*", where: str = None,
+                        where_params: tuple = (), db_name: str = "main") -> Optional[sqlite3.Row]:
+        """Select single row"""
+        return await self._run_read(db_name, self.manager.select_one, table, columns, where, where_params, db_name)
+    
+    async def delete(self, table: str, where: str, where_params: tuple = (), db_name: str = "main") -> int:
+        """Delete data"""
+        return await self.run(db_name, self.manager.delete, table, where, where_params, db_name)
+    
+    async def count(self, table: str, where: str = None, where_params: tuple = (),
+                   db_name: str = "main") -> int:
+        """Count rows"""
+        return await self._run_read(db_name, self.manager.count, table, where, where_params, db_name)
+    
+    async def table_exists(self, table_name: str, db_name: str = "main") -> bool:
+        """Check if table exists"""
+        return await self._run_read(db_name, self.manager.table_exists, table_name, db_name)
+    
+    def shutdown(self, wait: bool = True):
+        """Stop all executor threads (pending queries finish first when wait=True)"""
+        with self._lock:
+            executors = list(self._executors.values())
+            self._executors.clear()
+        for executor in executors:
+            executor.shutdown(wait=wait)
+
+# Global async instance
+async_db = AsyncDatabaseManager(db_manager)
+
 # ID Management Utilities
 class IDManager:
     """Utilities for managing various ID types"""
@@ -32,8 +32,10 @@ from telethon.tl.functions.phone import JoinGroupCallRequest, LeaveGroupCallRequ
 from telethon.tl.functions.channels import GetFullChannelRequest
 from dotenv import load_dotenv
 from plugin_loader import setup_plugins, PluginLoader
-from database import DatabaseManager
+from database import DatabaseManager, close_all_pools
 from voice_manager import initialize_voice_manager, cleanup_voice_manager
+from utils.startup_pipeline import StartupPipeline
+from utils.process_pool import process_pool
 
 
 
@@ -1084,13 +1086,21 @@ async def startup():
     
     try:
         await client.start()
-        await check_premium_status()
         
-        # Initialize voice chat manager
-        voice_success = await initialize_voice_manager(client)
+        # Independent init steps run concurrently; startup message waits for premium status
+        pipeline = StartupPipeline(name="core startup")
+        pipeline.add("premium", check_premium_status)
+        pipeline.add("voice", lambda: initialize_voice_manager(client))
+        pipeline.add("me", client.get_me)
+        pipeline.add("startup_message", send_startup_message, after=("premium", "me"))
+        await pipeline.run()
+        
+        voice_success = pipeline.result("voice", False)
         logger.info(f"🎵 Voice chat manager: {'initialized' if voice_success else 'failed'}")
         
-        me = await client.get_me()
+        me = pipeline.result("me")
+        if me is None:
+            raise RuntimeError(pipeline.results["me"]["error"])
         
         logger.info(f"✅ VZOEL ASSISTANT v0.1.0.75 Enhanced started successfully!")
         logger.info(f"👤 Logged in as: {me.first_name} (@{me.username or 'No username'})")
@@ -1098,8 +1108,7 @@ async def startup():
         logger.info(f"💎 Premium Status: {'Active' if premium_status else 'Standard'}")
         logger.info(f"🔧 Enhanced Features: Reply Gcast, Auto Emoji Extract, UTF-16 Fix, Database Integration")
         logger.info(f"🐛 Bug Fixes: Premium emoji entity handling completely resolved")
-        
-        await send_startup_message()
+        pipeline.log_report()
         return True
             
     except SessionPasswordNeededError:
@@ -1121,10 +1130,13 @@ async def main():
             # STEP 2: Load plugins setelah client ready
             logger.info("🔌 Loading plugins...")
             plugin_loader = setup_plugins(client, "plugins")
+            await plugin_loader.run_pending_setups()
+            plugin_loader.log_load_report()
             
             # Get status dengan method yang benar
             status = plugin_loader.get_status()
-            logger.info(f"✅ Plugins loaded: {status['total_loaded']}/{status['total_plugins']}")
+            logger.info(f"✅ Plugins loaded: {status['total_loaded']}/{status['total_plugins']}"
+                        + (f" ({status['total_lazy']} lazy)" if status['total_lazy'] else ""))
             
             # Show failed plugins if any
             if status['total_failed'] > 0:
@@ -1185,6 +1197,19 @@ async def main():
                 await client.disconnect()
             except Exception as e:
                 logger.error(f"Error during disconnect: {e}")
+            
+            # Run plugin cleanup hooks (drains buffered writes)
+            if plugin_loader:
+                try:
+                    await plugin_loader.cleanup_all_plugins()
+                except Exception as e:
+                    logger.error(f"Plugin cleanup error: {e}")
+            
+            # Close pooled database connections
+            try:
+                close_all_pools()
+            except Exception as e:
+                logger.error(f"Database pool cleanup error: {e}")
             logger.info("✅ VZOEL ASSISTANT stopped successfully!")
 
 # Alternatif: Plugin command untuk testing
@@ -1211,6 +1236,7 @@ async def plugins_handler(event):
 • Total Found: {status['total_plugins']}
 • Successfully Loaded: {status['total_loaded']}
 • Failed to Load: {status['total_failed']}
+• Lazy (not imported yet): {status['total_lazy']}
 
 ✅ Loaded Plugins:
 {chr(10).join(f'• {plugin}' for plugin in plugin_list['loaded']) if plugin_list['loaded'] else '• None'}
@@ -1218,6 +1244,12 @@ async def plugins_handler(event):
 ❌ Failed Plugins:
 {chr(10).join(f'• {plugin}' for plugin in plugin_list['failed']) if plugin_list['failed'] else '• None'}
 
+💤 Lazy Plugins (load on first command):
+{chr(10).join(f'• {plugin}' for plugin in plugin_list['lazy']) if plugin_list['lazy'] else '• None'}
+
+⏱️ Slowest Plugins (load time):
+{chr(10).join(f"• {row['plugin']}: {row['total_ms']:.0f}ms" for row in plugin_loader.get_load_report(5)) or '• None'}
+
 💡 Plugin Directory: plugins/
         """.strip()
         
@@ -1227,6 +1259,83 @@ async def plugins_handler(event):
         await event.reply(f"❌ Plugin status error: {str(e)}")
         logger.error(f"Plugin status command error: {e}")
 
+@client.on(events.NewMessage(pattern=rf'{re.escape(COMMAND_PREFIX)}reload\s+(\w+)'))
+async def reload_handler(event):
+    """Command untuk reload satu plugin tanpa restart"""
+    if not await is_owner(event.sender_id):
+        return
+    
+    await log_command(event, "reload")
+    
+    if plugin_loader is None:
+        await event.reply("❌ Plugin system not initialized")
+        return
+    
+    plugin_name = event.pattern_match.group(1)
+    if await plugin_loader.reload_plugin(plugin_name):
+        await event.reply(f"✅ Plugin `{plugin_name}` reloaded")
+    else:
+        await event.reply(f"❌ Plugin `{plugin_name}` not found or failed to load")
+
+@client.on(events.NewMessage(pattern=rf'{re.escape(COMMAND_PREFIX)}cmdstats'))
+async def cmdstats_handler(event):
+    """Command untuk menampilkan timing per command dari command router"""
+    if not await is_owner(event.sender_id):
+        return
+
+    await log_command(event, "cmdstats")
+
+    try:
+        if plugin_loader is None or plugin_loader.router is None:
+            await event.reply("❌ Command router not active")
+            return
+
+        router = plugin_loader.router
+        rows = router.get_stats(limit=20)
+        lines = [
+            "🧭 COMMAND ROUTER STATUS",
+            "",
+            f"• Routed Handlers: {router.route_count()} on {len(router.routes)} commands",
+            ""
+        ]
+        if not rows:
+            lines.append("• No commands dispatched yet")
+        for row in rows:
+            lines.append(f"• {row['command']}: {row['calls']}x, avg {row['avg_ms']:.1f}ms, max {row['max_ms']:.1f}ms"
+                         + (f", errors {row['errors']}" if row['errors'] else ""))
+
+        await event.reply("\n".join(lines))
+
+    except Exception as e:
+        await event.reply(f"❌ Command stats error: {str(e)}")
+        logger.error(f"Command stats error: {e}")
+
+@client.on(events.NewMessage(pattern=rf'{re.escape(COMMAND_PREFIX)}procstats'))
+async def procstats_handler(event):
+    """Command untuk menampilkan status process pool (ffmpeg, yt-dlp, git, ...)"""
+    if not await is_owner(event.sender_id):
+        return
+
+    await log_command(event, "procstats")
+
+    try:
+        stats = process_pool.get_stats()
+        lines = ["⚙️ PROCESS POOL STATUS", ""]
+        if not stats:
+            lines.append("• No external processes run yet")
+        for tool, row in sorted(stats.items()):
+            lines.append(f"🔧 {tool} (limit {row['limit']})")
+            lines.append(f"• Running: {row['running']}, Queued: {row['queued']}")
+            lines.append(f"• Runs: {row['runs']}, Failed: {row['failed']}, Timeouts: {row['timeouts']}, Cancelled: {row['cancelled']}")
+            lines.append(f"• Avg Time: {row['avg_time']:.2f}s, Avg Wait: {row['avg_wait']:.2f}s (max {row['max_wait']:.2f}s)")
+            lines.append("")
+
+        await event.reply("\n".join(lines).strip())
+
+    except Exception as e:
+        await event.reply(f"❌ Process stats error: {str(e)}")
+        logger.error(f"Process stats error: {e}")
+
 if __name__ == "__main__":
     try:
         asyncio.run(main())
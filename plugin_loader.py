@@ -6,7 +6,12 @@ Author: Morgan (Enhanced for Vzoel Fox's)
 """
 
 import os
+import re
+import ast
 import sys
+import json
+import time
+import inspect
 import importlib.util
 import logging
 import traceback
@@ -14,8 +19,379 @@ import asyncio
 from typing import Dict, List, Optional, Any, Callable
 from pathlib import Path
 
+from telethon import events
+
+from utils.startup_pipeline import StartupPipeline
+from utils import plugin_context
+
 logger = logging.getLogger(__name__)
 
+# Central command router (set COMMAND_ROUTER=0 to register plugin handlers directly)
+COMMAND_ROUTER_ENABLED = os.getenv("COMMAND_ROUTER", "1") != "0"
+
+# Lazy loading: import command-only plugins on first use (needs the command router)
+PLUGIN_LAZY_LOAD = os.getenv("PLUGIN_LAZY_LOAD", "0") == "1"
+PLUGIN_EAGER = {name.strip() for name in os.getenv("PLUGIN_EAGER", "").split(",") if name.strip()}
+MANIFEST_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "plugin_manifest.json")
+MANIFEST_VERSION = 1
+
+# Plugin that owns the code currently running (handler registrations and tasks are attributed to it)
+_current_plugin = plugin_context.current_plugin
+
+# Event builders that need the plugin running from startup (watchers, not commands)
+_WATCHER_EVENTS = {'ChatAction', 'MessageEdited', 'MessageDeleted', 'MessageRead', 'Raw',
+                   'UserUpdate', 'CallbackQuery', 'InlineQuery', 'Album'}
+# Frames skipped when looking for the code that created a task
+_TASK_CREATOR_SKIP = (os.path.dirname(asyncio.__file__) + os.sep, os.path.abspath(__file__))
+# Calls that start background work at import/setup time
+_BACKGROUND_CALLS = {'create_task', 'ensure_future', 'run_coroutine_threadsafe', 'Thread'}
+
+# "^\.gcast(\s+(.+))?$" -> prefix "\.", word "gcast", rest "(\s+(.+))?$"
+_PATTERN_HEAD_RE = re.compile(r'^\^?(\\[^\w\s]|\[[^\w\s\]]+\]|[!/#,;:~+\-])([A-Za-z0-9_]+)(.*)$', re.S)
+# Pattern text allowed right after the command word (word must end there)
+_WORD_END_PREFIXES = ('$', '\\s', ' ', '(?:\\s', '(\\s', '(?: ', '( ', '(?:$', '($', '\\b', '(?:\\b')
+_MESSAGE_WORD_RE = re.compile(r'[A-Za-z0-9_]+')
+
+def command_keys(builder):
+    """
+    Router keys [(prefix, word), ...] for a NewMessage builder, or None if
+    its pattern does not start with a literal prefix + whole command word.
+    """
+    if type(builder) is not events.NewMessage:
+        return None
+    regex = getattr(getattr(builder, 'pattern', None), '__self__', None)
+    if regex is None or not isinstance(regex.pattern, str):
+        return None
+    match = _PATTERN_HEAD_RE.match(regex.pattern)
+    if not match:
+        return None
+    prefix, word, rest = match.groups()
+    if rest and not rest.startswith(_WORD_END_PREFIXES):
+        return None
+    if prefix.startswith('['):
+        prefixes = [char for char in prefix[1:-1] if char != '\\']
+    else:
+        prefixes = [prefix[-1]]
+    return [(char, word.lower()) for char in prefixes]
+
+def _call_name(node):
+    func = node.func
+    if isinstance(func, ast.Attribute):
+        return func.attr
+    if isinstance(func, ast.Name):
+        return func.id
+    return None
+
+def extract_plugin_manifest(plugin_path: str) -> Dict[str, Any]:
+    """
+    Read plugin metadata without executing it (AST only):
+    PLUGIN_INFO literal, literal NewMessage command patterns, and whether
+    the plugin can be imported lazily (commands only, no watchers/background work).
+    """
+    entry = {'info': None, 'patterns': [], 'lazy': True, 'reason': None}
+    try:
+        with open(plugin_path, 'r', encoding='utf-8') as f:
+            tree = ast.parse(f.read(), filename=plugin_path)
+    except (SyntaxError, ValueError, OSError) as e:
+        entry.update(lazy=False, reason=f"parse error: {e}")
+        return entry
+
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and any(
+                isinstance(target, ast.Name) and target.id == 'PLUGIN_INFO' for target in node.targets):
+            try:
+                entry['info'] = ast.literal_eval(node.value)
+            except ValueError:
+                pass
+
+    def not_lazy(reason):
+        if entry['lazy']:
+            entry.update(lazy=False, reason=reason)
+
+    for node in ast.walk(tree):
+        if not isinstance(node, ast.Call):
+            continue
+        name = _call_name(node)
+        if name == 'NewMessage':
+            pattern = next((kw.value for kw in node.keywords if kw.arg == 'pattern'), None)
+            if isinstance(pattern, ast.Constant) and isinstance(pattern.value, str):
+                entry['patterns'].append(pattern.value)
+                builder = events.NewMessage(pattern=pattern.value)
+                if not command_keys(builder):
+                    not_lazy(f"non-command pattern {pattern.value!r}")
+            elif pattern is None:
+                not_lazy("catch-all NewMessage handler")
+            else:
+                not_lazy("computed pattern")
+        elif name in _WATCHER_EVENTS:
+            not_lazy(f"{name} handler")
+        elif name in _BACKGROUND_CALLS:
+            not_lazy(f"starts background work ({name})")
+
+    if not entry['patterns']:
+        not_lazy("no command patterns")
+    return entry
+
+def load_manifest(plugin_files) -> Dict[str, Dict[str, Any]]:
+    """Manifest for plugin_files, re-parsing only files changed since the cached copy"""
+    try:
+        with open(MANIFEST_FILE, 'r', encoding='utf-8') as f:
+            cached = json.load(f)
+        if cached.get('version') != MANIFEST_VERSION:
+            cached = {}
+    except (OSError, ValueError):
+        cached = {}
+    cached_plugins = cached.get('plugins', {})
+
+    manifest = {}
+    changed = False
+    for file_path in plugin_files:
+        stat = os.stat(file_path)
+        signature = [stat.st_mtime, stat.st_size]
+        entry = cached_plugins.get(file_path.stem)
+        if not entry or entry.get('signature') != signature:
+            entry = extract_plugin_manifest(str(file_path))
+            entry['signature'] = signature
+            changed = True
+        manifest[file_path.stem] = entry
+
+    if changed or set(manifest) != set(cached_plugins):
+        try:
+            os.makedirs(os.path.dirname(MANIFEST_FILE), exist_ok=True)
+            with open(MANIFEST_FILE, 'w', encoding='utf-8') as f:
+                json.dump({'version': MANIFEST_VERSION, 'plugins': manifest}, f, default=str)
+        except OSError as e:
+            logger.warning(f"Could not write plugin manifest: {e}")
+    return manifest
+
+class CommandRouter:
+    """
+    One NewMessage handler for every plugin command. Plugin registrations
+    with a literal prefix + command word pattern are stored in a dict keyed
+    by (prefix, word); each message costs one dict lookup and only the
+    matching builders' filters (pattern, incoming/outgoing, chats) run.
+    Everything else is passed through to Telethon unchanged.
+
+    Every registration made while a plugin's code runs, and every asyncio
+    task created by the plugin's own module, is attributed to that plugin,
+    so remove_plugin() can drop all of it at once on unload/reload. Tasks
+    that libraries start on its behalf (e.g. Telethon's sender loops during
+    download_media) are left alone.
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self.routes = {}        # (prefix, word) -> [(builder, callback, plugin_name)]
+        self.prefixes = set()
+        self.stats = {}         # "prefix+word" -> {'calls', 'total_time', 'max_time', 'errors'}
+        self.fallbacks = {}     # plugin_name -> [(callback, wrapper, builder)] registered on Telethon
+        self.plugin_tasks = {}  # plugin_name -> set of running tasks
+        self.plugin_files = {}  # plugin_name -> module file (its code owns the tasks it creates)
+        self._add_event_handler = None
+        self._remove_event_handler = None
+        self._task_factory_loop = None
+
+    @property
+    def current_plugin(self):
+        return _current_plugin.get()
+
+    @current_plugin.setter
+    def current_plugin(self, plugin_name):
+        _current_plugin.set(plugin_name)
+
+    def install(self):
+        """Register the dispatcher and route plugin registrations through it"""
+        if self._add_event_handler is not None:
+            return
+        self._add_event_handler = self.client.add_event_handler
+        self._remove_event_handler = self.client.remove_event_handler
+        self._add_event_handler(self._dispatch, events.NewMessage())
+        self.client.add_event_handler = self.add_event_handler
+        self.client.remove_event_handler = self.remove_event_handler
+        self.client.command_router = self
+        self._install_task_factory()
+
+    def _install_task_factory(self):
+        """Record tasks created while plugin code runs (chains any existing factory)"""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return  # retried from _dispatch once the loop runs
+        if self._task_factory_loop is loop:
+            return
+        previous = loop.get_task_factory()
+
+        def task_factory(loop, coro, **kwargs):
+            if previous is not None:
+                task = previous(loop, coro, **kwargs)
+            else:
+                task = asyncio.Task(coro, loop=loop, **kwargs)
+            context = kwargs.get('context')
+            plugin_name = context.get(_current_plugin) if context is not None else _current_plugin.get()
+            if plugin_name and self._created_by(plugin_name):
+                tasks = self.plugin_tasks.setdefault(plugin_name, set())
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            return task
+
+        loop.set_task_factory(task_factory)
+        self._task_factory_loop = loop
+
+    def _created_by(self, plugin_name):
+        """True if the code creating the task (outside asyncio) is plugin_name's module"""
+        plugin_file = self.plugin_files.get(plugin_name)
+        if plugin_file is None:
+            return False
+        frame = sys._getframe(2)
+        while frame is not None:
+            filename = frame.f_code.co_filename
+            if filename == plugin_file:
+                return True
+            if not filename.startswith(_TASK_CREATOR_SKIP):
+                return False
+            frame = frame.f_back
+        return False
+
+    def _wrap(self, callback, plugin_name):
+        """Run a Telethon-dispatched handler inside its plugin's context"""
+        async def plugin_handler(event):
+            token = _current_plugin.set(plugin_name)
+            try:
+                return await callback(event)
+            finally:
+                _current_plugin.reset(token)
+
+        plugin_handler.__name__ = getattr(callback, '__name__', 'plugin_handler')
+        return plugin_handler
+
+    def add_event_handler(self, callback, event=None):
+        """Drop-in for client.add_event_handler (also used by client.on)"""
+        builders = events._get_handlers(callback)
+        if builders is None:
+            if isinstance(event, type):
+                event = event()
+            builders = [event] if event else [None]
+
+        for builder in builders:
+            keys = command_keys(builder) if builder is not None else None
+            if keys:
+                for key in keys:
+                    self.routes.setdefault(key, []).append((builder, callback, self.current_plugin))
+                    self.prefixes.add(key[0])
+            elif self.current_plugin:
+                wrapper = self._wrap(callback, self.current_plugin)
+                self.fallbacks.setdefault(self.current_plugin, []).append((callback, wrapper, builder))
+                self._add_event_handler(wrapper, builder)
+            else:
+                self._add_event_handler(callback, builder)
+
+    def remove_event_handler(self, callback, event=None):
+        """Drop-in for client.remove_event_handler"""
+        event_type = type(event) if event and not isinstance(event, type) else event
+        found = 0
+        for key, routes in list(self.routes.items()):
+            kept = [route for route in routes
+                    if not (route[1] == callback and (not event_type or isinstance(route[0], event_type)))]
+            found += len(routes) - len(kept)
+            if kept:
+                self.routes[key] = kept
+            else:
+                del self.routes[key]
+        for plugin_name, handlers in list(self.fallbacks.items()):
+            for handler in [h for h in handlers if h[0] == callback]:
+                removed = self._remove_event_handler(handler[1], event)
+                if removed:
+                    found += removed
+                    handlers.remove(handler)
+            if not handlers:
+                del self.fallbacks[plugin_name]
+        return found + self._remove_event_handler(callback, event)
+
+    def remove_plugin(self, plugin_name):
+        """
+        Drop every handler registered by plugin_name and cancel its tasks.
+        Runs without awaiting, so no update is dispatched to a half-removed plugin.
+        """
+        routes = {}
+        removed = 0
+        for key, entries in self.routes.items():
+            kept = [route for route in entries if route[2] != plugin_name]
+            removed += len(entries) - len(kept)
+            if kept:
+                routes[key] = kept
+        self.routes = routes
+        self.prefixes = {key[0] for key in routes}
+
+        for callback, wrapper, builder in self.fallbacks.pop(plugin_name, []):
+            removed += self._remove_event_handler(wrapper, type(builder) if builder else None)
+
+        try:
+            current = asyncio.current_task()
+        except RuntimeError:
+            current = None
+        cancelled = 0
+        for task in list(self.plugin_tasks.pop(plugin_name, ())):
+            if task is not current and not task.done():
+                task.cancel()
+                cancelled += 1
+        return {'handlers': removed, 'tasks': cancelled}
+
+    async def _dispatch(self, event, only_plugin=None):
+        text = event.raw_text
+        if self._task_factory_loop is None:
+            self._install_task_factory()
+        if not text or text[0] not in self.prefixes:
+            return
+        word = _MESSAGE_WORD_RE.match(text, 1)
+        if not word:
+            return
+        key = (text[0], word.group(0).lower())
+        routes = self.routes.get(key)
+        if not routes:
+            return
+
+        for builder, callback, plugin_name in list(routes):
+            if only_plugin is not None and plugin_name != only_plugin:
+                continue
+            if not builder.resolved:
+                await builder.resolve(self.client)
+            passed = builder.filter(event)
+            if inspect.isawaitable(passed):
+                passed = await passed
+            if not passed:
+                continue
+
+            started = time.perf_counter()
+            counter = self.stats.setdefault(f"{key[0]}{key[1]}", {'calls': 0, 'total_time': 0.0, 'max_time': 0.0, 'errors': 0})
+            token = _current_plugin.set(plugin_name)
+            try:
+                await callback(event)
+            except events.StopPropagation:
+                raise
+            except Exception as e:
+                counter['errors'] += 1
+                logger.exception(f"Command {key[0]}{key[1]} ({plugin_name or 'unknown'}) error: {e}")
+            finally:
+                _current_plugin.reset(token)
+                elapsed = time.perf_counter() - started
+                counter['calls'] += 1
+                counter['total_time'] += elapsed
+                counter['max_time'] = max(counter['max_time'], elapsed)
+
+    def get_stats(self, limit=None):
+        """Per-command timing, slowest average first"""
+        rows = [
+            {'command': command, 'calls': data['calls'], 'errors': data['errors'],
+             'avg_ms': data['total_time'] / data['calls'] * 1000 if data['calls'] else 0.0,
+             'max_ms': data['max_time'] * 1000, 'total_s': data['total_time']}
+            for command, data in self.stats.items()
+        ]
+        rows.sort(key=lambda row: row['avg_ms'], reverse=True)
+        return rows[:limit] if limit else rows
+
+    def route_count(self):
+        return sum(len(routes) for routes in self.routes.values())
+
 class PluginLoader:
     def __init__(self, client=None):
         self.client = client
@@ -25,6 +401,18 @@ class PluginLoader:
         self.plugins_dir = None
         self.shared_functions = {}
         self.plugin_info = {}
+        self.manifest = {}
+        self.lazy_plugins = {}  # plugin_name -> (plugin_path, stub callback) until first command
+        self.pending_setups = {}  # plugin_name -> async setup coroutine not awaited yet
+        self.load_times = {}  # plugin_name -> {'import', 'setup', 'async_setup'} seconds
+        self.generation = 0  # bumped on every load/unload (help index cache key)
+        self.router = None
+        if client:
+            client.plugin_loader = self
+        if client and COMMAND_ROUTER_ENABLED:
+            # One router per client (a fallback loader reuses the installed one)
+            self.router = getattr(client, 'command_router', None) or CommandRouter(client)
+            self.router.install()
     
     def add_shared_function(self, name: str, func: Callable):
         """Add shared function yang bisa diakses oleh semua plugins"""
@@ -33,9 +421,10 @@ class PluginLoader:
     def get_status(self) -> Dict[str, int]:
         """Return plugin loading status"""
         return {
-            'total_plugins': len(self.plugins) + len(self.failed_plugins),
+            'total_plugins': len(self.plugins) + len(self.failed_plugins) + len(self.lazy_plugins),
             'total_loaded': len(self.loaded_plugins),
-            'total_failed': len(self.failed_plugins)
+            'total_failed': len(self.failed_plugins),
+            'total_lazy': len(self.lazy_plugins)
         }
     
     def inject_dependencies(self, module):
@@ -78,6 +467,8 @@ class PluginLoader:
             
             # Create module from spec
             module = importlib.util.module_from_spec(spec)
+            if self.router:
+                self.router.plugin_files[plugin_name] = module.__file__
             
             # Add to sys.modules to prevent import issues
             sys.modules[f"plugin_{plugin_name}"] = module
@@ -97,8 +488,13 @@ class PluginLoader:
                 except Exception:
                     pass
             
-            # Execute module dengan client tersedia
+            # Execute module dengan client tersedia (handlers are attributed to this plugin)
+            if self.router:
+                self.router.current_plugin = plugin_name
+            timing = self.load_times[plugin_name] = {'import': 0.0, 'setup': 0.0, 'async_setup': 0.0}
+            started = time.perf_counter()
             spec.loader.exec_module(module)
+            timing['import'] = time.perf_counter() - started
             
             # Clean up builtins to avoid pollution  
             try:
@@ -112,12 +508,16 @@ class PluginLoader:
             self.inject_dependencies(module)
             
             # PERBAIKAN: Call setup function for plugins that use it
+            started = time.perf_counter()
             if hasattr(module, 'setup'):
                 try:
                     setup_result = module.setup(self.client)
                     if asyncio.iscoroutine(setup_result):
-                        logger.warning(f"Plugin {plugin_name} has async setup - consider using sync setup")
-                    logger.info(f"✅ Plugin {plugin_name} setup completed")
+                        # Awaited by run_pending_setups, concurrently with other async setups
+                        self.pending_setups[plugin_name] = setup_result
+                        logger.info(f"⏳ Plugin {plugin_name} async setup queued")
+                    else:
+                        logger.info(f"✅ Plugin {plugin_name} setup completed")
                 except Exception as setup_error:
                     logger.error(f"Plugin {plugin_name} setup error: {setup_error}")
             
@@ -126,11 +526,14 @@ class PluginLoader:
                 try:
                     init_result = module.initialize_plugin()
                     if asyncio.iscoroutine(init_result):
-                        logger.warning(f"Plugin {plugin_name} has async initialization - skipping for now")
+                        self.pending_setups[plugin_name] = init_result
                 except Exception as init_error:
                     logger.warning(f"Plugin {plugin_name} initialization error: {init_error}")
+            timing['setup'] = time.perf_counter() - started
             
             # For plugins without setup function, event handlers should already be registered via decorators
+            if self.router:
+                self.router.current_plugin = None
             
             # Get plugin info if available
             if hasattr(module, 'get_plugin_info'):
@@ -138,26 +541,117 @@ class PluginLoader:
                     self.plugin_info[plugin_name] = module.get_plugin_info()
                 except Exception as info_error:
                     logger.warning(f"Error getting plugin info for {plugin_name}: {info_error}")
+            elif isinstance(getattr(module, 'PLUGIN_INFO', None), dict):
+                self.plugin_info[plugin_name] = module.PLUGIN_INFO
             
             # Store plugin
             self.plugins[plugin_name] = module
             self.loaded_plugins.append(plugin_name)
+            self.generation += 1
+            if plugin_name in self.failed_plugins:
+                self.failed_plugins.remove(plugin_name)
             
             logger.info(f"✅ Plugin loaded successfully: {plugin_name}")
             return True
             
         except Exception as e:
-            self.failed_plugins.append(plugin_name)
+            if self.router:
+                self.router.current_plugin = None
+                # Drop whatever the module registered before it failed
+                self.router.remove_plugin(plugin_name)
+            if plugin_name not in self.failed_plugins:
+                self.failed_plugins.append(plugin_name)
             logger.error(f"❌ Failed to load plugin {plugin_name}: {e}")
             logger.debug(f"Plugin {plugin_name} traceback: {traceback.format_exc()}")
             return False
     
+    async def run_pending_setups(self, plugin_names=None) -> Dict[str, Any]:
+        """Await queued async setups concurrently (all, or just plugin_names)"""
+        names = [name for name in (plugin_names or list(self.pending_setups)) if name in self.pending_setups]
+        if not names:
+            return {}
+        
+        async def scoped(name, coro):
+            # Each step runs in its own task, so the plugin context stays per-setup
+            if self.router:
+                self.router.current_plugin = name
+            return await coro
+        
+        pipeline = StartupPipeline(name="plugin setup")
+        for name in names:
+            pipeline.add(name, (lambda name, coro: lambda: scoped(name, coro))(name, self.pending_setups.pop(name)))
+        results = await pipeline.run()
+        
+        for name, result in results.items():
+            self.load_times.setdefault(name, {'import': 0.0, 'setup': 0.0, 'async_setup': 0.0})
+            self.load_times[name]['async_setup'] = result['duration']
+            if result['status'] == 'ok':
+                logger.info(f"✅ Plugin {name} async setup completed ({result['duration'] * 1000:.0f}ms)")
+            else:
+                logger.error(f"Plugin {name} async setup error: {result['error']}")
+        logger.info(f"⏱️ {len(names)} async plugin setups finished in {pipeline.elapsed:.2f}s")
+        return results
+    
+    def get_load_report(self, limit=None) -> List[Dict[str, Any]]:
+        """Per-plugin load time breakdown, slowest first"""
+        rows = [
+            {'plugin': name, 'import_ms': t['import'] * 1000, 'setup_ms': t['setup'] * 1000,
+             'async_setup_ms': t['async_setup'] * 1000,
+             'total_ms': (t['import'] + t['setup'] + t['async_setup']) * 1000}
+            for name, t in self.load_times.items()
+        ]
+        rows.sort(key=lambda row: row['total_ms'], reverse=True)
+        return rows[:limit] if limit else rows
+    
+    def log_load_report(self, limit=10):
+        rows = self.get_load_report()
+        if not rows:
+            return
+        logger.info(f"⏱️ Plugin load times (total {sum(row['total_ms'] for row in rows) / 1000:.2f}s, slowest first):")
+        for row in rows[:limit]:
+            logger.info(f"   {row['plugin']}: {row['total_ms']:.0f}ms "
+                        f"(import {row['import_ms']:.0f}ms, setup {row['setup_ms']:.0f}ms, "
+                        f"async setup {row['async_setup_ms']:.0f}ms)")
+    
+    def register_lazy_plugin(self, plugin_name: str, plugin_path: str, entry: Dict[str, Any]):
+        """Route the plugin's command words to a stub that imports it on first use"""
+        async def lazy_stub(event):
+            if plugin_name not in self.lazy_plugins:
+                return  # already imported by another stub route
+            logger.info(f"Lazy loading plugin on first command: {plugin_name}")
+            if self.ensure_loaded(plugin_name):
+                await self.run_pending_setups([plugin_name])
+                # Real handlers are registered now; run this message through them only -
+                # other plugins on the same command already saw it
+                await self.router._dispatch(event, only_plugin=plugin_name)
+
+        self.lazy_plugins[plugin_name] = (plugin_path, lazy_stub)
+        if entry.get('info'):
+            self.plugin_info[plugin_name] = entry['info']
+        self.generation += 1
+        self.router.current_plugin = plugin_name
+        try:
+            for pattern in entry['patterns']:
+                self.router.add_event_handler(lazy_stub, events.NewMessage(pattern=pattern))
+        finally:
+            self.router.current_plugin = None
+
+    def ensure_loaded(self, plugin_name: str) -> bool:
+        """Import a lazily registered plugin now (no-op if already loaded)"""
+        lazy = self.lazy_plugins.pop(plugin_name, None)
+        if lazy is None:
+            return plugin_name in self.plugins
+        plugin_path, lazy_stub = lazy
+        self.router.remove_event_handler(lazy_stub)
+        return self.load_plugin(plugin_name, plugin_path)
+
     def load_all_plugins(self, plugins_dir: str) -> Dict[str, Any]:
         """Load all plugins from directory dengan enhanced error handling"""
         self.plugins_dir = plugins_dir
         results = {
             'loaded': [],
             'failed': [],
+            'lazy': [],
             'total': 0,
             'errors': {}
         }
@@ -178,11 +672,21 @@ class PluginLoader:
                 logger.info(f"No plugins found in {plugins_dir}")
                 return results
             
+            lazy_mode = PLUGIN_LAZY_LOAD and self.router is not None
+            if lazy_mode:
+                self.manifest = load_manifest(plugin_files)
+            
             # Load each plugin
             for plugin_file in plugin_files:
                 plugin_name = plugin_file.stem  # filename without extension
                 plugin_path = str(plugin_file.absolute())
                 
+                entry = self.manifest.get(plugin_name)
+                if lazy_mode and entry and entry['lazy'] and plugin_name not in PLUGIN_EAGER:
+                    self.register_lazy_plugin(plugin_name, plugin_path, entry)
+                    results['lazy'].append(plugin_name)
+                    continue
+                
                 logger.info(f"Loading plugin: {plugin_name}")
                 
                 try:
@@ -198,7 +702,8 @@ class PluginLoader:
                     logger.error(f"Exception loading {plugin_name}: {e}")
             
             # Summary
-            logger.info(f"Plugin loading complete: {len(results['loaded'])}/{results['total']} loaded successfully")
+            logger.info(f"Plugin loading complete: {len(results['loaded'])}/{results['total']} loaded successfully"
+                        + (f", {len(results['lazy'])} deferred until first command" if results['lazy'] else ""))
             if results['failed']:
                 logger.warning(f"Failed plugins: {', '.join(results['failed'])}")
             
@@ -208,47 +713,74 @@ class PluginLoader:
             logger.error(f"Error scanning plugins directory: {e}")
             return results
     
-    def unload_plugin(self, plugin_name: str) -> bool:
-        """Unload specific plugin dengan cleanup"""
+    async def run_cleanup(self, plugin_name: str, module) -> None:
+        """Call cleanup_plugin (sync or async) and wait for it; errors are logged, never raised"""
+        cleanup = getattr(module, 'cleanup_plugin', None)
+        if cleanup is None:
+            return
         try:
-            if plugin_name in self.plugins:
-                # Call cleanup if exists
-                module = self.plugins[plugin_name]
-                if hasattr(module, 'cleanup_plugin'):
-                    try:
-                        cleanup_result = module.cleanup_plugin()
-                        if asyncio.iscoroutine(cleanup_result):
-                            logger.warning(f"Plugin {plugin_name} has async cleanup - skipping")
-                    except Exception as cleanup_error:
-                        logger.warning(f"Plugin {plugin_name} cleanup error: {cleanup_error}")
-                
-                # Remove from sys.modules
-                sys_module_name = f"plugin_{plugin_name}"
-                if sys_module_name in sys.modules:
-                    del sys.modules[sys_module_name]
-                
-                # Remove from our tracking
-                del self.plugins[plugin_name]
-                if plugin_name in self.loaded_plugins:
-                    self.loaded_plugins.remove(plugin_name)
-                if plugin_name in self.plugin_info:
-                    del self.plugin_info[plugin_name]
-                
-                logger.info(f"Plugin unloaded: {plugin_name}")
+            result = cleanup()
+            if inspect.isawaitable(result):
+                await result
+        except Exception as cleanup_error:
+            logger.warning(f"Plugin {plugin_name} cleanup error: {cleanup_error}")
+    
+    async def unload_plugin(self, plugin_name: str) -> bool:
+        """Unload specific plugin: remove its handlers and tasks, then await its cleanup"""
+        try:
+            if plugin_name in self.lazy_plugins:
+                # Never imported: just drop the stub routes
+                self.router.remove_event_handler(self.lazy_plugins.pop(plugin_name)[1])
+                self.plugin_info.pop(plugin_name, None)
+                self.generation += 1
+                logger.info(f"Plugin unloaded (was not imported yet): {plugin_name}")
                 return True
-            return False
+            pending = self.pending_setups.pop(plugin_name, None)
+            if pending is not None:
+                pending.close()  # async setup never ran
+            
+            sys_module_name = f"plugin_{plugin_name}"
+            module = self.plugins.pop(plugin_name, None) or sys.modules.get(sys_module_name)
+            if module is None and plugin_name not in self.failed_plugins:
+                return False
+            
+            try:
+                # Handlers first, in one step, so nothing dispatches into a half-torn-down plugin
+                if self.router:
+                    removed = self.router.remove_plugin(plugin_name)
+                    logger.info(f"Plugin {plugin_name}: removed {removed['handlers']} handlers, "
+                                f"cancelled {removed['tasks']} tasks")
+            finally:
+                if module is not None:
+                    await self.run_cleanup(plugin_name, module)
+            
+            # Remove from sys.modules and our tracking
+            sys.modules.pop(sys_module_name, None)
+            for status_list in (self.loaded_plugins, self.failed_plugins):
+                if plugin_name in status_list:
+                    status_list.remove(plugin_name)
+            self.plugin_info.pop(plugin_name, None)
+            self.generation += 1
+            
+            logger.info(f"Plugin unloaded: {plugin_name}")
+            return True
         except Exception as e:
             logger.error(f"Error unloading plugin {plugin_name}: {e}")
             return False
     
-    def reload_plugin(self, plugin_name: str) -> bool:
-        """Reload specific plugin"""
-        if plugin_name in self.plugins:
+    async def reload_plugin(self, plugin_name: str) -> bool:
+        """Reload specific plugin (old handlers/tasks removed and cleanup finished before the new module loads)"""
+        if plugin_name in self.plugins or plugin_name in self.lazy_plugins or plugin_name in self.failed_plugins:
             plugin_path = os.path.join(self.plugins_dir, f"{plugin_name}.py")
             if os.path.exists(plugin_path):
                 logger.info(f"Reloading plugin: {plugin_name}")
-                self.unload_plugin(plugin_name)
-                return self.load_plugin(plugin_name, plugin_path)
+                if not self.router:
+                    logger.warning(f"Command router disabled - old handlers of {plugin_name} cannot be removed")
+                await self.unload_plugin(plugin_name)
+                loaded = self.load_plugin(plugin_name, plugin_path)
+                if plugin_name in self.pending_setups:
+                    await self.run_pending_setups([plugin_name])
+                return loaded
         return False
     
     def get_plugin(self, plugin_name: str):
@@ -260,6 +792,7 @@ class PluginLoader:
         return {
             'loaded': self.loaded_plugins.copy(),
             'failed': self.failed_plugins.copy(),
+            'lazy': list(self.lazy_plugins),
             'all': list(self.plugins.keys()),
             'info': self.plugin_info.copy()
         }
@@ -272,10 +805,10 @@ class PluginLoader:
                 commands[plugin_name] = plugin_info['commands']
         return commands
     
-    def cleanup_all_plugins(self):
+    async def cleanup_all_plugins(self):
         """Cleanup all loaded plugins"""
         for plugin_name in self.loaded_plugins.copy():
-            self.unload_plugin(plugin_name)
+            await self.unload_plugin(plugin_name)
 
 
 def setup_plugins(client, plugins_dir: str = "plugins") -> PluginLoader:
@@ -322,6 +855,8 @@ def setup_plugins(client, plugins_dir: str = "plugins") -> PluginLoader:
         logger.info(f"   📊 Total found: {results['total']}")
         logger.info(f"   ✅ Successfully loaded: {len(results['loaded'])}")
         logger.info(f"   ❌ Failed to load: {len(results['failed'])}")
+        if results['lazy']:
+            logger.info(f"   💤 Lazy (import on first command): {len(results['lazy'])} - {', '.join(results['lazy'])}")
         
         if results['loaded']:
             logger.info(f"   🎯 Loaded plugins: {', '.join(results['loaded'])}")
@@ -332,6 +867,9 @@ def setup_plugins(client, plugins_dir: str = "plugins") -> PluginLoader:
             for plugin, error in results.get('errors', {}).items():
                 logger.warning(f"      - {plugin}: {error}")
         
+        if loader.router:
+            logger.info(f"   🧭 Command router: {loader.router.route_count()} handlers on {len(loader.router.routes)} commands")
+        
         # Show available commands
         commands = loader.get_plugin_commands()
         if commands:
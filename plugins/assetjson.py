@@ -137,6 +137,7 @@ class AssetManager:
         
         # Caching
         self._emoji_cache = {}
+        self._emoji_engine = None  # rebuilt when premium_emojis changes
         self._font_cache = {}
         self._config_cache = {}
         
@@ -217,6 +218,7 @@ class AssetManager:
                     data = json.load(f)
                     if 'premium_emojis' in data:
                         self.premium_emojis.update(data['premium_emojis'])
+                        self._emoji_engine = None
                     self._premium_status = data.get('premium_status', False)
             
             # Load settings
@@ -339,60 +341,16 @@ class AssetManager:
         return result
     
     def create_premium_entities(self, text: str) -> List:
-        """Create premium emoji entities with proper UTF-16 calculation"""
-        entities = []
-        
+        """Create premium emoji entities via the shared compiled engine"""
         if not text or not self._premium_status:
-            return entities
+            return []
         
         try:
-            # Import here to avoid circular dependency
-            try:
-                from telethon.tl.types import MessageEntityCustomEmoji
-            except ImportError:
-                self._logger.warning("Telethon not available, returning empty entities")
-                return entities
-            
-            current_offset = 0
-            i = 0
-            
-            while i < len(text):
-                found_emoji = False
-                
-                for emoji_type, emoji_data in self.premium_emojis.items():
-                    emoji_char = emoji_data['char']
-                    emoji_id = emoji_data['id']
-                    
-                    if text[i:].startswith(emoji_char):
-                        try:
-                            # Proper UTF-16 length calculation
-                            emoji_bytes = emoji_char.encode('utf-16-le')
-                            utf16_length = len(emoji_bytes) // 2
-                            
-                            entities.append(MessageEntityCustomEmoji(
-                                offset=current_offset,
-                                length=utf16_length,
-                                document_id=int(emoji_id)
-                            ))
-                            
-                            i += len(emoji_char)
-                            current_offset += utf16_length
-                            found_emoji = True
-                            break
-                            
-                        except Exception as e:
-                            self._logger.error(f"Error creating entity for {emoji_type}: {e}")
-                            break
-                
-                if not found_emoji:
-                    char = text[i]
-                    char_bytes = char.encode('utf-16-le')
-                    char_utf16_length = len(char_bytes) // 2
-                    current_offset += char_utf16_length
-                    i += 1
-            
-            return entities
-            
+            if self._emoji_engine is None:
+                # Import here to avoid circular dependency
+                from utils.premium_emoji_helper import PremiumEmojiEngine
+                self._emoji_engine = PremiumEmojiEngine(self.premium_emojis)
+            return self._emoji_engine.entities(text)
         except Exception as e:
             self._logger.error(f"Error in create_premium_entities: {e}")
             return []
@@ -583,6 +541,7 @@ class AssetManager:
     def clear_caches(self):
         """Clear all caches"""
         self._emoji_cache.clear()
+        self._emoji_engine = None
         self._font_cache.clear()
         self._config_cache.clear()
         self._logger.info("All caches cleared")
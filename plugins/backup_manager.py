@@ -22,6 +22,12 @@ except ImportError:
     select = None
     get_owner_id = lambda: 0
 
+# Connection pool stats (terpisah: helper di atas bisa gagal import sendiri)
+try:
+    from database import db_manager
+except ImportError:
+    db_manager = None
+
 # ===== Plugin Info =====
 PLUGIN_INFO = {
     "name": "backup_manager",
@@ -302,6 +308,17 @@ async def db_status_handler(event):
             if len(db_files) > 8:
                 report_lines.append(f"• *...and {len(db_files)-8} more*")
         
+        # Connection pool per database file (hanya yang sudah dibuka)
+        pool_stats = db_manager.get_pool_stats() if db_manager else {}
+        if pool_stats:
+            report_lines.append("")
+            report_lines.append(f"{get_emoji('check')} **Connection Pools:**")
+            for db_file, pool in sorted(pool_stats.items()):
+                report_lines.append(f"• `{db_file}`")
+                report_lines.append(f"  Open: `{pool['open_connections']}` (readers: {pool['readers']}, idle: {pool['idle_readers']})")
+                report_lines.append(f"  Checkouts: `{pool['checkouts']}` (write: {pool['writer_checkouts']}, read: {pool['reader_checkouts']})")
+                report_lines.append(f"  Waits: `{pool['waits']}` (avg {pool['avg_wait_ms']:.1f}ms, max {pool['max_wait'] * 1000:.1f}ms)")
+        
         report_lines.append("")
         report_lines.append(f"{get_emoji('adder2')} Use `.backup` to create backup")
         
@@ -12,7 +12,6 @@ Description:
 import re
 import os
 import sys
-import json
 from datetime import datetime
 from telethon import events
 from telethon.tl.types import MessageEntityCustomEmoji, Channel, Chat, User
@@ -43,9 +42,8 @@ PREMIUM_EMOJIS = {
 # ===== Global Client Variable =====
 client = None
 
-# ===== Blacklist File Path =====
-BLACKLIST_FILE = "data/blacklist/gcast_blacklist.json"
-LEGACY_BLACKLIST_FILE = "gcast_blacklist.json"  # Backward compatibility
+# ===== Shared Blacklist (data/blacklist.db, juga dipakai gcast & grub) =====
+from utils.blacklist_service import blacklist_service
 
 # Import from central font system
 from utils.font_helper import convert_font
@@ -162,77 +160,17 @@ def get_prefix():
         return "."
 
 def load_blacklist():
-    """Load blacklist dari file JSON dengan multi-location support"""
-    blacklist_files = [BLACKLIST_FILE, LEGACY_BLACKLIST_FILE]
-    
-    for blacklist_file in blacklist_files:
-        try:
-            if os.path.exists(blacklist_file):
-                with open(blacklist_file, 'r') as f:
-                    data = json.load(f)
-                    if isinstance(data, dict) and 'blacklisted_chats' in data:
-                        # Convert old format ke dict modern
-                        blacklist_data = {}
-                        for chat_id in data['blacklisted_chats']:
-                            blacklist_data[int(chat_id)] = {
-                                'title': f'Chat {chat_id}',
-                                'type': 'Unknown',
-                                'added_date': datetime.now().isoformat(),
-                                'added_by': 'legacy'
-                            }
-                        print(f"[Blacklist] Loaded {len(blacklist_data)} chats from {blacklist_file}")
-                        return blacklist_data
-                    elif isinstance(data, dict):
-                        # New format, pastikan key adalah angka
-                        blacklist_data = {int(k): v for k, v in data.items() if k.lstrip('-').isdigit()}
-                        print(f"[Blacklist] Loaded {len(blacklist_data)} chats from {blacklist_file}")
-                        return blacklist_data
-        except Exception as e:
-            print(f"Error loading {blacklist_file}: {e}")
-            continue
-    
-    print("[Blacklist] No blacklist file found, starting with empty blacklist")
-    return {}
-
-def save_blacklist(blacklist):
-    """Simpan blacklist ke file JSON dengan directory creation"""
-    try:
-        # Ensure directory exists
-        os.makedirs(os.path.dirname(BLACKLIST_FILE), exist_ok=True)
-        
-        # Save in new format with legacy support
-        data = {str(k): v for k, v in blacklist.items()}
-        
-        # Add legacy format for backward compatibility
-        data['blacklisted_chats'] = list(blacklist.keys())
-        data['metadata'] = {
-            'last_updated': datetime.now().isoformat(),
-            'total_blacklisted': len(blacklist),
-            'version': '2.0.0'
+    """Ambil blacklist dari shared blacklist service (in-memory, tanpa baca file)"""
+    return {
+        row['chat_id']: {
+            'title': row['title'],
+            'type': row['chat_type'],
+            'added_date': row['added_at'],
+            'added_by': row['added_by'],
+            'permanent': bool(row['permanent'])
         }
-        
-        with open(BLACKLIST_FILE, 'w') as f:
-            json.dump(data, f, indent=2)
-        
-        # Force reload blacklist in gcast plugin if available
-        try:
-            import sys
-            if 'plugin_gcast' in sys.modules:
-                gcast_module = sys.modules['plugin_gcast']
-                if hasattr(gcast_module, 'load_blacklist'):
-                    gcast_module.load_blacklist()
-                    print(f"[Blacklist] Successfully reloaded gcast blacklist - {len(blacklist)} chats")
-                else:
-                    print("[Blacklist] gcast plugin loaded but no load_blacklist function found")
-            else:
-                print("[Blacklist] gcast plugin not loaded for reload")
-        except Exception as e:
-            print(f"[Blacklist] Error reloading gcast blacklist: {e}")
-            
-        return True
-    except Exception as e:
-        print(f"Error saving blacklist: {e}")
-        return False
+        for row in blacklist_service.get_all()
+    }
 
 async def get_chat_info(chat_id):
     """Ambil info chat: title & type"""
@@ -271,7 +209,6 @@ async def add_blacklist_handler(event):
     try:
         prefix = get_prefix()
         command_arg = event.pattern_match.group(2)
-        blacklist = load_blacklist()
         
         # Jika tidak ada argumen, gunakan chat saat ini
         if not command_arg or not command_arg.strip():
@@ -295,7 +232,7 @@ async def add_blacklist_handler(event):
             source = "manual ID"
         
         # Cek apakah sudah blacklisted
-        if chat_id in blacklist:
+        if blacklist_service.contains(chat_id):
             already_text = f"""
 {get_emoji('adder1')} {safe_convert_font('ALREADY BLACKLISTED', 'mono')}
 {get_emoji('check')} Chat sudah ada di blacklist
@@ -307,16 +244,8 @@ async def add_blacklist_handler(event):
         # Ambil info chat
         chat_info = await get_chat_info(chat_id)
         
-        # Tambahkan ke blacklist
-        blacklist[chat_id] = {
-            'title': chat_info['title'],
-            'type': chat_info['type'],
-            'added_date': datetime.now().isoformat(),
-            'added_by': source
-        }
-        
-        # Simpan ke file
-        if save_blacklist(blacklist):
+        # Tambahkan ke blacklist (write-through, gcast langsung ter-update)
+        if await blacklist_service.add_async(chat_id, chat_info['title'], chat_info['type'], added_by=source):
             success_text = f"""
 {get_emoji('adder2')} {safe_convert_font('BLACKLIST ADDED', 'mono')}
 ╔══════════════════════════════════╗
@@ -330,7 +259,7 @@ async def add_blacklist_handler(event):
 {get_emoji('check')} GCast messages will be blocked
 {get_emoji('check')} Automatic filtering enabled
 {get_emoji('check')} Persistent across bot restarts
-{get_emoji('main')} Total blacklisted chats: {safe_convert_font(str(len(blacklist)), 'bold')}
+{get_emoji('main')} Total blacklisted chats: {safe_convert_font(str(len(blacklist_service)), 'bold')}
             """.strip()
             await safe_send_message(event, success_text)
         else:
@@ -353,7 +282,6 @@ async def remove_blacklist_handler(event):
     try:
         prefix = get_prefix()
         command_arg = event.pattern_match.group(2)
-        blacklist = load_blacklist()
         
         # Jika tidak ada argumen, gunakan chat saat ini
         if not command_arg or not command_arg.strip():
@@ -371,7 +299,8 @@ async def remove_blacklist_handler(event):
             chat_id = int(chat_id_str)
         
         # Cek apakah ada di blacklist
-        if chat_id not in blacklist:
+        chat_data = blacklist_service.get(chat_id)
+        if not chat_data:
             not_found_text = f"""
 {get_emoji('adder1')} {safe_convert_font('NOT IN BLACKLIST', 'mono')}
 {get_emoji('check')} Chat belum ada di blacklist
@@ -380,28 +309,22 @@ async def remove_blacklist_handler(event):
             await safe_send_message(event, not_found_text)
             return
         
-        # Ambil info chat sebelum dihapus
-        chat_data = blacklist[chat_id]
-        
-        # Hapus dari blacklist
-        del blacklist[chat_id]
-        
-        # Simpan perubahan
-        if save_blacklist(blacklist):
+        # Hapus dari blacklist (permanent entries tidak bisa dihapus)
+        if await blacklist_service.remove_async(chat_id):
             removed_text = f"""
 {get_emoji('adder4')} {safe_convert_font('BLACKLIST REMOVED', 'mono')}
 ╔══════════════════════════════════╗
    {get_emoji('main')} {safe_convert_font('GCAST ACCESS RESTORED', 'mono')} {get_emoji('main')}
 ╚══════════════════════════════════╝
 {get_emoji('check')} {safe_convert_font('Chat:', 'bold')} {safe_convert_font(chat_data['title'], 'mono')}
-{get_emoji('adder2')} {safe_convert_font('Type:', 'bold')} {chat_data['type']}
+{get_emoji('adder2')} {safe_convert_font('Type:', 'bold')} {chat_data['chat_type']}
 {get_emoji('adder3')} {safe_convert_font('ID:', 'bold')} {chat_id}
 {get_emoji('adder5')} {safe_convert_font('Removed:', 'bold')} {datetime.now().strftime('%H:%M:%S')}
 {get_emoji('adder6')} {safe_convert_font('Access Status:', 'bold')}
 {get_emoji('check')} GCast messages will be delivered
 {get_emoji('check')} Chat unprotected
 {get_emoji('check')} Changes saved permanently
-{get_emoji('main')} Remaining blacklisted chats: {safe_convert_font(str(len(blacklist)), 'bold')}
+{get_emoji('main')} Remaining blacklisted chats: {safe_convert_font(str(len(blacklist_service)), 'bold')}
             """.strip()
             await safe_send_message(event, removed_text)
         else:
@@ -490,8 +413,7 @@ async def clear_blacklist_handler(event):
         
         # Cek konfirmasi
         if command_arg and 'confirm' in command_arg.lower():
-            empty_blacklist = {}
-            if save_blacklist(empty_blacklist):
+            if await blacklist_service.clear_async() is not None:
                 cleared_text = f"""
 {get_emoji('adder4')} {safe_convert_font('BLACKLIST CLEARED', 'mono')}
 ╔══════════════════════════════════╗
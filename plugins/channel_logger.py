@@ -10,9 +10,9 @@ import asyncio
 from datetime import datetime
 from telethon import events
 from telethon.errors import ChatWriteForbiddenError, UserBannedInChannelError, FloodWaitError
-from telethon.tl.types import MessageEntityCustomEmoji
 import sqlite3
 import os
+from utils.premium_emoji_helper import PremiumEmojiEngine
 
 # ===== Plugin Info =====
 PLUGIN_INFO = {
@@ -36,53 +36,15 @@ PREMIUM_EMOJIS = {
     'adder6': {'id': '5794323465452394551', 'char': '🎚️'}
 }
 
+EMOJI_ENGINE = PremiumEmojiEngine(PREMIUM_EMOJIS)
+
 def get_emoji(emoji_type):
     """Get premium emoji character"""
     return PREMIUM_EMOJIS.get(emoji_type, {}).get('char', '🤩')
 
 def create_premium_entities(text):
-    """Create premium emoji entities for text"""
-    try:
-        entities = []
-        current_offset = 0
-        i = 0
-        
-        while i < len(text):
-            found_emoji = False
-            
-            for emoji_type, emoji_data in PREMIUM_EMOJIS.items():
-                emoji_char = emoji_data['char']
-                emoji_id = emoji_data['id']
-                
-                if text[i:].startswith(emoji_char):
-                    try:
-                        emoji_bytes = emoji_char.encode('utf-16-le')
-                        utf16_length = len(emoji_bytes) // 2
-                        
-                        entities.append(MessageEntityCustomEmoji(
-                            offset=current_offset,
-                            length=utf16_length,
-                            document_id=int(emoji_id)
-                        ))
-                        
-                        i += len(emoji_char)
-                        current_offset += utf16_length
-                        found_emoji = True
-                        break
-                        
-                    except Exception:
-                        break
-            
-            if not found_emoji:
-                char = text[i]
-                char_bytes = char.encode('utf-16-le')
-                char_utf16_length = len(char_bytes) // 2
-                current_offset += char_utf16_length
-                i += 1
-        
-        return entities
-    except Exception:
-        return []
+    """Create premium emoji entities (shared compiled engine, cached templates)"""
+    return EMOJI_ENGINE.entities(text)
 
 async def safe_send_premium(event, text):
     """Send message with premium entities"""
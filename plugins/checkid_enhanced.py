@@ -13,6 +13,8 @@ from telethon.tl.types import MessageEntityCustomEmoji, User, Chat, Channel
 from telethon.errors import UsernameNotOccupiedError, UsernameInvalidError
 import re
 
+from utils.participant_cache import participant_cache
+
 # Import database helper
 try:
     from database import create_table, insert, select, get_owner_id
@@ -235,7 +237,7 @@ async def get_user_from_username(client, username):
         username = username.replace('@', '').replace('https://t.me/', '').replace('t.me/', '')
         
         # Get user entity
-        user_entity = await client.get_entity(username)
+        user_entity = await participant_cache.resolve_user(client, username)
         
         if isinstance(user_entity, User):
             return {
@@ -326,7 +328,7 @@ async def checkid_handler(event):
             if target.isdigit():
                 try:
                     user_id = int(target)
-                    user_entity = await client.get_entity(user_id)
+                    user_entity = await participant_cache.resolve_user(client, user_id)
                     
                     if isinstance(user_entity, User):
                         user_data = {
@@ -450,6 +452,7 @@ async def setup(client_instance):
     
     # Initialize database
     init_checkid_database()
+    participant_cache.attach(client)
     
     # Register handlers for multiple commands
     client.add_event_handler(checkid_handler, events.NewMessage(pattern=r"\.id(\s|$)"))
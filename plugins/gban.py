@@ -5,13 +5,18 @@ Founder Userbot: Vzoel Fox's Ltpn 🤩
 Version: 1.0.0
 """
 
-import sqlite3
 import os
+import time
 import asyncio
 from datetime import datetime
 from telethon import events
 from telethon.tl.types import MessageEntityCustomEmoji, User
-from telethon.errors import UserAdminInvalidError, ChatAdminRequiredError, UserNotParticipantError
+from telethon.errors import UserAdminInvalidError, ChatAdminRequiredError, UserNotParticipantError, FloodWaitError
+from utils.dialog_index import dialog_index
+from utils.participant_cache import participant_cache
+from utils.progress_reporter import ProgressReporter
+from utils.send_scheduler import SendScheduler
+from database import get_config, set_config, async_db, db_manager
 
 # Plugin Info
 PLUGIN_INFO = {
@@ -19,8 +24,8 @@ PLUGIN_INFO = {
     "version": "1.0.0",
     "description": "Global ban system with auto UTF-16 premium emoji detection and SQLite database.",
     "author": "Founder Userbot: Vzoel Fox's Ltpn 🤩",
-    "commands": [".gban", ".ungban", ".gbanlist", ".gbancheck", ".testgban"],
-    "features": ["global ban", "global unban", "SQLite storage", "auto UTF-16 premium emoji", "cross-group enforcement"]
+    "commands": [".gban", ".ungban", ".gbanlist", ".gbancheck", ".gbanenforce", ".testgban"],
+    "features": ["global ban", "global unban", "SQLite storage", "auto UTF-16 premium emoji", "cross-group enforcement", "auto-ban on join"]
 }
 
 # Auto Premium Emoji Mapping (UTF-16 auto-detection)
@@ -38,6 +43,21 @@ PREMIUM_EMOJIS = {
 DB_FILE = "plugins/gban.db"
 client = None
 
+# Parallel executor settings
+GBAN_CONCURRENCY = int(os.getenv("GBAN_CONCURRENCY", "8"))  # bans in flight
+GBAN_LOG_BATCH = 50      # gban_logs rows per DB write
+MAX_BAN_ATTEMPTS = 3     # FloodWait retries per group
+
+# Ban/unban requests get their own budget; FloodWait pauses every worker
+ban_scheduler = SendScheduler(rate=5.0, max_rate=15.0, burst=GBAN_CONCURRENCY)
+
+# In-memory gban index (loaded at setup, synced by add_gban/remove_gban)
+GBANNED_IDS = set()
+ENFORCE_GBAN = False            # auto-ban gbanned users on join/message (config: gban_enforce)
+ENFORCE_COOLDOWN = 60           # seconds before retrying the same (chat, user)
+_enforce_attempts = {}          # (chat_id, user_id) -> monotonic time
+enforce_stats = {'checks': 0, 'hits': 0, 'banned': 0, 'failed': 0}
+
 def get_utf16_length(emoji_char):
     """Get UTF-16 length of emoji character"""
     try:
@@ -71,11 +91,10 @@ async def safe_send_message(event, text):
     try:
         entities = create_premium_emoji_entities(text)
         if entities:
-            await event.reply(text, formatting_entities=entities)
-        else:
-            await event.reply(text)
+            return await event.reply(text, formatting_entities=entities)
+        return await event.reply(text)
     except Exception as e:
-        await event.reply(text)
+        return await event.reply(text)
 
 def get_emoji(emoji_type):
     """Get premium emoji with fallback"""
@@ -87,121 +106,190 @@ async def is_owner_check(user_id):
     OWNER_ID = 7847025168
     return user_id == OWNER_ID
 
+GBANNED_USERS_SCHEMA = """
+    user_id INTEGER PRIMARY KEY,
+    username TEXT,
+    first_name TEXT,
+    reason TEXT,
+    banned_by INTEGER,
+    banned_date TEXT,
+    total_groups INTEGER DEFAULT 0
+"""
+
+GBAN_LOGS_SCHEMA = """
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER,
+    action TEXT,
+    chat_id INTEGER,
+    chat_title TEXT,
+    success INTEGER,
+    error_msg TEXT,
+    timestamp TEXT
+"""
+
+GBAN_LOG_INSERT = """
+    INSERT INTO gban_logs 
+    (user_id, action, chat_id, chat_title, success, error_msg, timestamp)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+
 def init_database():
-    """Initialize GBan database"""
-    try:
-        os.makedirs(os.path.dirname(DB_FILE), exist_ok=True)
-        conn = sqlite3.connect(DB_FILE)
-        conn.execute("""
-            CREATE TABLE IF NOT EXISTS gbanned_users (
-                user_id INTEGER PRIMARY KEY,
-                username TEXT,
-                first_name TEXT,
-                reason TEXT,
-                banned_by INTEGER,
-                banned_date TEXT,
-                total_groups INTEGER DEFAULT 0
-            )
-        """)
-        conn.execute("""
-            CREATE TABLE IF NOT EXISTS gban_logs (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER,
-                action TEXT,
-                chat_id INTEGER,
-                chat_title TEXT,
-                success INTEGER,
-                error_msg TEXT,
-                timestamp TEXT
-            )
-        """)
-        conn.commit()
-        conn.close()
-        return True
-    except Exception as e:
-        print(f"[GBan] Database init error: {e}")
-        return False
+    """Initialize GBan database (via db_manager, same pooled file as async_db)"""
+    return (db_manager.create_table('gbanned_users', GBANNED_USERS_SCHEMA, DB_FILE) and
+            db_manager.create_table('gban_logs', GBAN_LOGS_SCHEMA, DB_FILE))
 
-def add_gban(user_id, username, first_name, reason, banned_by):
+async def add_gban(user_id, username, first_name, reason, banned_by):
     """Add user to global ban list"""
-    try:
-        conn = sqlite3.connect(DB_FILE)
-        conn.execute("""
-            INSERT OR REPLACE INTO gbanned_users 
-            (user_id, username, first_name, reason, banned_by, banned_date)
-            VALUES (?, ?, ?, ?, ?, ?)
-        """, (user_id, username, first_name, reason, banned_by, datetime.now().isoformat()))
-        conn.commit()
-        conn.close()
-        return True
-    except Exception as e:
-        print(f"[GBan] Add error: {e}")
+    result = await async_db.execute_query("""
+        INSERT OR REPLACE INTO gbanned_users 
+        (user_id, username, first_name, reason, banned_by, banned_date)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, (user_id, username, first_name, reason, banned_by, datetime.now().isoformat()), DB_FILE)
+    if result is None:
+        print(f"[GBan] Add error: {user_id}")
         return False
+    GBANNED_IDS.add(user_id)
+    return True
 
-def remove_gban(user_id):
+async def remove_gban(user_id):
     """Remove user from global ban list"""
-    try:
-        conn = sqlite3.connect(DB_FILE)
-        result = conn.execute("DELETE FROM gbanned_users WHERE user_id = ?", (user_id,))
-        conn.commit()
-        conn.close()
-        return result.rowcount > 0
-    except Exception as e:
-        print(f"[GBan] Remove error: {e}")
+    result = await async_db.execute_query("DELETE FROM gbanned_users WHERE user_id = ?", (user_id,), DB_FILE)
+    if result is None:
+        print(f"[GBan] Remove error: {user_id}")
         return False
+    GBANNED_IDS.discard(user_id)
+    return result > 0
+
+def load_gban_index():
+    """Load all gbanned user ids into memory (called once at setup)"""
+    rows = db_manager.execute_query("SELECT user_id FROM gbanned_users", (), DB_FILE, fetch="all")
+    if rows is None:
+        print("[GBan] Index load error")
+        return 0
+    GBANNED_IDS.clear()
+    GBANNED_IDS.update(row[0] for row in rows)
+    return len(GBANNED_IDS)
 
 def is_gbanned(user_id):
-    """Check if user is globally banned"""
-    try:
-        conn = sqlite3.connect(DB_FILE)
-        result = conn.execute("SELECT * FROM gbanned_users WHERE user_id = ?", (user_id,))
-        row = result.fetchone()
-        conn.close()
-        return row is not None
-    except Exception as e:
-        return False
+    """Check if user is globally banned (memory only, O(1))"""
+    return user_id in GBANNED_IDS
 
-def get_gban_info(user_id):
+async def get_gban_info(user_id):
     """Get gban information for user"""
-    try:
-        conn = sqlite3.connect(DB_FILE)
-        result = conn.execute("SELECT * FROM gbanned_users WHERE user_id = ?", (user_id,))
-        row = result.fetchone()
-        conn.close()
-        if row:
-            return {
-                'user_id': row[0], 'username': row[1], 'first_name': row[2],
-                'reason': row[3], 'banned_by': row[4], 'banned_date': row[5],
-                'total_groups': row[6]
-            }
-        return None
-    except Exception as e:
-        return None
+    row = await async_db.execute_query("SELECT * FROM gbanned_users WHERE user_id = ?", (user_id,), DB_FILE, fetch="one")
+    return dict(row) if row else None
 
-def get_all_gbanned():
+async def get_all_gbanned():
     """Get all globally banned users"""
-    try:
-        conn = sqlite3.connect(DB_FILE)
-        result = conn.execute("SELECT * FROM gbanned_users ORDER BY banned_date DESC")
-        rows = result.fetchall()
-        conn.close()
-        return rows
-    except Exception as e:
-        return []
+    rows = await async_db.execute_query("SELECT * FROM gbanned_users ORDER BY banned_date DESC", (), DB_FILE, fetch="all")
+    return rows or []
 
-def log_gban_action(user_id, action, chat_id, chat_title, success, error_msg=None):
+async def log_gban_action(user_id, action, chat_id, chat_title, success, error_msg=None):
     """Log gban actions"""
+    if await async_db.execute_query(GBAN_LOG_INSERT, (user_id, action, chat_id, chat_title, success,
+                                                      error_msg, datetime.now().isoformat()), DB_FILE) is None:
+        print(f"[GBan] Log error: {user_id} {action}")
+
+async def log_gban_actions(rows):
+    """Log many gban actions in one transaction
+    rows: (user_id, action, chat_id, chat_title, success, error_msg, timestamp)"""
+    if rows and await async_db.executemany(GBAN_LOG_INSERT, rows, DB_FILE) is None:
+        print(f"[GBan] Batch log error: {len(rows)} rows")
+
+async def update_gban_total(user_id, total_groups):
+    """Store number of groups the user was banned from"""
+    if await async_db.execute_query("UPDATE gbanned_users SET total_groups = ? WHERE user_id = ?",
+                                    (total_groups, user_id), DB_FILE) is None:
+        print(f"[GBan] Total update error: {user_id}")
+
+async def ban_in_chat(row, user_id):
+    """
+    Ban user_id in one dialog index row. Basic groups have no ban list
+    (edit_permissions only works on channels), so the user is removed instead.
+    """
+    peer = dialog_index.input_peer(row)
+    if row['chat_type'] == 'group':
+        await client.kick_participant(peer, user_id)
+    else:
+        await client.edit_permissions(peer, user_id, view_messages=False)
+
+async def execute_gban_action(user_id, action, progress_callback=None):
+    """
+    Ban/unban user_id di semua grup dengan ban rights (dari dialog index cache).
+    Basic groups: ban = remove user, unban di-skip (tidak ada ban list).
+    Bounded worker pool, shared FloodWait backoff, log ditulis per batch.
+    """
+    await dialog_index.ensure_ready(client)
+    joined = dialog_index.get_targets("all")
+    targets = dialog_index.get_targets("bannable")
+    basic_groups = sum(1 for row in targets if row['chat_type'] == 'group')
+    if action != "ban":
+        targets = [row for row in targets if row['chat_type'] != 'group']
+    
+    results = {
+        'total': len(targets),
+        'success': 0,
+        'failed': 0,
+        'skipped': len(joined) - len(targets),  # no ban rights (or basic group on unban), not attempted
+        'basic_groups': basic_groups
+    }
+    
+    queue = asyncio.Queue()
+    for row in targets:
+        queue.put_nowait((row, 0))
+    
+    log_buffer = []
+    
+    async def flush_logs():
+        if log_buffer:
+            batch = log_buffer[:]
+            log_buffer.clear()
+            await log_gban_actions(batch)
+    
+    async def finish(row, success, error=None):
+        results['success' if success else 'failed'] += 1
+        log_buffer.append((user_id, action, row['peer_id'], row['title'], int(success),
+                           (error or '')[:200] or None, datetime.now().isoformat()))
+        if len(log_buffer) >= GBAN_LOG_BATCH:
+            await flush_logs()
+        if progress_callback:
+            await progress_callback(results['success'] + results['failed'], results['total'], results['success'])
+    
+    async def worker():
+        while True:
+            try:
+                row, attempts = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            
+            try:
+                await ban_scheduler.acquire()
+                if action == "ban":
+                    await ban_in_chat(row, user_id)
+                else:
+                    await client.edit_permissions(dialog_index.input_peer(row), user_id)
+                ban_scheduler.on_success()
+                await finish(row, True)
+                
+            except FloodWaitError as e:
+                if ban_scheduler.on_flood_wait(e.seconds) and attempts + 1 < MAX_BAN_ATTEMPTS:
+                    queue.put_nowait((row, attempts + 1))
+                else:
+                    await finish(row, False, f"FloodWait {e.seconds}s")
+                
+            except (UserAdminInvalidError, ChatAdminRequiredError) as e:
+                # Cached rights outdated
+                await finish(row, False, f"No ban rights: {e}")
+                
+            except Exception as e:
+                await finish(row, False, str(e))
+    
     try:
-        conn = sqlite3.connect(DB_FILE)
-        conn.execute("""
-            INSERT INTO gban_logs 
-            (user_id, action, chat_id, chat_title, success, error_msg, timestamp)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        """, (user_id, action, chat_id, chat_title, success, error_msg, datetime.now().isoformat()))
-        conn.commit()
-        conn.close()
-    except Exception as e:
-        print(f"[GBan] Log error: {e}")
+        await asyncio.gather(*[worker() for _ in range(min(GBAN_CONCURRENCY, len(targets)))])
+    finally:
+        await flush_logs()
+    
+    return results
 
 async def get_user_info(event, user_identifier):
     """Get user info from ID, username, or reply"""
@@ -214,13 +302,8 @@ async def get_user_info(event, user_identifier):
         
         # If user provided ID or username
         if user_identifier:
-            if user_identifier.isdigit():
-                user_id = int(user_identifier)
-                return await client.get_entity(user_id)
-            else:
-                # Remove @ if present
-                username = user_identifier.replace('@', '')
-                return await client.get_entity(username)
+            # Cached access_hash from participant snapshots (no ResolveUsername)
+            return await participant_cache.resolve_user(client, user_identifier.replace('@', ''))
         
         return None
     except Exception as e:
@@ -256,7 +339,7 @@ async def gban_handler(event):
     username = getattr(user, 'username', None) or 'None'
     first_name = getattr(user, 'first_name', None) or 'Unknown'
     
-    if add_gban(user.id, username, first_name, reason, event.sender_id):
+    if await add_gban(user.id, username, first_name, reason, event.sender_id):
         text = f"""
 {get_emoji('ban')} **GLOBAL BAN ACTIVATED**
 
@@ -268,44 +351,23 @@ async def gban_handler(event):
 {get_emoji('ban')} Executing ban across all groups...
         """.strip()
         
-        status_msg = await safe_send_with_premium_emojis(event, text)
+        status_msg = await safe_send_message(event, text)
+        reporter = ProgressReporter(status_msg, entities=create_premium_emoji_entities)
         
-        # Execute ban across all groups
-        success_count = 0
-        total_groups = 0
-        
-        async for dialog in client.iter_dialogs():
-            if dialog.is_group or dialog.is_channel:
-                total_groups += 1
-                try:
-                    await client.ban_participant(dialog.id, user.id)
-                    success_count += 1
-                    log_gban_action(user.id, "ban", dialog.id, dialog.title, True)
-                except Exception as e:
-                    log_gban_action(user.id, "ban", dialog.id, dialog.title, False, str(e))
-                
-                # Update every 5 groups
-                if total_groups % 5 == 0:
-                    try:
-                        progress_text = f"""
+        # Execute ban across all groups (parallel)
+        async def progress_update(processed, total, success_count):
+            reporter.update(f"""
 {get_emoji('ban')} **GLOBAL BAN IN PROGRESS**
 
 {get_emoji('main')} **Target:** [{first_name}](tg://user?id={user.id})
-{get_emoji('success')} **Progress:** {success_count}/{total_groups} groups processed
+{get_emoji('success')} **Progress:** {success_count}/{processed} of {total} groups processed
 {get_emoji('info')} **Processing...**
-                        """.strip()
-                        await status_msg.edit(progress_text)
-                    except:
-                        pass
+            """.strip())
+        
+        results = await execute_gban_action(user.id, "ban", progress_update)
         
         # Update database with total count
-        try:
-            conn = sqlite3.connect(DB_FILE)
-            conn.execute("UPDATE gbanned_users SET total_groups = ? WHERE user_id = ?", (success_count, user.id))
-            conn.commit()
-            conn.close()
-        except:
-            pass
+        await update_gban_total(user.id, results['success'])
         
         # Final status
         final_text = f"""
@@ -314,14 +376,14 @@ async def gban_handler(event):
 {get_emoji('main')} **Target:** [{first_name}](tg://user?id={user.id})
 {get_emoji('info')} **User ID:** `{user.id}`
 {get_emoji('warning')} **Reason:** {reason}
-{get_emoji('success')} **Banned from:** {success_count}/{total_groups} groups
+{get_emoji('success')} **Banned from:** {results['success']}/{results['total']} groups
+{get_emoji('info')} **Skipped:** {results['skipped']} groups (no ban rights)
+{get_emoji('info')} **Basic groups:** {results['basic_groups']} (user removed - basic groups have no ban list)
 {get_emoji('ban')} **Status:** User globally banned
         """.strip()
         
-        try:
-            await status_msg.edit(final_text)
-        except:
-            await safe_send_with_premium_emojis(event, final_text)
+        if not await reporter.finish(final_text):
+            await safe_send_message(event, final_text)
     
     else:
         text = f"{get_emoji('error')} **GBan Error:** Failed to add user to ban database"
@@ -342,14 +404,14 @@ async def ungban_handler(event):
         return
     
     # Check if user is gbanned
-    gban_info = get_gban_info(user.id)
+    gban_info = await get_gban_info(user.id)
     if not gban_info:
         text = f"{get_emoji('warning')} **UnGBan Warning:** User tidak ada dalam global ban list!"
         await safe_send_message(event, text)
         return
     
     # Remove from global ban list
-    if remove_gban(user.id):
+    if await remove_gban(user.id):
         first_name = getattr(user, 'first_name', None) or 'Unknown'
         
         text = f"""
@@ -362,35 +424,20 @@ async def ungban_handler(event):
 {get_emoji('unban')} Executing unban across all groups...
         """.strip()
         
-        status_msg = await safe_send_with_premium_emojis(event, text)
-        
-        # Execute unban across all groups
-        success_count = 0
-        total_groups = 0
+        status_msg = await safe_send_message(event, text)
+        reporter = ProgressReporter(status_msg, entities=create_premium_emoji_entities)
         
-        async for dialog in client.iter_dialogs():
-            if dialog.is_group or dialog.is_channel:
-                total_groups += 1
-                try:
-                    await client.unban_participant(dialog.id, user.id)
-                    success_count += 1
-                    log_gban_action(user.id, "unban", dialog.id, dialog.title, True)
-                except Exception as e:
-                    log_gban_action(user.id, "unban", dialog.id, dialog.title, False, str(e))
-                
-                # Update every 5 groups
-                if total_groups % 5 == 0:
-                    try:
-                        progress_text = f"""
+        # Execute unban across all groups (parallel)
+        async def progress_update(processed, total, success_count):
+            reporter.update(f"""
 {get_emoji('unban')} **GLOBAL UNBAN IN PROGRESS**
 
 {get_emoji('main')} **Target:** [{first_name}](tg://user?id={user.id})
-{get_emoji('success')} **Progress:** {success_count}/{total_groups} groups processed
+{get_emoji('success')} **Progress:** {success_count}/{processed} of {total} groups processed
 {get_emoji('info')} **Processing...**
-                        """.strip()
-                        await status_msg.edit(progress_text)
-                    except:
-                        pass
+            """.strip())
+        
+        results = await execute_gban_action(user.id, "unban", progress_update)
         
         # Final status
         final_text = f"""
@@ -398,14 +445,13 @@ async def ungban_handler(event):
 
 {get_emoji('main')} **Target:** [{first_name}](tg://user?id={user.id})
 {get_emoji('info')} **User ID:** `{user.id}`
-{get_emoji('success')} **Unbanned from:** {success_count}/{total_groups} groups
+{get_emoji('success')} **Unbanned from:** {results['success']}/{results['total']} groups
+{get_emoji('info')} **Skipped:** {results['skipped']} groups (no ban rights, or basic group - {results['basic_groups']} - with no ban list)
 {get_emoji('unban')} **Status:** User globally unbanned
         """.strip()
         
-        try:
-            await status_msg.edit(final_text)
-        except:
-            await safe_send_with_premium_emojis(event, final_text)
+        if not await reporter.finish(final_text):
+            await safe_send_message(event, final_text)
     
     else:
         text = f"{get_emoji('error')} **UnGBan Error:** Failed to remove user from ban database"
@@ -416,7 +462,7 @@ async def gbanlist_handler(event):
     if not await is_owner_check(event.sender_id):
         return
     
-    gbanned_users = get_all_gbanned()
+    gbanned_users = await get_all_gbanned()
     if not gbanned_users:
         text = f"{get_emoji('info')} **GBan List:** Tidak ada user yang di-gban"
         await safe_send_message(event, text)
@@ -444,7 +490,7 @@ async def gbanlist_handler(event):
     if len(gbanned_users) > 10:
         text += f"\n{get_emoji('info')} ...and {len(gbanned_users) - 10} more users"
     
-    await safe_send_with_premium_emojis(event, text.strip())
+    await safe_send_message(event, text.strip())
 
 async def gbancheck_handler(event):
     """Check if user is globally banned"""
@@ -460,7 +506,7 @@ async def gbancheck_handler(event):
         await safe_send_message(event, text)
         return
     
-    gban_info = get_gban_info(user.id)
+    gban_info = await get_gban_info(user.id)
     first_name = getattr(user, 'first_name', None) or 'Unknown'
     username = getattr(user, 'username', None) or 'None'
     
@@ -487,7 +533,7 @@ async def gbancheck_handler(event):
 {get_emoji('success')} **Status:** User is not globally banned
         """.strip()
     
-    await safe_send_with_premium_emojis(event, text)
+    await safe_send_message(event, text)
 
 async def test_gban_emoji_handler(event):
     """Test UTF-16 emoji detection for GBan plugin"""
@@ -515,7 +561,77 @@ async def test_gban_emoji_handler(event):
 {get_emoji('success')} Database: SQLite with full logging
     """.strip()
     
-    await safe_send_with_premium_emojis(event, test_text)
+    await safe_send_message(event, test_text)
+
+async def enforce_gban(chat_id, user_id):
+    """Ban a gbanned user in chat_id if we have ban rights there"""
+    key = (chat_id, user_id)
+    now = time.monotonic()
+    if now - _enforce_attempts.get(key, 0) < ENFORCE_COOLDOWN:
+        return
+    if len(_enforce_attempts) > 10000:
+        _enforce_attempts.clear()
+    _enforce_attempts[key] = now
+    
+    row = dialog_index.get(chat_id)
+    if not row or not row['can_ban']:
+        return
+    
+    try:
+        await ban_scheduler.acquire()
+        await ban_in_chat(row, user_id)
+        ban_scheduler.on_success()
+        enforce_stats['banned'] += 1
+        success, error = True, None
+        print(f"[GBan] Enforced gban: {user_id} in {row['title']}")
+    except FloodWaitError as e:
+        ban_scheduler.on_flood_wait(e.seconds)
+        _enforce_attempts.pop(key, None)
+        enforce_stats['failed'] += 1
+        success, error = False, f"FloodWait {e.seconds}s"
+    except Exception as e:
+        enforce_stats['failed'] += 1
+        success, error = False, str(e)[:200]
+    
+    await log_gban_action(user_id, "enforce", chat_id, row['title'], success, error)
+
+async def gban_join_watcher(event):
+    """Ban gbanned users the moment they join/are added (no DB access)"""
+    if not ENFORCE_GBAN or not (event.user_joined or event.user_added):
+        return
+    enforce_stats['checks'] += 1
+    for user_id in event.user_ids or []:
+        if user_id in GBANNED_IDS:
+            enforce_stats['hits'] += 1
+            await enforce_gban(event.chat_id, user_id)
+
+async def gban_message_watcher(event):
+    """Ban gbanned users that speak in a group (no DB access)"""
+    if not ENFORCE_GBAN or event.sender_id not in GBANNED_IDS or event.is_private:
+        return
+    enforce_stats['hits'] += 1
+    await enforce_gban(event.chat_id, event.sender_id)
+
+async def gbanenforce_handler(event):
+    """Toggle/show automatic gban enforcement"""
+    global ENFORCE_GBAN
+    if not await is_owner_check(event.sender_id):
+        return
+    
+    arg = (event.pattern_match.group(1) or "").strip().lower()
+    if arg in ("on", "off"):
+        ENFORCE_GBAN = arg == "on"
+        set_config('gban_enforce', ENFORCE_GBAN, 'boolean', 'Auto-ban gbanned users on join/message')
+    
+    text = f"""
+{get_emoji('ban')} **GBAN ENFORCEMENT**
+
+{get_emoji('main')} **Status:** {'ON' if ENFORCE_GBAN else 'OFF'}
+{get_emoji('info')} **Gbanned users:** {len(GBANNED_IDS)}
+{get_emoji('success')} **Enforced bans:** {enforce_stats['banned']} (failed: {enforce_stats['failed']})
+{get_emoji('info')} **Usage:** `.gbanenforce on/off`
+    """.strip()
+    await safe_send_message(event, text)
 
 def get_plugin_info():
     """Return plugin info for plugin loader"""
@@ -531,11 +647,23 @@ def setup(client_instance):
         print("[GBan] Failed to initialize database!")
         return
     
+    global ENFORCE_GBAN
+    loaded = load_gban_index()
+    ENFORCE_GBAN = get_config('gban_enforce', False, 'boolean')
+    
+    dialog_index.attach(client)
+    participant_cache.attach(client)
+    
     # Register event handlers
-    client.add_event_handler(gban_handler, events.NewMessage(pattern=r"\.gban"))
+    client.add_event_handler(gban_handler, events.NewMessage(pattern=r"\.gban(\s|$)"))
     client.add_event_handler(ungban_handler, events.NewMessage(pattern=r"\.ungban"))
     client.add_event_handler(gbanlist_handler, events.NewMessage(pattern=r"\.gbanlist"))
     client.add_event_handler(gbancheck_handler, events.NewMessage(pattern=r"\.gbancheck"))
     client.add_event_handler(test_gban_emoji_handler, events.NewMessage(pattern=r"\.testgban"))
+    client.add_event_handler(gbanenforce_handler, events.NewMessage(pattern=r"\.gbanenforce(?:\s+(\w+))?$"))
+    
+    # Enforcement watchers (memory-only checks, cheap for every update)
+    client.add_event_handler(gban_join_watcher, events.ChatAction())
+    client.add_event_handler(gban_message_watcher, events.NewMessage(incoming=True))
     
-    print(f"[GBan] Plugin loaded with auto UTF-16 emoji detection v{PLUGIN_INFO['version']}")
\ No newline at end of file
+    print(f"[GBan] Plugin loaded with auto UTF-16 emoji detection v{PLUGIN_INFO['version']} ({loaded} gbanned, enforcement {'on' if ENFORCE_GBAN else 'off'})")
\ No newline at end of file
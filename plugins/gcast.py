@@ -7,14 +7,15 @@ Version: 2.1.0 - Simplified Clean Version
 """
 
 import re
-import os
-import json
 import time
 import asyncio
+import heapq
+import itertools
 from datetime import datetime
 from telethon import events
-from telethon.tl.types import MessageEntityCustomEmoji, Channel, Chat, User
-from telethon.errors import FloodWaitError, ChatWriteForbiddenError, MessageNotModifiedError
+from telethon.tl.types import MessageEntityCustomEmoji
+from telethon.errors import FloodWaitError, SlowModeWaitError, ChatWriteForbiddenError, MessageNotModifiedError
+from utils.premium_emoji_helper import PremiumEmojiEngine
 
 # Plugin Info
 PLUGIN_INFO = {
@@ -22,7 +23,7 @@ PLUGIN_INFO = {
     "version": "2.1.0",
     "description": "Simple Global Cast dengan blacklist integration dan premium emoji",
     "author": "Founder Userbot: Vzoel Fox's Ltpn",
-    "commands": [".gcast", ".gcastbl refresh", ".gcastbl list", ".gcastbl status"],
+    "commands": [".gcast", ".gcastbl refresh", ".gcastbl list", ".gcastbl status", ".gcastbl sync", ".gcastbl migrate", ".gcastjobs", ".gcastjobs resume <id>"],
     "features": ["global broadcast", "blacklist integration", "premium emoji support"]
 }
 
@@ -42,15 +43,16 @@ PREMIUM_EMOJIS = {
     'adder10': {'id': '5794407002566300999', 'char': '🥳', 'length': 2}
 }
 
+EMOJI_ENGINE = PremiumEmojiEngine(PREMIUM_EMOJIS)
+
 # ----------------- CONFIG -----------------
-BLACKLIST_FILE = "data/blacklist/gcast_blacklist.json"
 PV_REVERIES_ID = -1002785371546  # permanent block
-MAX_CONCURRENT = 5
-GCAST_DELAY = 0.5
+MAX_CONCURRENT = 5          # sends in flight; rate itself comes from send_scheduler
+MAX_SEND_ATTEMPTS = 3       # per target, FloodWait/SlowMode retries included
+MAX_SLOW_MODE_WAIT = 300    # skip chats whose slow mode is longer than this
 
 # ----------------- GLOBAL -----------------
 client = None
-blacklisted_chats = set()
 
 # Import font helper
 try:
@@ -59,6 +61,12 @@ except ImportError:
     def convert_font(text, style):
         return text
 
+from utils.dialog_index import dialog_index
+from utils.blacklist_service import blacklist_service
+from utils.send_scheduler import send_scheduler
+from utils.gcast_jobs import gcast_jobs
+from utils.progress_reporter import ProgressReporter
+
 # ============= EMOJI FUNCTIONS =============
 
 def get_emoji(emoji_type):
@@ -66,78 +74,8 @@ def get_emoji(emoji_type):
     return PREMIUM_EMOJIS.get(emoji_type, {}).get('char', '🤩')
 
 def create_premium_entities(text):
-    """Create premium emoji entities dengan improved error handling"""
-    if not text:
-        return []
-        
-    entities = []
-    
-    try:
-        # Convert text to bytes untuk accurate UTF-16 calculation
-        text_bytes = text.encode('utf-8')
-        utf16_text = text_bytes.decode('utf-8').encode('utf-16-le')
-        
-        utf16_offset = 0
-        char_index = 0
-        
-        while char_index < len(text):
-            found_emoji = False
-            
-            # Check untuk setiap premium emoji
-            for emoji_type, emoji_data in PREMIUM_EMOJIS.items():
-                emoji_char = emoji_data['char']
-                emoji_len = len(emoji_char)
-                
-                # Match emoji di posisi saat ini
-                if char_index + emoji_len <= len(text) and text[char_index:char_index + emoji_len] == emoji_char:
-                    try:
-                        # Validate document_id
-                        doc_id = int(emoji_data['id'])
-                        if doc_id <= 0:
-                            char_index += emoji_len
-                            utf16_offset += emoji_data.get('length', 2)
-                            found_emoji = True
-                            break
-                        
-                        # Create entity dengan proper UTF-16 length
-                        entity = MessageEntityCustomEmoji(
-                            offset=utf16_offset,
-                            length=emoji_data.get('length', 2),
-                            document_id=doc_id
-                        )
-                        entities.append(entity)
-                        
-                        char_index += emoji_len
-                        utf16_offset += emoji_data.get('length', 2)
-                        found_emoji = True
-                        break
-                        
-                    except (ValueError, OverflowError, TypeError) as e:
-                        # Skip invalid emoji dan continue
-                        char_index += emoji_len
-                        utf16_offset += emoji_data.get('length', 2)
-                        found_emoji = True
-                        break
-            
-            # Jika bukan premium emoji, hitung UTF-16 offset untuk character biasa
-            if not found_emoji:
-                try:
-                    char = text[char_index]
-                    # Calculate proper UTF-16 length untuk character ini
-                    char_utf16_bytes = char.encode('utf-16-le')
-                    char_utf16_length = len(char_utf16_bytes) // 2
-                    utf16_offset += char_utf16_length
-                    char_index += 1
-                except (UnicodeEncodeError, UnicodeDecodeError):
-                    # Fallback untuk problematic characters
-                    utf16_offset += 1
-                    char_index += 1
-        
-        return entities
-        
-    except Exception as e:
-        # Return empty list jika ada error
-        return []
+    """Create premium emoji entities (shared compiled engine, cached templates)"""
+    return EMOJI_ENGINE.entities(text)
 
 def extract_all_premium_entities(message):
     """Extract dan validate semua premium emoji entities dari message"""
@@ -211,153 +149,68 @@ async def safe_send_premium(event, text):
 # ============= BLACKLIST MANAGEMENT =============
 
 def load_blacklist():
-    """Load blacklist dari file JSON, fallback ke PV REVERIES"""
-    global blacklisted_chats
-    try:
-        os.makedirs(os.path.dirname(BLACKLIST_FILE), exist_ok=True)
-        if os.path.exists(BLACKLIST_FILE):
-            with open(BLACKLIST_FILE, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                if isinstance(data, dict) and "blacklisted_chats" in data:
-                    ids = set()
-                    for chat_id in data['blacklisted_chats']:
-                        try:
-                            validated_id = int(chat_id)
-                            ids.add(validated_id)
-                        except:
-                            continue
-                    blacklisted_chats = ids
-    except Exception as e:
-        print(f"[Blacklist] Error loading: {e}")
-    finally:
-        blacklisted_chats.add(PV_REVERIES_ID)  # selalu block PV REVERIES
-        print(f"[Blacklist] Loaded {len(blacklisted_chats)} chats, including PV REVERIES")
-    return blacklisted_chats
-
-def save_blacklist():
-    """Simpan blacklist ke file JSON"""
-    try:
-        data = {"blacklisted_chats": list(blacklisted_chats)}
-        os.makedirs(os.path.dirname(BLACKLIST_FILE), exist_ok=True)
-        with open(BLACKLIST_FILE, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
-        print(f"[Blacklist] Saved {len(blacklisted_chats)} chats")
-    except Exception as e:
-        print(f"[Blacklist] Error saving: {e}")
+    """Load blacklist service (in-memory, sekali saja), selalu block PV REVERIES"""
+    blacklist_service.load()
+    existing = blacklist_service.get(PV_REVERIES_ID)
+    if not existing or not existing['permanent']:
+        # Legacy JSON migration imports it as non-permanent: always (re)flag it
+        blacklist_service.add(PV_REVERIES_ID, title="PV REVERIES", added_by="system", permanent=True)
+    print(f"[Blacklist] Loaded {len(blacklist_service)} chats, including PV REVERIES")
+    return blacklist_service.get_ids()
 
 def is_chat_blacklisted(chat_id):
-    """Cek apakah chat di blacklist"""
-    try:
-        validated_id = int(chat_id)
-        return validated_id in blacklisted_chats
-    except:
-        return True  # jika invalid, dianggap blacklisted
+    """Cek apakah chat di blacklist (O(1), tanpa disk access)"""
+    return blacklist_service.contains(chat_id)
 
 def add_blacklist(chat_id):
-    """Tambahkan chat ke blacklist dan save file"""
+    """Tambahkan chat ke blacklist (write-through)"""
     try:
-        validated_id = int(chat_id)
-        if validated_id not in blacklisted_chats:
-            blacklisted_chats.add(validated_id)
-            save_blacklist()
-            print(f"[Blacklist] Chat {validated_id} added")
+        if blacklist_service.add(chat_id, added_by="gcast"):
+            print(f"[Blacklist] Chat {chat_id} added")
             return True
         return False
-    except:
+    except (ValueError, TypeError):
         return False
 
 def remove_blacklist(chat_id):
-    """Hapus chat dari blacklist dan save file"""
+    """Hapus chat dari blacklist (PV REVERIES permanent)"""
     try:
-        validated_id = int(chat_id)
-        if validated_id in blacklisted_chats and validated_id != PV_REVERIES_ID:
-            blacklisted_chats.remove(validated_id)
-            save_blacklist()
-            print(f"[Blacklist] Chat {validated_id} removed")
+        if blacklist_service.remove(chat_id):
+            print(f"[Blacklist] Chat {chat_id} removed")
             return True
         return False
-    except:
+    except (ValueError, TypeError):
         return False
 
 # ============= GCAST FUNCTIONS =============
 
 async def get_broadcast_channels():
-    """Ambil semua channel/group valid, skip yang di blacklist"""
+    """Ambil semua channel/group valid dari dialog index, skip yang di blacklist"""
+    # Index dimuat dari SQLite dan di-update dari ChatAction; full resync hanya jika kosong/expired
+    await dialog_index.ensure_ready(client)
+    
     channels = []
     blocked_count = 0
-    invalid_count = 0
     
-    async for dialog in client.iter_dialogs(limit=None):
-        try:
-            entity = dialog.entity
-            if isinstance(entity, User):
-                continue  # skip PV
-            if not hasattr(entity, 'id'):
-                invalid_count += 1
-                continue
-            
-            entity_id = entity.id
-            if is_chat_blacklisted(entity_id):
-                blocked_count += 1
-                title = getattr(entity, 'title', f'Chat_{entity_id}')
-                print(f"[Gcast] BLOCKED: {title} (ID: {entity_id}) - Tidak bisa kirim GCast, karena blacklist")
-                continue
-            
-            if isinstance(entity, (Chat, Channel)):
-                # Optional: cek permission untuk broadcast channels
-                if isinstance(entity, Channel) and getattr(entity, 'broadcast', False):
-                    if not (getattr(entity, 'creator', False) or 
-                           (hasattr(entity, 'admin_rights') and entity.admin_rights and 
-                            getattr(entity.admin_rights, 'post_messages', False))):
-                        invalid_count += 1
-                        continue
-                
-                # Check if accessible
-                if hasattr(entity, 'left') and entity.left:
-                    invalid_count += 1
-                    continue
-                    
-                channels.append({
-                    'id': entity_id, 
-                    'entity': entity,
-                    'title': getattr(entity, 'title', f'Chat_{entity_id}')
-                })
-                
-        except Exception:
-            invalid_count += 1
+    for row in dialog_index.get_targets("broadcast"):
+        entity_id = row['entity_id']
+        if is_chat_blacklisted(row['peer_id']):
+            blocked_count += 1
+            print(f"[Gcast] BLOCKED: {row['title']} (ID: {entity_id}) - Tidak bisa kirim GCast, karena blacklist")
             continue
+        
+        channels.append({
+            'id': entity_id,
+            'entity': dialog_index.input_peer(row),
+            'title': row['title'],
+            'row': row
+        })
     
-    print(f"[Gcast] {len(channels)} valid channels, {blocked_count} blocked, {invalid_count} invalid")
+    print(f"[Gcast] {len(channels)} valid channels, {blocked_count} blocked, {len(dialog_index) - len(channels) - blocked_count} skipped")
     return channels
 
-async def execute_gcast(message_text, entities=None, progress_callback=None):
-    """Execute gcast dengan enhanced error handling dan markdown preservation"""
-    if not message_text or not message_text.strip():
-        return {
-            'success': False,
-            'error': 'Empty message text',
-            'channels_total': 0
-        }
-    
-    # Get channels dengan blacklist protection
-    channels = await get_broadcast_channels()
-    
-    if not channels:
-        return {
-            'success': False,
-            'error': 'No valid broadcast channels found',
-            'channels_total': 0
-        }
-    
-    results = {
-        'channels_total': len(channels),
-        'channels_success': 0,
-        'channels_failed': 0,
-        'errors': [],
-        'success': True
-    }
-    
-    # Validate dan prepare entities
+def validate_entities(message_text, entities=None):
+    """Validate dan prepare premium emoji entities"""
     validated_entities = []
     if entities:
         for entity in entities:
@@ -379,96 +232,194 @@ async def execute_gcast(message_text, entities=None, progress_callback=None):
         # Create entities untuk UI premium emojis
         validated_entities = create_premium_entities(message_text)
     
-    # Semaphore untuk limit concurrent sends
-    semaphore = asyncio.Semaphore(MAX_CONCURRENT)
+    return validated_entities
+
+def target_from_job_row(row):
+    """Rebuild channel info dari job target row (tanpa dialog lookup)"""
+    return {
+        'id': row['entity_id'],
+        'entity': dialog_index.input_peer(row),
+        'title': row['title'],
+        'row': row
+    }
+
+async def execute_gcast(message_text, entities=None, progress_callback=None, job=None):
+    """
+    Execute gcast dengan enhanced error handling dan markdown preservation.
+    Setiap run adalah persistent job; pass job yang sudah di-claim
+    (gcast_jobs.claim) untuk resume - target yang sudah terkirim di-skip.
+    """
+    if job is None:
+        if not message_text or not message_text.strip():
+            return {
+                'success': False,
+                'error': 'Empty message text',
+                'channels_total': 0
+            }
+        
+        # Get channels dengan blacklist protection
+        channels = await get_broadcast_channels()
+        
+        if not channels:
+            return {
+                'success': False,
+                'error': 'No valid broadcast channels found',
+                'channels_total': 0
+            }
+        
+        validated_entities = validate_entities(message_text, entities)
+        job_id = await gcast_jobs.create_job(
+            'gcast', message_text, [channel_info['row'] for channel_info in channels], validated_entities
+        )
+        done_success = done_failed = 0
+        total = len(channels)
+    else:
+        job_id = job['id']
+        message_text = job['message']
+        validated_entities = job['entities'] or []
+        try:
+            channels = [target_from_job_row(row) for row in await gcast_jobs.pending_targets(job_id)]
+        except BaseException:
+            gcast_jobs.release(job_id)
+            raise
+        done_success, done_failed = job['success'], job['failed']
+        total = job['total']
+    
+    gcast_jobs.start(job_id)
     
-    async def send_to_channel(channel_info):
-        async with semaphore:
-            channel_id = channel_info['id']
+    results = {
+        'job_id': job_id,
+        'channels_total': total,
+        'channels_success': done_success,
+        'channels_failed': done_failed,
+        'errors': [],
+        'success': True,
+        'cancelled': False,
+        'paused': 0         # FloodWait seconds that stopped the job (restart or .gcastjobs resume)
+    }
+    
+    async def send_once(channel_id):
+        """Single send attempt; rate-limit errors propagate to the scheduler"""
+        try:
+            if validated_entities:
+                await client.send_message(
+                    channel_id,
+                    message_text,
+                    formatting_entities=validated_entities,
+                    parse_mode='md'
+                )
+            else:
+                await client.send_message(
+                    channel_id,
+                    message_text,
+                    parse_mode='md'
+                )
+        except (FloodWaitError, SlowModeWaitError):
+            raise
+        except Exception:
+            # Fallback tanpa markdown
+            await client.send_message(channel_id, message_text)
+    
+    # Retry queue: FloodWait/SlowMode requeue the target with a not-before time
+    # instead of sleeping inline, so a slow-mode chat never holds a worker
+    queue = []  # heap of (not_before, seq, channel_info, attempts)
+    seq = itertools.count()
+    
+    def requeue(channel_info, attempts, delay=0.0):
+        heapq.heappush(queue, (time.monotonic() + delay, next(seq), channel_info, attempts))
+    
+    for channel_info in channels:
+        requeue(channel_info, 0)
+    
+    completed_count = done_success + done_failed
+    
+    async def finish(channel_info, success, error=None):
+        nonlocal completed_count
+        if success:
+            results['channels_success'] += 1
+        else:
+            results['channels_failed'] += 1
+            results['errors'].append(error)
+        completed_count += 1
+        
+        # Checkpoint per target (di-flush ke DB per batch)
+        await gcast_jobs.mark(job_id, channel_info['row']['peer_id'], 'sent' if success else 'failed', error)
+        
+        # Progress callback (every result; edits are throttled by the caller's ProgressReporter)
+        if progress_callback:
+            await progress_callback(completed_count, total)
+    
+    async def worker():
+        while queue:
+            if gcast_jobs.is_cancelled(job_id):
+                results['cancelled'] = True
+                return
+            if results['paused']:
+                return
+            
+            delay = queue[0][0] - time.monotonic()
+            if delay > 0:
+                # Only slow-mode targets left for now: wait for the earliest one
+                await asyncio.sleep(min(delay, 1.0))
+                continue
+            _, _, channel_info, attempts = heapq.heappop(queue)
+            
+            channel_id = channel_info.get('entity') or channel_info['id']
             channel_title = channel_info.get('title', 'Unknown')
+            chat_key = channel_info['id']
+            
+            chat_delay = send_scheduler.chat_delay(chat_key)
+            if chat_delay > 0:
+                requeue(channel_info, attempts, chat_delay)
+                continue
             
             try:
-                # Rate limiting delay
-                await asyncio.sleep(GCAST_DELAY)
-                
-                # Send message dengan entities dan markdown support
-                try:
-                    if validated_entities:
-                        await client.send_message(
-                            channel_id,
-                            message_text,
-                            formatting_entities=validated_entities,
-                            parse_mode='md'
-                        )
-                    else:
-                        await client.send_message(
-                            channel_id,
-                            message_text,
-                            parse_mode='md'
-                        )
-                except Exception:
-                    # Fallback tanpa markdown
-                    await client.send_message(channel_id, message_text)
-                
-                results['channels_success'] += 1
-                return True
+                await send_scheduler.acquire()
+                await send_once(channel_id)
+                send_scheduler.on_success()
+                await finish(channel_info, True)
                 
             except FloodWaitError as e:
-                # Handle flood wait
-                wait_time = min(e.seconds, 60)  # Max 60 seconds wait
-                await asyncio.sleep(wait_time)
+                if not send_scheduler.on_flood_wait(e.seconds):
+                    # Too long to wait out: stop, remaining targets stay pending for resume
+                    requeue(channel_info, attempts)
+                    results['paused'] = e.seconds
+                    return
+                if attempts + 1 < MAX_SEND_ATTEMPTS:
+                    requeue(channel_info, attempts + 1)
+                else:
+                    await finish(channel_info, False, f"Flood wait limit for {channel_title}")
+                
+            except SlowModeWaitError as e:
+                send_scheduler.on_slow_mode(chat_key, e.seconds)
+                if attempts + 1 < MAX_SEND_ATTEMPTS and e.seconds <= MAX_SLOW_MODE_WAIT:
+                    requeue(channel_info, attempts + 1, send_scheduler.chat_delay(chat_key))
+                else:
+                    await finish(channel_info, False, f"Slow mode {e.seconds}s: {channel_title}")
                 
-                try:
-                    # Retry send with hybrid support
-                    try:
-                        await client.send_message(
-                            channel_id,
-                            message_text,
-                            formatting_entities=validated_entities if validated_entities else None,
-                            parse_mode='md'
-                        )
-                    except Exception:
-                        # Final retry without markdown
-                        if validated_entities:
-                            await client.send_message(
-                                channel_id,
-                                message_text,
-                                formatting_entities=validated_entities,
-                                parse_mode=None
-                            )
-                        else:
-                            await client.send_message(channel_id, message_text)
-                    results['channels_success'] += 1
-                    return True
-                    
-                except Exception as retry_error:
-                    results['channels_failed'] += 1
-                    results['errors'].append(f"Retry failed for {channel_title}: {str(retry_error)}")
-                    return False
-                    
             except ChatWriteForbiddenError:
-                results['channels_failed'] += 1
-                results['errors'].append(f"Permission denied: {channel_title}")
-                return False
+                await finish(channel_info, False, f"Permission denied: {channel_title}")
                 
             except Exception as e:
-                results['channels_failed'] += 1
                 error_msg = str(e)[:100]  # Limit error message length
-                results['errors'].append(f"Error in {channel_title}: {error_msg}")
-                return False
+                await finish(channel_info, False, f"Error in {channel_title}: {error_msg}")
     
-    # Execute all sends dengan concurrent limit
-    tasks = [send_to_channel(channel_info) for channel_info in channels]
-    completed_count = 0
-    
-    for task in asyncio.as_completed(tasks):
-        await task
-        completed_count += 1
+    # Workers keep requests in flight; the shared scheduler decides the actual rate
+    try:
+        try:
+            await asyncio.gather(*[worker() for _ in range(min(MAX_CONCURRENT, len(channels)))])
+        except asyncio.CancelledError:
+            # Interrupted (shutdown/reload): save progress, job stays running untuk resume
+            await gcast_jobs.checkpoint(job_id)
+            raise
         
-        # Progress callback
-        if progress_callback and (completed_count % 3 == 0 or completed_count in [1, len(channels)]):
-            await progress_callback(completed_count, len(channels))
-    
+        if results['paused'] and not results['cancelled']:
+            await gcast_jobs.finish(job_id, 'paused')
+        else:
+            await gcast_jobs.finish(job_id, 'cancelled' if results['cancelled'] else 'completed')
+    finally:
+        # No live worker any more: a reloaded plugin can resume the job
+        gcast_jobs.release(job_id)
     return results
 
 # ============= EVENT HANDLERS =============
@@ -563,6 +514,8 @@ async def gcast_handler(event):
         # Enhanced progress callback dengan animasi
         progress_emojis = [get_emoji('adder7'), get_emoji('adder8'), get_emoji('adder9'), get_emoji('adder10')]
         
+        reporter = ProgressReporter(progress_msg, entities=create_premium_entities)
+        
         async def progress_update(completed, total):
             try:
                 # Rotating emoji berdasarkan progress
@@ -583,12 +536,15 @@ async def gcast_handler(event):
 {get_emoji('adder2')} Sent: {completed}/{total} channels
 {get_emoji('adder4')} Status: Broadcasting to groups..."""
                 
-                await progress_msg.edit(progress_text, formatting_entities=create_premium_entities(progress_text))
-            except (MessageNotModifiedError, Exception):
+                reporter.update(progress_text)
+            except Exception:
                 pass
         
         # Execute gcast dengan entities (unlimited support)
-        result = await execute_gcast(message_text, message_entities, progress_update)
+        try:
+            result = await execute_gcast(message_text, message_entities, progress_update)
+        finally:
+            await reporter.stop()
         
         # Animated completion dengan celebration
         if result['success']:
@@ -614,12 +570,19 @@ async def gcast_handler(event):
             
             success_rate = (result['channels_success'] / result['channels_total'] * 100) if result['channels_total'] > 0 else 0
             
-            success_text = f"""{get_emoji('main')} GCAST COMPLETED {get_emoji('adder10')}
+            if result.get('cancelled'):
+                status_title = "GCAST CANCELLED"
+            elif result.get('paused'):
+                status_title = f"GCAST PAUSED - FloodWait {result['paused']}s, lanjutkan dengan .gcastjobs resume {result['job_id']}"
+            else:
+                status_title = "GCAST COMPLETED"
+            success_text = f"""{get_emoji('main')} {status_title} {get_emoji('adder10')}
 
 {get_emoji('adder2')} Successfully sent: {result['channels_success']} groups
 {get_emoji('adder7')} Success rate: {success_rate:.1f}%
 {get_emoji('check')} Failed: {result['channels_failed']} groups
 {get_emoji('adder4')} Completed at: {datetime.now().strftime('%H:%M:%S')}{emoji_sent}
+{get_emoji('adder6')} Job: #{result['job_id']} (`.gcastjobs {result['job_id']}`)
 
 {get_emoji('main')} Ready for next broadcast {get_emoji('adder8')}"""
             
@@ -667,8 +630,10 @@ async def gcastbl_handler(event):
 {get_emoji('check')} .gcastbl refresh - Reload blacklist
 {get_emoji('check')} .gcastbl list - Show blacklisted groups  
 {get_emoji('check')} .gcastbl status - Show blacklist status
+{get_emoji('check')} .gcastbl sync - Full resync of dialog index
+{get_emoji('check')} .gcastbl migrate - Merge legacy blacklist stores
 
-{get_emoji('adder2')} Current blacklisted: {len(blacklisted_chats)} groups"""
+{get_emoji('adder2')} Current blacklisted: {len(blacklist_service)} groups"""
             
             await safe_send_premium(event, help_text)
             return
@@ -676,9 +641,8 @@ async def gcastbl_handler(event):
         cmd = args[1].lower()
         
         if cmd == 'refresh':
-            old_count = len(blacklisted_chats)
-            load_blacklist()
-            new_count = len(blacklisted_chats)
+            old_count = len(blacklist_service)
+            new_count = blacklist_service.reload()
             
             refresh_text = f"""{get_emoji('adder2')} Blacklist Refreshed
 
@@ -689,6 +653,7 @@ async def gcastbl_handler(event):
             await safe_send_premium(event, refresh_text)
         
         elif cmd == 'list':
+            blacklisted_chats = blacklist_service.get_ids()
             if not blacklisted_chats:
                 await event.reply(f"{get_emoji('check')} No groups are blacklisted.")
             else:
@@ -707,18 +672,148 @@ async def gcastbl_handler(event):
                 await safe_send_premium(event, list_text)
         
         elif cmd == 'status':
+            index_stats = dialog_index.get_stats()
+            index_age = f"{int(index_stats['age_seconds'] // 60)} menit" if index_stats['age_seconds'] is not None else "never synced"
+            send_stats = send_scheduler.get_stats()
+            blacklist_stats = blacklist_service.get_stats()
             status_text = f"""{get_emoji('main')} Blacklist Status
 
-{get_emoji('check')} Total blacklisted: {len(blacklisted_chats)} groups
-{get_emoji('adder1')} File: {BLACKLIST_FILE}
-{get_emoji('adder2')} Last refresh: On command
-{get_emoji('adder4')} Protection: Active"""
+{get_emoji('check')} Total blacklisted: {blacklist_stats['total']} groups ({blacklist_stats['permanent']} permanent)
+{get_emoji('adder1')} Store: data/blacklist.db (in-memory cache)
+{get_emoji('adder2')} Checks: {blacklist_stats['checks']}, blocked: {blacklist_stats['hits']}
+{get_emoji('adder4')} Protection: Active
+
+{get_emoji('adder6')} Dialog index: {index_stats['dialogs']} dialogs, {index_stats['broadcastable']} broadcastable
+{get_emoji('adder6')} Last full sync: {index_age} ago
+{get_emoji('adder5')} Send rate: {send_stats['rate']:.2f}/s, FloodWaits: {send_stats['flood_waits']} ({send_stats['flood_wait_seconds']}s)"""
             
             await safe_send_premium(event, status_text)
+        
+        elif cmd == 'migrate':
+            old_count = len(blacklist_service)
+            blacklist_service.migrate_legacy()
+            new_count = blacklist_service.reload()
+            
+            migrate_text = f"""{get_emoji('adder2')} Legacy Blacklists Merged
+
+{get_emoji('check')} Previous: {old_count} groups
+{get_emoji('check')} Current: {new_count} groups
+{get_emoji('main')} Sources: gcast JSON, blacklistgcast JSON, grub, sql_helpers"""
+            
+            await safe_send_premium(event, migrate_text)
+        
+        elif cmd == 'sync':
+            sync_msg = await safe_send_premium(event, f"{get_emoji('adder1')} Resyncing dialog index...")
+            total = await dialog_index.sync(client)
+            sync_text = f"""{get_emoji('adder2')} Dialog Index Resynced
+
+{get_emoji('check')} Dialogs: {total}
+{get_emoji('check')} Broadcastable: {len(dialog_index.get_targets('broadcast'))}
+{get_emoji('adder4')} Time: {dialog_index.stats['last_sync_seconds']:.1f}s"""
+            
+            await sync_msg.edit(sync_text, formatting_entities=create_premium_entities(sync_text))
     
     except Exception as e:
         await event.reply(f"{get_emoji('adder5')} Blacklist command error: {str(e)}")
 
+async def gcastjobs_handler(event):
+    """Inspect atau cancel persistent gcast jobs (gcast + slow_gcast)"""
+    if not await is_owner_check(event.sender_id):
+        return
+    
+    try:
+        args = (event.pattern_match.group(2) or '').split()
+        
+        if args and args[0] == 'resume':
+            if len(args) < 2 or not args[1].lstrip('#').isdigit():
+                await safe_send_premium(event, f"{get_emoji('adder5')} Usage: `.gcastjobs resume <id>`")
+                return
+            job_id = int(args[1].lstrip('#'))
+            job = await gcast_jobs.get_job(job_id)
+            if job and job['source'] != 'gcast':
+                await safe_send_premium(event, f"{get_emoji('adder5')} Job #{job_id} ({job['source']}) di-resume otomatis saat plugin dimuat")
+                return
+            # Claimed before any await, so a second resume (or the startup loop) cannot run it too
+            job = await gcast_jobs.claim(job_id)
+            if not job:
+                await safe_send_premium(event, f"{get_emoji('adder5')} Job tidak ditemukan, sudah selesai, atau masih berjalan")
+                return
+            pending = job['total'] - job['success'] - job['failed']
+            asyncio.create_task(resume_job(job))
+            await safe_send_premium(event, f"{get_emoji('adder2')} Job #{job['id']} resumed - {pending} target tersisa")
+            return
+        
+        if args and args[0] == 'cancel':
+            if len(args) < 2 or not args[1].lstrip('#').isdigit():
+                await safe_send_premium(event, f"{get_emoji('adder5')} Usage: `.gcastjobs cancel <id>`")
+                return
+            job_id = int(args[1].lstrip('#'))
+            if await gcast_jobs.cancel(job_id):
+                await safe_send_premium(event, f"{get_emoji('adder2')} Job #{job_id} cancelled - sisa target tidak akan dikirim")
+            else:
+                await safe_send_premium(event, f"{get_emoji('adder5')} Job #{job_id} tidak ditemukan atau sudah selesai")
+            return
+        
+        if args and args[0].lstrip('#').isdigit():
+            job = await gcast_jobs.get_job(int(args[0].lstrip('#')))
+            if not job:
+                await safe_send_premium(event, f"{get_emoji('adder5')} Job tidak ditemukan")
+                return
+            pending = job['total'] - job['success'] - job['failed']
+            live = "live" if gcast_jobs.is_running(job['id']) else "idle"
+            message_preview = (job['message'] or '')[:80]
+            job_text = f"""{get_emoji('main')} Gcast Job #{job['id']}
+
+{get_emoji('check')} Source: {job['source']}
+{get_emoji('adder1')} Status: {job['status']} ({live})
+{get_emoji('adder2')} Sent: {job['success']}/{job['total']}
+{get_emoji('adder5')} Failed: {job['failed']}
+{get_emoji('adder4')} Pending: {pending}
+{get_emoji('adder6')} Created: {datetime.fromtimestamp(job['created_at']).strftime('%Y-%m-%d %H:%M:%S')}
+
+{get_emoji('adder3')} Message: {message_preview}{'...' if len(job['message'] or '') > 80 else ''}"""
+            await safe_send_premium(event, job_text)
+            return
+        
+        jobs = await gcast_jobs.list_jobs(10)
+        if not jobs:
+            await safe_send_premium(event, f"{get_emoji('main')} Belum ada gcast job")
+            return
+        
+        lines = [f"{get_emoji('main')} Gcast Jobs (10 terakhir)", ""]
+        for job in jobs:
+            lines.append(f"{get_emoji('check')} #{job['id']} {job['source']} - {job['status']} - {job['success']}/{job['total']} sent, {job['failed']} failed")
+        lines.append("")
+        lines.append(f"{get_emoji('adder6')} `.gcastjobs <id>` detail, `.gcastjobs cancel <id>` stop, `.gcastjobs resume <id>` lanjut")
+        await safe_send_premium(event, "\n".join(lines))
+    
+    except Exception as e:
+        await event.reply(f"{get_emoji('adder5')} Gcast jobs error: {str(e)}")
+
+async def resume_job(job):
+    """Lanjutkan satu job yang sudah di-claim (skip target yang sudah terkirim)"""
+    print(f"[Gcast] Resuming job #{job['id']}: {job['success'] + job['failed']}/{job['total']} done")
+    try:
+        result = await execute_gcast(job['message'], job=job)
+    except Exception as e:
+        print(f"[Gcast] Job #{job['id']} resume error: {e}")
+        return None
+    state = f"paused again (FloodWait {result['paused']}s)" if result['paused'] else "finished"
+    print(f"[Gcast] Job #{job['id']} {state}: {result['channels_success']} sent, {result['channels_failed']} failed")
+    return result
+
+async def resume_gcast_jobs():
+    """Resume gcast jobs yang terputus karena restart"""
+    await asyncio.sleep(5)
+    try:
+        for listed in await gcast_jobs.unfinished_jobs('gcast'):
+            # Re-read + claim: skip jobs resumed manually or cancelled since the list was taken
+            job = await gcast_jobs.claim(listed['id'])
+            if job:
+                await resume_job(job)
+    except Exception as e:
+        print(f"[Gcast] Resume error: {e}")
+
 async def is_owner_check(user_id):
     """Simple owner check"""
     OWNER_ID = 7847025168
@@ -737,12 +832,15 @@ def setup(client_instance):
     
     # Load blacklist saat bot start - tidak perlu tunggu GCast dijalankan
     load_blacklist()
-    print(f"[Gcast] Bot started with {len(blacklisted_chats)} blacklisted chats (including PV REVERIES)")
+    
+    # Persistent dialog index, incrementally updated dari ChatAction/participant updates
+    dialog_index.attach(client)
+    print(f"[Gcast] Bot started with {len(blacklist_service)} blacklisted chats (including PV REVERIES)")
     
     # Register handlers
     client.add_event_handler(
         gcast_handler, 
-        events.NewMessage(pattern=re.compile(r'\.gcast(\s+(.+))?', re.DOTALL))
+        events.NewMessage(pattern=re.compile(r'\.gcast(\s+(.+))?$', re.DOTALL))
     )
     
     client.add_event_handler(
@@ -750,10 +848,23 @@ def setup(client_instance):
         events.NewMessage(pattern=re.compile(r'\.gcastbl(\s+(.+))?', re.DOTALL))
     )
     
+    client.add_event_handler(
+        gcastjobs_handler,
+        events.NewMessage(pattern=r'\.gcastjobs(\s+(.+))?$')
+    )
+    
+    # Resume jobs yang terputus (crash/.update/restart)
+    gcast_jobs.load()
+    client.loop.create_task(resume_gcast_jobs())
+    
     print(f"✅ [Gcast] Enhanced version loaded v{PLUGIN_INFO['version']}")
     print(f"✅ [Gcast] Permanent blacklist protection: PV REVERIES (-{PV_REVERIES_ID})")
-    print(f"✅ [Gcast] Concurrent limit: {MAX_CONCURRENT}, Delay: {GCAST_DELAY}s")
-    print(f"✅ [Gcast] Total protected chats: {len(blacklisted_chats)}")
+    print(f"✅ [Gcast] Concurrent limit: {MAX_CONCURRENT}, Adaptive rate: {send_scheduler.rate:.1f}/s")
+    print(f"✅ [Gcast] Total protected chats: {len(blacklist_service)}")
+
+def cleanup_plugin():
+    """Flush pending job checkpoints"""
+    gcast_jobs.flush_sync()
 
 # Export functions
-__all__ = ['setup', 'get_plugin_info', 'gcast_handler', 'gcastbl_handler']
\ No newline at end of file
+__all__ = ['setup', 'get_plugin_info', 'gcast_handler', 'gcastbl_handler', 'gcastjobs_handler']
\ No newline at end of file
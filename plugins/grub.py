@@ -46,6 +46,10 @@ PLUGIN_INFO = {
 }
 
 DB_FILE = "plugins/grup.db"
+
+# Blacklist disimpan di shared blacklist service (dipakai juga oleh gcast & blacklistgcast)
+from utils.blacklist_service import blacklist_service
+from utils.participant_cache import participant_cache
 client = None
 
 # Premium Emoji Mapping
@@ -150,12 +154,8 @@ async def send_to_log_group(message):
         print(f"[Grub] Log group send error: {e}")
 
 async def add_blacklist(chat_id, reason=None, added_by="manual"):
-    """Add grup ke blacklist dengan database compatibility dan log group integration"""
+    """Add grup ke shared gcast blacklist dengan log group integration"""
     try:
-        db = get_db_conn()
-        if not db:
-            return False
-        
         # Get chat info jika memungkinkan
         chat_title = f"Chat_{chat_id}"
         try:
@@ -166,27 +166,11 @@ async def add_blacklist(chat_id, reason=None, added_by="manual"):
             pass
         
         now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        data = {
-            'chat_id': chat_id,
-            'chat_title': chat_title,
-            'added_at': now,
-            'reason': reason or 'No reason provided',
-            'added_by': added_by
-        }
+        already_listed = blacklist_service.get(chat_id) is not None
+        added = await blacklist_service.add_async(chat_id, chat_title, reason=reason or 'No reason provided', added_by=added_by)
         
-        if DB_COMPATIBLE and plugin_db:
-            # Use centralized database
-            result = db.insert('grup_blacklist', data)
-        else:
-            # Legacy database operations
-            db.execute("INSERT OR REPLACE INTO grup_blacklist (chat_id, chat_title, added_at, reason, added_by) VALUES (?, ?, ?, ?, ?)",
-                       tuple(data.values()))
-            db.commit()
-            db.close()
-            result = True
-        
-        # Send ke log group
-        if result:
+        # Send ke log group (hanya untuk grup baru)
+        if added:
             log_message = f"""
 {get_emoji('adder5')} {convert_font('BLACKLIST ADDED', 'bold')}
 
@@ -200,32 +184,18 @@ async def add_blacklist(chat_id, reason=None, added_by="manual"):
             """.strip()
             await send_to_log_group(log_message)
             
-        return result
+        # Sudah di-blacklist tetap dianggap sukses (reason/title di-update)
+        return added or already_listed
         
     except Exception as e:
         print(f"[Grub] Add blacklist error: {e}")
         return False
 
 async def remove_blacklist(chat_id):
-    """Remove grup dari blacklist dengan database compatibility dan log group integration"""
+    """Remove grup dari shared gcast blacklist dengan log group integration"""
     try:
-        db = get_db_conn()
-        if not db:
-            return False
-        
-        # Get existing data untuk log
-        existing = None
-        if DB_COMPATIBLE and plugin_db:
-            existing_list = db.select('grup_blacklist', 'chat_id = ?', (chat_id,))
-            existing = existing_list[0] if existing_list else None
-            result = db.delete('grup_blacklist', 'chat_id = ?', (chat_id,))
-        else:
-            cur = db.execute("SELECT * FROM grup_blacklist WHERE chat_id=?", (chat_id,))
-            existing = cur.fetchone()
-            db.execute("DELETE FROM grup_blacklist WHERE chat_id=?", (chat_id,))
-            db.commit()
-            db.close()
-            result = True
+        existing = blacklist_service.get(chat_id)
+        result = await blacklist_service.remove_async(chat_id)
         
         # Send ke log group
         if result and existing:
@@ -233,7 +203,7 @@ async def remove_blacklist(chat_id):
 {get_emoji('adder2')} {convert_font('BLACKLIST REMOVED', 'bold')}
 
 {get_emoji('check')} {convert_font('Chat ID:', 'mono')} {chat_id}
-{get_emoji('adder3')} {convert_font('Title:', 'mono')} {existing.get('chat_title', f'Chat_{chat_id}')}
+{get_emoji('adder3')} {convert_font('Title:', 'mono')} {existing.get('title', f'Chat_{chat_id}')}
 {get_emoji('adder6')} {convert_font('Removed at:', 'mono')} {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
 
 {get_emoji('main')} Grup ini sekarang dapat menerima gcast lagi.
@@ -248,57 +218,24 @@ async def remove_blacklist(chat_id):
 
 def get_blacklisted_groups():
     """Get all blacklisted group IDs for gcast integration"""
-    try:
-        db = get_db_conn()
-        if not db:
-            return set()
-        
-        blacklisted_ids = set()
-        
-        if DB_COMPATIBLE and plugin_db:
-            # Use centralized database
-            rows = db.select('grup_blacklist', columns=['chat_id'])
-            blacklisted_ids = {row['chat_id'] for row in rows}
-        else:
-            # Legacy database operations
-            cursor = db.execute("SELECT chat_id FROM grup_blacklist")
-            blacklisted_ids = {row[0] for row in cursor.fetchall()}
-            db.close()
-        
-        return blacklisted_ids
-    except Exception as e:
-        print(f"[Grub] Get blacklist error: {e}")
-        return set()
+    return blacklist_service.get_ids()
 
 def is_blacklisted(chat_id):
-    """Check if chat_id is blacklisted"""
-    try:
-        blacklisted_ids = get_blacklisted_groups()
-        return chat_id in blacklisted_ids
-    except Exception as e:
-        print(f"[Grub] Check blacklist error: {e}")
-        return False
+    """Check if chat_id is blacklisted (in-memory)"""
+    return blacklist_service.contains(chat_id)
 
 def get_blacklist():
-    """Get blacklist dengan database compatibility"""
-    try:
-        db = get_db_conn()
-        if not db:
-            return []
-        
-        if DB_COMPATIBLE and plugin_db:
-            # Use centralized database
-            return db.select('grup_blacklist', 'TRUE ORDER BY added_at DESC')
-        else:
-            # Legacy database operations
-            cur = db.execute("SELECT * FROM grup_blacklist ORDER BY added_at DESC")
-            rows = cur.fetchall()
-            db.close()
-            return rows
-            
-    except Exception as e:
-        print(f"[Grub] Get blacklist error: {e}")
-        return []
+    """Get blacklist rows, newest first"""
+    return [
+        {
+            'chat_id': row['chat_id'],
+            'chat_title': row['title'],
+            'added_at': row['added_at'],
+            'reason': row['reason'],
+            'added_by': row['added_by']
+        }
+        for row in blacklist_service.get_all()
+    ]
 
 async def add_banlist(chat_id, reason=None):
     """Add grup ke banlist dengan database compatibility dan log group integration"""
@@ -583,10 +520,9 @@ async def ban_monitor_handler(event):
             chat = await event.get_chat()
             chat_id = chat.id
             
-            # Get our user ID
+            # Get our user ID (cached, no GetUsers per event)
             if client:
-                me = await client.get_me()
-                our_id = me.id
+                our_id = await participant_cache.me_id(client)
                 
                 # Check if it's us who got kicked/left
                 if hasattr(event, 'user_id') and event.user_id == our_id:
@@ -607,6 +543,8 @@ def setup(telegram_client):
     client = telegram_client
     
     try:
+        participant_cache.attach(client)
+        
         # Register event handlers
         client.add_event_handler(grup_cmd_handler, events.NewMessage(pattern=r"\.grup"))
         client.add_event_handler(ban_monitor_handler, events.ChatAction(func=lambda e: getattr(e, "user_left", None) or getattr(e, "user_kicked", None)))
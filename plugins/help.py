@@ -7,12 +7,12 @@ Version: 4.0.0 - Simple Template System
 """
 
 import os
-import glob
+from pathlib import Path
 from telethon import events
-from telethon.tl.types import MessageEntityCustomEmoji
 
 # Import from central font system
 from utils.font_helper import convert_font
+from utils.premium_emoji_helper import PremiumEmojiEngine
 
 # ===== Plugin Info =====
 PLUGIN_INFO = {
@@ -36,6 +36,8 @@ PREMIUM_EMOJIS = {
     'adder6': {'id': '5794323465452394551', 'char': '🎚️'}
 }
 
+EMOJI_ENGINE = PremiumEmojiEngine(PREMIUM_EMOJIS)
+
 # Global navigation state
 HELP_STATE = {
     'current_page': 0,
@@ -47,48 +49,8 @@ def get_emoji(emoji_type):
     return PREMIUM_EMOJIS.get(emoji_type, {}).get('char', '🤩')
 
 def create_premium_entities(text):
-    """Create premium emoji entities for text with UTF-16 support"""
-    try:
-        entities = []
-        current_offset = 0
-        i = 0
-        
-        while i < len(text):
-            found_emoji = False
-            
-            for emoji_type, emoji_data in PREMIUM_EMOJIS.items():
-                emoji_char = emoji_data['char']
-                emoji_id = emoji_data['id']
-                
-                if text[i:].startswith(emoji_char):
-                    try:
-                        emoji_bytes = emoji_char.encode('utf-16-le')
-                        utf16_length = len(emoji_bytes) // 2
-                        
-                        entities.append(MessageEntityCustomEmoji(
-                            offset=current_offset,
-                            length=utf16_length,
-                            document_id=int(emoji_id)
-                        ))
-                        
-                        i += len(emoji_char)
-                        current_offset += utf16_length
-                        found_emoji = True
-                        break
-                        
-                    except Exception:
-                        break
-            
-            if not found_emoji:
-                char = text[i]
-                char_bytes = char.encode('utf-16-le')
-                char_utf16_length = len(char_bytes) // 2
-                current_offset += char_utf16_length
-                i += 1
-        
-        return entities
-    except Exception:
-        return []
+    """Create premium emoji entities (shared compiled engine, cached templates)"""
+    return EMOJI_ENGINE.entities(text)
 
 async def safe_send_premium(event, text):
     """Send message with premium entities"""
@@ -103,60 +65,40 @@ async def safe_send_premium(event, text):
         print(f"[Help] Premium emoji error: {e}")
         return await event.reply(text)
 
-def get_all_plugins():
-    """Get all plugin files from plugins directory"""
-    try:
-        plugin_files = glob.glob("plugins/*.py")
-        plugins = []
-        
-        for plugin_file in plugin_files:
-            plugin_name = os.path.basename(plugin_file).replace('.py', '')
-            if plugin_name not in ['__init__', 'database_helper', 'nsfw_downloader']:
-                plugins.append(plugin_name)
-        
-        return sorted(plugins)
-    except Exception:
-        return []
+HELP_EXCLUDED = ['__init__', 'database_helper', 'nsfw_downloader']
 
-def get_plugin_info_from_file(plugin_name):
-    """Get plugin info from file if available"""
-    try:
-        import importlib
-        import sys
-        
-        # Add plugins to path
-        if 'plugins' not in sys.path:
-            sys.path.append('plugins')
-            
-        plugin_module = importlib.import_module(plugin_name)
-        
-        if hasattr(plugin_module, 'get_plugin_info'):
-            return plugin_module.get_plugin_info()
-        elif hasattr(plugin_module, 'PLUGIN_INFO'):
-            return plugin_module.PLUGIN_INFO
-        else:
-            return {
-                'name': plugin_name,
+# Help index cache: rebuilt only when the plugin loader's generation changes (load/unload/reload)
+HELP_INDEX = {'key': None, 'plugins': {}, 'commands': [], 'pages': {}}
+
+def get_plugin_loader():
+    return getattr(client, 'plugin_loader', None)
+
+def build_help_index():
+    """Plugin info from the loader (loaded + lazy), AST manifest for the rest - no plugin imports"""
+    from plugin_loader import load_manifest
+    
+    # Same file set as PluginLoader.load_plugins, so both share one cached manifest
+    all_files = sorted(path for path in Path("plugins").glob("*.py") if not path.name.startswith('__'))
+    manifest = load_manifest(all_files)
+    plugin_files = [path for path in all_files
+                    if path.stem not in HELP_EXCLUDED and not path.stem.startswith('_')]
+    loader = get_plugin_loader()
+    loaded_info = loader.plugin_info if loader else {}
+    
+    plugins = {}
+    for path in plugin_files:
+        info = loaded_info.get(path.stem) or manifest.get(path.stem, {}).get('info')
+        if not isinstance(info, dict):
+            info = {
+                'name': path.stem,
                 'description': 'Plugin deskripsi tidak tersedia',
                 'commands': ['Lihat source code untuk commands']
             }
-    except Exception:
-        return {
-            'name': plugin_name,
-            'description': 'Plugin tidak dapat dimuat',
-            'commands': ['Error loading plugin']
-        }
-
-def get_help_page(page=0):
-    """Generate help page with 10 commands per page"""
-    all_plugins = get_all_plugins()
-    all_commands = []
+        plugins[path.stem] = info
     
-    # Collect all commands from plugins
-    for plugin_name in all_plugins:
-        plugin_info = get_plugin_info_from_file(plugin_name)
-        commands = plugin_info.get('commands', [])
-        for cmd in commands:
+    all_commands = []
+    for plugin_name, plugin_info in plugins.items():
+        for cmd in plugin_info.get('commands', []):
             all_commands.append({
                 'command': cmd,
                 'plugin': plugin_name,
@@ -164,16 +106,58 @@ def get_help_page(page=0):
             })
     
     # Add core commands
-    core_commands = [
+    all_commands.extend([
         {'command': '.alive', 'plugin': 'core', 'description': 'Check bot status and uptime'},
         {'command': '.ping', 'plugin': 'core', 'description': 'Test response time'},
         {'command': '.restart', 'plugin': 'core', 'description': 'Restart the userbot'},
         {'command': '.plugins', 'plugin': 'core', 'description': 'Show plugin status'},
-    ]
-    all_commands.extend(core_commands)
+    ])
     
     # Sort commands alphabetically
     all_commands.sort(key=lambda x: x['command'])
+    return plugins, all_commands
+
+def get_help_index():
+    """Cached help index; rebuilt after plugin load/unload/reload"""
+    loader = get_plugin_loader()
+    key = (id(loader), loader.generation) if loader else 'static'
+    if HELP_INDEX['key'] != key:
+        HELP_INDEX['plugins'], HELP_INDEX['commands'] = build_help_index()
+        HELP_INDEX['pages'] = {}
+        HELP_INDEX['key'] = key
+    return HELP_INDEX
+
+def get_all_plugins():
+    """Get all plugin names (from the help index)"""
+    try:
+        return sorted(get_help_index()['plugins'])
+    except Exception:
+        return []
+
+def get_plugin_info_from_file(plugin_name):
+    """Get plugin info from the help index (never imports the plugin)"""
+    try:
+        info = get_help_index()['plugins'].get(plugin_name)
+        if info:
+            return info
+    except Exception:
+        pass
+    return {
+        'name': plugin_name,
+        'description': 'Plugin tidak dapat dimuat',
+        'commands': ['Error loading plugin']
+    }
+
+def get_total_pages():
+    commands_per_page = HELP_STATE['plugins_per_page']
+    return (len(get_help_index()['commands']) - 1) // commands_per_page + 1
+
+def get_help_page(page=0):
+    """Generate help page with 10 commands per page (rendered pages are cached)"""
+    index = get_help_index()
+    if page in index['pages']:
+        return index['pages'][page]
+    all_commands = index['commands']
     
     commands_per_page = HELP_STATE['plugins_per_page']
     start_idx = page * commands_per_page
@@ -205,6 +189,7 @@ def get_help_page(page=0):
     help_text += f"{get_emoji('adder5')} Powered by Vzoel Fox's Technology\n"
     help_text += f"{get_emoji('adder6')} - 2025 Vzoel Fox's (LTPN)"
     
+    index['pages'][page] = help_text
     return help_text
 
 def get_plugin_details(plugin_name):
@@ -307,9 +292,7 @@ async def next_handler(event):
         return
     
     try:
-        all_plugins = get_all_plugins()
-        plugins_per_page = HELP_STATE['plugins_per_page']
-        total_pages = (len(all_plugins) - 1) // plugins_per_page + 1
+        total_pages = get_total_pages()
         current_page = HELP_STATE['current_page']
         
         if current_page < total_pages - 1:
@@ -5,12 +5,21 @@ Founder Userbot: Vzoel Fox's Ltpn 🤩
 Version: 2.0.0 - Complete Activity Monitoring
 """
 
-import sqlite3
 import os
+import sys
 import json
+import time
+import asyncio
+import atexit
+import threading
+from collections import defaultdict
 from datetime import datetime
 from telethon import events
-from telethon.tl.types import Channel, Chat
+
+# Async database facade (flushes run off the event loop)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from database import async_db, db_manager
+from utils.entity_cache import entity_cache, describe_entity
 
 # Import assetjson environment
 try:
@@ -32,68 +41,55 @@ PLUGIN_INFO = {
 
 DB_FILE = "plugins/log.db"
 
-def get_db_conn():
-    try:
-        os.makedirs(os.path.dirname(DB_FILE), exist_ok=True)
-        conn = sqlite3.connect(DB_FILE)
-        conn.row_factory = sqlite3.Row
-        
-        # Enhanced message logging table
-        conn.execute("""
-            CREATE TABLE IF NOT EXISTS activity_log (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                activity_type TEXT NOT NULL,
-                user_id INTEGER,
-                chat_id INTEGER,
-                chat_title TEXT,
-                username TEXT,
-                message_text TEXT,
-                command TEXT,
-                is_outgoing INTEGER DEFAULT 0,
-                message_id INTEGER,
-                reply_to_id INTEGER,
-                media_type TEXT,
-                file_name TEXT,
-                additional_data TEXT,
-                created_at TEXT,
-                timestamp INTEGER
-            );
-        """)
-        
-        # Activity statistics table
-        conn.execute("""
-            CREATE TABLE IF NOT EXISTS activity_stats (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                date TEXT UNIQUE,
-                messages_sent INTEGER DEFAULT 0,
-                messages_received INTEGER DEFAULT 0,
-                commands_executed INTEGER DEFAULT 0,
-                chats_active INTEGER DEFAULT 0,
-                media_sent INTEGER DEFAULT 0,
-                updated_at TEXT
-            );
-        """)
-        
-        # Chat monitoring table
-        conn.execute("""
-            CREATE TABLE IF NOT EXISTS chat_monitoring (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                chat_id INTEGER UNIQUE,
-                chat_title TEXT,
-                chat_type TEXT,
-                monitoring_enabled INTEGER DEFAULT 1,
-                log_level TEXT DEFAULT 'all',
-                last_activity TEXT,
-                message_count INTEGER DEFAULT 0,
-                created_at TEXT
-            );
-        """)
-        
-        conn.commit()
-        return conn
-    except Exception as e:
-        print(f"[ActivityLog] Database error: {e}")
-        return None
+ACTIVITY_LOG_SCHEMA = """
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    activity_type TEXT NOT NULL,
+    user_id INTEGER,
+    chat_id INTEGER,
+    chat_title TEXT,
+    username TEXT,
+    message_text TEXT,
+    command TEXT,
+    is_outgoing INTEGER DEFAULT 0,
+    message_id INTEGER,
+    reply_to_id INTEGER,
+    media_type TEXT,
+    file_name TEXT,
+    additional_data TEXT,
+    created_at TEXT,
+    timestamp INTEGER
+"""
+
+ACTIVITY_STATS_SCHEMA = """
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    date TEXT UNIQUE,
+    messages_sent INTEGER DEFAULT 0,
+    messages_received INTEGER DEFAULT 0,
+    commands_executed INTEGER DEFAULT 0,
+    chats_active INTEGER DEFAULT 0,
+    media_sent INTEGER DEFAULT 0,
+    updated_at TEXT
+"""
+
+CHAT_MONITORING_SCHEMA = """
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    chat_id INTEGER UNIQUE,
+    chat_title TEXT,
+    chat_type TEXT,
+    monitoring_enabled INTEGER DEFAULT 1,
+    log_level TEXT DEFAULT 'all',
+    last_activity TEXT,
+    message_count INTEGER DEFAULT 0,
+    created_at TEXT
+"""
+
+def init_db():
+    """Create tables through db_manager (same file the buffered writes and reads use)"""
+    return all([
+        db_manager.create_table('activity_log', ACTIVITY_LOG_SCHEMA, DB_FILE),
+        db_manager.create_table('activity_stats', ACTIVITY_STATS_SCHEMA, DB_FILE),
+        db_manager.create_table('chat_monitoring', CHAT_MONITORING_SCHEMA, DB_FILE)
+    ])
 
 # Helper functions for enhanced logging
 async def safe_send_message(event, text):
@@ -121,39 +117,192 @@ def safe_convert_font(text, font_type='bold'):
 
 async def get_chat_info(chat):
     """Get detailed chat information"""
-    try:
-        if isinstance(chat, Channel):
-            chat_type = "Channel" if chat.broadcast else "Supergroup"
-            title = chat.title
-        elif isinstance(chat, Chat):
-            chat_type = "Group"
-            title = chat.title
-        else:
-            chat_type = "Private"
-            title = f"User_{chat.id}"
-        
-        return {
-            'title': title,
-            'type': chat_type,
-            'id': chat.id
-        }
-    except Exception:
-        return {
-            'title': f"Chat_{chat.id if hasattr(chat, 'id') else 'Unknown'}",
-            'type': "Unknown",
-            'id': chat.id if hasattr(chat, 'id') else 0
+    info = describe_entity(chat)
+    if info['type'] == "Bot":
+        info['type'] = "Private"
+    if info['type'] == "Private":
+        info['title'] = f"User_{info['id']}"
+    return info
+
+# Write-behind settings
+FLUSH_BATCH_SIZE = int(os.getenv("LOG_FLUSH_BATCH_SIZE", "200"))
+FLUSH_INTERVAL_MS = int(os.getenv("LOG_FLUSH_INTERVAL_MS", "2000"))
+
+# Daily counter column per (activity_type, is_outgoing)
+STATS_COLUMNS = {
+    ("message", True): "messages_sent",
+    ("message", False): "messages_received",
+    ("command", True): "commands_executed",
+    ("command", False): "commands_executed",
+    ("media", True): "media_sent",
+    ("media", False): "media_sent",
+}
+
+class ActivityWriteBuffer:
+    """
+    Write-behind buffer untuk activity_log.
+    Rows dikumpulkan di memory dan di-flush dengan executemany dalam satu
+    transaksi setiap FLUSH_BATCH_SIZE rows atau FLUSH_INTERVAL_MS.
+    Daily counters diakumulasi di memory dan di-merge per flush.
+    """
+    
+    def __init__(self, batch_size=FLUSH_BATCH_SIZE, interval_ms=FLUSH_INTERVAL_MS):
+        self.batch_size = batch_size
+        self.interval = interval_ms / 1000
+        self._rows = []
+        self._daily = defaultdict(lambda: defaultdict(int))
+        self._lock = threading.Lock()
+        self._flush_lock = None
+        self._wakeup = None
+        self._task = None
+        self.stats = {
+            'queued': 0,
+            'flushed': 0,
+            'flushes': 0,
+            'errors': 0,
+            'last_flush_ms': 0.0,
+            'max_flush_ms': 0.0,
+            'total_flush_ms': 0.0
         }
+    
+    @property
+    def depth(self):
+        return len(self._rows)
+    
+    def add(self, row, date, activity_type, is_outgoing):
+        """Queue one activity row (non-blocking)"""
+        with self._lock:
+            self._rows.append(row)
+            column = STATS_COLUMNS.get((activity_type, bool(is_outgoing)))
+            if column:
+                self._daily[date][column] += 1
+            self.stats['queued'] += 1
+            full = len(self._rows) >= self.batch_size
+        
+        if full and self._wakeup is not None:
+            self._wakeup.set()
+    
+    def _take(self):
+        with self._lock:
+            rows, daily = self._rows, self._daily
+            self._rows = []
+            self._daily = defaultdict(lambda: defaultdict(int))
+        return rows, daily
+    
+    def _write(self, conn, rows, daily):
+        """Write one batch in a single transaction"""
+        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        conn.executemany("""
+            INSERT INTO activity_log 
+            (activity_type, user_id, chat_id, chat_title, username, message_text, 
+             command, is_outgoing, message_id, reply_to_id, media_type, file_name, 
+             additional_data, created_at, timestamp) 
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, rows)
+        
+        for date, counters in daily.items():
+            conn.execute("INSERT OR IGNORE INTO activity_stats (date, updated_at) VALUES (?, ?)", (date, now))
+            set_clause = ", ".join(f"{column} = {column} + ?" for column in counters)
+            conn.execute(
+                f"UPDATE activity_stats SET {set_clause}, updated_at = ? WHERE date = ?",
+                (*counters.values(), now, date)
+            )
+        conn.commit()
+    
+    def _record_flush(self, count, started):
+        elapsed = (time.perf_counter() - started) * 1000
+        self.stats['flushed'] += count
+        self.stats['flushes'] += 1
+        self.stats['last_flush_ms'] = elapsed
+        self.stats['max_flush_ms'] = max(self.stats['max_flush_ms'], elapsed)
+        self.stats['total_flush_ms'] += elapsed
+    
+    def _restore(self, rows, daily):
+        """Put a failed batch back in front of the queue"""
+        with self._lock:
+            self._rows[:0] = rows
+            for date, counters in daily.items():
+                for column, value in counters.items():
+                    self._daily[date][column] += value
+        self.stats['errors'] += 1
+    
+    async def flush(self):
+        """Flush buffered rows on the database executor"""
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        
+        async with self._flush_lock:
+            rows, daily = self._take()
+            if not rows:
+                return 0
+            
+            started = time.perf_counter()
+            try:
+                await async_db.run_in_connection(lambda conn: self._write(conn, rows, daily), DB_FILE)
+            except Exception as e:
+                print(f"[ActivityLog] Flush error: {e}")
+                self._restore(rows, daily)
+                return 0
+            
+            self._record_flush(len(rows), started)
+            return len(rows)
+    
+    def flush_sync(self):
+        """Blocking flush - used on shutdown when no event loop is available"""
+        rows, daily = self._take()
+        if not rows:
+            return 0
+        
+        started = time.perf_counter()
+        try:
+            with async_db.manager.get_connection(DB_FILE) as conn:
+                self._write(conn, rows, daily)
+        except Exception as e:
+            print(f"[ActivityLog] Shutdown flush error: {e}")
+            self._restore(rows, daily)
+            return 0
+        
+        self._record_flush(len(rows), started)
+        return len(rows)
+    
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+    
+    def start(self):
+        """Start periodic flusher task"""
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._flush_lock = asyncio.Lock()
+            self._task = asyncio.get_event_loop().create_task(self._run())
+    
+    def stop(self):
+        """Stop flusher and drain remaining rows"""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        self._wakeup = None
+        return self.flush_sync()
+    
+    def get_stats(self):
+        stats = dict(self.stats)
+        stats['depth'] = self.depth
+        stats['avg_flush_ms'] = stats['total_flush_ms'] / stats['flushes'] if stats['flushes'] else 0.0
+        return stats
+
+activity_buffer = ActivityWriteBuffer()
 
 def log_activity(activity_type, user_id=None, chat_id=None, chat_title=None, 
                 username=None, message_text=None, command=None, is_outgoing=False, 
                 message_id=None, reply_to_id=None, media_type=None, file_name=None, 
                 additional_data=None):
-    """Enhanced activity logging function"""
+    """Enhanced activity logging function (buffered, write-behind)"""
     try:
-        conn = get_db_conn()
-        if not conn:
-            return False
-        
         now = datetime.now()
         timestamp = int(now.timestamp())
         created_at = now.strftime("%Y-%m-%d %H:%M:%S")
@@ -162,61 +311,17 @@ def log_activity(activity_type, user_id=None, chat_id=None, chat_title=None,
         if isinstance(additional_data, dict):
             additional_data = json.dumps(additional_data)
         
-        conn.execute("""
-            INSERT INTO activity_log 
-            (activity_type, user_id, chat_id, chat_title, username, message_text, 
-             command, is_outgoing, message_id, reply_to_id, media_type, file_name, 
-             additional_data, created_at, timestamp) 
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
+        activity_buffer.add((
             activity_type, user_id, chat_id, chat_title, username, message_text,
             command, 1 if is_outgoing else 0, message_id, reply_to_id, media_type,
             file_name, additional_data, created_at, timestamp
-        ))
-        
-        conn.commit()
-        conn.close()
-        
-        # Update statistics
-        update_daily_stats(activity_type, is_outgoing)
+        ), now.strftime("%Y-%m-%d"), activity_type, is_outgoing)
         return True
         
     except Exception as e:
         print(f"[ActivityLog] Log error: {e}")
         return False
 
-def update_daily_stats(activity_type, is_outgoing=False):
-    """Update daily statistics"""
-    try:
-        conn = get_db_conn()
-        if not conn:
-            return
-        
-        today = datetime.now().strftime("%Y-%m-%d")
-        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        
-        # Initialize today's stats if not exists
-        conn.execute("""
-            INSERT OR IGNORE INTO activity_stats (date, updated_at) VALUES (?, ?)
-        """, (today, now))
-        
-        # Update counters based on activity type
-        if activity_type == "message":
-            if is_outgoing:
-                conn.execute("UPDATE activity_stats SET messages_sent = messages_sent + 1, updated_at = ? WHERE date = ?", (now, today))
-            else:
-                conn.execute("UPDATE activity_stats SET messages_received = messages_received + 1, updated_at = ? WHERE date = ?", (now, today))
-        elif activity_type == "command":
-            conn.execute("UPDATE activity_stats SET commands_executed = commands_executed + 1, updated_at = ? WHERE date = ?", (now, today))
-        elif activity_type == "media":
-            conn.execute("UPDATE activity_stats SET media_sent = media_sent + 1, updated_at = ? WHERE date = ?", (now, today))
-        
-        conn.commit()
-        conn.close()
-        
-    except Exception as e:
-        print(f"[ActivityLog] Stats update error: {e}")
-
 def log_message(user_id, chat_id, username, text):
     """Legacy function - redirects to enhanced logging"""
     return log_activity("message", user_id=user_id, chat_id=chat_id, 
@@ -224,34 +329,23 @@ def log_message(user_id, chat_id, username, text):
 
 def query_logs(chat_id, keyword=None, limit=10):
     try:
-        conn = get_db_conn()
-        if not conn:
-            return []
         if keyword:
-            cur = conn.execute(
+            logs = db_manager.execute_query(
                 "SELECT * FROM log_message WHERE chat_id=? AND text LIKE ? ORDER BY created_at DESC LIMIT ?",
-                (chat_id, f"%{keyword}%", limit),
+                (chat_id, f"%{keyword}%", limit), DB_FILE, fetch="all"
             )
         else:
-            cur = conn.execute(
+            logs = db_manager.execute_query(
                 "SELECT * FROM log_message WHERE chat_id=? ORDER BY created_at DESC LIMIT ?",
-                (chat_id, limit),
+                (chat_id, limit), DB_FILE, fetch="all"
             )
-        logs = cur.fetchall()
-        conn.close()
-        return logs
+        return logs or []
     except Exception:
         return []
 
 def clear_logs(chat_id):
     try:
-        conn = get_db_conn()
-        if not conn:
-            return False
-        conn.execute("DELETE FROM log_message WHERE chat_id=?", (chat_id,))
-        conn.commit()
-        conn.close()
-        return True
+        return db_manager.execute_query("DELETE FROM log_message WHERE chat_id=?", (chat_id,), DB_FILE) is not None
     except Exception:
         return False
 
@@ -259,9 +353,9 @@ def clear_logs(chat_id):
 async def incoming_message_handler(event):
     """Log all incoming messages"""
     try:
-        chat = await event.get_chat()
+        chat = await entity_cache.get_chat(event)
         chat_info = await get_chat_info(chat)
-        sender = await event.get_sender()
+        sender = await entity_cache.get_sender(event)
         
         username = getattr(sender, 'username', '') or f"User_{event.sender_id}"
         text = event.message.message if event.message else ""
@@ -301,7 +395,7 @@ async def incoming_message_handler(event):
 async def outgoing_message_handler(event):
     """Log all outgoing messages (userbot activities)"""
     try:
-        chat = await event.get_chat()
+        chat = await entity_cache.get_chat(event)
         chat_info = await get_chat_info(chat)
         
         text = event.message.message if event.message else ""
@@ -344,9 +438,9 @@ async def outgoing_message_handler(event):
 async def message_edited_handler(event):
     """Log message edits"""
     try:
-        chat = await event.get_chat()
+        chat = await entity_cache.get_chat(event)
         chat_info = await get_chat_info(chat)
-        sender = await event.get_sender()
+        sender = await entity_cache.get_sender(event)
         
         username = getattr(sender, 'username', '') or f"User_{event.sender_id}"
         text = event.message.message if event.message else ""
@@ -382,7 +476,7 @@ async def log_cmd_handler(event):
     """Enhanced log command handler with comprehensive monitoring features"""
     try:
         # Log this command execution
-        chat = await event.get_chat()
+        chat = await entity_cache.get_chat(event)
         chat_info = await get_chat_info(chat)
         
         log_activity(
@@ -396,6 +490,9 @@ async def log_cmd_handler(event):
             is_outgoing=True
         )
         
+        # Make buffered activity visible to the queries below
+        await activity_buffer.flush()
+        
         args = event.text.split(maxsplit=2)
         
         if len(args) == 1:
@@ -449,21 +546,16 @@ async def log_cmd_handler(event):
 async def show_recent_activity(event, chat_id):
     """Show recent activity in current chat"""
     try:
-        conn = get_db_conn()
-        if not conn:
-            await safe_send_message(event, f"{safe_get_emoji('adder3')} Database error")
-            return
-            
-        cur = conn.execute("""
+        activities = await async_db.execute_query("""
             SELECT activity_type, username, message_text, command, is_outgoing, created_at, media_type
             FROM activity_log 
             WHERE chat_id = ? 
             ORDER BY timestamp DESC 
             LIMIT 10
-        """, (chat_id,))
-        
-        activities = cur.fetchall()
-        conn.close()
+        """, (chat_id,), DB_FILE, fetch="all")
+        if activities is None:
+            await safe_send_message(event, f"{safe_get_emoji('adder3')} Database error")
+            return
         
         if not activities:
             await safe_send_message(event, f"{safe_get_emoji('check')} No activity logged in this chat yet")
@@ -511,41 +603,39 @@ async def show_recent_activity(event, chat_id):
 async def show_activity_stats(event):
     """Show comprehensive activity statistics"""
     try:
-        conn = get_db_conn()
-        if not conn:
-            await safe_send_message(event, f"{safe_get_emoji('adder3')} Database error")
-            return
-        
-        # Get today's stats
-        today = datetime.now().strftime("%Y-%m-%d")
-        cur = conn.execute("SELECT * FROM activity_stats WHERE date = ?", (today,))
-        today_stats = cur.fetchone()
-        
-        # Get total activity counts
-        cur = conn.execute("""
-            SELECT 
-                COUNT(*) as total_activities,
-                SUM(CASE WHEN activity_type = 'command' THEN 1 ELSE 0 END) as total_commands,
-                SUM(CASE WHEN activity_type = 'message' AND is_outgoing = 1 THEN 1 ELSE 0 END) as messages_sent,
-                SUM(CASE WHEN activity_type = 'message' AND is_outgoing = 0 THEN 1 ELSE 0 END) as messages_received,
-                COUNT(DISTINCT chat_id) as active_chats
-            FROM activity_log
-        """)
-        
-        total_stats = cur.fetchone()
-        
-        # Get recent command usage
-        cur = conn.execute("""
-            SELECT command, COUNT(*) as usage_count 
-            FROM activity_log 
-            WHERE activity_type = 'command' AND command IS NOT NULL
-            GROUP BY command 
-            ORDER BY usage_count DESC 
-            LIMIT 5
-        """)
-        
-        top_commands = cur.fetchall()
-        conn.close()
+        def _read(conn):
+            # Get today's stats
+            today = datetime.now().strftime("%Y-%m-%d")
+            cur = conn.execute("SELECT * FROM activity_stats WHERE date = ?", (today,))
+            today_stats = cur.fetchone()
+        
+            # Get total activity counts
+            cur = conn.execute("""
+                SELECT 
+                    COUNT(*) as total_activities,
+                    SUM(CASE WHEN activity_type = 'command' THEN 1 ELSE 0 END) as total_commands,
+                    SUM(CASE WHEN activity_type = 'message' AND is_outgoing = 1 THEN 1 ELSE 0 END) as messages_sent,
+                    SUM(CASE WHEN activity_type = 'message' AND is_outgoing = 0 THEN 1 ELSE 0 END) as messages_received,
+                    COUNT(DISTINCT chat_id) as active_chats
+                FROM activity_log
+            """)
+        
+            total_stats = cur.fetchone()
+        
+            # Get recent command usage
+            cur = conn.execute("""
+                SELECT command, COUNT(*) as usage_count 
+                FROM activity_log 
+                WHERE activity_type = 'command' AND command IS NOT NULL
+                GROUP BY command 
+                ORDER BY usage_count DESC 
+                LIMIT 5
+            """)
+        
+            top_commands = cur.fetchall()
+            return today_stats, total_stats, top_commands
+        
+        today_stats, total_stats, top_commands = await async_db.run_in_connection(_read, DB_FILE, readonly=True)
         
         stats_text = f"""
 {safe_get_emoji('main')} {safe_convert_font('USERBOT ACTIVITY STATISTICS', 'bold')}
@@ -580,21 +670,16 @@ async def show_activity_stats(event):
 async def show_userbot_activity(event, chat_id):
     """Show only userbot outgoing activities"""
     try:
-        conn = get_db_conn()
-        if not conn:
-            await safe_send_message(event, f"{safe_get_emoji('adder3')} Database error")
-            return
-            
-        cur = conn.execute("""
+        activities = await async_db.execute_query("""
             SELECT activity_type, message_text, command, created_at, media_type
             FROM activity_log 
             WHERE chat_id = ? AND is_outgoing = 1
             ORDER BY timestamp DESC 
             LIMIT 15
-        """, (chat_id,))
-        
-        activities = cur.fetchall()
-        conn.close()
+        """, (chat_id,), DB_FILE, fetch="all")
+        if activities is None:
+            await safe_send_message(event, f"{safe_get_emoji('adder3')} Database error")
+            return
         
         if not activities:
             await safe_send_message(event, f"{safe_get_emoji('check')} No userbot activity in this chat yet")
@@ -630,19 +715,18 @@ async def show_userbot_activity(event, chat_id):
 async def show_monitoring_status(event):
     """Show monitoring system status"""
     try:
-        conn = get_db_conn()
-        if not conn:
-            await safe_send_message(event, f"{safe_get_emoji('adder3')} Database error")
-            return
+        def _read(conn):
+            # Get monitoring stats
+            cur = conn.execute("SELECT COUNT(*) as monitored_chats FROM chat_monitoring WHERE monitoring_enabled = 1")
+            monitored = cur.fetchone()['monitored_chats']
         
-        # Get monitoring stats
-        cur = conn.execute("SELECT COUNT(*) as monitored_chats FROM chat_monitoring WHERE monitoring_enabled = 1")
-        monitored = cur.fetchone()['monitored_chats']
+            cur = conn.execute("SELECT COUNT(*) as total_activities FROM activity_log WHERE DATE(created_at) = DATE('now')")
+            today_activities = cur.fetchone()['total_activities']
+            return monitored, today_activities
         
-        cur = conn.execute("SELECT COUNT(*) as total_activities FROM activity_log WHERE DATE(created_at) = DATE('now')")
-        today_activities = cur.fetchone()['total_activities']
+        monitored, today_activities = await async_db.run_in_connection(_read, DB_FILE, readonly=True)
         
-        conn.close()
+        buffer_stats = activity_buffer.get_stats()
         
         status_text = f"""
 {safe_get_emoji('adder6')} {safe_convert_font('MONITORING SYSTEM STATUS', 'bold')}
@@ -661,6 +745,11 @@ async def show_monitoring_status(event):
 
 {safe_get_emoji('adder5')} {safe_convert_font('Database:', 'bold')} SQLite Active
 {safe_get_emoji('adder3')} {safe_convert_font('Real-time Logging:', 'bold')} Enabled
+
+{safe_get_emoji('adder1')} {safe_convert_font('Write Buffer:', 'bold')}
+• Queue Depth: {buffer_stats['depth']}
+• Rows Flushed: {buffer_stats['flushed']} ({buffer_stats['flushes']} flushes)
+• Flush Latency: {buffer_stats['last_flush_ms']:.1f}ms last, {buffer_stats['avg_flush_ms']:.1f}ms avg, {buffer_stats['max_flush_ms']:.1f}ms max
         """.strip()
         
         await safe_send_message(event, status_text)
@@ -672,21 +761,16 @@ async def show_monitoring_status(event):
 async def search_activity(event, chat_id, keyword):
     """Search activity by keyword"""
     try:
-        conn = get_db_conn()
-        if not conn:
-            await safe_send_message(event, f"{safe_get_emoji('adder3')} Database error")
-            return
-            
-        cur = conn.execute("""
+        results = await async_db.execute_query("""
             SELECT activity_type, username, message_text, command, is_outgoing, created_at, media_type
             FROM activity_log 
             WHERE chat_id = ? AND (message_text LIKE ? OR command LIKE ?)
             ORDER BY timestamp DESC 
             LIMIT 10
-        """, (chat_id, f"%{keyword}%", f"%{keyword}%"))
-        
-        results = cur.fetchall()
-        conn.close()
+        """, (chat_id, f"%{keyword}%", f"%{keyword}%"), DB_FILE, fetch="all")
+        if results is None:
+            await safe_send_message(event, f"{safe_get_emoji('adder3')} Database error")
+            return
         
         if not results:
             await safe_send_message(event, f"{safe_get_emoji('adder3')} No results found for: {safe_convert_font(keyword, 'mono')}")
@@ -721,18 +805,11 @@ async def search_activity(event, chat_id, keyword):
 async def clear_chat_logs(event, chat_id):
     """Clear logs for current chat"""
     try:
-        conn = get_db_conn()
-        if not conn:
+        count = await async_db.execute_query("DELETE FROM activity_log WHERE chat_id = ?", (chat_id,), DB_FILE)
+        if count is None:
             await safe_send_message(event, f"{safe_get_emoji('adder3')} Database error")
             return
         
-        cur = conn.execute("SELECT COUNT(*) as count FROM activity_log WHERE chat_id = ?", (chat_id,))
-        count = cur.fetchone()['count']
-        
-        conn.execute("DELETE FROM activity_log WHERE chat_id = ?", (chat_id,))
-        conn.commit()
-        conn.close()
-        
         await safe_send_message(event, f"{safe_get_emoji('adder2')} {safe_convert_font('Logs Cleared!', 'bold')}\n{safe_get_emoji('check')} Removed {count} activity records from this chat")
         
     except Exception as e:
@@ -742,6 +819,13 @@ async def clear_chat_logs(event, chat_id):
 def get_plugin_info():
     return PLUGIN_INFO
 
+def cleanup_plugin():
+    """Drain write buffer on unload/shutdown"""
+    atexit.unregister(activity_buffer.flush_sync)
+    flushed = activity_buffer.stop()
+    if flushed:
+        print(f"[ActivityLog] Drained {flushed} buffered activity rows")
+
 def setup(client_instance):
     """Enhanced setup function with comprehensive userbot monitoring"""
     global client, env
@@ -751,6 +835,13 @@ def setup(client_instance):
         # Create plugin environment
         env = create_plugin_environment(client)
         
+        # Create tables once, then start the write-behind flusher
+        init_db()
+        activity_buffer.start()
+        # Satu hook per buffer: setup ulang tanpa unload tidak menumpuk hook
+        atexit.unregister(activity_buffer.flush_sync)
+        atexit.register(activity_buffer.flush_sync)
+        
         # Register comprehensive event handlers
         
         # 1. Incoming messages (from others)
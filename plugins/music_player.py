@@ -7,13 +7,15 @@ Version: 3.0.0 - Total Rework
 """
 
 import os
-import asyncio
-import subprocess
 import glob
-import shutil
 from datetime import datetime
 from telethon import events
-from telethon.tl.types import MessageEntityCustomEmoji, DocumentAttributeAudio
+from telethon.tl.types import DocumentAttributeAudio
+
+from utils.audio_cache import audio_cache
+from utils.music_resolver import music_resolver
+from utils.process_pool import process_pool
+from utils.premium_emoji_helper import PremiumEmojiEngine
 
 # ===== Plugin Info =====
 PLUGIN_INFO = {
@@ -37,53 +39,15 @@ PREMIUM_EMOJIS = {
     'adder6': {'id': '5794323465452394551', 'char': '🎚️'}
 }
 
+EMOJI_ENGINE = PremiumEmojiEngine(PREMIUM_EMOJIS)
+
 def get_emoji(emoji_type):
     """Get premium emoji character"""
     return PREMIUM_EMOJIS.get(emoji_type, {}).get('char', '🤩')
 
 def create_premium_entities(text):
-    """Create premium emoji entities for text with UTF-16 support"""
-    try:
-        entities = []
-        current_offset = 0
-        i = 0
-        
-        while i < len(text):
-            found_emoji = False
-            
-            for emoji_type, emoji_data in PREMIUM_EMOJIS.items():
-                emoji_char = emoji_data['char']
-                emoji_id = emoji_data['id']
-                
-                if text[i:].startswith(emoji_char):
-                    try:
-                        emoji_bytes = emoji_char.encode('utf-16-le')
-                        utf16_length = len(emoji_bytes) // 2
-                        
-                        entities.append(MessageEntityCustomEmoji(
-                            offset=current_offset,
-                            length=utf16_length,
-                            document_id=int(emoji_id)
-                        ))
-                        
-                        i += len(emoji_char)
-                        current_offset += utf16_length
-                        found_emoji = True
-                        break
-                        
-                    except Exception:
-                        break
-            
-            if not found_emoji:
-                char = text[i]
-                char_bytes = char.encode('utf-16-le')
-                char_utf16_length = len(char_bytes) // 2
-                current_offset += char_utf16_length
-                i += 1
-        
-        return entities
-    except Exception:
-        return []
+    """Create premium emoji entities (shared compiled engine, cached templates)"""
+    return EMOJI_ENGINE.entities(text)
 
 async def safe_send_premium(event, text, file=None):
     """Send message with premium entities"""
@@ -116,24 +80,19 @@ async def safe_edit_premium(message, text):
 
 # Configuration
 TEMP_DIR = os.path.expanduser("~/vzoelfox/temp/music")
-DOWNLOAD_DIR = os.path.expanduser("~/vzoelfox/downloads/music")
+DOWNLOAD_TIMEOUT = 600  # seconds per yt-dlp download
 
 def ensure_directories():
     """Ensure all directories exist"""
-    for directory in [TEMP_DIR, DOWNLOAD_DIR]:
+    for directory in [TEMP_DIR]:
         os.makedirs(directory, exist_ok=True)
 
 async def check_ytdlp():
     """Check if yt-dlp is available"""
     try:
-        result = await asyncio.create_subprocess_exec(
-            'yt-dlp', '--version',
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE
-        )
-        stdout, stderr = await result.communicate()
+        result = await process_pool.run(['yt-dlp', '--version'], tool='yt-dlp', timeout=30)
         if result.returncode == 0:
-            version = stdout.decode().strip()
+            version = result.stdout.decode().strip()
             return {'available': True, 'version': version}
         else:
             return {'available': False, 'error': 'Command failed'}
@@ -141,85 +100,64 @@ async def check_ytdlp():
         return {'available': False, 'error': str(e)}
 
 async def search_youtube(query):
-    """Search YouTube and get basic info"""
-    try:
-        cmd = [
-            'yt-dlp',
-            '--get-title',
-            '--get-duration', 
-            '--get-id',
-            '--no-playlist',
-            f'ytsearch1:{query}'
-        ]
-        
-        process = await asyncio.create_subprocess_exec(
-            *cmd,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE
-        )
-        
-        stdout, stderr = await process.communicate()
-        
-        if process.returncode == 0:
-            lines = stdout.decode().strip().split('\n')
-            if len(lines) >= 3:
-                return {
-                    'success': True,
-                    'title': lines[0],
-                    'duration': lines[1],
-                    'video_id': lines[2],
-                    'url': f'https://youtube.com/watch?v={lines[2]}'
-                }
-        
-        return {
-            'success': False,
-            'error': 'Search failed or no results found'
-        }
-    except Exception as e:
-        return {
-            'success': False,
-            'error': f'Search error: {str(e)}'
-        }
-
-async def download_music_preview(query):
-    """Download short preview (30 seconds) for .play command"""
+    """Search YouTube and get basic info (shared resolver: cached + de-duplicated)"""
+    return await music_resolver.search(query)
+
+# yt-dlp prints the final file after post-processing: "<id>\t<title>\t<path>"
+DOWNLOAD_PRINT = 'after_move:%(id)s\t%(title)s\t%(filepath)s'
+
+def parse_download_output(stdout):
+    """(video_id, title, path) from yt-dlp --print output, None if nothing was saved"""
+    for line in reversed(stdout.decode(errors='ignore').strip().splitlines()):
+        parts = line.split('\t')
+        if len(parts) == 3 and os.path.exists(parts[2]):
+            return parts[0], parts[1], parts[2]
+    return None
+
+def download_target(query, video_id):
+    return f'https://youtube.com/watch?v={video_id}' if video_id else f'ytsearch1:{query}'
+
+async def run_cached_download(kind, query, video_id, args, fmt):
+    """Run yt-dlp into the cache dir and index the result (None on failure)"""
+    cmd = ['yt-dlp', *args,
+           '--output', audio_cache.output_template(kind),
+           '--print', DOWNLOAD_PRINT,
+           '--no-playlist',
+           download_target(query, video_id)]
+    
+    process = await process_pool.run(cmd, tool='yt-dlp', timeout=DOWNLOAD_TIMEOUT)
+    
+    downloaded = parse_download_output(process.stdout) if process.returncode == 0 else None
+    if not downloaded:
+        return None, process.stderr
+    video_id, title, path = downloaded
+    if fmt is None:
+        fmt = f'{os.path.splitext(path)[1].upper()} Best Quality'
+    return await audio_cache.store(kind, query, video_id, path, title, fmt), process.stderr
+
+async def download_music_preview(query, video_id=None):
+    """Download short preview (30 seconds) for .play command (served from cache when possible)
+    File is pinned against cache eviction on success - caller must audio_cache.unpin() after sending"""
     try:
         ensure_directories()
-        
-        cmd = [
-            'yt-dlp',
-            '--extract-audio',
-            '--audio-format', 'mp3',
-            '--audio-quality', '128K',
-            '--postprocessor-args', 'ffmpeg:-t 30',  # 30 seconds only
-            '--output', f'{TEMP_DIR}/preview_%(title)s.%(ext)s',
-            '--no-playlist',
-            f'ytsearch1:{query}'
-        ]
-        
-        process = await asyncio.create_subprocess_exec(
-            *cmd,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE
-        )
-        
-        stdout, stderr = await process.communicate()
-        
-        if process.returncode == 0:
-            # Find the preview file
-            preview_files = glob.glob(f"{TEMP_DIR}/preview_*.mp3")
-            if preview_files:
-                newest_file = max(preview_files, key=os.path.getmtime)
-                title = os.path.basename(newest_file).replace('preview_', '').replace('.mp3', '')
-                size = os.path.getsize(newest_file)
-                
-                return {
-                    'success': True,
-                    'file_path': newest_file,
-                    'title': title,
-                    'size': size,
-                    'type': 'preview'
-                }
+        video_id = video_id or await audio_cache.resolve_video_id(query)
+        
+        async with audio_cache.lock('preview', video_id):
+            result = await audio_cache.lookup('preview', query, video_id)
+            stderr = None
+            if not result:
+                result, stderr = await run_cached_download('preview', query, video_id, [
+                    '--extract-audio',
+                    '--audio-format', 'mp3',
+                    '--audio-quality', '128K',
+                    '--postprocessor-args', 'ffmpeg:-t 30',  # 30 seconds only
+                ], 'MP3 128K')
+            if result:
+                audio_cache.pin('preview', result['video_id'])
+        
+        if result:
+            result.update(success=True, type='preview')
+            return result
         
         return {
             'success': False,
@@ -232,85 +170,34 @@ async def download_music_preview(query):
             'error': f'Preview error: {str(e)}'
         }
 
-async def download_music_full(query):
-    """Download full song for .download command"""
+async def download_music_full(query, video_id=None):
+    """Download full song for .download command (served from cache when possible)
+    File is pinned against cache eviction on success - caller must audio_cache.unpin() after sending"""
     try:
         ensure_directories()
-        
-        # Method 1: High quality MP3
-        cmd = [
-            'yt-dlp',
-            '--extract-audio',
-            '--audio-format', 'mp3',
-            '--audio-quality', '320K',
-            '--output', f'{DOWNLOAD_DIR}/%(title)s.%(ext)s',
-            '--no-playlist',
-            f'ytsearch1:{query}'
-        ]
-        
-        process = await asyncio.create_subprocess_exec(
-            *cmd,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE
-        )
-        
-        stdout, stderr = await process.communicate()
-        
-        if process.returncode == 0:
-            # Find downloaded file
-            audio_files = glob.glob(f"{DOWNLOAD_DIR}/*.mp3")
-            if audio_files:
-                newest_file = max(audio_files, key=os.path.getmtime)
-                title = os.path.basename(newest_file).replace('.mp3', '')
-                size = os.path.getsize(newest_file)
-                
-                return {
-                    'success': True,
-                    'file_path': newest_file,
-                    'title': title,
-                    'size': size,
-                    'type': 'full',
-                    'format': 'MP3 320K'
-                }
-        
-        # Method 2: Best audio available
-        cmd_fallback = [
-            'yt-dlp',
-            '--format', 'bestaudio/best',
-            '--output', f'{DOWNLOAD_DIR}/%(title)s.%(ext)s',
-            '--no-playlist',
-            f'ytsearch1:{query}'
-        ]
-        
-        process = await asyncio.create_subprocess_exec(
-            *cmd_fallback,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE
-        )
-        
-        stdout, stderr = await process.communicate()
-        
-        if process.returncode == 0:
-            # Find any audio file
-            audio_exts = ['.mp3', '.webm', '.m4a', '.ogg', '.opus']
-            audio_files = []
-            for ext in audio_exts:
-                audio_files.extend(glob.glob(f"{DOWNLOAD_DIR}/*{ext}"))
-            
-            if audio_files:
-                newest_file = max(audio_files, key=os.path.getmtime)
-                title = os.path.basename(newest_file).split('.')[0]
-                size = os.path.getsize(newest_file)
-                ext = os.path.splitext(newest_file)[1].upper()
-                
-                return {
-                    'success': True,
-                    'file_path': newest_file,
-                    'title': title,
-                    'size': size,
-                    'type': 'full',
-                    'format': f'{ext} Best Quality'
-                }
+        video_id = video_id or await audio_cache.resolve_video_id(query)
+        
+        async with audio_cache.lock('full', video_id):
+            result = await audio_cache.lookup('full', query, video_id)
+            stderr = None
+            if not result:
+                # Method 1: High quality MP3
+                result, stderr = await run_cached_download('full', query, video_id, [
+                    '--extract-audio',
+                    '--audio-format', 'mp3',
+                    '--audio-quality', '320K',
+                ], 'MP3 320K')
+            if not result:
+                # Method 2: Best audio available
+                result, stderr = await run_cached_download('full', query, video_id, [
+                    '--format', 'bestaudio/best',
+                ], None)
+            if result:
+                audio_cache.pin('full', result['video_id'])
+        
+        if result:
+            result.update(success=True, type='full')
+            return result
         
         return {
             'success': False,
@@ -340,20 +227,13 @@ async def is_owner_check(client, user_id):
         return True
 
 def cleanup_old_files():
-    """Clean up old temporary files"""
+    """Clean up old temporary files (downloads live in audio_cache, which evicts itself)"""
     try:
         # Clean temp files older than 1 hour
         temp_files = glob.glob(f"{TEMP_DIR}/*")
         for file in temp_files:
             if os.path.getmtime(file) < (datetime.now().timestamp() - 3600):
                 os.remove(file)
-        
-        # Keep only 20 newest downloads
-        download_files = glob.glob(f"{DOWNLOAD_DIR}/*")
-        if len(download_files) > 20:
-            download_files.sort(key=os.path.getmtime)
-            for old_file in download_files[:-20]:
-                os.remove(old_file)
     except Exception as e:
         print(f"[Music] Cleanup error: {e}")
 
@@ -418,39 +298,39 @@ async def play_handler(event):
 {get_emoji('main')} **VzoelFox Music Engine**""")
         
         # Download preview
-        result = await download_music_preview(query)
+        result = await download_music_preview(query, search_result.get('video_id'))
         
         if result['success']:
-            await safe_edit_premium(search_msg, f"""{get_emoji('adder2')} **PREVIEW READY!**
+            try:
+                await safe_edit_premium(search_msg, f"""{get_emoji('adder2')} **PREVIEW READY!**
 
 {get_emoji('check')} **Title:** {result['title'][:40]}...
 {get_emoji('adder4')} **Size:** {result['size'] // 1024} KB
-{get_emoji('adder6')} **Type:** 30-second preview
+{get_emoji('adder6')} **Type:** 30-second preview{' (cached)' if result.get('cached') else ''}
 
 {get_emoji('main')} **VzoelFox Music Player**""")
             
-            # Send preview file
-            try:
-                with open(result['file_path'], 'rb') as audio:
-                    await event.reply(
-                        file=audio,
-                        attributes=[DocumentAttributeAudio(
-                            duration=30,
-                            title=f"🎵 {result['title'][:30]} (Preview)",
-                            performer="VzoelFox Music"
-                        )]
-                    )
-                
-                # Clean up preview file
-                os.remove(result['file_path'])
+                # Send preview file
+                try:
+                    with open(result['file_path'], 'rb') as audio:
+                        await event.reply(
+                            file=audio,
+                            attributes=[DocumentAttributeAudio(
+                                duration=30,
+                                title=f"🎵 {result['title'][:30]} (Preview)",
+                                performer="VzoelFox Music"
+                            )]
+                        )
                 
-            except Exception as e:
-                await safe_edit_premium(search_msg, f"""{get_emoji('adder5')} **SEND FAILED**
+                except Exception as e:
+                    await safe_edit_premium(search_msg, f"""{get_emoji('adder5')} **SEND FAILED**
 
 {get_emoji('adder3')} **Error:** {str(e)[:50]}...
 {get_emoji('adder1')} **File saved locally**
 
 {get_emoji('main')} **VzoelFox Music System**""")
+            finally:
+                audio_cache.unpin('preview', result['video_id'])
         
         else:
             await safe_edit_premium(search_msg, f"""{get_emoji('adder5')} **PREVIEW FAILED**
@@ -519,40 +399,40 @@ async def download_handler(event):
 {get_emoji('main')} **VzoelFox Download Engine**""")
         
         # Download full song
-        result = await download_music_full(query)
+        result = await download_music_full(query, search_result.get('video_id'))
         
         if result['success']:
-            await safe_edit_premium(search_msg, f"""{get_emoji('adder2')} **DOWNLOAD COMPLETE!**
+            try:
+                await safe_edit_premium(search_msg, f"""{get_emoji('adder2')} **DOWNLOAD COMPLETE!**
 
 {get_emoji('check')} **Title:** {result['title'][:40]}...
 {get_emoji('adder4')} **Size:** {result['size'] // 1024} KB
-{get_emoji('adder6')} **Format:** {result['format']}
+{get_emoji('adder6')} **Format:** {result['format']}{' (cached)' if result.get('cached') else ''}
 
 {get_emoji('main')} **VzoelFox Music Player**""")
             
-            # Send full file
-            try:
-                with open(result['file_path'], 'rb') as audio:
-                    await event.reply(
-                        file=audio,
-                        attributes=[DocumentAttributeAudio(
-                            duration=180,  # Default duration
-                            title=result['title'][:50],
-                            performer="VzoelFox Music"
-                        )],
-                        supports_streaming=True
-                    )
-                
-                # Cleanup old files
-                cleanup_old_files()
+                # Send full file
+                try:
+                    with open(result['file_path'], 'rb') as audio:
+                        await event.reply(
+                            file=audio,
+                            attributes=[DocumentAttributeAudio(
+                                duration=180,  # Default duration
+                                title=result['title'][:50],
+                                performer="VzoelFox Music"
+                            )],
+                            supports_streaming=True
+                        )
                 
-            except Exception as e:
-                await safe_edit_premium(search_msg, f"""{get_emoji('adder5')} **SEND FAILED**
+                except Exception as e:
+                    await safe_edit_premium(search_msg, f"""{get_emoji('adder5')} **SEND FAILED**
 
 {get_emoji('adder3')} **Error:** {str(e)[:50]}...
-{get_emoji('adder1')} **File saved to:** Downloads folder
+{get_emoji('adder1')} **File saved to:** Audio cache (`.download` again resends it)
 
 {get_emoji('main')} **VzoelFox Music System**""")
+            finally:
+                audio_cache.unpin('full', result['video_id'])
         
         else:
             await safe_edit_premium(search_msg, f"""{get_emoji('adder5')} **DOWNLOAD FAILED**
@@ -584,7 +464,8 @@ async def musicstatus_handler(event):
         
         # Check directories
         temp_files = len(glob.glob(f"{TEMP_DIR}/*")) if os.path.exists(TEMP_DIR) else 0
-        download_files = len(glob.glob(f"{DOWNLOAD_DIR}/*")) if os.path.exists(DOWNLOAD_DIR) else 0
+        cache_stats = await audio_cache.get_stats()
+        resolver_stats = music_resolver.get_stats()
         
         status_text = f"""{get_emoji('main')} **VZOELFOX MUSIC STATUS**
 
@@ -595,7 +476,9 @@ async def musicstatus_handler(event):
 
 {get_emoji('adder2')} **File Statistics:**
 {get_emoji('adder6')} Temp Files: {temp_files}
-{get_emoji('adder6')} Downloads: {download_files}
+{get_emoji('adder6')} Audio Cache: {cache_stats['files']} files, {cache_stats['size_mb']:.1f}/{audio_cache.max_bytes // (1024 * 1024)} MB
+{get_emoji('adder6')} Cache Hits: {cache_stats['hits']} / Misses: {cache_stats['misses']} ({cache_stats['hit_rate']:.0f}%)
+{get_emoji('adder6')} Search Cache: {resolver_stats['cached']} songs, {resolver_stats['hit_rate']:.0f}% hits, {resolver_stats['running']} running
 
 {get_emoji('adder3')} **Commands:**
 {get_emoji('adder4')} `.play <song>` - 30s preview
@@ -632,6 +515,7 @@ def setup(client_instance):
     
     # Ensure directories exist
     ensure_directories()
+    audio_cache.load()
     
     # Register handlers
     client.add_event_handler(play_handler, events.NewMessage(pattern=r'\.play(?:\s+(.+))?$'))
@@ -142,10 +142,10 @@ async def clear_queue(event):
         else:
             queue_length = 0
         
-        # Clear voice manager queue too
+        # Clear voice manager queue too (cancels prefetched tracks)
         vm = get_voice_manager()
         if vm:
-            vm.music_queue[chat_id] = []
+            vm.clear_queue(chat_id)
         
         await event.reply(
             f"{get_emoji('clear')} **Queue cleared**\n"
@@ -171,10 +171,10 @@ async def shuffle_queue(event):
         import random
         random.shuffle(music_queues[chat_id])
         
-        # Update voice manager queue
+        # Update voice manager queue (re-targets prefetch to the new next tracks)
         vm = get_voice_manager()
-        if vm and chat_id in vm.music_queue:
-            random.shuffle(vm.music_queue[chat_id])
+        if vm:
+            vm.shuffle_queue(chat_id)
         
         await event.reply(
             f"{get_emoji('shuffle')} **Queue shuffled**\n"
@@ -240,8 +240,8 @@ async def remove_from_queue(event):
         
         # Update voice manager queue
         vm = get_voice_manager()
-        if vm and chat_id in vm.music_queue and position < len(vm.music_queue[chat_id]):
-            vm.music_queue[chat_id].pop(position)
+        if vm:
+            vm.remove_from_queue(chat_id, position)
         
         await event.reply(
             f"{get_emoji('clear')} **Removed from queue:**\n"
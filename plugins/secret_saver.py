@@ -17,6 +17,7 @@ from telethon.tl.types import (
     DocumentAttributeAudio, DocumentAttributeAnimated, MessageMediaWebPage
 )
 from telethon.errors import FloodWaitError
+from utils.entity_cache import entity_cache
 
 # Premium emoji helper
 sys.path.append('utils')
@@ -192,13 +193,8 @@ async def save_media_to_saved_messages(client, message, media_type="unknown"):
         chat_info = "Unknown Chat"
         
         try:
-            chat = await client.get_entity(message.chat_id)
-            if hasattr(chat, 'title'):
-                chat_info = chat.title
-            elif hasattr(chat, 'first_name'):
-                chat_info = f"{chat.first_name}" + (f" {chat.last_name}" if hasattr(chat, 'last_name') and chat.last_name else "")
-            else:
-                chat_info = f"Chat {message.chat_id}"
+            info = await entity_cache.get_info(client, message.chat_id, getattr(message, 'chat', None))
+            chat_info = info['title'] if info else f"Chat {message.chat_id}"
         except:
             chat_info = f"Chat {message.chat_id}"
         
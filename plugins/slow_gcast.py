@@ -13,6 +13,9 @@ from telethon.errors import FloodWaitError, ChatWriteForbiddenError, UserBannedI
 from telethon.tl.types import MessageEntityCustomEmoji
 import sqlite3
 import os
+from utils.dialog_index import dialog_index
+from utils.gcast_jobs import gcast_jobs
+from utils.progress_reporter import ProgressReporter
 
 # ===== Plugin Info =====
 PLUGIN_INFO = {
@@ -123,7 +126,8 @@ gcast_state = {
     "processed": 0,
     "success": 0,
     "failed": 0,
-    "start_time": None
+    "start_time": None,
+    "job_id": None
 }
 
 # ===== Animation Words with Premium Emojis =====
@@ -187,16 +191,14 @@ def save_gcast_log(message, duration):
         print(f"[Slow GCast] Log save error: {e}")
         return False
 
-async def animate_progress(event, message):
-    """Animasi progress dengan edit pesan dan premium emojis"""
-    for i, word in enumerate(ANIMATION_WORDS):
-        try:
-            progress = f"{word}\n\n📊 Progress: {gcast_state['processed']}/{gcast_state['total_chats']}\n✅ Berhasil: {gcast_state['success']}\n❌ Gagal: {gcast_state['failed']}"
-            await safe_edit_premium(event, progress)
-            await asyncio.sleep(2)  # Delay 2 detik per kata
-        except Exception as e:
-            print(f"[Slow GCast] Animation error: {e}")
-            break
+def progress_text(word):
+    return f"{word}\n\n📊 Progress: {gcast_state['processed']}/{gcast_state['total_chats']}\n✅ Berhasil: {gcast_state['success']}\n❌ Gagal: {gcast_state['failed']}"
+
+async def animate_progress(reporter):
+    """Animasi progress dengan premium emojis (edit di-throttle oleh ProgressReporter)"""
+    for word in ANIMATION_WORDS:
+        reporter.update(progress_text(word))
+        await asyncio.sleep(2)  # Delay 2 detik per kata
 
 # Global client reference
 client = None
@@ -235,6 +237,7 @@ async def slow_gcast_handler(event):
 {get_emoji('check')} **Metode 2:** Reply ke pesan + `.sgcast` - Forward pesan yang direply
 {get_emoji('check')} **Alias:** `.slowgcast` juga bisa digunakan
 {get_emoji('check')} **Status:** `.sgstatus` - Lihat progress
+{get_emoji('check')} **Jobs:** `.gcastjobs` - Lihat/cancel job (auto resume setelah restart)
 
 {get_emoji('adder1')} **Fitur:**
 {get_emoji('adder2')} Delay 15 detik antar grup
@@ -250,84 +253,112 @@ async def slow_gcast_handler(event):
             return
         message = message_text[1]
     
+    try:
+        # Get all groups dari persistent dialog index (tanpa full iter_dialogs)
+        await dialog_index.ensure_ready(client)
+        targets = dialog_index.get_targets("groups")
+        
+        if not targets:
+            await safe_send_premium(event, f"{get_emoji('adder5')} Tidak ada grup yang ditemukan!")
+            return
+        
+        # Persistent job: reply di-forward dari sumber aslinya, juga saat resume
+        forward_msg = None
+        payload = None
+        if event.is_reply:
+            forward_msg = await event.get_reply_message()
+            if forward_msg:
+                payload = {'forward_chat_id': forward_msg.chat_id, 'forward_message_id': forward_msg.id}
+        
+        job_id = await gcast_jobs.create_job('slow_gcast', message, targets, payload=payload)
+        await run_slow_gcast_job(job_id, message, targets, event=event, forward_msg=forward_msg)
+    
+    except Exception as e:
+        error_msg = f"{get_emoji('adder5')} Error dalam slow gcast: {e}"
+        print(f"[Slow GCast] Main error: {e}")
+        await safe_edit_premium(event, error_msg)
+
+async def send_slow_gcast(entity, message, forward_msg=None):
+    if forward_msg:
+        await client.forward_messages(entity, forward_msg)
+    else:
+        await client.send_message(entity, message)
+
+async def run_slow_gcast_job(job_id, message, targets, event=None, forward_msg=None, done=(0, 0)):
+    """
+    Jalankan (atau resume) slow gcast job. targets = target yang belum terkirim;
+    done = (success, failed) dari run sebelumnya.
+    """
+    gcast_jobs.start(job_id)  # resumed jobs are already claimed (gcast_jobs.claim)
+    
     # Reset state
     gcast_state.update({
         "is_running": True,
-        "processed": 0,
-        "success": 0,
-        "failed": 0,
+        "job_id": job_id,
+        "total_chats": len(targets) + sum(done),
+        "processed": sum(done),
+        "success": done[0],
+        "failed": done[1],
         "start_time": datetime.now()
     })
     
+    animation_task = None
+    reporter = ProgressReporter(event, entities=create_premium_entities) if event is not None else None
     try:
-        # Get all chats
-        all_chats = []
-        async for dialog in client.iter_dialogs():
-            if dialog.is_group and not dialog.entity.broadcast:
-                all_chats.append(dialog)
-        
-        gcast_state["total_chats"] = len(all_chats)
-        
-        if gcast_state["total_chats"] == 0:
-            await safe_send_premium(event, f"{get_emoji('adder5')} Tidak ada grup yang ditemukan!")
-            gcast_state["is_running"] = False
-            return
-        
         # Start animation task
-        animation_task = asyncio.create_task(animate_progress(event, message))
+        if reporter is not None:
+            animation_task = asyncio.create_task(animate_progress(reporter))
         
         # Process chats with delay
-        for chat in all_chats:
-            if not gcast_state["is_running"]:  # Check if cancelled
+        for target in targets:
+            if not gcast_state["is_running"] or gcast_jobs.is_cancelled(job_id):  # Check if cancelled
                 break
+            
+            entity = dialog_index.input_peer(target)
+            name = target['title']
+            error = None
                 
             try:
-                # Cek apakah dari reply message untuk forward
-                if event.is_reply:
-                    replied_msg = await event.get_reply_message()
-                    if replied_msg:
-                        await client.forward_messages(chat.entity, replied_msg)
-                    else:
-                        await client.send_message(chat.entity, message)
-                else:
-                    await client.send_message(chat.entity, message)
-                
+                await send_slow_gcast(entity, message, forward_msg)
                 gcast_state["success"] += 1
-                print(f"[Slow GCast] Sent to: {chat.name}")
+                print(f"[Slow GCast] Sent to: {name}")
             
             except FloodWaitError as fe:
-                print(f"[Slow GCast] Flood wait {fe.seconds}s for {chat.name}")
+                print(f"[Slow GCast] Flood wait {fe.seconds}s for {name}")
                 await asyncio.sleep(fe.seconds)
                 try:
-                    if event.is_reply:
-                        replied_msg = await event.get_reply_message()
-                        if replied_msg:
-                            await client.forward_messages(chat.entity, replied_msg)
-                        else:
-                            await client.send_message(chat.entity, message)
-                    else:
-                        await client.send_message(chat.entity, message)
+                    await send_slow_gcast(entity, message, forward_msg)
                     gcast_state["success"] += 1
-                except:
+                except Exception as e:
                     gcast_state["failed"] += 1
+                    error = str(e)
             
-            except (ChatWriteForbiddenError, UserBannedInChannelError):
+            except (ChatWriteForbiddenError, UserBannedInChannelError) as e:
                 gcast_state["failed"] += 1
-                print(f"[Slow GCast] Banned/Forbidden: {chat.name}")
+                error = str(e)
+                print(f"[Slow GCast] Banned/Forbidden: {name}")
             
             except Exception as e:
                 gcast_state["failed"] += 1
-                print(f"[Slow GCast] Error in {chat.name}: {e}")
+                error = str(e)
+                print(f"[Slow GCast] Error in {name}: {e}")
             
             gcast_state["processed"] += 1
+            await gcast_jobs.mark(job_id, target['peer_id'], 'failed' if error else 'sent', error)
+            if reporter is not None:
+                reporter.update(progress_text(ANIMATION_WORDS[gcast_state["processed"] % len(ANIMATION_WORDS)]))
             
             # Delay 15 detik antar grup (kecuali grup terakhir)
             if gcast_state["processed"] < gcast_state["total_chats"]:
                 await asyncio.sleep(15)
         
         # Cancel animation
-        if not animation_task.done():
+        if animation_task and not animation_task.done():
             animation_task.cancel()
+        if reporter is not None:
+            await reporter.stop()
+        
+        job = await gcast_jobs.finish(job_id, 'completed' if gcast_state["processed"] >= gcast_state["total_chats"] else 'cancelled')
         
         # Final report dengan premium emojis
         end_time = datetime.now()
@@ -341,6 +372,7 @@ async def slow_gcast_handler(event):
 • Berhasil: {gcast_state['success']}
 • Gagal: {gcast_state['failed']}
 • Durasi: {duration}
+• Job: #{job_id} ({job['status'] if job else '-'})
 
 {get_emoji('adder3')} **Pesan:** {message[:50]}{'...' if len(message) > 50 else ''}
 {get_emoji('adder4')} **Selesai:** {end_time.strftime('%H:%M:%S')}
@@ -348,7 +380,10 @@ async def slow_gcast_handler(event):
 {get_emoji('check')} **Premium emoji system working perfectly!**
         """.strip()
         
-        await safe_edit_premium(event, final_report)
+        if event is not None:
+            await safe_edit_premium(event, final_report)
+        else:
+            print(f"[Slow GCast] Resumed job #{job_id} finished: {gcast_state['success']} sent, {gcast_state['failed']} failed")
         save_gcast_log(message, duration)
         
         # Send to log channel if available
@@ -359,11 +394,19 @@ async def slow_gcast_handler(event):
             await client.send_message(channel_id, log_msg)
         except Exception:
             pass  # Ignore if channel logging fails
+    
+    except asyncio.CancelledError:
+        # Interrupted (shutdown/reload): save progress, job stays running untuk resume
+        await gcast_jobs.checkpoint(job_id)
+        raise
         
     except Exception as e:
         error_msg = f"{get_emoji('adder5')} Error dalam slow gcast: {e}"
         print(f"[Slow GCast] Main error: {e}")
-        await safe_edit_premium(event, error_msg)
+        await gcast_jobs.checkpoint(job_id)
+        if reporter is not None:
+            await reporter.stop()
+            await safe_edit_premium(event, error_msg)
         
         # Send error log to channel if available
         try:
@@ -374,6 +417,37 @@ async def slow_gcast_handler(event):
     
     finally:
         gcast_state["is_running"] = False
+        gcast_jobs.release(job_id)  # reload/error: job can be resumed by the reloaded plugin
+        if animation_task and not animation_task.done():
+            animation_task.cancel()
+        if reporter is not None:
+            await reporter.stop()
+
+async def resume_slow_gcast_jobs():
+    """Resume slow gcast jobs yang terputus karena restart (skip grup yang sudah terkirim)"""
+    await asyncio.sleep(5)
+    try:
+        for listed in await gcast_jobs.unfinished_jobs('slow_gcast'):
+            # Re-read + claim: skip jobs claimed or cancelled since the list was taken
+            job = await gcast_jobs.claim(listed['id'])
+            if not job:
+                continue
+            try:
+                targets = await gcast_jobs.pending_targets(job['id'])
+                forward_msg = None
+                payload = job['payload']
+                if payload.get('forward_message_id'):
+                    forward_msg = await client.get_messages(payload['forward_chat_id'], ids=payload['forward_message_id'])
+                    if not forward_msg:
+                        print(f"[Slow GCast] Job #{job['id']}: source message gone, sending text instead")
+            except BaseException:
+                gcast_jobs.release(job['id'])
+                raise
+            print(f"[Slow GCast] Resuming job #{job['id']}: {len(targets)} grup tersisa")
+            await run_slow_gcast_job(job['id'], job['message'], targets, forward_msg=forward_msg,
+                                     done=(job['success'], job['failed']))
+    except Exception as e:
+        print(f"[Slow GCast] Resume error: {e}")
 
 async def sgstatus_handler(event):
     """Show slow gcast status with premium emojis"""
@@ -423,6 +497,7 @@ async def sgstatus_handler(event):
 • Berhasil: {gcast_state['success']}
 • Gagal: {gcast_state['failed']}
 • Durasi: {elapsed}
+• Job: #{gcast_state['job_id']} (`.gcastjobs cancel {gcast_state['job_id']}` untuk stop)
 
 {get_emoji('adder1')} **ETA:** ~{((gcast_state['total_chats'] - gcast_state['processed']) * 15 / 60):.1f} menit
 
@@ -438,8 +513,17 @@ def setup(client_instance):
     """Setup function untuk register event handlers"""
     global client
     client = client_instance
+    dialog_index.attach(client)
     
     client.add_event_handler(slow_gcast_handler, events.NewMessage(pattern=r"\.s(?:g|low)gcast"))
     client.add_event_handler(sgstatus_handler, events.NewMessage(pattern=r"\.sgstatus"))
     
-    print(f"✅ [Slow GCast] Plugin loaded - Standalone premium emoji anti-spam gcast v{PLUGIN_INFO['version']}")
\ No newline at end of file
+    # Resume job yang terputus (crash/.update/restart)
+    gcast_jobs.load()
+    client.loop.create_task(resume_slow_gcast_jobs())
+    
+    print(f"✅ [Slow GCast] Plugin loaded - Standalone premium emoji anti-spam gcast v{PLUGIN_INFO['version']}")
+
+def cleanup_plugin():
+    """Flush pending job checkpoints"""
+    gcast_jobs.flush_sync()
\ No newline at end of file
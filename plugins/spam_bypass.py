@@ -14,6 +14,7 @@ from datetime import datetime, timedelta
 from telethon import events
 from telethon.tl.types import MessageEntityCustomEmoji, User
 from telethon.errors import FloodWaitError
+from utils.entity_cache import entity_cache
 
 # Plugin Info
 PLUGIN_INFO = {
@@ -30,10 +31,7 @@ client = None
 logger = None
 DB_FILE = "plugins/spam_bypass.db"
 
-# Cache untuk mengurangi API calls
-sender_cache = {}
-cache_expiry = {}
-CACHE_DURATION = timedelta(hours=1)  # Cache sender info untuk 1 jam
+# Flood wait tracking (sender lookups go through the shared entity cache)
 last_flood_wait = None
 flood_wait_until = None
 
@@ -310,43 +308,20 @@ def get_response_delay():
         return 1.0
 
 async def get_sender_safe(event):
-    """Get sender with caching and flood wait handling"""
-    global last_flood_wait, flood_wait_until, sender_cache, cache_expiry
+    """Get sender via shared entity cache with flood wait handling"""
+    global last_flood_wait, flood_wait_until
     
     try:
         # Check flood wait status
         if flood_wait_until and datetime.now() < flood_wait_until:
             return None  # Still in flood wait period
         
-        sender_id = event.sender_id
-        if not sender_id:
+        if not event.sender_id:
             return None
-            
-        # Check cache first
-        now = datetime.now()
-        if sender_id in sender_cache and sender_id in cache_expiry:
-            if now < cache_expiry[sender_id]:
-                return sender_cache[sender_id]
-            else:
-                # Clean expired cache
-                del sender_cache[sender_id]
-                del cache_expiry[sender_id]
         
         # Get sender with flood wait handling
         try:
-            sender = await event.get_sender()
-            
-            # Cache the result
-            sender_cache[sender_id] = sender
-            cache_expiry[sender_id] = now + CACHE_DURATION
-            
-            # Clean old cache entries (max 100 entries)
-            if len(sender_cache) > 100:
-                oldest_key = min(cache_expiry.keys(), key=lambda k: cache_expiry[k])
-                del sender_cache[oldest_key]
-                del cache_expiry[oldest_key]
-            
-            return sender
+            return await entity_cache.get_sender(event)
             
         except FloodWaitError as e:
             # Set flood wait period
@@ -543,7 +518,7 @@ async def checkspam_handler(event):
 
 {get_emoji('check')} {convert_font('Auto-Bypass:', 'bold')} {flood_status}
 {get_emoji('monitor')} {convert_font('Custom Responses:', 'bold')} {response_count}
-{get_emoji('shield')} {convert_font('Cached Senders:', 'bold')} {len(sender_cache)}
+{get_emoji('shield')} {convert_font('Cached Entities:', 'bold')} {len(entity_cache)}
 
 {get_emoji('bypass')} {convert_font('Default Response:', 'bold')}
 {get_emoji('success')} {convert_font('akun vzoel aman', 'bold')} {get_emoji('security')}
@@ -665,15 +640,12 @@ def setup(telegram_client):
         return False
 
 def cleanup_plugin():
-    global client, logger, sender_cache, cache_expiry, flood_wait_until
+    global client, logger, flood_wait_until
     try:
         if logger:
             logger.info("[SpamBypass] Plugin cleanup initiated")
         client = None
         
-        # Clear caches
-        sender_cache.clear()
-        cache_expiry.clear()
         flood_wait_until = None
         
         if logger:
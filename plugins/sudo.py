@@ -1,15 +1,18 @@
 """
-Sudo Manager Plugin (SQL3 murni, dengan durasi & akses fitur)
+Sudo Manager Plugin (async database facade, dengan durasi & akses fitur)
 Author: Vzoel Fox's (Enhanced by Morgan)
 Version: 1.0.0
 """
 
-import sqlite3
 import os
 import re
 import sys
 from telethon import events
 
+# Async database facade (non-blocking for event handlers)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from database import async_db, db_manager
+
 # Premium emoji helper
 sys.path.append('utils')
 try:
@@ -26,29 +29,19 @@ PLUGIN_INFO = {
     "description": "Manajemen sudo user untuk akses fitur tertentu dengan durasi di SQLite.",
     "author": "Vzoel Fox's (Enhanced by Morgan)",
     "commands": [".sudo <username/reply> <durasi> <fitur>", ".sudo list", ".sudo revoke <user_id>"],
-    "features": ["sudo by reply/username", "akses fitur", "durasi otomatis", "sql3 direct"]
+    "features": ["sudo by reply/username", "akses fitur", "durasi otomatis", "async database"]
 }
 
 DB_FILE = "plugins/sudo.db"
 
-def get_db_conn():
-    try:
-        os.makedirs(os.path.dirname(DB_FILE), exist_ok=True)
-        conn = sqlite3.connect(DB_FILE)
-        conn.row_factory = sqlite3.Row
-        conn.execute("""
-            CREATE TABLE IF NOT EXISTS sudo_access (
-                user_id INTEGER,
-                username TEXT,
-                feature TEXT,
-                expire_at INTEGER,
-                granted_at INTEGER,
-                PRIMARY KEY (user_id, feature)
-            );
-        """)
-        return conn
-    except Exception:
-        return None
+SUDO_SCHEMA = """
+    user_id INTEGER,
+    username TEXT,
+    feature TEXT,
+    expire_at INTEGER,
+    granted_at INTEGER,
+    PRIMARY KEY (user_id, feature)
+"""
 
 def parse_duration(text):
     # Mendukung format: 10 (menit), 1h (jam), 2d (hari)
@@ -63,58 +56,44 @@ def parse_duration(text):
     else:
         return val * 60  # default menit
 
-def add_sudo(user_id, username, feature, duration_sec):
+async def add_sudo(user_id, username, feature, duration_sec):
     try:
         from time import time
         expire = int(time()) + duration_sec
         granted = int(time())
-        conn = get_db_conn()
-        if not conn: return False
-        conn.execute("INSERT OR REPLACE INTO sudo_access (user_id, username, feature, expire_at, granted_at) VALUES (?, ?, ?, ?, ?)",
-                     (user_id, username, feature, expire, granted))
-        conn.commit()
-        conn.close()
-        return True
+        result = await async_db.execute_query(
+            "INSERT OR REPLACE INTO sudo_access (user_id, username, feature, expire_at, granted_at) VALUES (?, ?, ?, ?, ?)",
+            (user_id, username, feature, expire, granted), db_name=DB_FILE)
+        return bool(result)
     except Exception:
         return False
 
-def check_sudo(user_id, feature):
+async def check_sudo(user_id, feature):
     try:
         from time import time
         now = int(time())
-        conn = get_db_conn()
-        if not conn: return False
-        cur = conn.execute("SELECT expire_at FROM sudo_access WHERE user_id=? AND feature=?", (user_id, feature))
-        row = cur.fetchone()
-        conn.close()
-        return row and row["expire_at"] > now
+        row = await async_db.execute_query(
+            "SELECT expire_at FROM sudo_access WHERE user_id=? AND feature=?",
+            (user_id, feature), db_name=DB_FILE, fetch="one")
+        return bool(row and row["expire_at"] > now)
     except Exception:
         return False
 
-def sudo_list():
+async def sudo_list():
     try:
         from time import time
         now = int(time())
-        conn = get_db_conn()
-        if not conn: return []
-        cur = conn.execute("SELECT * FROM sudo_access WHERE expire_at > ?", (now,))
-        rows = cur.fetchall()
-        conn.close()
-        return rows
+        return await async_db.select("sudo_access", where="expire_at > ?", where_params=(now,), db_name=DB_FILE)
     except Exception:
         return []
 
-def sudo_revoke(user_id, feature=None):
+async def sudo_revoke(user_id, feature=None):
     try:
-        conn = get_db_conn()
-        if not conn: return False
         if feature:
-            conn.execute("DELETE FROM sudo_access WHERE user_id=? AND feature=?", (user_id, feature))
+            result = await async_db.delete("sudo_access", "user_id=? AND feature=?", (user_id, feature), db_name=DB_FILE)
         else:
-            conn.execute("DELETE FROM sudo_access WHERE user_id=?", (user_id,))
-        conn.commit()
-        conn.close()
-        return True
+            result = await async_db.delete("sudo_access", "user_id=?", (user_id,), db_name=DB_FILE)
+        return bool(result)
     except Exception:
         return False
 
@@ -131,7 +110,7 @@ async def sudo_cmd_handler(event):
         await safe_send_premium(event, help_text)
         return
     if args[1] == "list":
-        rows = sudo_list()
+        rows = await sudo_list()
         if rows:
             from time import time
             now = int(time())
@@ -147,7 +126,9 @@ async def sudo_cmd_handler(event):
     if args[1] == "revoke" and len(args) >= 3:
         target_id = int(args[2])
         feature = args[3] if len(args) >= 4 else None
-        sudo_revoke(target_id, feature)
+        if not await sudo_revoke(target_id, feature):
+            await safe_send_premium(event, f"{get_emoji('adder3')} **Sudo tidak ditemukan** untuk **{target_id}**{' | Fitur: **'+feature+'**' if feature else ''}\n\n{get_vzoel_signature()}")
+            return
         revoke_text = f"{get_emoji('check')} **Sudo Revoked**\n\n{get_emoji('adder2')} User: **{target_id}**{' | Fitur: **'+feature+'**' if feature else ''}\n\n{get_vzoel_signature()}"
         await safe_send_premium(event, revoke_text)
         return
@@ -184,7 +165,9 @@ async def sudo_cmd_handler(event):
     if not user_id:
         await safe_send_premium(event, f"{get_emoji('adder3')} **User ID tidak ditemukan.**\n\n{get_vzoel_signature()}")
         return
-    add_sudo(user_id, username, feature, duration_sec)
+    if not await add_sudo(user_id, username, feature, duration_sec):
+        await safe_send_premium(event, f"{get_emoji('adder3')} **Gagal memberi sudo** ke **{username or user_id}**.\n\n{get_vzoel_signature()}")
+        return
     success_text = f"""{get_emoji('main')} **Sudo Granted Successfully**
 
 {get_emoji('check')} **User:** {username or user_id}
@@ -198,4 +181,5 @@ def get_plugin_info():
     return PLUGIN_INFO
 
 def setup(client):
+    db_manager.create_table("sudo_access", SUDO_SCHEMA, DB_FILE)
     client.add_event_handler(sudo_cmd_handler, events.NewMessage(pattern=r"\.sudo"))
\ No newline at end of file
@@ -7,12 +7,14 @@ Version: 2.0.0 - Enhanced Batch TagAll System
 """
 
 import re
+import os
 import asyncio
 import random
 import time
 from telethon import events
-from telethon.tl.types import MessageEntityCustomEmoji, Channel, Chat, User, Message
+from telethon.tl.types import Channel, Chat
 from telethon.errors import ChatAdminRequiredError, UserNotParticipantError, FloodWaitError, MessageNotModifiedError
+from utils.premium_emoji_helper import PremiumEmojiEngine
 
 # ===== Plugin Info =====
 PLUGIN_INFO = {
@@ -20,7 +22,7 @@ PLUGIN_INFO = {
     "version": "2.0.0",
     "description": "Enhanced TagAll dengan batch processing, reply support, stop functionality, premium emoji per username",
     "author": "Founder Userbot: Vzoel Fox's Ltpn 🤩",
-    "commands": [".tag all <text>", ".tag all (reply)", ".stop tagall"],
+    "commands": [".tag all <text>", ".tag all (reply)", ".stop tagall", ".tag status"],
     "features": ["5-member batch processing", "reply message support", "stop functionality", "premium emoji per username", "random member selection", "no markdown bugs"]
 }
 
@@ -36,14 +38,23 @@ PREMIUM_EMOJIS = {
     "adder6":  {"emoji": "🎚", "custom_emoji_id": "5794323465452394551"}
 }
 
+EMOJI_ENGINE = PremiumEmojiEngine(PREMIUM_EMOJIS)
+
 # Import from central font system
 from utils.font_helper import convert_font
+from utils.participant_cache import participant_cache
+from utils.send_scheduler import send_scheduler
+from utils.progress_reporter import ProgressReporter
 
 # ===== Global Variables =====
 client = None
 active_tagall = {}  # Track active tagall processes per chat
 tagall_stop_flags = {}  # Stop flags for tagall processes
 
+BATCH_SIZE = 5          # members per tag message
+SHUFFLE_WINDOW = 200    # members buffered for random order while streaming
+TAGALL_CHAT_INTERVAL = float(os.getenv("TAGALL_CHAT_INTERVAL", "4"))  # min seconds between batches in one chat
+
 # ===== Helper Functions =====
 async def safe_send_premium(event, text):
     """Send message with premium entities"""
@@ -92,49 +103,241 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from utils.font_helper import convert_font, process_markdown_bold, process_all_markdown
 
 def create_premium_entities(text):
-    """Create premium emoji entities for text with UTF-16 support (FIXED VERSION)"""
+    """Create premium emoji entities (shared compiled engine, cached templates)"""
+    return EMOJI_ENGINE.entities(text)
+
+# ===== Participant Streaming =====
+async def stream_tag_batches(participants, batch_size=BATCH_SIZE, shuffle_window=SHUFFLE_WINDOW):
+    """
+    Async generator: member stream (participant cache) -> batches of unique, non-bot users.
+    Only a small shuffle window of users is buffered, so the first batch is
+    ready after the first GetParticipants page instead of after the whole list.
+    Memory still grows with the member count: de-duplication keeps every id seen.
+    """
+    seen = set()  # user ids only (ints), not User objects
+    window = []
+    
+    async def drain(keep):
+        random.shuffle(window)
+        while len(window) - keep >= batch_size:
+            yield [window.pop() for _ in range(batch_size)]
+    
+    async for user in participants:
+        if getattr(user, 'bot', False) or getattr(user, 'deleted', False):
+            continue
+        if user.id in seen:
+            continue
+        seen.add(user.id)
+        window.append(user)
+        if len(window) >= shuffle_window:
+            async for batch in drain(shuffle_window // 2):
+                yield batch
+    
+    async for batch in drain(0):
+        yield batch
+    if window:
+        yield window
+
+# ===== Central Tagall Scheduler =====
+class TagallScheduler:
+    """
+    Runs every active tagall from one dispatcher: chats are served round-robin
+    (one batch per ready chat per round), each send takes a token from the
+    account-wide send_scheduler, and a chat never gets batches faster than
+    TAGALL_CHAT_INTERVAL. Parallel runs therefore share the budget instead
+    of multiplying the account's send rate.
+    Member pages are fetched and batches sent in per-run tasks; the dispatcher
+    only picks runs whose next batch is ready, so one slow chat stalls nobody.
+    """
+
+    def __init__(self):
+        self.runs = {}      # chat_id -> run dict (insertion order = rotation)
+        self._task = None
+        self._wake = None
+
+    def submit(self, chat_id, make_source, send, on_sent=None):
+        """make_source(run) -> async generator of (text, tagged_count); send(text) -> coroutine"""
+        loop = asyncio.get_event_loop()
+        if self._wake is None:
+            self._wake = asyncio.Event()
+        run = {
+            'chat_id': chat_id,
+            'send': send,
+            'on_sent': on_sent,
+            'pending': None,
+            'fetch': None,       # task fetching the next batch
+            'sending': None,     # task sending the pending batch
+            'exhausted': False,
+            'error': None,
+            'sent': 0,
+            'tagged': 0,
+            'total_batches': None,
+            'next_at': 0.0,
+            'stopped': False,
+            'done': loop.create_future()
+        }
+        run['source'] = make_source(run)
+        self.runs[chat_id] = run
+        self._prefetch(run)
+        if self._task is None or self._task.done():
+            self._task = loop.create_task(self._dispatch())
+        self._wake.set()
+        return run
+
+    def eta(self, chat_id):
+        """Estimated seconds left for chat_id (None while total unknown)"""
+        run = self.runs.get(chat_id)
+        if not run or not run['total_batches']:
+            return None
+        remaining = max(0, run['total_batches'] - run['sent'])
+        per_batch = max(TAGALL_CHAT_INTERVAL, len(self.runs) / max(send_scheduler.rate, 0.01))
+        return remaining * per_batch + send_scheduler.paused_for
+
+    def wake(self):
+        """Re-check runs now (stop flags)"""
+        if self._wake is not None:
+            self._wake.set()
+
+    def _prefetch(self, run):
+        if run['pending'] is None and run['fetch'] is None and not run['exhausted'] and run['error'] is None:
+            run['fetch'] = asyncio.get_event_loop().create_task(self._fetch(run))
+
+    async def _fetch(self, run):
+        try:
+            run['pending'] = await run['source'].__anext__()
+        except StopAsyncIteration:
+            run['exhausted'] = True
+        except Exception as e:
+            run['error'] = e
+        finally:
+            run['fetch'] = None
+            self._wake.set()
+
+    async def _dispatch(self):
+        while self.runs:
+            self._wake.clear()
+            now = time.monotonic()
+            ready = []
+            for run in list(self.runs.values()):
+                if run['sending'] is not None:
+                    continue
+                if tagall_stop_flags.get(run['chat_id'], False):
+                    run['stopped'] = True
+                    await self._finish(run)
+                elif run['error'] is not None:
+                    await self._finish(run, run['error'])
+                elif run['pending'] is None:
+                    if run['exhausted']:
+                        await self._finish(run)
+                    else:
+                        self._prefetch(run)
+                elif run['next_at'] <= now:
+                    ready.append(run)
+
+            if not ready:
+                waits = [run['next_at'] - now for run in self.runs.values()
+                         if run['pending'] is not None and run['sending'] is None]
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=max(0.0, min(waits)) if waits else None)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            for run in ready:
+                await send_scheduler.acquire()
+                run['sending'] = asyncio.get_event_loop().create_task(self._send(run))
+
+    async def _send(self, run):
+        text, count = run['pending']
+        try:
+            await run['send'](text)
+        except FloodWaitError as e:
+            # Shared backoff; batch is kept and retried on this chat's next turn
+            if not send_scheduler.on_flood_wait(e.seconds):
+                run['error'] = e  # hours-long FloodWait: stop instead of hanging
+            else:
+                run['next_at'] = time.monotonic() + e.seconds
+            return
+        except Exception as e:
+            run['error'] = e
+            return
+        finally:
+            run['sending'] = None
+            self._wake.set()
+
+        send_scheduler.on_success()
+        run['pending'] = None
+        run['sent'] += 1
+        run['tagged'] += count
+        run['next_at'] = time.monotonic() + TAGALL_CHAT_INTERVAL
+        self._prefetch(run)  # next page loads while this chat waits its interval
+        if run['on_sent']:
+            try:
+                run['on_sent'](run)
+            except Exception as e:
+                print(f"[TagAll] Progress callback error: {e}")
+
+    async def _finish(self, run, error=None):
+        self.runs.pop(run['chat_id'], None)
+        fetch = run['fetch']
+        if fetch is not None:
+            fetch.cancel()
+            try:
+                await fetch
+            except (asyncio.CancelledError, Exception):
+                pass
+        try:
+            await run['source'].aclose()
+        except Exception:
+            pass
+        if not run['done'].done():
+            if error is not None:
+                run['done'].set_exception(error)
+            else:
+                run['done'].set_result(run)
+
+tagall_scheduler = TagallScheduler()
+
+def format_eta(seconds):
+    if seconds is None:
+        return "menghitung..."
+    minutes, seconds = divmod(int(seconds), 60)
+    return f"{minutes}m {seconds}s" if minutes else f"{seconds}s"
+
+async def tag_messages(run, chat_id, custom_message):
+    """Async generator: member batches -> (batch message, tagged count)"""
+    batches = stream_tag_batches(participant_cache.iter_members(client, chat_id))
+    batch_count = 0
     try:
-        entities = []
-        current_offset = 0
-        i = 0
-        
-        while i < len(text):
-            found_emoji = False
+        async for batch_users in batches:
+            batch_count += 1
+            if batch_count == 1:
+                # Member count known after first page (estimate incl. bots)
+                total_members = participant_cache.get_total(chat_id) or len(batch_users)
+                run['total_batches'] = max(1, (total_members + BATCH_SIZE - 1) // BATCH_SIZE)
             
-            for emoji_name, emoji_data in PREMIUM_EMOJIS.items():
-                emoji = emoji_data["emoji"]
-                custom_emoji_id = int(emoji_data["custom_emoji_id"])
-                
-                if text[i:].startswith(emoji):
-                    try:
-                        # Calculate UTF-16 length properly
-                        emoji_bytes = emoji.encode('utf-16-le')
-                        utf16_length = len(emoji_bytes) // 2
-                        
-                        entities.append(MessageEntityCustomEmoji(
-                            offset=current_offset,
-                            length=utf16_length,
-                            document_id=custom_emoji_id
-                        ))
-                        
-                        i += len(emoji)
-                        current_offset += utf16_length
-                        found_emoji = True
-                        break
-                        
-                    except Exception:
-                        break
+            # Build tag message for this batch with premium emoji after each username
+            batch_tags = ""
+            for user in batch_users:
+                if user.username:
+                    batch_tags += f"@{user.username} {get_emoji('main')} "
+                elif user.first_name:
+                    # Use mention for users without username + premium emoji
+                    display_name = user.first_name[:20]  # Limit length
+                    batch_tags += f"[{display_name}](tg://user?id={user.id}) {get_emoji('main')} "
             
-            if not found_emoji:
-                char = text[i]
-                char_bytes = char.encode('utf-16-le')
-                char_utf16_length = len(char_bytes) // 2
-                current_offset += char_utf16_length
-                i += 1
-        
-        return entities
-    except Exception:
-        return []
+            # Create batch message
+            batch_message = f"""
+{get_emoji('adder3')} {convert_font(f'Batch {batch_count}/~{run["total_batches"]} - Enhanced Tag All')}
+
+{batch_tags}
+
+{get_emoji('adder4')} {convert_font(custom_message)}
+{get_emoji('check')} {convert_font('By Vzoel Fox Ltpn')}
+            """.strip()
+            yield batch_message, len(batch_users)
+    finally:
+        await batches.aclose()
 
 # ===== Enhanced Tag All Command System =====
 @events.register(events.NewMessage(pattern=r'^\.tag all(?:\s+(.*))?$', outgoing=True))
@@ -190,97 +393,51 @@ async def enhanced_tag_all_handler(event):
         """.strip()
         progress_msg = await event.reply(progress_text, formatting_entities=create_premium_entities(progress_text))
         
-        await asyncio.sleep(2)
-        
-        # Get all participants
-        participants = await client.get_participants(event.chat_id)
-        
-        if not participants:
-            no_members_text = f"{get_emoji('adder5')} {convert_font('Tidak ada member yang ditemukan!')}"
-            await safe_edit_message(progress_msg, no_members_text, create_premium_entities(no_members_text))
-            # Clean up
-            if chat_id in active_tagall:
-                del active_tagall[chat_id]
-            if chat_id in tagall_stop_flags:
-                del tagall_stop_flags[chat_id]
-            return
-        
-        # Filter valid users and shuffle for random selection
-        valid_users = [user for user in participants if isinstance(user, User) and not getattr(user, 'bot', False)]
-        random.shuffle(valid_users)  # Random selection optimization
-        
-        # Start batch processing with 5 members at a time
-        batch_size = 5
-        total_batches = (len(valid_users) + batch_size - 1) // batch_size
+        # Progress message shows per-chat progress + ETA (throttled edits)
+        reporter = ProgressReporter(progress_msg, entities=create_premium_entities)
         
-        # Update progress message with batch info
-        batch_info_text = f"""
+        def on_sent(run):
+            active_tagall[chat_id]['total_tagged'] = run['tagged']
+            reporter.update(f"""
 {get_emoji('main')} {convert_font(custom_message)}
 
-{get_emoji('adder2')} {convert_font(f'Total member: {len(valid_users)}')}
-{get_emoji('adder4')} {convert_font(f'Batch processing: {total_batches} batch')}
-{get_emoji('check')} {convert_font('Memulai batch tagging...')}
-        """.strip()
-        await safe_edit_message(progress_msg, batch_info_text, create_premium_entities(batch_info_text))
+{get_emoji('adder2')} {convert_font(f'Batch: {run["sent"]}/~{run["total_batches"]} | Ditag: {run["tagged"]}')}
+{get_emoji('adder4')} {convert_font(f'ETA: {format_eta(tagall_scheduler.eta(chat_id))} | Tagall aktif: {len(tagall_scheduler.runs)}')}
+{get_emoji('adder3')} {convert_font('Gunakan .stop tagall untuk memberhentikan')}
+            """.strip())
+        
+        async def send_batch(text):
+            await event.reply(text, formatting_entities=create_premium_entities(text))
         
-        await asyncio.sleep(3)
+        # Stream participants into the central scheduler (shared send budget, round-robin)
+        run = tagall_scheduler.submit(
+            chat_id, lambda run: tag_messages(run, chat_id, custom_message), send_batch, on_sent
+        )
+        active_tagall[chat_id]['run'] = run
+        try:
+            await run['done']
+        finally:
+            await reporter.stop()
         
-        # Process in batches of 5 members
-        for batch_num in range(0, len(valid_users), batch_size):
-            # Check stop flag
-            if tagall_stop_flags.get(chat_id, False):
-                stop_text = f"""
+        if run['stopped']:
+            stop_text = f"""
 {get_emoji('adder5')} {convert_font('Tag All diberhentikan oleh pengguna!')}
-{get_emoji('adder3')} {convert_font(f'Total yang sudah ditag: {active_tagall[chat_id]["total_tagged"]}')}
+{get_emoji('adder3')} {convert_font(f'Total yang sudah ditag: {run["tagged"]}')}
 {get_emoji('main')} {convert_font('By Vzoel Fox Ltpn')}
-                """.strip()
-                await event.reply(stop_text, formatting_entities=create_premium_entities(stop_text))
-                # Clean up
-                if chat_id in active_tagall:
-                    del active_tagall[chat_id]
-                if chat_id in tagall_stop_flags:
-                    del tagall_stop_flags[chat_id]
-                return
-            
-            # Get current batch
-            batch_users = valid_users[batch_num:batch_num + batch_size]
-            current_batch_number = (batch_num // batch_size) + 1
-            
-            # Build tag message for this batch with premium emoji after each username
-            batch_tags = ""
-            for user in batch_users:
-                if user.username:
-                    batch_tags += f"@{user.username} {get_emoji('main')} "
-                elif user.first_name:
-                    # Use mention for users without username + premium emoji
-                    display_name = user.first_name[:20]  # Limit length
-                    batch_tags += f"[{display_name}](tg://user?id={user.id}) {get_emoji('main')} "
-            
-            # Create batch message
-            batch_message = f"""
-{get_emoji('adder3')} {convert_font(f'Batch {current_batch_number}/{total_batches} - Enhanced Tag All')}
-
-{batch_tags}
-
-{get_emoji('adder4')} {convert_font(custom_message)}
-{get_emoji('check')} {convert_font('By Vzoel Fox Ltpn')}
             """.strip()
-            
-            # Send batch message
-            await event.reply(batch_message, formatting_entities=create_premium_entities(batch_message))
-            
-            # Update counter
-            active_tagall[chat_id]['total_tagged'] += len(batch_users)
-            
-            # Wait between batches (avoid flood)
-            if batch_num + batch_size < len(valid_users):
-                await asyncio.sleep(4)  # 4 second delay between batches
+            await event.reply(stop_text, formatting_entities=create_premium_entities(stop_text))
+            return
+        
+        if run['sent'] == 0:
+            no_members_text = f"{get_emoji('adder5')} {convert_font('Tidak ada member yang ditemukan!')}"
+            await safe_edit_message(progress_msg, no_members_text, create_premium_entities(no_members_text))
+            return
         
         # Final completion message
         completion_text = f"""
 {get_emoji('adder2')} {convert_font('Enhanced Tag All Selesai!')}
-{get_emoji('main')} {convert_font(f'Total member ditag: {len(valid_users)}')}
-{get_emoji('adder4')} {convert_font(f'Total batch: {total_batches}')}
+{get_emoji('main')} {convert_font(f'Total member ditag: {run["tagged"]}')}
+{get_emoji('adder4')} {convert_font(f'Total batch: {run["sent"]}')}
 {get_emoji('adder6')} {convert_font('Dengan premium emoji per username')}
 {get_emoji('check')} {convert_font('By Vzoel Fox Ltpn')}
         """.strip()
@@ -318,6 +475,7 @@ async def stop_tagall_handler(event):
         
         # Set stop flag
         tagall_stop_flags[chat_id] = True
+        tagall_scheduler.wake()  # stop now, even while a member page is loading
         
         # Confirmation message
         stopping_text = f"""
@@ -330,6 +488,27 @@ async def stop_tagall_handler(event):
         error_text = f"{get_emoji('adder5')} {convert_font(f'Error menghentikan tagall: {str(e)}')}"
         await event.reply(error_text, formatting_entities=create_premium_entities(error_text))
 
+# ===== Tag All Status Command =====
+@events.register(events.NewMessage(pattern=r'^\.tag status$', outgoing=True))
+async def tagall_status_handler(event):
+    """Show every active tagall with progress and ETA"""
+    runs = list(tagall_scheduler.runs.values())
+    if not runs:
+        idle_text = f"{get_emoji('adder5')} {convert_font('Tidak ada Tag All yang sedang berjalan!')}"
+        await event.reply(idle_text, formatting_entities=create_premium_entities(idle_text))
+        return
+    
+    lines = [f"{get_emoji('main')} {convert_font(f'Tag All aktif: {len(runs)} chat')}", ""]
+    for run in runs:
+        lines.append(
+            f"{get_emoji('adder3')} `{run['chat_id']}` - batch {run['sent']}/~{run['total_batches'] or '?'}, "
+            f"ditag {run['tagged']}, ETA {format_eta(tagall_scheduler.eta(run['chat_id']))}"
+        )
+    lines.append("")
+    lines.append(f"{get_emoji('check')} {convert_font(f'Send rate: {send_scheduler.rate:.2f}/s (shared)')}")
+    status_text = "\n".join(lines)
+    await event.reply(status_text, formatting_entities=create_premium_entities(status_text))
+
 # ===== Check User ID Command =====
 @events.register(events.NewMessage(pattern=r'^\.cekid(?:\s+@?(\w+))?$', outgoing=True))
 async def cekid_handler(event):
@@ -351,7 +530,7 @@ async def cekid_handler(event):
         # Check if username provided
         elif username:
             try:
-                target_user = await client.get_entity(username)
+                target_user = await participant_cache.resolve_user(client, username)
             except Exception as e:
                 not_found_text = f"{get_emoji('adder5')} {convert_font(f'User @{username} tidak ditemukan!')}"
                 await event.reply(not_found_text, formatting_entities=create_premium_entities(not_found_text))
@@ -395,10 +574,12 @@ async def cekid_handler(event):
 def setup(client):
     """Setup function to register event handlers with client"""
     if client:
+        participant_cache.attach(client)
         client.add_event_handler(enhanced_tag_all_handler)
         client.add_event_handler(stop_tagall_handler)
+        client.add_event_handler(tagall_status_handler)
         client.add_event_handler(cekid_handler)
         print("⚙️ Enhanced Tagall handlers registered to client")
 
 print("🤩 Enhanced Tag All Plugin v2.0 dengan Premium Emoji Support berhasil dimuat!")
-print("Commands: .tag all [pesan] | .tag all (reply) | .stop tagall | .cekid [@username atau reply]")
\ No newline at end of file
+print("Commands: .tag all [pesan] | .tag all (reply) | .stop tagall | .tag status | .cekid [@username atau reply]")
\ No newline at end of file
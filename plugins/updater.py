@@ -8,13 +8,12 @@ Version: 1.0.0 - Complete Update Management System
 import sqlite3
 import os
 import sys
-import subprocess
 import json
 import shutil
 import asyncio
 from datetime import datetime
 from telethon import events
-from telethon.tl.types import MessageEntityCustomEmoji
+from utils.premium_emoji_helper import PremiumEmojiEngine
 
 # Import database compatibility layer
 try:
@@ -46,6 +45,8 @@ PREMIUM_EMOJIS = {
     "adder6": {"emoji": "🎚️", "custom_emoji_id": "5794323465452394551"}
 }
 
+EMOJI_ENGINE = PremiumEmojiEngine(PREMIUM_EMOJIS)
+
 DB_FILE = "plugins/updater.db"
 BACKUP_DIR = "data/backups/updates"
 client = None
@@ -56,49 +57,8 @@ def get_emoji(emoji_type):
     return emoji_data["emoji"]
 
 def create_premium_entities(text):
-    """Create premium emoji entities for text with UTF-16 support"""
-    try:
-        entities = []
-        current_offset = 0
-        i = 0
-        
-        while i < len(text):
-            found_emoji = False
-            
-            for emoji_type, emoji_data in PREMIUM_EMOJIS.items():
-                emoji = emoji_data["emoji"]
-                custom_emoji_id = int(emoji_data["custom_emoji_id"])
-                
-                if text[i:].startswith(emoji):
-                    try:
-                        # Calculate UTF-16 length properly
-                        emoji_bytes = emoji.encode('utf-16-le')
-                        utf16_length = len(emoji_bytes) // 2
-                        
-                        entities.append(MessageEntityCustomEmoji(
-                            offset=current_offset,
-                            length=utf16_length,
-                            document_id=custom_emoji_id
-                        ))
-                        
-                        i += len(emoji)
-                        current_offset += utf16_length
-                        found_emoji = True
-                        break
-                        
-                    except Exception:
-                        break
-            
-            if not found_emoji:
-                char = text[i]
-                char_bytes = char.encode('utf-16-le')
-                char_utf16_length = len(char_bytes) // 2
-                current_offset += char_utf16_length
-                i += 1
-        
-        return entities
-    except Exception:
-        return []
+    """Create premium emoji entities (shared compiled engine, cached templates)"""
+    return EMOJI_ENGINE.entities(text)
 
 async def safe_send_premium(event, text):
     """Send message with premium entities"""
@@ -126,6 +86,7 @@ async def safe_edit_premium(message, text):
 
 # Import from central font system
 from utils.font_helper import convert_font
+from utils.process_pool import process_pool, PRIORITY_BACKGROUND
 
 def get_db_conn():
     """Get database connection dengan compatibility layer"""
@@ -238,20 +199,20 @@ async def send_to_log_group(message):
     except Exception as e:
         print(f"[Updater] Log group send error: {e}")
 
-def run_command(command, cwd=None):
-    """Execute shell command dengan error handling"""
+async def run_command(command, cwd=None):
+    """Execute shell command lewat process pool (background priority) dengan error handling"""
     try:
-        result = subprocess.run(
-            command, 
-            shell=True, 
-            capture_output=True, 
-            text=True, 
+        result = await process_pool.run(
+            command,
+            shell=True,
+            text=True,
             cwd=cwd or os.getcwd(),
+            priority=PRIORITY_BACKGROUND,
             timeout=300  # 5 minutes timeout
         )
+        if result.timed_out:
+            return False, "", "Command timeout after 5 minutes"
         return result.returncode == 0, result.stdout, result.stderr
-    except subprocess.TimeoutExpired:
-        return False, "", "Command timeout after 5 minutes"
     except Exception as e:
         return False, "", str(e)
 
@@ -259,37 +220,37 @@ def check_git_repo():
     """Check if we're in a git repository"""
     return os.path.exists('.git') and os.path.isdir('.git')
 
-def get_current_commit():
+async def get_current_commit():
     """Get current git commit hash"""
     if not check_git_repo():
         return None
     
-    success, stdout, stderr = run_command("git rev-parse HEAD")
+    success, stdout, stderr = await run_command("git rev-parse HEAD")
     if success:
         return stdout.strip()[:8]  # Short hash
     return None
 
-def get_remote_commit():
+async def get_remote_commit():
     """Get latest remote commit hash"""
     if not check_git_repo():
         return None
     
     # Fetch latest changes
-    success, _, _ = run_command("git fetch origin")
+    success, _, _ = await run_command("git fetch origin")
     if not success:
         return None
     
-    success, stdout, stderr = run_command("git rev-parse origin/main")
+    success, stdout, stderr = await run_command("git rev-parse origin/main")
     if success:
         return stdout.strip()[:8]  # Short hash
     return None
 
-def get_commits_behind():
+async def get_commits_behind():
     """Get number of commits behind remote"""
     if not check_git_repo():
         return 0
     
-    success, stdout, stderr = run_command("git rev-list --count HEAD..origin/main")
+    success, stdout, stderr = await run_command("git rev-list --count HEAD..origin/main")
     if success:
         try:
             return int(stdout.strip())
@@ -297,13 +258,13 @@ def get_commits_behind():
             return 0
     return 0
 
-def create_backup():
+async def create_backup():
     """Create backup sebelum update"""
     try:
         os.makedirs(BACKUP_DIR, exist_ok=True)
         
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        current_commit = get_current_commit()
+        current_commit = await get_current_commit()
         backup_name = f"backup_{timestamp}_{current_commit}"
         backup_path = os.path.join(BACKUP_DIR, backup_name)
         
@@ -344,13 +305,13 @@ def create_backup():
         print(f"[Updater] Backup error: {e}")
         return None
 
-def check_dependencies():
+async def check_dependencies():
     """Check if all dependencies are satisfied"""
     try:
         if not os.path.exists('requirements.txt'):
             return True, "No requirements.txt found"
         
-        success, stdout, stderr = run_command("pip check")
+        success, stdout, stderr = await run_command("pip check")
         if success:
             return True, "All dependencies satisfied"
         else:
@@ -359,13 +320,13 @@ def check_dependencies():
     except Exception as e:
         return False, str(e)
 
-def update_dependencies():
+async def update_dependencies():
     """Update dependencies dari requirements.txt"""
     try:
         if not os.path.exists('requirements.txt'):
             return True, "No requirements.txt found"
         
-        success, stdout, stderr = run_command("pip install -r requirements.txt --upgrade")
+        success, stdout, stderr = await run_command("pip install -r requirements.txt --upgrade")
         return success, stdout if success else stderr
         
     except Exception as e:
@@ -378,20 +339,20 @@ async def perform_update(update_type="normal"):
             return False, "Not a git repository"
         
         # Get current state
-        old_commit = get_current_commit()
+        old_commit = await get_current_commit()
         
         # Create backup
-        backup_path = create_backup()
+        backup_path = await create_backup()
         if not backup_path:
             return False, "Failed to create backup"
         
         # Fetch latest changes
-        success, stdout, stderr = run_command("git fetch origin")
+        success, stdout, stderr = await run_command("git fetch origin")
         if not success:
             return False, f"Git fetch failed: {stderr}"
         
         # Get new commit
-        new_commit = get_remote_commit()
+        new_commit = await get_remote_commit()
         if not new_commit:
             return False, "Failed to get remote commit"
         
@@ -404,16 +365,16 @@ async def perform_update(update_type="normal"):
         
         # Perform git pull
         if update_type == "force":
-            success, stdout, stderr = run_command("git reset --hard origin/main")
+            success, stdout, stderr = await run_command("git reset --hard origin/main")
         else:
-            success, stdout, stderr = run_command("git pull origin main")
+            success, stdout, stderr = await run_command("git pull origin main")
         
         if not success:
             log_update_attempt(update_type, old_commit, new_commit, backup_path, "failed", stderr)
             return False, f"Git pull failed: {stderr}"
         
         # Update dependencies
-        dep_success, dep_message = update_dependencies()
+        dep_success, dep_message = await update_dependencies()
         if not dep_success:
             print(f"[Updater] Dependencies update failed: {dep_message}")
         
@@ -461,7 +422,7 @@ async def rollback_update():
         
         # Reset git to old commit if possible
         if old_commit:
-            run_command(f"git reset --hard {old_commit}")
+            await run_command(f"git reset --hard {old_commit}")
         
         # Log rollback
         now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
@@ -472,14 +433,14 @@ async def rollback_update():
     except Exception as e:
         return False, str(e)
 
-def get_changelog():
+async def get_changelog():
     """Get changelog between current and remote"""
     try:
         if not check_git_repo():
             return []
         
         # Get commits between current and remote
-        success, stdout, stderr = run_command("git log --oneline HEAD..origin/main")
+        success, stdout, stderr = await run_command("git log --oneline HEAD..origin/main")
         if success and stdout.strip():
             commits = []
             for line in stdout.strip().split('\n'):
@@ -553,9 +514,9 @@ async def updater_handler(event):
             
             await event.reply(f"{get_emoji('adder4')} {convert_font('Checking for updates...', 'mono')}")
             
-            current_commit = get_current_commit()
-            remote_commit = get_remote_commit()
-            commits_behind = get_commits_behind()
+            current_commit = await get_current_commit()
+            remote_commit = await get_remote_commit()
+            commits_behind = await get_commits_behind()
             
             if not remote_commit:
                 await event.reply(f"{get_emoji('adder5')} {convert_font('Failed to check remote repository', 'bold')}")
@@ -570,7 +531,7 @@ async def updater_handler(event):
 {get_emoji('main')} {convert_font('Status:', 'mono')} No updates available
                 """.strip()
             else:
-                changelog = get_changelog()
+                changelog = await get_changelog()
                 changelog_text = ""
                 if changelog:
                     changelog_text = "\n\n" + get_emoji('adder6') + " " + convert_font('Recent Changes:', 'bold') + "\n"
@@ -692,10 +653,10 @@ async def updater_handler(event):
                 await event.reply(f"{get_emoji('adder3')} {convert_font('Not a git repository', 'bold')}")
                 return
             
-            current_commit = get_current_commit()
-            remote_commit = get_remote_commit()
-            commits_behind = get_commits_behind()
-            dep_status, dep_message = check_dependencies()
+            current_commit = await get_current_commit()
+            remote_commit = await get_remote_commit()
+            commits_behind = await get_commits_behind()
+            dep_status, dep_message = await check_dependencies()
             
             history = get_update_history(3)
             history_text = ""
@@ -722,7 +683,7 @@ async def updater_handler(event):
             
         elif command == "changelog":
             # Show changelog
-            changelog = get_changelog()
+            changelog = await get_changelog()
             
             if not changelog:
                 await event.reply(f"{get_emoji('check')} {convert_font('No pending changes', 'bold')}")
@@ -750,7 +711,7 @@ async def updater_handler(event):
                 await event.reply(f"{get_emoji('adder3')} {convert_font('Not a git repository', 'bold')}")
                 return
             
-            commits_behind = get_commits_behind()
+            commits_behind = await get_commits_behind()
             if commits_behind == 0:
                 await event.reply(f"{get_emoji('check')} {convert_font('Already up to date!', 'bold')}")
                 return
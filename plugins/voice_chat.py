@@ -5,7 +5,6 @@ Supports premium emoji mapping and markdown formatting
 
 import asyncio
 import logging
-import yt_dlp
 from telethon import events
 from telethon.tl.types import MessageEntityCustomEmoji
 
@@ -33,6 +32,8 @@ except ImportError:
     async def is_owner_check(user_id):
         return True
 
+from utils.music_resolver import music_resolver
+
 logger = logging.getLogger(__name__)
 
 async def setup(bot):
@@ -291,35 +292,21 @@ async def voice_chat_status(event):
             f"{get_emoji('queue')} **Queue:** {len(queue)} tracks"
         )
         
+        prefetch = vm.get_prefetch_status(chat_id)
+        if prefetch['enabled'] and queue:
+            status_text += (
+                f"\n{get_emoji('info')} **Prefetched:** {prefetch['ready']} ready, "
+                f"{prefetch['in_flight']} downloading ({prefetch['disk_mb']:.1f} MB)"
+            )
+        
         await event.reply(status_text)
         
     except Exception as e:
         await event.reply(f"{get_emoji('error')} Error: {str(e)}")
 
 async def extract_audio_info(query: str):
-    """Extract audio URL and title from YouTube"""
-    try:
-        ydl_opts = {
-            'format': 'bestaudio[ext=m4a]',
-            'noplaylist': True,
-            'quiet': True,
-            'extract_flat': False,
-        }
-        
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            if query.startswith(('http://', 'https://')):
-                info = ydl.extract_info(query, download=False)
-            else:
-                info = ydl.extract_info(f"ytsearch:{query}", download=False)
-                info = info['entries'][0] if info['entries'] else None
-            
-            if info:
-                return info.get('url'), info.get('title', 'Unknown')
-            return None, None
-            
-    except Exception as e:
-        logger.error(f"YouTube extraction error: {e}")
-        return None, None
+    """Extract audio URL and title from YouTube (shared resolver: cached + de-duplicated)"""
+    return await music_resolver.stream_info(query)
 
 # Command list for help system
 COMMAND_LIST = [
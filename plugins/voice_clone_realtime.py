@@ -12,8 +12,6 @@ import os
 import json
 import time
 import random
-import subprocess
-import tempfile
 import base64
 from datetime import datetime
 from telethon import events, functions
@@ -21,6 +19,8 @@ from telethon.tl.types import DocumentAttributeAudio
 import requests
 import io
 
+from utils.process_pool import process_pool
+
 # ===== PLUGIN INFO =====
 PLUGIN_INFO = {
     "name": "voice_clone_realtime", 
@@ -399,7 +399,86 @@ def log_voice_generation(voice_name, text_input, audio_file, generation_time, ap
         print(f"Log voice generation error: {e}")
         return False
 
+# ===== STREAMING AUDIO PIPELINE =====
+TTS_CHUNK_SIZE = 16 * 1024
+VOICE_ENCODE_TIMEOUT = 120  # seconds per voice note
+OPUS_GRANULE_RATE = 48000   # Ogg/Opus granule positions always count 48 kHz samples
+
+def stream_chunks(response):
+    """Yield TTS audio chunks as they arrive, closing the response afterwards"""
+    try:
+        yield from response.iter_content(chunk_size=TTS_CHUNK_SIZE)
+    finally:
+        response.close()
+
+async def iterate_in_executor(iterator):
+    """Async view of a blocking (requests) chunk iterator"""
+    loop = asyncio.get_event_loop()
+    while True:
+        chunk = await loop.run_in_executor(None, next, iterator, None)
+        if chunk is None:
+            break
+        if chunk:
+            yield chunk
+
+def ogg_opus_duration(data):
+    """Duration in seconds from an Ogg/Opus stream (last page granule minus pre-skip)"""
+    last_page = data.rfind(b'OggS')
+    head = data.find(b'OpusHead')
+    if last_page < 0 or head < 0:
+        return 0.0
+    granule = int.from_bytes(data[last_page + 6:last_page + 14], 'little')
+    pre_skip = int.from_bytes(data[head + 10:head + 12], 'little')
+    return max(granule - pre_skip, 0) / OPUS_GRANULE_RATE
+
+async def encode_voice_stream(chunks):
+    """
+    Pipe TTS chunks (mp3/wav, any ffmpeg input) through ffmpeg into an
+    in-memory OGG/Opus voice note - no temp files, no ffprobe.
+    Returns io.BytesIO (name voice.ogg, .duration in seconds).
+    """
+    async with process_pool.slot('ffmpeg') as stats:
+        process = await asyncio.create_subprocess_exec(
+            'ffmpeg', '-loglevel', 'error', '-i', 'pipe:0',
+            '-vn', '-ac', '1', '-ar', '48000', '-c:a', 'libopus', '-b:a', '64k',
+            '-application', 'voip', '-f', 'ogg', 'pipe:1',
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
+        )
+
+        async def feed():
+            try:
+                async for chunk in chunks:
+                    process.stdin.write(chunk)
+                    await process.stdin.drain()
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # ffmpeg exited early, its stderr says why
+            finally:
+                process.stdin.close()
+
+        try:
+            _, encoded, stderr = await asyncio.wait_for(
+                asyncio.gather(feed(), process.stdout.read(), process.stderr.read()),
+                VOICE_ENCODE_TIMEOUT
+            )
+            await process.wait()
+        except asyncio.TimeoutError:
+            stats['timeouts'] += 1
+            raise RuntimeError(f"Voice encoding timed out after {VOICE_ENCODE_TIMEOUT}s")
+        finally:
+            await process_pool.kill(process)
+
+        if process.returncode != 0 or not encoded:
+            raise RuntimeError(stderr.decode(errors='ignore').strip()[-200:] or f"ffmpeg exit {process.returncode}")
+
+    voice = io.BytesIO(encoded)
+    voice.name = "voice.ogg"
+    voice.duration = ogg_opus_duration(encoded)
+    return voice
+
 # ===== VOICE CLONING FUNCTIONS =====
+# generate_voice_* return (chunk iterator, seconds until response) or (None, error message)
 async def generate_voice_elevenlabs(text, voice_id, settings=None):
     """Generate voice using ElevenLabs API"""
     try:
@@ -425,11 +504,12 @@ async def generate_voice_elevenlabs(text, voice_id, settings=None):
         
         start_time = time.time()
         
-        response = requests.post(url, json=data, headers=headers, timeout=30)
+        loop = asyncio.get_event_loop()
+        response = await loop.run_in_executor(None, lambda: requests.post(url, json=data, headers=headers, timeout=30, stream=True))
         
         if response.status_code == 200:
             generation_time = time.time() - start_time
-            return response.content, generation_time
+            return stream_chunks(response), generation_time
         else:
             return None, f"ElevenLabs API error: {response.status_code} - {response.text}"
             
@@ -456,18 +536,20 @@ async def generate_voice_murf(text, voice_id, settings=None):
         
         start_time = time.time()
         
-        response = requests.post(api_config["endpoint"], json=data, headers=headers, timeout=30)
+        loop = asyncio.get_event_loop()
+        response = await loop.run_in_executor(None, lambda: requests.post(api_config["endpoint"], json=data, headers=headers, timeout=30))
         
         if response.status_code == 200:
             result = response.json()
             audio_url = result.get("audio_url")
             
             if audio_url:
-                # Download generated audio
-                audio_response = requests.get(audio_url, timeout=30)
+                # Stream generated audio
+                audio_response = await loop.run_in_executor(None, lambda: requests.get(audio_url, timeout=30, stream=True))
                 if audio_response.status_code == 200:
                     generation_time = time.time() - start_time
-                    return audio_response.content, generation_time
+                    return stream_chunks(audio_response), generation_time
+                audio_response.close()
             
         return None, f"Murf API error: {response.status_code} - {response.text}"
         
@@ -488,11 +570,12 @@ async def generate_voice_coqui_local(text, voice_id, settings=None):
         
         start_time = time.time()
         
-        response = requests.post(api_config["endpoint"], json=data, timeout=30)
+        loop = asyncio.get_event_loop()
+        response = await loop.run_in_executor(None, lambda: requests.post(api_config["endpoint"], json=data, timeout=30, stream=True))
         
         if response.status_code == 200:
             generation_time = time.time() - start_time
-            return response.content, generation_time
+            return stream_chunks(response), generation_time
         else:
             return None, f"Coqui TTS error: {response.status_code}"
             
@@ -500,7 +583,7 @@ async def generate_voice_coqui_local(text, voice_id, settings=None):
         return None, f"Coqui error: {str(e)}"
 
 async def generate_voice(text, voice_name=None):
-    """Generate voice using specified voice model"""
+    """Generate voice note (in-memory OGG/Opus) using specified voice model"""
     if not voice_name:
         voice_name = current_voice
     
@@ -513,25 +596,24 @@ async def generate_voice(text, voice_name=None):
     settings = voice_config["settings"]
     
     try:
+        start_time = time.time()
+        
         # Select appropriate API
         if api_provider == "elevenlabs":
-            audio_data, generation_time = await generate_voice_elevenlabs(text, voice_id, settings)
+            chunks, generation_time = await generate_voice_elevenlabs(text, voice_id, settings)
         elif api_provider == "murf":
-            audio_data, generation_time = await generate_voice_murf(text, voice_id, settings)
+            chunks, generation_time = await generate_voice_murf(text, voice_id, settings)
         elif api_provider == "coqui":
-            audio_data, generation_time = await generate_voice_coqui_local(text, voice_id, settings)
+            chunks, generation_time = await generate_voice_coqui_local(text, voice_id, settings)
         else:
             return None, f"Unsupported API: {api_provider}"
         
-        if isinstance(audio_data, bytes):
-            # Save audio to temp file
-            temp_file = os.path.join(TEMP_AUDIO_DIR, f"voice_{int(time.time())}.mp3")
-            with open(temp_file, 'wb') as f:
-                f.write(audio_data)
-            
-            return temp_file, generation_time
-        else:
-            return None, audio_data  # Error message
+        if chunks is None:
+            return None, generation_time  # Error message
+        
+        # Encode while the TTS response is still downloading
+        voice = await encode_voice_stream(iterate_in_executor(chunks))
+        return voice, time.time() - start_time
             
     except Exception as e:
         return None, f"Voice generation error: {str(e)}"
@@ -540,13 +622,8 @@ async def generate_voice(text, voice_name=None):
 async def process_real_time_audio(audio_data, voice_name):
     """Process audio in real-time for calls"""
     try:
-        # Save input audio
-        input_file = os.path.join(TEMP_AUDIO_DIR, f"input_{int(time.time())}.wav")
-        with open(input_file, 'wb') as f:
-            f.write(audio_data)
-        
-        # Convert audio to text (speech-to-text)
-        text = await audio_to_text(input_file)
+        # Convert audio to text (speech-to-text), straight from memory
+        text = await audio_to_text(audio_data)
         if not text:
             return None, "Failed to convert audio to text"
         
@@ -560,26 +637,26 @@ async def process_real_time_audio(audio_data, voice_name):
     except Exception as e:
         return None, f"Real-time processing error: {str(e)}"
 
-async def audio_to_text(audio_file):
-    """Convert audio to text using speech recognition"""
+async def audio_to_text(audio_data):
+    """Convert audio (bytes) to text using speech recognition"""
     try:
         # Using OpenAI Whisper API for speech-to-text
         # You can also use Google Speech-to-Text or other services
         
-        with open(audio_file, 'rb') as f:
-            files = {"file": f}
-            headers = {"Authorization": "Bearer YOUR_OPENAI_API_KEY"}
-            
-            response = requests.post(
-                "https://api.openai.com/v1/audio/transcriptions",
-                headers=headers,
-                files=files,
-                data={"model": "whisper-1"}
-            )
-            
-            if response.status_code == 200:
-                result = response.json()
-                return result.get("text", "")
+        files = {"file": ("input.wav", audio_data)}
+        headers = {"Authorization": "Bearer YOUR_OPENAI_API_KEY"}
+        
+        loop = asyncio.get_event_loop()
+        response = await loop.run_in_executor(None, lambda: requests.post(
+            "https://api.openai.com/v1/audio/transcriptions",
+            headers=headers,
+            files=files,
+            data={"model": "whisper-1"}
+        ))
+        
+        if response.status_code == 200:
+            result = response.json()
+            return result.get("text", "")
             
         return None
         
@@ -588,44 +665,29 @@ async def audio_to_text(audio_file):
         return None
 
 # ===== TELEGRAM VOICE INTEGRATION =====
-async def send_voice_message(event, audio_file, duration=None):
-    """Send voice message to Telegram"""
+async def send_voice_message(event, voice, duration=None):
+    """Send in-memory OGG/Opus voice note to Telegram"""
     try:
-        # Get audio duration if not provided
+        # Duration comes from the encoded stream itself
         if not duration:
-            duration = get_audio_duration(audio_file)
-        
-        # Send voice message
-        with open(audio_file, 'rb') as audio:
-            await client.send_file(
-                event.chat_id,
-                audio,
-                voice_note=True,
-                attributes=[DocumentAttributeAudio(
-                    duration=int(duration),
-                    voice=True
-                )]
-            )
+            duration = getattr(voice, 'duration', None) or ogg_opus_duration(voice.getvalue())
+        
+        voice.seek(0)
+        await client.send_file(
+            event.chat_id,
+            voice,
+            voice_note=True,
+            attributes=[DocumentAttributeAudio(
+                duration=int(round(duration)),
+                voice=True
+            )]
+        )
         
         return True
     except Exception as e:
         print(f"Send voice message error: {e}")
         return False
 
-def get_audio_duration(audio_file):
-    """Get audio file duration"""
-    try:
-        result = subprocess.run([
-            'ffprobe', '-v', 'quiet', '-show_entries', 'format=duration',
-            '-of', 'default=noprint_wrappers=1:nokey=1', audio_file
-        ], capture_output=True, text=True)
-        
-        if result.returncode == 0:
-            return float(result.stdout.strip())
-        return 10.0  # Default duration
-    except:
-        return 10.0
-
 # ===== COMMAND HANDLERS =====
 @client.on(events.NewMessage(pattern=r'\.vclone\s+(.+)'))
 async def voice_clone_handler(event):
@@ -868,11 +930,11 @@ async def test_voice(event, text):
         """.strip())
         
         # Generate voice
-        audio_file, generation_time = await generate_voice(text, current_voice)
+        voice, generation_time = await generate_voice(text, current_voice)
         
-        if audio_file:
+        if voice:
             # Send voice message
-            success = await send_voice_message(event, audio_file)
+            success = await send_voice_message(event, voice)
             
             if success:
                 await loading_msg.edit(f"""
@@ -886,7 +948,7 @@ async def test_voice(event, text):
                 await loading_msg.edit("❌ Failed to send voice message")
             
             # Log generation
-            log_voice_generation(current_voice, text, audio_file, generation_time, CHARACTER_VOICES[current_voice]['api'], success)
+            log_voice_generation(current_voice, text, voice.name, generation_time, CHARACTER_VOICES[current_voice]['api'], success)
             
         else:
             await loading_msg.edit(f"❌ Voice generation failed: {generation_time}")
@@ -908,11 +970,11 @@ async def generate_voice_note(event, text):
         """.strip())
         
         # Generate voice
-        audio_file, generation_time = await generate_voice(text, current_voice)
+        voice, generation_time = await generate_voice(text, current_voice)
         
-        if audio_file:
+        if voice:
             # Send voice note
-            success = await send_voice_message(event, audio_file)
+            success = await send_voice_message(event, voice)
             
             if success:
                 await loading_msg.edit(f"""
@@ -924,7 +986,7 @@ async def generate_voice_note(event, text):
                 
                 # Log generation
                 log_voice_generation(
-                    current_voice, text, audio_file, generation_time,
+                    current_voice, text, voice.name, generation_time,
                     CHARACTER_VOICES[current_voice]['api'], True,
                     event.chat_id, event.sender_id
                 )
@@ -957,11 +1019,11 @@ async def generate_character_voice(event, character_name, text):
         """.strip())
         
         # Generate voice
-        audio_file, generation_time = await generate_voice(text, character_name)
+        voice, generation_time = await generate_voice(text, character_name)
         
-        if audio_file:
+        if voice:
             # Send voice message
-            success = await send_voice_message(event, audio_file)
+            success = await send_voice_message(event, voice)
             
             if success:
                 # Show success message with character info
@@ -984,7 +1046,7 @@ async def generate_character_voice(event, character_name, text):
                 
                 # Log generation
                 log_voice_generation(
-                    character_name, text, audio_file, generation_time,
+                    character_name, text, voice.name, generation_time,
                     character['api'], True, event.chat_id, event.sender_id
                 )
             else:
@@ -9,7 +9,8 @@ import os
 import json
 import logging
 from telethon import events
-from telethon.tl.types import MessageEntityCustomEmoji
+from utils.entity_cache import entity_cache
+from utils.premium_emoji_helper import PremiumEmojiEngine
 
 # Import database compatibility layer
 try:
@@ -44,6 +45,8 @@ PREMIUM_EMOJIS = {
     'adder6': {'id': '5794323465452394551', 'char': '🎚️'} # UTF-16 length: 2
 }
 
+EMOJI_ENGINE = PremiumEmojiEngine(PREMIUM_EMOJIS)
+
 # Font conversion maps
 FONTS = {
     'bold': {
@@ -138,65 +141,10 @@ def convert_font(text, font_type='bold'):
     return result
 
 def create_premium_entities(text):
-    """Create MessageEntityCustomEmoji for premium emojis in text"""
-    entities = []
-    
+    """Create premium emoji entities (shared compiled engine, cached templates)"""
     if not premium_status:
-        return entities
-    
-    try:
-        current_offset = 0
-        i = 0
-        
-        while i < len(text):
-            found_emoji = False
-            
-            # Check for premium emojis at current position
-            for emoji_type, emoji_data in PREMIUM_EMOJIS.items():
-                emoji_char = emoji_data['char']
-                emoji_id = emoji_data['id']
-                
-                if text[i:].startswith(emoji_char):
-                    try:
-                        # Calculate proper UTF-16 length
-                        emoji_bytes = emoji_char.encode('utf-16-le')
-                        utf16_length = len(emoji_bytes) // 2
-                        
-                        # Create entity
-                        entities.append(MessageEntityCustomEmoji(
-                            offset=current_offset,
-                            length=utf16_length,
-                            document_id=int(emoji_id)
-                        ))
-                        
-                        # Skip the emoji characters
-                        i += len(emoji_char)
-                        current_offset += utf16_length
-                        found_emoji = True
-                        break
-                        
-                    except Exception as e:
-                        if logger:
-                            logger.error(f"[Welcome] Error creating entity for {emoji_type}: {e}")
-                        break
-            
-            if not found_emoji:
-                # Regular character
-                char = text[i]
-                char_bytes = char.encode('utf-16-le')
-                char_utf16_length = len(char_bytes) // 2
-                current_offset += char_utf16_length
-                i += 1
-        
-        if logger:
-            logger.debug(f"[Welcome] Created {len(entities)} premium emoji entities")
-        
-    except Exception as e:
-        if logger:
-            logger.error(f"[Welcome] Error in create_premium_entities: {e}")
         return []
-    
-    return entities
+    return EMOJI_ENGINE.entities(text)
 
 def render_emoji_in_text(text):
     """Replace {emoji:name} and {font:type:text} with corresponding emojis and fonts"""
@@ -377,7 +325,7 @@ async def welcome_cmd_handler(event):
         if not await is_owner_check(event.sender_id):
             return
         
-        chat = await event.get_chat()
+        chat = await entity_cache.get_chat(event)
         chat_id = chat.id
         
         # Only work in groups/supergroups
@@ -485,7 +433,7 @@ async def member_join_handler(event):
         if not (hasattr(event, "user_joined") and event.user_joined):
             return
         
-        chat = await event.get_chat()
+        chat = await entity_cache.get_chat(event)
         chat_id = chat.id
         row = get_welcome(chat_id)
         
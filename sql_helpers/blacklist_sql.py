@@ -4,11 +4,10 @@ Manage persistent blacklist dengan SQLAlchemy
 """
 
 try:
-    from sql_helpers import BASE, SESSION, DB_LOCK
+    from sql_helpers import BASE, DB_LOCK
 except ImportError:
     raise AttributeError("SQL helpers not available")
 
-import threading
 from sqlalchemy import BigInteger, Column, String, DateTime, Text, Boolean
 from datetime import datetime
 
@@ -39,172 +38,88 @@ class BlacklistChat(BASE):
 # Create table will be handled by start_db() in __init__.py
 print("✅ [BlacklistSQL] Table definition ready")
 
-INSERTION_LOCK = threading.RLock()
+# Reads/writes go through the shared blacklist service (in-memory set +
+# data/blacklist.db). The blacklist_chats table above is only read once by
+# the service migration.
+from utils.blacklist_service import blacklist_service
 
-def add_blacklist_chat(chat_id, chat_title=None, chat_type=None, added_by="system", permanent=False, reason=""):
-    """Add chat ke blacklist dengan detail info"""
-    with INSERTION_LOCK:
-        try:
-            chat_id = int(chat_id)
-            
-            # Check if already exists
-            existing = SESSION.query(BlacklistChat).get(chat_id)
-            if existing:
-                # Update existing entry
-                if chat_title:
-                    existing.chat_title = chat_title
-                if chat_type:
-                    existing.chat_type = chat_type
-                if reason:
-                    existing.reason = reason
-                existing.permanent = permanent
-                existing.added_date = datetime.utcnow()
-                existing.added_by = added_by
-            else:
-                # Create new entry
-                blacklist_entry = BlacklistChat(
-                    chat_id=chat_id,
-                    chat_title=chat_title,
-                    chat_type=chat_type,
-                    added_by=added_by,
-                    permanent=permanent,
-                    reason=reason
-                )
-                SESSION.add(blacklist_entry)
-            
-            SESSION.commit()
-            print(f"[BlacklistSQL] Added {chat_id} to blacklist (permanent={permanent})")
-            return True
-            
-        except Exception as e:
-            print(f"[BlacklistSQL] Error adding to blacklist: {e}")
-            SESSION.rollback()
-            return False
+def _info(row):
+    return {
+        'chat_id': row['chat_id'],
+        'chat_title': row['title'],
+        'chat_type': row['chat_type'],
+        'added_date': row['added_at'],
+        'added_by': row['added_by'],
+        'permanent': bool(row['permanent']),
+        'reason': row['reason']
+    }
+
+def add_blacklist_chat(chat_id, chat_title=None, chat_type=None, added_by="system", permanent=None, reason=""):
+    """Add chat ke blacklist dengan detail info (permanent=None keeps the current flag)"""
+    try:
+        blacklist_service.add(chat_id, chat_title, chat_type, reason, added_by, permanent)
+        print(f"[BlacklistSQL] Added {chat_id} to blacklist (permanent={permanent})")
+        return True
+    except Exception as e:
+        print(f"[BlacklistSQL] Error adding to blacklist: {e}")
+        return False
 
 def remove_blacklist_chat(chat_id):
     """Remove chat dari blacklist (jika tidak permanent)"""
-    with INSERTION_LOCK:
-        try:
-            chat_id = int(chat_id)
-            
-            blacklist_entry = SESSION.query(BlacklistChat).get(chat_id)
-            if blacklist_entry:
-                if blacklist_entry.permanent:
-                    print(f"[BlacklistSQL] Cannot remove {chat_id} - marked as permanent")
-                    return False
-                
-                SESSION.delete(blacklist_entry)
-                SESSION.commit()
-                print(f"[BlacklistSQL] Removed {chat_id} from blacklist")
-                return True
-            else:
-                print(f"[BlacklistSQL] Chat {chat_id} not in blacklist")
-                return False
-                
-        except Exception as e:
-            print(f"[BlacklistSQL] Error removing from blacklist: {e}")
-            SESSION.rollback()
+    try:
+        entry = blacklist_service.get(chat_id)
+        if not entry:
+            print(f"[BlacklistSQL] Chat {chat_id} not in blacklist")
             return False
+        if entry['permanent']:
+            print(f"[BlacklistSQL] Cannot remove {chat_id} - marked as permanent")
+            return False
+        blacklist_service.remove(chat_id)
+        print(f"[BlacklistSQL] Removed {chat_id} from blacklist")
+        return True
+    except Exception as e:
+        print(f"[BlacklistSQL] Error removing from blacklist: {e}")
+        return False
 
 def is_chat_blacklisted(chat_id):
-    """Check if chat ada di blacklist"""
-    try:
-        chat_id = int(chat_id)
-        blacklist_entry = SESSION.query(BlacklistChat).get(chat_id)
-        return blacklist_entry is not None
-    except (ValueError, TypeError):
-        return True  # Invalid ID dianggap blacklisted untuk safety
-    except Exception as e:
-        print(f"[BlacklistSQL] Error checking blacklist: {e}")
-        return True
+    """Check if chat ada di blacklist (in-memory, tanpa query)"""
+    return blacklist_service.contains(chat_id)
 
 def get_blacklist_info(chat_id):
     """Get detail info tentang blacklisted chat"""
-    try:
-        chat_id = int(chat_id)
-        blacklist_entry = SESSION.query(BlacklistChat).get(chat_id)
-        if blacklist_entry:
-            return {
-                'chat_id': blacklist_entry.chat_id,
-                'chat_title': blacklist_entry.chat_title,
-                'chat_type': blacklist_entry.chat_type,
-                'added_date': blacklist_entry.added_date,
-                'added_by': blacklist_entry.added_by,
-                'permanent': blacklist_entry.permanent,
-                'reason': blacklist_entry.reason
-            }
-        return None
-    except Exception as e:
-        print(f"[BlacklistSQL] Error getting blacklist info: {e}")
-        return None
+    row = blacklist_service.get(chat_id)
+    return _info(row) if row else None
 
 def get_all_blacklisted_chats():
     """Get semua blacklisted chats dengan detail"""
-    try:
-        all_blacklisted = SESSION.query(BlacklistChat).all()
-        result = []
-        for entry in all_blacklisted:
-            result.append({
-                'chat_id': entry.chat_id,
-                'chat_title': entry.chat_title,
-                'chat_type': entry.chat_type,
-                'added_date': entry.added_date,
-                'added_by': entry.added_by,
-                'permanent': entry.permanent,
-                'reason': entry.reason
-            })
-        return result
-    except Exception as e:
-        print(f"[BlacklistSQL] Error getting all blacklisted chats: {e}")
-        return []
+    return [_info(row) for row in blacklist_service.get_all()]
 
 def get_blacklisted_ids():
     """Get list of blacklisted chat IDs only (untuk fast checking)"""
-    try:
-        result = SESSION.query(BlacklistChat.chat_id).all()
-        return [row[0] for row in result]
-    except Exception as e:
-        print(f"[BlacklistSQL] Error getting blacklisted IDs: {e}")
-        return []
+    return list(blacklist_service.get_ids())
 
 def count_blacklisted_chats():
     """Count total blacklisted chats"""
-    try:
-        count = SESSION.query(BlacklistChat).count()
-        return count
-    except Exception as e:
-        print(f"[BlacklistSQL] Error counting blacklisted chats: {e}")
-        return 0
+    return len(blacklist_service)
 
 def migrate_blacklist_chat(old_chat_id, new_chat_id):
     """Migrate blacklist entry ke chat ID baru"""
-    with INSERTION_LOCK:
-        try:
-            old_chat_id, new_chat_id = int(old_chat_id), int(new_chat_id)
-            
-            entry = SESSION.query(BlacklistChat).get(old_chat_id)
-            if entry:
-                # Create new entry dengan new ID
-                new_entry = BlacklistChat(
-                    chat_id=new_chat_id,
-                    chat_title=entry.chat_title,
-                    chat_type=entry.chat_type,
-                    added_by=entry.added_by,
-                    permanent=entry.permanent,
-                    reason=f"Migrated from {old_chat_id}. {entry.reason}"
-                )
-                
-                SESSION.add(new_entry)
-                SESSION.delete(entry)  # Remove old entry
-                SESSION.commit()
-                
-                print(f"[BlacklistSQL] Migrated blacklist {old_chat_id} → {new_chat_id}")
-                return True
-            
-        except Exception as e:
-            print(f"[BlacklistSQL] Migration error: {e}")
-            SESSION.rollback()
+    try:
+        entry = blacklist_service.get(old_chat_id)
+        if not entry:
             return False
+        blacklist_service.add(new_chat_id, entry['title'], entry['chat_type'],
+                              f"Migrated from {old_chat_id}. {entry['reason']}", entry['added_by'],
+                              bool(entry['permanent']))
+        if entry['permanent']:
+            # remove() keeps permanent entries; drop the old id explicitly
+            blacklist_service.add(old_chat_id, permanent=False)
+        blacklist_service.remove(old_chat_id)
+        print(f"[BlacklistSQL] Migrated blacklist {old_chat_id} → {new_chat_id}")
+        return True
+    except Exception as e:
+        print(f"[BlacklistSQL] Migration error: {e}")
+        return False
 
 # Export functions
 __all__ = [
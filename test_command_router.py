@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Test script for the plugin_loader command router
+Covers: command_keys() on real plugin patterns, whole-word routing in _dispatch
+(.logtest no longer fires \\.log), dispatch with and without only_plugin
+"""
+
+import os
+import re
+import sys
+import types
+import asyncio
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from telethon import events
+
+from plugin_loader import CommandRouter, command_keys, extract_plugin_manifest
+
+PLUGINS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "plugins")
+ROUTED_PLUGINS = ('log', 'sudo', 'gban')
+
+def plugin_patterns(plugin_name):
+    return extract_plugin_manifest(os.path.join(PLUGINS_DIR, f"{plugin_name}.py"))['patterns']
+
+def keys_for(pattern):
+    return command_keys(events.NewMessage(pattern=pattern))
+
+class FakeClient:
+    """Only what CommandRouter touches outside install()"""
+
+    def add_event_handler(self, callback, event=None):
+        pass
+
+    def remove_event_handler(self, callback, event=None):
+        return 0
+
+def fake_event(text):
+    message = types.SimpleNamespace(message=text, out=True, fwd_from=None, sender_id=1)
+    return types.SimpleNamespace(raw_text=text, message=message, chat_id=1)
+
+def build_router(extra=()):
+    """Router with every real pattern of ROUTED_PLUGINS (+ extra (plugin, pattern)); returns (router, fired)"""
+    router = CommandRouter(FakeClient())
+    fired = []
+
+    def recorder(plugin_name, pattern):
+        async def handler(event):
+            fired.append((plugin_name, pattern))
+        return handler
+
+    registrations = [(name, pattern) for name in ROUTED_PLUGINS for pattern in plugin_patterns(name)]
+    for plugin_name, pattern in registrations + list(extra):
+        router.current_plugin = plugin_name
+        try:
+            router.add_event_handler(recorder(plugin_name, pattern), events.NewMessage(pattern=pattern))
+        finally:
+            router.current_plugin = None
+    return router, fired
+
+def dispatch(router, fired, text, only_plugin=None):
+    fired.clear()
+    asyncio.run(router._dispatch(fake_event(text), only_plugin=only_plugin))
+    return list(fired)
+
+def test_command_keys_real_patterns():
+    assert keys_for(r"\.log") == [('.', 'log')]
+    assert keys_for(r"\.sudo") == [('.', 'sudo')]
+    assert keys_for(r"\.gban(\s|$)") == [('.', 'gban')]
+    assert keys_for(r"\.gbanenforce(?:\s+(\w+))?$") == [('.', 'gbanenforce')]
+    assert keys_for(r"[.!]ping$") == [('.', 'ping'), ('!', 'ping')]
+
+    # Word not ending at a boundary / no literal prefix: left to Telethon
+    assert keys_for(r"\.log\d+") is None
+    assert keys_for(r"(?i)\.log") is None
+    assert command_keys(events.NewMessage()) is None
+    assert command_keys(events.ChatAction()) is None
+
+    # Every pattern of the routed plugins is a command route
+    for plugin_name in ROUTED_PLUGINS:
+        patterns = plugin_patterns(plugin_name)
+        assert patterns, plugin_name
+        for pattern in patterns:
+            assert keys_for(pattern), pattern
+
+def test_dispatch_whole_word():
+    router, fired = build_router()
+    assert dispatch(router, fired, ".log") == [('log', r"\.log")]
+    assert dispatch(router, fired, ".log recent 5") == [('log', r"\.log")]
+    assert dispatch(router, fired, ".sudo add") == [('sudo', r"\.sudo")]
+    assert dispatch(router, fired, ".gban @spammer") == [('gban', r"\.gban(\s|$)")]
+    assert dispatch(router, fired, ".gbanlist") == [('gban', r"\.gbanlist")]
+    assert dispatch(router, fired, ".gbanenforce on") == [('gban', r"\.gbanenforce(?:\s+(\w+))?$")]
+
+    # Prefix-only patterns now match the whole word only (Telethon's re.match fired on these)
+    assert re.match(r"\.log", ".logtest") and dispatch(router, fired, ".logtest") == []
+    assert re.match(r"\.sudo", ".sudoers") and dispatch(router, fired, ".sudoers") == []
+
+    # The builder's own pattern still filters within a route
+    assert dispatch(router, fired, ".gbanenforce on off") == []
+    assert dispatch(router, fired, "log") == []
+
+def test_dispatch_real_patterns_not_hidden():
+    """Any message a routed pattern matches on a whole word still reaches its handler"""
+    router, fired = build_router()
+    for plugin_name in ROUTED_PLUGINS:
+        for pattern in plugin_patterns(plugin_name):
+            for prefix, word in keys_for(pattern):
+                for text in (f"{prefix}{word}", f"{prefix}{word} arg"):
+                    if re.match(pattern, text):
+                        assert (plugin_name, pattern) in dispatch(router, fired, text), (pattern, text)
+
+def test_dispatch_only_plugin():
+    router, fired = build_router(extra=[('log_viewer', r"\.log")])
+    assert dispatch(router, fired, ".log") == [('log', r"\.log"), ('log_viewer', r"\.log")]
+    assert dispatch(router, fired, ".log", only_plugin='log_viewer') == [('log_viewer', r"\.log")]
+    assert dispatch(router, fired, ".log", only_plugin='log') == [('log', r"\.log")]
+    assert dispatch(router, fired, ".log", only_plugin='gban') == []
+    assert router.stats['.log']['calls'] == 4
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith('test_') and callable(test):
+            test()
+            print(f"✅ {name}")
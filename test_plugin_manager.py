@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Test script for client.PluginManager hot reload
+Covers: tasks created by a plugin's setup are attributed to it, reload cancels
+them and awaits cleanup_plugin before the new module's setup runs
+"""
+
+import os
+import sys
+import asyncio
+import importlib
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+SAMPLE_PLUGIN = '''
+import asyncio
+
+_client = None
+
+async def _forever():
+    await asyncio.Event().wait()
+
+async def setup(client):
+    global _client, task
+    _client = client
+    client.calls.append('setup')
+    task = asyncio.create_task(_forever())
+
+async def cleanup_plugin():
+    await asyncio.sleep(0)
+    _client.calls.append('cleanup')
+'''
+
+class FakeClient:
+    """Only what PluginManager/CommandRouter touch"""
+
+    def __init__(self):
+        self.calls = []
+
+    def add_event_handler(self, callback, event=None):
+        pass
+
+    def remove_event_handler(self, callback, event=None):
+        return 0
+
+async def _reload_cycle(client_module, plugins_dir):
+    client = FakeClient()
+    manager = client_module.PluginManager(client, plugins_dir)
+    assert await manager.load_plugins() == 1
+
+    old_module = manager.loaded_plugins['pm_sample']['module']
+    old_task = old_module.task
+    assert manager.router.plugin_files['pm_sample'] == old_module.__file__
+    assert old_task in manager.router.plugin_tasks['pm_sample']
+
+    await manager.reload_plugin('pm_sample')
+    await asyncio.sleep(0)
+    assert old_task.cancelled()
+    assert client.calls == ['setup', 'cleanup', 'setup']
+
+    new_task = manager.loaded_plugins['pm_sample']['module'].task
+    assert new_task in manager.router.plugin_tasks['pm_sample']
+
+    await manager.unload_plugin('pm_sample')
+    await asyncio.sleep(0)
+    assert new_task.cancelled()
+    assert client.calls[-1] == 'cleanup'
+
+def test_plugin_manager_reload_cancels_tasks(tmp_path, monkeypatch):
+    plugins_dir = tmp_path / "pm_test_plugins"
+    plugins_dir.mkdir()
+    (plugins_dir / "pm_sample.py").write_text(SAMPLE_PLUGIN)
+    monkeypatch.chdir(tmp_path)  # client.py creates its session file in cwd
+    monkeypatch.syspath_prepend(str(tmp_path))
+
+    client_module = importlib.import_module('client')
+    asyncio.run(_reload_cycle(client_module, plugins_dir))
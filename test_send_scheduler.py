@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Test script for send_scheduler FloodWait handling
+Covers: shared pause, AIMD rate backoff/ramp-up, gcast job state for FloodWaits
+below and above MAX_FLOOD_PAUSE (paused job + resume), single-claim resume
+"""
+
+import os
+import sys
+import types
+import asyncio
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from telethon.errors import FloodWaitError
+
+import database
+import utils.send_scheduler as scheduler_module
+
+_real_sleep = asyncio.sleep
+
+class FakeClock:
+    """monotonic()/sleep() pair: sleeping advances time instantly"""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.slept = 0.0
+
+    def monotonic(self):
+        return self.now
+
+    async def sleep(self, seconds):
+        self.slept += seconds
+        self.now += seconds
+        await _real_sleep(0)
+
+def fake_scheduler(monkeypatch, rate=2.0):
+    clock = FakeClock()
+    monkeypatch.setattr(scheduler_module, 'time', types.SimpleNamespace(monotonic=clock.monotonic))
+    monkeypatch.setattr(scheduler_module, 'asyncio', types.SimpleNamespace(Lock=asyncio.Lock, sleep=clock.sleep))
+    return scheduler_module.SendScheduler(rate=rate), clock
+
+def flood_wait(seconds):
+    return FloodWaitError(request=None, capture=seconds)
+
+def test_short_flood_wait_pauses_and_backs_off(monkeypatch):
+    scheduler, clock = fake_scheduler(monkeypatch, rate=2.0)
+
+    assert scheduler.on_flood_wait(30) is True
+    assert scheduler.paused_for == 30
+    assert scheduler.rate == 1.0
+
+    asyncio.run(scheduler.acquire())
+    assert clock.slept >= 30  # every sender waits out the shared pause
+
+    for _ in range(scheduler_module.RAMP_UP_AFTER):
+        scheduler.on_success()
+    assert scheduler.rate == 1.0 + scheduler_module.RAMP_UP_STEP
+
+def test_long_flood_wait_within_cap(monkeypatch):
+    scheduler, clock = fake_scheduler(monkeypatch, rate=2.0)
+
+    assert scheduler.on_flood_wait(120) is True
+    assert scheduler.paused_for == 120
+    assert scheduler.rate == 1.0
+    assert scheduler.stats['flood_aborts'] == 0
+
+    assert scheduler.on_flood_wait(scheduler_module.MAX_FLOOD_PAUSE + 1) is False
+    assert scheduler.paused_for == scheduler_module.MAX_FLOOD_PAUSE
+    assert scheduler.rate == 0.5
+    assert scheduler.stats['flood_aborts'] == 1
+
+class FakeClient:
+    """send_message raises the scripted FloodWaits (per channel id) before succeeding"""
+
+    def __init__(self, floods):
+        self.floods = floods
+        self.sent = []
+
+    async def send_message(self, peer, text, **kwargs):
+        pending = self.floods.get(peer.channel_id)
+        if pending:
+            raise flood_wait(pending.pop(0))
+        self.sent.append(peer.channel_id)
+
+def _targets(*ids):
+    return [{'peer_id': int(f"-100{channel_id}"), 'entity_id': channel_id, 'access_hash': channel_id,
+             'chat_type': 'supergroup', 'title': f"Chat {channel_id}"} for channel_id in ids]
+
+async def _run_gcast_jobs(gcast, gcast_jobs):
+    # 30s and 120s FloodWaits: waited out through the scheduler, job completes
+    job_id = await gcast_jobs.create_job('gcast', 'hello', _targets(111, 222))
+    gcast.client = FakeClient({111: [30], 222: [120]})
+    result = await gcast.execute_gcast('hello', job=await gcast_jobs.claim(job_id))
+    job = await gcast_jobs.get_job(job_id)
+    assert result['paused'] == 0
+    assert sorted(gcast.client.sent) == [111, 222]
+    assert job['status'] == 'completed' and job['success'] == 2
+
+    # FloodWait above the cap: job is paused with its target pending, resume finishes it
+    job_id = await gcast_jobs.create_job('gcast', 'hello', _targets(333))
+    gcast.client = FakeClient({333: [scheduler_module.MAX_FLOOD_PAUSE * 2]})
+    result = await gcast.execute_gcast('hello', job=await gcast_jobs.claim(job_id))
+    job = await gcast_jobs.get_job(job_id)
+    assert result['paused'] == scheduler_module.MAX_FLOOD_PAUSE * 2
+    assert job['status'] == 'paused'
+    assert not gcast_jobs.is_running(job_id)
+    assert len(await gcast_jobs.pending_targets(job_id)) == 1
+
+    # Only one resume can claim the job; a cancelled idle job is never claimed
+    claimed = await gcast_jobs.claim(job_id)
+    assert claimed and claimed['status'] == 'running'
+    assert await gcast_jobs.claim(job_id) is None
+    result = await gcast.resume_job(claimed)
+    job = await gcast_jobs.get_job(job_id)
+    assert result['channels_success'] == 1
+    assert job['status'] == 'completed'
+
+    job_id = await gcast_jobs.create_job('gcast', 'hello', _targets(444))
+    assert await gcast_jobs.cancel(job_id)
+    assert await gcast_jobs.claim(job_id) is None
+
+def test_gcast_job_state_on_flood_wait(monkeypatch, tmp_path):
+    # Every database (including base-dir ones like vzoel_assistant) goes to tmp_path
+    monkeypatch.setattr(database.db_manager, 'db_dir', str(tmp_path))
+    monkeypatch.setattr(database.db_manager, 'base_dir', str(tmp_path))
+    scheduler, clock = fake_scheduler(monkeypatch, rate=2.0)
+
+    from plugins import gcast
+    from utils.gcast_jobs import gcast_jobs
+    monkeypatch.setattr(gcast, 'send_scheduler', scheduler)
+    monkeypatch.setattr(gcast, 'client', None)
+    monkeypatch.setattr(gcast_jobs, '_ready', False)
+    gcast_jobs.load()
+
+    asyncio.run(_run_gcast_jobs(gcast, gcast_jobs))
+    assert scheduler.stats['flood_waits'] == 3
+    assert scheduler.stats['flood_aborts'] == 1
+    assert clock.slept >= 150  # both short waits were paused through acquire()
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, "-q"]))
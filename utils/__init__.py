@@ -1,12 +1,13 @@
 #!/usr/bin/env python3
 """
 Utils package for VzoelFox Userbot
-Contains font helper, premium emoji helper, and auto logger utilities
+Contains font helper, premium emoji helper, entity cache, and auto logger utilities
 """
 
 # Make utils a proper Python package
 from .font_helper import convert_font, process_markdown_bold, process_markdown_mono, process_all_markdown
-from .premium_emoji_helper import get_emoji, create_premium_entities, safe_send_premium
+from .premium_emoji_helper import get_emoji, create_premium_entities, safe_send_premium, PremiumEmojiEngine
+from .entity_cache import entity_cache, describe_entity
 
 __all__ = [
     'convert_font',
@@ -15,5 +16,8 @@ __all__ = [
     'process_all_markdown',
     'get_emoji',
     'create_premium_entities',
-    'safe_send_premium'
+    'safe_send_premium',
+    'PremiumEmojiEngine',
+    'entity_cache',
+    'describe_entity'
 ]
\ No newline at end of file
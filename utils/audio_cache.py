@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Audio Cache for VzoelFox Userbot - Persistent downloaded-audio cache
+Fitur: Files keyed by YouTube video id, normalised query -> video id index,
+size-based LRU eviction (skips files in use), hit/miss counters, per-song download locks
+Founder Userbot: Vzoel Fox's Ltpn 🤩
+Version: 1.0.0 - Audio Download Cache
+"""
+
+import os
+import re
+import sys
+import time
+import asyncio
+import logging
+import contextlib
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from database import async_db, db_manager
+
+logger = logging.getLogger(__name__)
+
+DB_NAME = "audio_cache"
+AUDIO_CACHE_DIR = os.path.expanduser(os.getenv("AUDIO_CACHE_DIR", "~/vzoelfox/cache/audio"))
+AUDIO_CACHE_MAX_BYTES = int(os.getenv("AUDIO_CACHE_MAX_MB", "1024")) * 1024 * 1024
+
+FILES_SCHEMA = """
+    video_id TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    path TEXT NOT NULL,
+    title TEXT,
+    format TEXT,
+    size INTEGER DEFAULT 0,
+    created_at REAL,
+    last_used REAL,
+    hits INTEGER DEFAULT 0,
+    PRIMARY KEY (video_id, kind)
+"""
+
+QUERIES_SCHEMA = """
+    query TEXT PRIMARY KEY,
+    video_id TEXT NOT NULL,
+    updated_at REAL
+"""
+
+_YOUTUBE_ID_RE = re.compile(r'(?:youtube\.com/(?:watch\?(?:.*&)?v=|shorts/|embed/)|youtu\.be/)([\w-]{11})')
+
+def normalize_query(query):
+    """Case/whitespace-insensitive cache key for a search query"""
+    return re.sub(r'\s+', ' ', query.strip().lower())
+
+def video_id_from_url(query):
+    """YouTube video id if query is a YouTube URL, else None"""
+    match = _YOUTUBE_ID_RE.search(query)
+    return match.group(1) if match else None
+
+class AudioCache:
+    """
+    Downloaded audio on disk, one file per (video id, kind) where kind is
+    'full' or 'preview'. Queries map to video ids so a repeated request -
+    same words or the same song found by other words - is served from disk.
+    """
+
+    def __init__(self, cache_dir=AUDIO_CACHE_DIR, max_bytes=AUDIO_CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._locks = {}  # (kind, video_id) -> [asyncio.Lock, holders+waiters]
+        self._pins = {}   # (kind, video_id) -> in-use count (upload/stream)
+        self._loaded = False
+        self.stats = {'hits': 0, 'misses': 0, 'stored': 0, 'evicted': 0, 'evicted_bytes': 0}
+
+    def load(self):
+        """Create tables (sync, called at plugin setup)"""
+        if self._loaded:
+            return
+        db_manager.create_table('files', FILES_SCHEMA, DB_NAME)
+        db_manager.create_table('queries', QUERIES_SCHEMA, DB_NAME)
+        db_manager.execute_query("CREATE INDEX IF NOT EXISTS idx_files_last_used ON files (last_used)", db_name=DB_NAME)
+        self._loaded = True
+
+    def output_template(self, kind):
+        """yt-dlp --output template placing the file at its cache address"""
+        directory = os.path.join(self.cache_dir, kind)
+        os.makedirs(directory, exist_ok=True)
+        return os.path.join(directory, '%(id)s.%(ext)s')
+
+    @contextlib.asynccontextmanager
+    async def lock(self, kind, video_id):
+        """
+        Per-song lock so concurrent requests for one song download it once.
+        Keyed by video id only: files are saved as <id>.<ext>, so two different
+        queries for one song must share the lock. Downloads whose id is not known
+        yet (video_id None) all share one lock. Dropped once nobody holds it.
+        """
+        key = (kind, video_id)
+        entry = self._locks.get(key)
+        if entry is None:
+            entry = self._locks[key] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self._locks[key]
+
+    def pin(self, kind, video_id):
+        """Mark a cached file as in use (evict() skips it until unpin)"""
+        key = (kind, video_id)
+        self._pins[key] = self._pins.get(key, 0) + 1
+
+    def unpin(self, kind, video_id):
+        key = (kind, video_id)
+        count = self._pins.get(key, 0) - 1
+        if count > 0:
+            self._pins[key] = count
+        else:
+            self._pins.pop(key, None)
+
+    async def resolve_video_id(self, query):
+        """Video id for a URL or a previously seen query (None if unknown)"""
+        video_id = video_id_from_url(query)
+        if video_id:
+            return video_id
+        self.load()
+        row = await async_db.select_one('queries', 'video_id', 'query = ?', (normalize_query(query),), DB_NAME)
+        return row['video_id'] if row else None
+
+    async def remember_query(self, query, video_id):
+        if video_id_from_url(query) or not video_id:
+            return
+        self.load()
+        await async_db.execute_query(
+            "INSERT OR REPLACE INTO queries (query, video_id, updated_at) VALUES (?, ?, ?)",
+            (normalize_query(query), video_id, time.time()), DB_NAME
+        )
+
+    async def lookup(self, kind, query=None, video_id=None):
+        """Cached file dict for video_id (or query's known video id); None on miss"""
+        self.load()
+        if video_id is None and query:
+            video_id = await self.resolve_video_id(query)
+        row = None
+        if video_id:
+            row = await async_db.select_one('files', '*', 'video_id = ? AND kind = ?', (video_id, kind), DB_NAME)
+        if row and not os.path.exists(row['path']):
+            await async_db.delete('files', 'video_id = ? AND kind = ?', (video_id, kind), DB_NAME)
+            row = None
+        if not row:
+            self.stats['misses'] += 1
+            return None
+
+        self.stats['hits'] += 1
+        await async_db.execute_query(
+            "UPDATE files SET last_used = ?, hits = hits + 1 WHERE video_id = ? AND kind = ?",
+            (time.time(), video_id, kind), DB_NAME
+        )
+        if query:
+            await self.remember_query(query, video_id)
+        return {'video_id': video_id, 'file_path': row['path'], 'title': row['title'],
+                'format': row['format'], 'size': row['size'], 'cached': True}
+
+    async def store(self, kind, query, video_id, path, title, fmt=None):
+        """Index a file downloaded into the cache dir, then evict down to the size budget"""
+        self.load()
+        now = time.time()
+        size = os.path.getsize(path)
+        await async_db.execute_query(
+            "INSERT OR REPLACE INTO files (video_id, kind, path, title, format, size, created_at, last_used, hits) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, 0)",
+            (video_id, kind, path, title, fmt, size, now, now), DB_NAME
+        )
+        if query:
+            await self.remember_query(query, video_id)
+        self.stats['stored'] += 1
+        await self.evict(keep=(video_id, kind))
+        return {'video_id': video_id, 'file_path': path, 'title': title, 'format': fmt,
+                'size': size, 'cached': False}
+
+    async def evict(self, keep=None):
+        """Delete least recently used files until the cache fits max_bytes (pinned files are kept)"""
+        self.load()
+        row = await async_db.execute_query("SELECT COALESCE(SUM(size), 0) AS total FROM files", db_name=DB_NAME, fetch="one")
+        total = row['total'] if row else 0
+        if total <= self.max_bytes:
+            return 0
+
+        evicted = 0
+        for row in await async_db.select('files', 'video_id, kind, path, size', order_by='last_used ASC', db_name=DB_NAME):
+            if total <= self.max_bytes:
+                break
+            if keep == (row['video_id'], row['kind']) or (row['kind'], row['video_id']) in self._pins:
+                continue
+            try:
+                os.remove(row['path'])
+            except OSError:
+                pass
+            await async_db.delete('files', 'video_id = ? AND kind = ?', (row['video_id'], row['kind']), DB_NAME)
+            total -= row['size']
+            evicted += 1
+            self.stats['evicted_bytes'] += row['size']
+        self.stats['evicted'] += evicted
+        if evicted:
+            logger.info(f"[AudioCache] Evicted {evicted} files, {total / (1024 * 1024):.1f} MB cached")
+        return evicted
+
+    async def get_stats(self):
+        self.load()
+        row = await async_db.execute_query(
+            "SELECT COUNT(*) AS files, COALESCE(SUM(size), 0) AS size FROM files", db_name=DB_NAME, fetch="one"
+        )
+        stats = dict(self.stats)
+        stats['files'] = row['files'] if row else 0
+        stats['size_mb'] = (row['size'] if row else 0) / (1024 * 1024)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / lookups * 100 if lookups else 0.0
+        return stats
+
+# Global shared instance
+audio_cache = AudioCache()
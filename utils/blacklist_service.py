@@ -0,0 +1,388 @@
+#!/usr/bin/env python3
+"""
+Blacklist Service for VzoelFox Userbot - Single cached gcast blacklist
+Fitur: In-memory set (O(1) checks), write-through SQLite persistence, change notifications,
+one-time migration dari gcast JSON, blacklistgcast JSON, grub SQLite dan sql_helpers
+Founder Userbot: Vzoel Fox's Ltpn 🤩
+Version: 1.0.0 - Unified Blacklist
+"""
+
+import os
+import sys
+import json
+import sqlite3
+import asyncio
+import logging
+from datetime import datetime
+
+from telethon import utils as tg_utils
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT_DIR)
+from database import async_db, db_manager, get_config, set_config
+from utils.plugin_context import shared_service
+
+logger = logging.getLogger(__name__)
+
+DB_NAME = "blacklist"
+
+BLACKLIST_SCHEMA = """
+    chat_id INTEGER PRIMARY KEY,
+    title TEXT,
+    chat_type TEXT,
+    reason TEXT,
+    added_by TEXT,
+    added_at TEXT,
+    permanent INTEGER DEFAULT 0
+"""
+
+COLUMNS = ('chat_id', 'title', 'chat_type', 'reason', 'added_by', 'added_at', 'permanent')
+UPSERT_QUERY = f"INSERT OR REPLACE INTO blacklist ({', '.join(COLUMNS)}) VALUES ({', '.join('?' for _ in COLUMNS)})"
+
+# Legacy stores merged by migrate_legacy()
+LEGACY_JSON_FILES = [
+    os.path.join(ROOT_DIR, "data", "blacklist", "gcast_blacklist.json"),  # gcast.py + blacklistgcast.py
+    os.path.join(ROOT_DIR, "gcast_blacklist.json")                        # blacklistgcast.py legacy
+]
+LEGACY_GRUB_DBS = [
+    os.path.join(ROOT_DIR, "data", "grub.db"),     # grub.py via database_helper
+    os.path.join(ROOT_DIR, "plugins", "grup.db")   # grub.py legacy fallback
+]
+
+def peer_key(chat_id):
+    """Marked peer id (user, -chat, -100channel) so different peer types never collide"""
+    try:
+        return tg_utils.get_peer_id(int(chat_id) if isinstance(chat_id, str) else chat_id)
+    except (ValueError, TypeError):
+        return None
+
+class BlacklistService:
+    """Gcast blacklist kept in memory, persisted write-through to SQLite"""
+
+    def __init__(self):
+        self._entries = {}     # marked chat_id -> row dict
+        self._listeners = []
+        self._loaded = False
+        self.stats = {'checks': 0, 'hits': 0, 'writes': 0}
+
+    def __len__(self):
+        self.load()
+        return len(self._entries)
+
+    def __contains__(self, chat_id):
+        return self.contains(chat_id)
+
+    # ----------------- loading -----------------
+
+    def load(self):
+        """Load blacklist into memory once (runs legacy migration on first start)"""
+        if self._loaded:
+            return
+        db_manager.create_table('blacklist', BLACKLIST_SCHEMA, DB_NAME)
+        if not get_config('blacklist_migrated', False, 'boolean'):
+            self.migrate_legacy()
+        self._load_rows()
+        self._loaded = True
+        logger.info(f"[Blacklist] Loaded {len(self._entries)} blacklisted chats")
+
+    def _load_rows(self):
+        rows = db_manager.select('blacklist', db_name=DB_NAME)
+        self._entries = {row['chat_id']: dict(row) for row in rows}
+
+    def reload(self):
+        """Reload from database (e.g. after manual DB edit)"""
+        db_manager.create_table('blacklist', BLACKLIST_SCHEMA, DB_NAME)
+        self._load_rows()
+        self._loaded = True
+        self._notify('reload', None)
+        return len(self._entries)
+
+    # ----------------- lookups (memory only) -----------------
+
+    def contains(self, chat_id):
+        """O(1) check; invalid ids count as blacklisted for safety"""
+        self.load()
+        self.stats['checks'] += 1
+        key = peer_key(chat_id)
+        if key is None:
+            return True
+        if key in self._entries:
+            self.stats['hits'] += 1
+            return True
+        return False
+
+    def get(self, chat_id):
+        self.load()
+        row = self._entries.get(peer_key(chat_id))
+        return dict(row) if row else None
+
+    def get_ids(self):
+        self.load()
+        return set(self._entries)
+
+    def get_all(self):
+        """All entries, newest first"""
+        self.load()
+        return sorted((dict(row) for row in self._entries.values()),
+                      key=lambda row: row.get('added_at') or '', reverse=True)
+
+    # ----------------- write-through changes -----------------
+
+    def _prepare_add(self, chat_id, title, chat_type, reason, added_by, permanent):
+        """(chat_id, row, existing) for add(); None for an invalid id"""
+        self.load()
+        chat_id = peer_key(chat_id)
+        if chat_id is None:
+            return None
+        existing = self.get(chat_id)
+        row = {
+            'chat_id': chat_id,
+            'title': title or (existing or {}).get('title') or f"Chat {chat_id}",
+            'chat_type': chat_type or (existing or {}).get('chat_type') or "Unknown",
+            'reason': reason or (existing or {}).get('reason') or "",
+            'added_by': added_by,
+            'added_at': (existing or {}).get('added_at') or datetime.now().isoformat(),
+            'permanent': int(bool(existing and existing['permanent']) if permanent is None else permanent)
+        }
+        return chat_id, row, existing
+
+    def _apply_add(self, chat_id, row, existing):
+        self._entries[chat_id] = row
+        self.stats['writes'] += 1
+        if not existing:
+            self._notify('add', chat_id)
+        return not existing
+
+    def _apply_remove(self, chat_id):
+        self._entries.pop(chat_id, None)
+        self.stats['writes'] += 1
+        self._notify('remove', chat_id)
+        return True
+
+    def _apply_clear(self):
+        removed = sum(1 for row in self._entries.values() if not row['permanent'])
+        self._entries = {chat_id: row for chat_id, row in self._entries.items() if row['permanent']}
+        self.stats['writes'] += 1
+        self._notify('clear', None)
+        return removed
+
+    @staticmethod
+    def _upsert_params(row):
+        return tuple(row[col] for col in COLUMNS)
+
+    def add(self, chat_id, title=None, chat_type=None, reason=None, added_by="manual", permanent=None):
+        """
+        Add/update a chat; memory and database are updated together (permanent=None keeps current flag).
+        Inside the event loop use add_async() - it reports a failed write.
+        """
+        prepared = self._prepare_add(chat_id, title, chat_type, reason, added_by, permanent)
+        if prepared is None:
+            return False
+        chat_id, row, existing = prepared
+        if not self._persist(UPSERT_QUERY, self._upsert_params(row)):
+            return False
+        return self._apply_add(chat_id, row, existing)
+
+    def remove(self, chat_id):
+        """Remove a chat (permanent entries are kept)"""
+        existing = self.get(chat_id)
+        if not existing or existing['permanent']:
+            return False
+        self._persist("DELETE FROM blacklist WHERE chat_id = ?", (existing['chat_id'],))
+        return self._apply_remove(existing['chat_id'])
+
+    def clear(self):
+        """Remove every non-permanent chat; returns number removed"""
+        self.load()
+        self._persist("DELETE FROM blacklist WHERE permanent = 0")
+        return self._apply_clear()
+
+    async def add_async(self, chat_id, title=None, chat_type=None, reason=None, added_by="manual", permanent=None):
+        """add() that waits for the SQLite write; False (memory unchanged) if it failed"""
+        prepared = self._prepare_add(chat_id, title, chat_type, reason, added_by, permanent)
+        if prepared is None:
+            return False
+        chat_id, row, existing = prepared
+        if not await self._persist_async(UPSERT_QUERY, self._upsert_params(row)):
+            return False
+        return self._apply_add(chat_id, row, existing)
+
+    async def remove_async(self, chat_id):
+        """remove() that waits for the SQLite write; False (memory unchanged) if it failed"""
+        existing = self.get(chat_id)
+        if not existing or existing['permanent']:
+            return False
+        if not await self._persist_async("DELETE FROM blacklist WHERE chat_id = ?", (existing['chat_id'],)):
+            return False
+        return self._apply_remove(existing['chat_id'])
+
+    async def clear_async(self):
+        """clear() that waits for the SQLite write; None (memory unchanged) if it failed"""
+        self.load()
+        if not await self._persist_async("DELETE FROM blacklist WHERE permanent = 0"):
+            return None
+        return self._apply_clear()
+
+    def _persist(self, query, params=()):
+        """
+        Write-through to SQLite for sync callers. Inside the event loop the write
+        goes through async_db (off the loop thread, memory is already
+        authoritative) and a failure is only logged; without a running loop it
+        is written synchronously.
+        """
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return db_manager.execute_query(query, params, DB_NAME) is not None
+
+        with shared_service():  # must finish even if the calling plugin is reloaded
+            task = loop.create_task(async_db.execute_query(query, params, DB_NAME))
+        task.add_done_callback(self._persist_done)
+        return True
+
+    async def _persist_async(self, query, params=()):
+        """Write-through to SQLite, awaited; False if the write failed"""
+        if await async_db.execute_query(query, params, DB_NAME) is None:
+            logger.error(f"[Blacklist] Write failed: {query}")
+            return False
+        return True
+
+    @staticmethod
+    def _persist_done(task):
+        if task.cancelled() or task.exception() is not None or task.result() is None:
+            logger.error(f"[Blacklist] Background write failed: {None if task.cancelled() else task.exception()}")
+
+    # ----------------- notifications -----------------
+
+    def subscribe(self, callback):
+        """callback(action, chat_id) on 'add', 'remove', 'clear', 'reload'"""
+        if callback not in self._listeners:
+            self._listeners.append(callback)
+
+    def unsubscribe(self, callback):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def _notify(self, action, chat_id):
+        for callback in list(self._listeners):
+            try:
+                callback(action, chat_id)
+            except Exception as e:
+                logger.error(f"[Blacklist] Listener error: {e}")
+
+    # ----------------- migration -----------------
+
+    def migrate_legacy(self):
+        """Merge legacy stores into the service table (idempotent, existing rows win)"""
+        rows = {}
+
+        for path in LEGACY_JSON_FILES:
+            for row in self._read_legacy_json(path):
+                rows.setdefault(row['chat_id'], row)
+
+        for path in LEGACY_GRUB_DBS:
+            for row in self._read_legacy_grub(path):
+                rows.setdefault(row['chat_id'], row)
+
+        for row in self._read_legacy_sql_helpers():
+            existing = rows.get(row['chat_id'])
+            if existing is None or row['permanent']:
+                rows[row['chat_id']] = row
+
+        if rows:
+            with db_manager.get_connection(DB_NAME) as conn:
+                conn.executemany(
+                    f"INSERT OR IGNORE INTO blacklist ({', '.join(COLUMNS)}) VALUES ({', '.join('?' for _ in COLUMNS)})",
+                    [tuple(row.get(col) for col in COLUMNS) for row in rows.values()]
+                )
+                conn.commit()
+
+        set_config('blacklist_migrated', True, 'boolean', 'Legacy gcast blacklists merged into data/blacklist.db')
+        logger.info(f"[Blacklist] Migrated {len(rows)} chats from legacy stores")
+        return len(rows)
+
+    @staticmethod
+    def _legacy_row(chat_id, title=None, chat_type=None, reason=None, added_by="legacy", added_at=None, permanent=False):
+        return {
+            'chat_id': int(chat_id),
+            'title': title or f"Chat {chat_id}",
+            'chat_type': chat_type or "Unknown",
+            'reason': reason or "",
+            'added_by': added_by or "legacy",
+            'added_at': str(added_at) if added_at else datetime.now().isoformat(),
+            'permanent': int(bool(permanent))
+        }
+
+    def _read_legacy_json(self, path):
+        if not os.path.exists(path):
+            return []
+        rows = []
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if not isinstance(data, dict):
+                return []
+            # blacklistgcast.py format: {"<id>": {title, type, added_date, added_by}}
+            for key, info in data.items():
+                if key.lstrip('-').isdigit() and isinstance(info, dict):
+                    rows.append(self._legacy_row(key, info.get('title'), info.get('type'),
+                                                 added_by=info.get('added_by'), added_at=info.get('added_date')))
+            # gcast.py format: {"blacklisted_chats": [ids]}
+            for chat_id in data.get('blacklisted_chats', []):
+                try:
+                    rows.append(self._legacy_row(chat_id))
+                except (ValueError, TypeError):
+                    continue
+        except Exception as e:
+            logger.error(f"[Blacklist] Could not read {path}: {e}")
+        return rows
+
+    def _read_legacy_grub(self, path):
+        if not os.path.exists(path):
+            return []
+        try:
+            conn = sqlite3.connect(path)
+            conn.row_factory = sqlite3.Row
+            try:
+                found = conn.execute(
+                    "SELECT name FROM sqlite_master WHERE type='table' AND name='grup_blacklist'"
+                ).fetchone()
+                if not found:
+                    return []
+                return [
+                    self._legacy_row(row['chat_id'], row['chat_title'], reason=row['reason'],
+                                     added_by=row['added_by'], added_at=row['added_at'])
+                    for row in conn.execute("SELECT * FROM grup_blacklist")
+                ]
+            finally:
+                conn.close()
+        except Exception as e:
+            logger.error(f"[Blacklist] Could not read {path}: {e}")
+            return []
+
+    def _read_legacy_sql_helpers(self):
+        db_url = os.getenv('DATABASE_URL', 'sqlite:///vzoel_userbot.db')
+        if db_url.startswith('sqlite') and not os.path.exists(db_url.split('///', 1)[-1]):
+            return []
+        try:
+            from sql_helpers import SESSION
+            from sql_helpers.blacklist_sql import BlacklistChat
+            return [
+                self._legacy_row(entry.chat_id, entry.chat_title, entry.chat_type, entry.reason,
+                                 entry.added_by, entry.added_date, entry.permanent)
+                for entry in SESSION.query(BlacklistChat).all()
+            ]
+        except Exception as e:
+            # SQLAlchemy not installed / table never created
+            logger.debug(f"[Blacklist] sql_helpers blacklist not migrated: {e}")
+            return []
+
+    def get_stats(self):
+        stats = dict(self.stats)
+        stats['total'] = len(self._entries)
+        stats['permanent'] = sum(1 for row in self._entries.values() if row['permanent'])
+        stats['listeners'] = len(self._listeners)
+        return stats
+
+# Global shared instance
+blacklist_service = BlacklistService()
@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+Dialog Index for VzoelFox Userbot - Persistent group/channel index
+Fitur: SQLite-backed dialog index, precomputed broadcastable/admin flags, incremental updates
+Founder Userbot: Vzoel Fox's Ltpn 🤩
+Version: 1.0.0 - Persistent Dialog Index
+"""
+
+import os
+import sys
+import time
+import asyncio
+import logging
+
+from telethon import events, utils as tg_utils
+from telethon.errors import ChannelInvalidError, ChannelPrivateError, ChatIdInvalidError
+from telethon.tl import types
+from telethon.tl.types import (
+    Channel, Chat, ChannelForbidden, ChatForbidden, InputPeerChannel, InputPeerChat
+)
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.plugin_context import shared_service
+from database import async_db, db_manager, get_config, set_config
+
+logger = logging.getLogger(__name__)
+
+DB_NAME = "dialog_index"
+DIALOG_INDEX_TTL = int(os.getenv("DIALOG_INDEX_TTL", "86400"))  # full resync after 24 hours
+REFRESH_DEBOUNCE = float(os.getenv("DIALOG_REFRESH_DEBOUNCE", "30"))  # coalesce UpdateChannel bursts, seconds
+
+# get_entity errors meaning the chat is gone for us; anything else (FloodWait,
+# network) keeps the entry until the next refresh/resync
+ACCESS_LOST_ERRORS = (ChannelPrivateError, ChannelInvalidError, ChatIdInvalidError)
+
+DIALOG_SCHEMA = """
+    peer_id INTEGER PRIMARY KEY,
+    entity_id INTEGER NOT NULL,
+    access_hash INTEGER,
+    title TEXT,
+    chat_type TEXT,
+    is_left INTEGER DEFAULT 0,
+    can_post INTEGER DEFAULT 0,
+    can_ban INTEGER DEFAULT 0,
+    broadcastable INTEGER DEFAULT 0,
+    updated_at REAL
+"""
+
+COLUMNS = ('peer_id', 'entity_id', 'access_hash', 'title', 'chat_type',
+           'is_left', 'can_post', 'can_ban', 'broadcastable', 'updated_at')
+
+def entry_from_entity(entity):
+    """Build index row for a Chat/Channel entity (None for users)"""
+    if not isinstance(entity, (Chat, Channel)):
+        return None
+
+    creator = bool(getattr(entity, 'creator', False))
+    rights = getattr(entity, 'admin_rights', None)
+
+    if isinstance(entity, Channel):
+        chat_type = "channel" if entity.broadcast else "supergroup"
+        is_left = bool(entity.left)
+        access_hash = entity.access_hash
+    else:
+        chat_type = "group"
+        is_left = bool(getattr(entity, 'left', False) or getattr(entity, 'deactivated', False))
+        access_hash = None
+
+    can_post = creator or bool(rights and getattr(rights, 'post_messages', False))
+    can_ban = creator or bool(rights and getattr(rights, 'ban_users', False))
+    broadcastable = not is_left and (chat_type != "channel" or can_post)
+
+    return {
+        'peer_id': tg_utils.get_peer_id(entity),
+        'entity_id': entity.id,
+        'access_hash': access_hash,
+        'title': getattr(entity, 'title', None) or f"Chat_{entity.id}",
+        'chat_type': chat_type,
+        'is_left': int(is_left),
+        'can_post': int(can_post),
+        'can_ban': int(can_ban),
+        'broadcastable': int(broadcastable),
+        'updated_at': time.time()
+    }
+
+class DialogIndex:
+    """In-memory dialog index mirrored to SQLite, kept fresh from updates"""
+
+    def __init__(self):
+        self._entries = {}  # peer_id -> row dict
+        self._loaded = False
+        self._attached = None
+        self._me_id = None
+        self._sync_lock = asyncio.Lock()  # one full resync at a time
+        self._pending_refresh = set()     # peer ids waiting for the debounced refresh
+        self._refresh_task = None
+        self.last_sync = 0.0
+        self.stats = {'syncs': 0, 'last_sync_seconds': 0.0, 'incremental_updates': 0,
+                      'refresh_errors': 0, 'coalesced_updates': 0}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def load(self):
+        """Load persisted index (sync, called once at plugin setup)"""
+        if self._loaded:
+            return
+        db_manager.create_table('dialogs', DIALOG_SCHEMA, DB_NAME)
+        rows = db_manager.select('dialogs', db_name=DB_NAME)
+        self._entries = {row['peer_id']: dict(row) for row in rows}
+        self.last_sync = get_config('dialog_index_last_sync', 0.0, 'float')
+        self._loaded = True
+        logger.info(f"[DialogIndex] Loaded {len(self._entries)} dialogs from database")
+
+    def is_stale(self):
+        return not self._entries or (time.time() - self.last_sync) > DIALOG_INDEX_TTL
+
+    async def sync(self, client):
+        """Full resync from iter_dialogs (replaces the whole index)"""
+        started = time.perf_counter()
+        entries = {}
+        async for dialog in client.iter_dialogs(limit=None):
+            entry = entry_from_entity(dialog.entity)
+            if entry:
+                entries[entry['peer_id']] = entry
+
+        rows = [tuple(entry[col] for col in COLUMNS) for entry in entries.values()]
+
+        def _replace(conn):
+            conn.execute("DELETE FROM dialogs")
+            conn.executemany(
+                f"INSERT INTO dialogs ({', '.join(COLUMNS)}) VALUES ({', '.join('?' for _ in COLUMNS)})",
+                rows
+            )
+            conn.commit()
+
+        await async_db.run_in_connection(_replace, DB_NAME)
+
+        self._entries = entries
+        self.last_sync = time.time()
+        await async_db.run('vzoel_assistant', set_config, 'dialog_index_last_sync', self.last_sync, 'float',
+                           'Last full dialog index resync (unix time)')
+        self.stats['syncs'] += 1
+        self.stats['last_sync_seconds'] = time.perf_counter() - started
+        logger.info(f"[DialogIndex] Resynced {len(entries)} dialogs in {self.stats['last_sync_seconds']:.1f}s")
+        return len(entries)
+
+    async def ensure_ready(self, client):
+        """Load persisted index and resync only when empty or past TTL"""
+        self.load()
+        if not self.is_stale():
+            return
+        async with self._sync_lock:
+            # Concurrent callers wait for the running resync instead of starting another
+            if self.is_stale():
+                await self.sync(client)
+
+    async def upsert(self, entity):
+        """Add/refresh a single dialog"""
+        entry = entry_from_entity(entity)
+        if not entry:
+            return
+        self._entries[entry['peer_id']] = entry
+        self.stats['incremental_updates'] += 1
+        await async_db.execute_query(
+            f"INSERT OR REPLACE INTO dialogs ({', '.join(COLUMNS)}) VALUES ({', '.join('?' for _ in COLUMNS)})",
+            tuple(entry[col] for col in COLUMNS), db_name=DB_NAME
+        )
+
+    async def remove(self, peer_id):
+        """Drop a dialog (left/kicked)"""
+        if self._entries.pop(peer_id, None) is not None:
+            self.stats['incremental_updates'] += 1
+            await async_db.delete('dialogs', 'peer_id = ?', (peer_id,), db_name=DB_NAME)
+
+    def get(self, peer_id):
+        return self._entries.get(peer_id)
+
+    def get_targets(self, kind="broadcast"):
+        """
+        Get target rows from memory:
+        broadcast = precomputed broadcastable, groups = joined groups/supergroups,
+        all = every joined group/channel, bannable = joined chats with ban rights
+        """
+        rows = [row for row in self._entries.values() if not row['is_left']]
+        if kind == "broadcast":
+            return [row for row in rows if row['broadcastable']]
+        if kind == "groups":
+            return [row for row in rows if row['chat_type'] != "channel"]
+        if kind == "bannable":
+            return [row for row in rows if row['can_ban']]
+        return rows
+
+    @staticmethod
+    def input_peer(row):
+        """Build input peer from stored row (no session lookup needed)"""
+        if row['chat_type'] == "group":
+            return InputPeerChat(row['entity_id'])
+        if row['access_hash'] is not None:
+            return InputPeerChannel(row['entity_id'], row['access_hash'])
+        return row['peer_id']
+
+    async def _refresh_peer(self, client, peer_id):
+        try:
+            entity = await client.get_entity(peer_id)
+        except ACCESS_LOST_ERRORS:
+            # No longer accessible (kicked, channel deleted, ...)
+            await self.remove(peer_id)
+            return
+        except Exception as e:
+            # Transient (FloodWait, network): keep the entry as it is
+            self.stats['refresh_errors'] += 1
+            logger.debug(f"[DialogIndex] Refresh of {peer_id} failed, entry kept: {e}")
+            return
+        if isinstance(entity, (ChatForbidden, ChannelForbidden)):
+            await self.remove(peer_id)
+            return
+        entry = entry_from_entity(entity)
+        if entry and entry['is_left']:
+            await self.remove(entry['peer_id'])
+        else:
+            await self.upsert(entity)
+
+    async def _on_chat_action(self, event):
+        try:
+            if self._me_id is None:
+                self._me_id = (await event.client.get_me(input_peer=True)).user_id
+            if self._me_id not in (event.user_ids or []) and not event.new_title and not event.created:
+                return
+
+            if (event.user_left or event.user_kicked) and self._me_id in (event.user_ids or []):
+                await self.remove(event.chat_id)
+            else:
+                await self.upsert(await event.get_chat())
+        except Exception as e:
+            logger.debug(f"[DialogIndex] Chat action update error: {e}")
+
+    def _schedule_refresh(self, peer_id):
+        """Queue peer for the debounced refresh; repeats within the window are coalesced"""
+        if peer_id in self._pending_refresh:
+            self.stats['coalesced_updates'] += 1
+            return
+        self._pending_refresh.add(peer_id)
+        if self._refresh_task is None or self._refresh_task.done():
+            with shared_service():
+                self._refresh_task = asyncio.get_event_loop().create_task(self._flush_refreshes())
+
+    async def _flush_refreshes(self):
+        await asyncio.sleep(REFRESH_DEBOUNCE)
+        peer_ids, self._pending_refresh = self._pending_refresh, set()
+        for peer_id in peer_ids:
+            try:
+                await self._refresh_peer(self._attached, peer_id)
+            except Exception as e:
+                logger.debug(f"[DialogIndex] Refresh error for {peer_id}: {e}")
+
+    async def _on_raw_update(self, event):
+        try:
+            if isinstance(event, types.UpdateChannel):
+                # UpdateChannel carries only the id and arrives often: refresh at most once per window
+                self._schedule_refresh(tg_utils.get_peer_id(types.PeerChannel(event.channel_id)))
+            elif isinstance(event, types.UpdateChatParticipantAdmin):
+                if self._me_id is not None and event.user_id == self._me_id:
+                    await self._refresh_peer(self._attached, -event.chat_id)
+        except Exception as e:
+            logger.debug(f"[DialogIndex] Raw update error: {e}")
+
+    def attach(self, client):
+        """Register incremental update handlers (idempotent)"""
+        if self._attached is client:
+            return
+        self.load()
+        self._attached = client
+        with shared_service():  # bot-wide, not owned by the plugin that attached first
+            client.add_event_handler(self._on_chat_action, events.ChatAction())
+            client.add_event_handler(
+                self._on_raw_update,
+                events.Raw(types=[types.UpdateChannel, types.UpdateChatParticipantAdmin])
+            )
+
+    def get_stats(self):
+        stats = dict(self.stats)
+        stats['dialogs'] = len(self._entries)
+        stats['broadcastable'] = sum(1 for row in self._entries.values() if row['broadcastable'] and not row['is_left'])
+        stats['age_seconds'] = time.time() - self.last_sync if self.last_sync else None
+        return stats
+
+# Global shared instance
+dialog_index = DialogIndex()
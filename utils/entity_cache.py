@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Entity Cache for VzoelFox Userbot - Shared TTL + LRU chat/user cache
+Fitur: Bounded entity cache keyed by peer id, lazy refresh, FloodWait-safe lookups
+Founder Userbot: Vzoel Fox's Ltpn 🤩
+Version: 1.0.0 - Shared Entity Cache
+"""
+
+import os
+import time
+import logging
+from collections import OrderedDict
+
+from telethon import utils as tg_utils
+from telethon.errors import FloodWaitError
+from telethon.tl.types import Channel, Chat, User
+
+logger = logging.getLogger(__name__)
+
+ENTITY_CACHE_SIZE = int(os.getenv("ENTITY_CACHE_SIZE", "5000"))
+ENTITY_CACHE_TTL = int(os.getenv("ENTITY_CACHE_TTL", "900"))  # 15 minutes
+
+def describe_entity(entity):
+    """Get title, username and type for a chat/user entity"""
+    entity_id = getattr(entity, 'id', 0)
+    if isinstance(entity, Channel):
+        chat_type = "Channel" if entity.broadcast else "Supergroup"
+        title = entity.title
+    elif isinstance(entity, Chat):
+        chat_type = "Group"
+        title = entity.title
+    elif isinstance(entity, User):
+        chat_type = "Bot" if entity.bot else "Private"
+        title = " ".join(filter(None, [entity.first_name, entity.last_name])) or f"User_{entity_id}"
+    else:
+        chat_type = "Unknown"
+        title = f"Chat_{entity_id or 'Unknown'}"
+
+    return {
+        'id': entity_id,
+        'title': title,
+        'username': getattr(entity, 'username', None),
+        'first_name': getattr(entity, 'first_name', None),
+        'type': chat_type
+    }
+
+class EntityCache:
+    """TTL + LRU cache of Telethon entities keyed by marked peer id"""
+
+    def __init__(self, maxsize=ENTITY_CACHE_SIZE, ttl=ENTITY_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()  # peer_id -> (expires_at, entity, info)
+        self.stats = {'hits': 0, 'misses': 0, 'fetches': 0, 'stale_served': 0, 'evictions': 0}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def put(self, entity, peer_id=None):
+        """Store entity (no-op for None)"""
+        if entity is None:
+            return
+        try:
+            if peer_id is None:
+                peer_id = tg_utils.get_peer_id(entity)
+        except Exception:
+            return
+
+        self._entries[peer_id] = (time.monotonic() + self.ttl, entity, describe_entity(entity))
+        self._entries.move_to_end(peer_id)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.stats['evictions'] += 1
+
+    def _lookup(self, peer_id, allow_stale=False):
+        entry = self._entries.get(peer_id)
+        if entry is None:
+            return None
+        if not allow_stale and entry[0] < time.monotonic():
+            return None
+        self._entries.move_to_end(peer_id)
+        return entry
+
+    def get_cached(self, peer_id):
+        """Get fresh cached entity without any network access"""
+        entry = self._lookup(peer_id)
+        return entry[1] if entry else None
+
+    def invalidate(self, peer_id):
+        """Drop cached entity (e.g. after title/username change)"""
+        self._entries.pop(peer_id, None)
+
+    def clear(self):
+        self._entries.clear()
+
+    async def get_entity(self, client, peer_id, hint=None):
+        """
+        Get entity for peer_id: cache first, then the entity Telethon already
+        received with the update (hint), and only then client.get_entity.
+        On FloodWait the last known (stale) entity is returned instead; with
+        nothing cached the FloodWaitError is re-raised so callers can back off.
+        Min entities (hint.min) are returned but never cached - they lack
+        access_hash/full fields and would shadow the real entity until TTL.
+        """
+        if peer_id is None:
+            return None
+
+        entry = self._lookup(peer_id)
+        if entry:
+            self.stats['hits'] += 1
+            return entry[1]
+
+        self.stats['misses'] += 1
+        if hint is not None:
+            if not getattr(hint, 'min', False):
+                self.put(hint, peer_id)
+            return hint
+
+        try:
+            self.stats['fetches'] += 1
+            entity = await client.get_entity(peer_id)
+        except FloodWaitError as e:
+            stale = self._lookup(peer_id, allow_stale=True)
+            if stale:
+                self.stats['stale_served'] += 1
+                return stale[1]
+            logger.warning(f"[EntityCache] FloodWait {e.seconds}s resolving {peer_id}")
+            raise
+        except Exception as e:
+            logger.debug(f"[EntityCache] Could not resolve {peer_id}: {e}")
+            stale = self._lookup(peer_id, allow_stale=True)
+            return stale[1] if stale else None
+
+        self.put(entity, peer_id)
+        return entity
+
+    async def get_chat(self, event):
+        """Cached replacement for await event.get_chat()"""
+        entity = await self.get_entity(event.client, event.chat_id, getattr(event, 'chat', None))
+        if entity is None:
+            entity = await event.get_chat()
+            self.put(entity, event.chat_id)
+        return entity
+
+    async def get_sender(self, event):
+        """Cached replacement for await event.get_sender()"""
+        if not event.sender_id:
+            return None
+        entity = await self.get_entity(event.client, event.sender_id, getattr(event, 'sender', None))
+        if entity is None:
+            entity = await event.get_sender()
+            self.put(entity, event.sender_id)
+        return entity
+
+    async def get_info(self, client, peer_id, hint=None):
+        """Get {'id', 'title', 'username', 'first_name', 'type'} for peer_id"""
+        entity = await self.get_entity(client, peer_id, hint)
+        if entity is None:
+            return None
+        entry = self._lookup(peer_id, allow_stale=True)
+        return entry[2] if entry else describe_entity(entity)
+
+    def get_stats(self):
+        stats = dict(self.stats)
+        stats['size'] = len(self._entries)
+        stats['maxsize'] = self.maxsize
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / lookups * 100 if lookups else 0.0
+        return stats
+
+# Global shared instance
+entity_cache = EntityCache()
@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+"""
+Gcast Jobs for VzoelFox Userbot - Resumable, checkpointed broadcast jobs
+Fitur: Persistent job payload + entities, per-target status, batched checkpoints, resume & cancel
+Founder Userbot: Vzoel Fox's Ltpn 🤩
+Version: 1.0.0 - Resumable Gcast Jobs
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+
+from telethon.tl.types import MessageEntityCustomEmoji
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from database import async_db, db_manager
+
+logger = logging.getLogger(__name__)
+
+DB_NAME = "gcast_jobs"
+CHECKPOINT_BATCH = int(os.getenv("GCAST_CHECKPOINT_BATCH", "10"))  # target results per checkpoint
+CHECKPOINT_INTERVAL = float(os.getenv("GCAST_CHECKPOINT_INTERVAL", "5"))  # seconds
+
+JOBS_SCHEMA = """
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    source TEXT NOT NULL,
+    message TEXT,
+    entities TEXT,
+    payload TEXT,
+    status TEXT DEFAULT 'running',
+    total INTEGER DEFAULT 0,
+    success INTEGER DEFAULT 0,
+    failed INTEGER DEFAULT 0,
+    created_at REAL,
+    updated_at REAL
+"""
+
+TARGETS_SCHEMA = """
+    job_id INTEGER NOT NULL,
+    peer_id INTEGER NOT NULL,
+    entity_id INTEGER,
+    access_hash INTEGER,
+    chat_type TEXT,
+    title TEXT,
+    status TEXT DEFAULT 'pending',
+    error TEXT,
+    updated_at REAL,
+    PRIMARY KEY (job_id, peer_id)
+"""
+
+TARGET_COLUMNS = ('peer_id', 'entity_id', 'access_hash', 'chat_type', 'title')
+
+# Job states: running -> completed | cancelled | failed | paused (long FloodWait,
+# resumed at next start or with .gcastjobs resume <id>)
+ACTIVE_STATUSES = ('running', 'paused')
+
+def serialize_entities(entities):
+    """Custom emoji entities -> JSON (other entity types are rebuilt by markdown parsing)"""
+    if not entities:
+        return None
+    return json.dumps([
+        [int(entity.offset), int(entity.length), int(entity.document_id)]
+        for entity in entities
+        if getattr(entity, 'document_id', None) is not None
+    ])
+
+def deserialize_entities(data):
+    if not data:
+        return None
+    try:
+        return [
+            MessageEntityCustomEmoji(offset=offset, length=length, document_id=document_id)
+            for offset, length, document_id in json.loads(data)
+        ]
+    except (ValueError, TypeError):
+        return None
+
+class GcastJobStore:
+    """Persistent broadcast jobs with batched per-target checkpoints"""
+
+    def __init__(self):
+        self._ready = False
+        self._pending = {}        # job_id -> [(status, error, updated_at, job_id, peer_id), ...]
+        self._last_flush = {}     # job_id -> monotonic time
+        self._cancelled = set()
+        self._running = set()     # job ids with a live worker in this process
+        self.stats = {'jobs_created': 0, 'jobs_resumed': 0, 'checkpoints': 0, 'targets_checkpointed': 0}
+
+    def load(self):
+        """Create tables (sync, called once at plugin setup)"""
+        if self._ready:
+            return
+        db_manager.create_table('jobs', JOBS_SCHEMA, DB_NAME)
+        db_manager.create_table('job_targets', TARGETS_SCHEMA, DB_NAME)
+        db_manager.execute_query(
+            "CREATE INDEX IF NOT EXISTS idx_job_targets_status ON job_targets (job_id, status)",
+            db_name=DB_NAME
+        )
+        self._ready = True
+
+    async def create_job(self, source, message, targets, entities=None, payload=None):
+        """
+        Persist a new job with all targets pending.
+        targets are dialog index rows (peer_id, entity_id, access_hash, chat_type, title).
+        """
+        self.load()
+        now = time.time()
+        job = {
+            'source': source,
+            'message': message,
+            'entities': serialize_entities(entities),
+            'payload': json.dumps(payload) if payload else None,
+            'status': 'running',
+            'total': len(targets),
+            'success': 0,
+            'failed': 0,
+            'created_at': now,
+            'updated_at': now
+        }
+        rows = [tuple(target.get(col) for col in TARGET_COLUMNS) for target in targets]
+
+        def _create(conn):
+            cursor = conn.execute(
+                f"INSERT INTO jobs ({', '.join(job)}) VALUES ({', '.join('?' for _ in job)})",
+                tuple(job.values())
+            )
+            job_id = cursor.lastrowid
+            conn.executemany(
+                f"INSERT OR IGNORE INTO job_targets (job_id, {', '.join(TARGET_COLUMNS)}, status, updated_at) "
+                f"VALUES (?, {', '.join('?' for _ in TARGET_COLUMNS)}, 'pending', ?)",
+                [(job_id,) + row + (now,) for row in rows]
+            )
+            conn.commit()
+            return job_id
+
+        job_id = await async_db.run_in_connection(_create, DB_NAME)
+        self._last_flush[job_id] = time.monotonic()
+        self.stats['jobs_created'] += 1
+        logger.info(f"[GcastJobs] Created job #{job_id} ({source}) with {len(targets)} targets")
+        return job_id
+
+    async def get_job(self, job_id):
+        self.load()
+        row = await async_db.select_one('jobs', where='id = ?', where_params=(job_id,), db_name=DB_NAME)
+        return self._job_dict(row) if row else None
+
+    @staticmethod
+    def _job_dict(row):
+        job = dict(row)
+        job['entities'] = deserialize_entities(job.get('entities'))
+        job['payload'] = json.loads(job['payload']) if job.get('payload') else {}
+        return job
+
+    async def list_jobs(self, limit=10):
+        self.load()
+        rows = await async_db.select('jobs', order_by='id DESC', limit=limit, db_name=DB_NAME)
+        return [dict(row) for row in rows]
+
+    async def unfinished_jobs(self, source):
+        """Jobs interrupted by a restart (running in DB, no live worker here)"""
+        self.load()
+        rows = await async_db.select(
+            'jobs', where=f"source = ? AND status IN ({', '.join('?' for _ in ACTIVE_STATUSES)})",
+            where_params=(source,) + ACTIVE_STATUSES, order_by='id', db_name=DB_NAME
+        )
+        return [self._job_dict(row) for row in rows if row['id'] not in self._running]
+
+    async def pending_targets(self, job_id):
+        """Targets not yet delivered/failed (delivered ones are skipped on resume)"""
+        rows = await async_db.select(
+            'job_targets', where="job_id = ? AND status = 'pending'",
+            where_params=(job_id,), order_by='rowid', db_name=DB_NAME
+        )
+        return [dict(row) for row in rows]
+
+    def start(self, job_id, resumed=False):
+        """Mark job as owned by a live worker in this process (idempotent)"""
+        self._running.add(job_id)
+        self._last_flush.setdefault(job_id, time.monotonic())
+        if resumed:
+            self.stats['jobs_resumed'] += 1
+
+    def try_start(self, job_id, resumed=False):
+        """
+        Claim job for a live worker in this process (check + claim in one step,
+        no await in between); False if another worker already owns it
+        """
+        if job_id in self._running:
+            return False
+        self.start(job_id, resumed)
+        return True
+
+    async def claim(self, job_id):
+        """
+        Claim an unfinished job for resume and re-read it from the database.
+        None if it already has a worker, or finished/was cancelled meanwhile.
+        The caller owns the job until finish() or release().
+        """
+        if not self.try_start(job_id, resumed=True):
+            return None
+        try:
+            job = await self.get_job(job_id)
+            if not job or job['status'] not in ACTIVE_STATUSES:
+                self.release(job_id)
+                return None
+            await self.reopen(job_id)
+        except BaseException:
+            self.release(job_id)
+            raise
+        job['status'] = 'running'
+        return job
+
+    def release(self, job_id):
+        """Worker gone without finishing (reload/cancel/error): job can be resumed again"""
+        self._running.discard(job_id)
+        self._cancelled.discard(job_id)
+
+    async def reopen(self, job_id):
+        """Paused job back to running before a worker resumes it"""
+        await async_db.update('jobs', {'status': 'running', 'updated_at': time.time()},
+                              "id = ? AND status = 'paused'", (job_id,), db_name=DB_NAME)
+
+    def is_running(self, job_id):
+        return job_id in self._running
+
+    def is_cancelled(self, job_id):
+        return job_id in self._cancelled
+
+    async def mark(self, job_id, peer_id, status, error=None):
+        """Record a target result; checkpointed in batches"""
+        batch = self._pending.setdefault(job_id, [])
+        batch.append((status, (error or '')[:200] or None, time.time(), job_id, peer_id))
+        if (len(batch) >= CHECKPOINT_BATCH or
+                time.monotonic() - self._last_flush.get(job_id, 0) >= CHECKPOINT_INTERVAL):
+            await self.checkpoint(job_id)
+
+    @staticmethod
+    def _write_checkpoint(conn, job_id, batch):
+        conn.executemany(
+            "UPDATE job_targets SET status = ?, error = ?, updated_at = ? WHERE job_id = ? AND peer_id = ?",
+            batch
+        )
+        conn.execute(
+            """UPDATE jobs SET
+                success = (SELECT COUNT(*) FROM job_targets WHERE job_id = ? AND status = 'sent'),
+                failed = (SELECT COUNT(*) FROM job_targets WHERE job_id = ? AND status = 'failed'),
+                updated_at = ?
+            WHERE id = ?""",
+            (job_id, job_id, time.time(), job_id)
+        )
+        conn.commit()
+
+    async def checkpoint(self, job_id):
+        """Flush buffered target results and refresh job counters in one transaction"""
+        batch = self._pending.pop(job_id, [])
+        self._last_flush[job_id] = time.monotonic()
+        if not batch:
+            return
+
+        try:
+            await async_db.run_in_connection(lambda conn: self._write_checkpoint(conn, job_id, batch), DB_NAME)
+            self.stats['checkpoints'] += 1
+            self.stats['targets_checkpointed'] += len(batch)
+        except Exception as e:
+            # Keep results for the next checkpoint instead of losing them
+            self._pending[job_id] = batch + self._pending.get(job_id, [])
+            logger.error(f"[GcastJobs] Checkpoint error for job #{job_id}: {e}")
+
+    async def finish(self, job_id, status='completed'):
+        """Final checkpoint and close the job (status is kept if already cancelled)"""
+        await self.checkpoint(job_id)
+        if job_id in self._cancelled:
+            status = 'cancelled'
+        await async_db.update('jobs', {'status': status, 'updated_at': time.time()},
+                              'id = ?', (job_id,), db_name=DB_NAME)
+        self._running.discard(job_id)
+        self._cancelled.discard(job_id)
+        self._last_flush.pop(job_id, None)
+        return await self.get_job(job_id)
+
+    async def cancel(self, job_id):
+        """Cancel a running job; live workers stop before their next send"""
+        job = await self.get_job(job_id)
+        if not job or job['status'] not in ACTIVE_STATUSES:
+            return False
+        if job_id in self._running:
+            self._cancelled.add(job_id)
+        await async_db.update('jobs', {'status': 'cancelled', 'updated_at': time.time()},
+                              'id = ?', (job_id,), db_name=DB_NAME)
+        return True
+
+    def flush_sync(self):
+        """Write remaining checkpoints synchronously (plugin cleanup)"""
+        for job_id, batch in list(self._pending.items()):
+            try:
+                with db_manager.get_connection(DB_NAME) as conn:
+                    self._write_checkpoint(conn, job_id, batch)
+                self._pending.pop(job_id, None)
+            except Exception as e:
+                logger.error(f"[GcastJobs] Final checkpoint error for job #{job_id}: {e}")
+
+    def get_stats(self):
+        stats = dict(self.stats)
+        stats['running'] = len(self._running)
+        stats['buffered_results'] = sum(len(batch) for batch in self._pending.values())
+        return stats
+
+# Global shared instance
+gcast_jobs = GcastJobStore()
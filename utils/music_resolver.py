@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Music Resolver for VzoelFox Userbot - Shared YouTube search/stream lookup service
+Fitur: TTL cache of query -> metadata, in-flight de-duplication (one yt-dlp run per
+song no matter how many callers), bounded concurrent lookups, hit/miss stats
+Founder Userbot: Vzoel Fox's Ltpn 🤩
+Version: 1.0.0 - Music Resolver Service
+"""
+
+import os
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.audio_cache import normalize_query, video_id_from_url
+from utils.process_pool import process_pool
+
+logger = logging.getLogger(__name__)
+
+SEARCH_CACHE_TTL = int(os.getenv("SEARCH_CACHE_TTL", "21600"))  # search metadata: 6 hours
+STREAM_URL_TTL = 1800       # direct stream URLs expire, keep them 30 minutes
+RESOLVER_CONCURRENCY = int(os.getenv("RESOLVER_CONCURRENCY", "3"))  # yt-dlp lookups at once
+RESOLVER_MAX_ENTRIES = 500
+RESOLVER_TIMEOUT = 60       # seconds per lookup, counted from when it actually starts
+SEARCH_TOOL = 'yt-dlp-search'  # own process_pool slots: searches never queue behind downloads
+
+def format_duration(seconds):
+    """yt-dlp --get-duration style: 3:45 / 1:02:03"""
+    if not seconds:
+        return 'Unknown'
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    minutes, secs = divmod(rest, 60)
+    return f"{hours}:{minutes:02d}:{secs:02d}" if hours else f"{minutes}:{secs:02d}"
+
+class MusicResolver:
+    """
+    One place that turns a song query into YouTube metadata.
+    .play/.download (search) and voice chat (stream URL) share the cache;
+    concurrent requests for the same query await the same lookup.
+    """
+
+    def __init__(self, concurrency=RESOLVER_CONCURRENCY, max_entries=RESOLVER_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._cache = OrderedDict()   # key -> (expires_at, value)
+        self._inflight = {}           # key -> Future
+        self._semaphore = asyncio.Semaphore(concurrency)
+        # yt_dlp extraction threads outlive a timed-out lookup (threads can't be
+        # cancelled), so they get their own pool of the same size: abandoned
+        # extractions queue there instead of piling up beyond the limit
+        self._executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='music_resolver')
+        self.concurrency = concurrency
+        self.stats = {'hits': 0, 'misses': 0, 'coalesced': 0, 'lookups': 0, 'failures': 0,
+                      'running': 0, 'queued': 0, 'extracting': 0}
+
+    def _cached(self, key):
+        entry = self._cache.get(key)
+        if not entry:
+            return None
+        if entry[0] < time.monotonic():
+            del self._cache[key]
+            return None
+        self._cache.move_to_end(key)
+        return entry[1]
+
+    def _put(self, key, value, ttl):
+        self._cache[key] = (time.monotonic() + ttl, value)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+
+    async def _resolve(self, key, ttl, producer):
+        value = self._cached(key)
+        if value is not None:
+            self.stats['hits'] += 1
+            return value
+
+        while True:
+            inflight = self._inflight.get(key)
+            if inflight is None:
+                break
+            self.stats['coalesced'] += 1
+            try:
+                return await asyncio.shield(inflight)
+            except asyncio.CancelledError:
+                if not inflight.cancelled() or asyncio.current_task().cancelling():
+                    raise  # this caller was cancelled
+                # Owner was cancelled, not us: look again (cache, new owner, or run it ourselves)
+            value = self._cached(key)
+            if value is not None:
+                self.stats['hits'] += 1
+                return value
+
+        self.stats['misses'] += 1
+        future = asyncio.get_event_loop().create_future()
+        self._inflight[key] = future
+        try:
+            self.stats['queued'] += 1
+            try:
+                await self._semaphore.acquire()
+            finally:
+                self.stats['queued'] -= 1  # also when cancelled while waiting for a slot
+            self.stats['running'] += 1
+            self.stats['lookups'] += 1
+            try:
+                # Producers apply RESOLVER_TIMEOUT themselves, once running,
+                # so waiting for a process/thread slot does not eat into it
+                value = await producer()
+            finally:
+                self.stats['running'] -= 1
+                self._semaphore.release()
+            if value is not None:
+                self._put(key, value, ttl)  # failures are not cached
+            else:
+                self.stats['failures'] += 1
+            future.set_result(value)
+            return value
+        except BaseException as e:
+            if isinstance(e, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(e)
+                future.exception()  # retrieved: waiters re-raise, no "never retrieved" warning
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    # ----------------- search (title/duration/video id) -----------------
+
+    async def search(self, query):
+        """Search metadata dict like music_player.search_youtube returned"""
+        key = ('search', normalize_query(query))
+        try:
+            info = await self._resolve(key, SEARCH_CACHE_TTL, lambda: self._search_subprocess(query))
+        except asyncio.TimeoutError:
+            return {'success': False, 'error': 'Search timed out'}
+        except Exception as e:
+            return {'success': False, 'error': f'Search error: {str(e)}'}
+        if not info:
+            return {'success': False, 'error': 'Search failed or no results found'}
+        return dict(info, success=True)
+
+    async def _search_subprocess(self, query):
+        result = await process_pool.run(
+            ['yt-dlp', '--get-title', '--get-duration', '--get-id', '--no-playlist',
+             query if video_id_from_url(query) else f'ytsearch1:{query}'],
+            tool=SEARCH_TOOL, timeout=RESOLVER_TIMEOUT, text=True
+        )
+        if result.timed_out:
+            raise asyncio.TimeoutError()
+        if result.returncode != 0:
+            return None
+        lines = result.stdout.strip().split('\n')
+        if len(lines) < 3:
+            return None
+        return {
+            'title': lines[0],
+            'duration': lines[1],
+            'video_id': lines[2],
+            'url': f'https://youtube.com/watch?v={lines[2]}'
+        }
+
+    # ----------------- stream URL (voice chat) -----------------
+
+    async def stream_info(self, query):
+        """(direct audio URL, title) for voice chat playback; (None, None) on failure"""
+        key = ('stream', normalize_query(query))
+        # A song already found by .play/.download is extracted by id (no search round)
+        search = self._cached(('search', normalize_query(query)))
+        target = search['url'] if search else query
+        try:
+            info = await self._resolve(key, STREAM_URL_TTL, lambda: self._extract_stream(query, target))
+        except Exception as e:
+            logger.error(f"YouTube extraction error: {e}")
+            return None, None
+        if not info:
+            return None, None
+        return info['stream_url'], info['title']
+
+    async def _extract_stream(self, query, target):
+        loop = asyncio.get_event_loop()
+        info = await asyncio.wait_for(
+            loop.run_in_executor(self._executor, self._extract_stream_sync, target), RESOLVER_TIMEOUT
+        )
+        if not info or not info.get('url'):
+            return None
+        video_id = info.get('id')
+        if video_id:
+            # Same lookup answers the search cache too
+            self._put(('search', normalize_query(query)), {
+                'title': info.get('title', 'Unknown'),
+                'duration': format_duration(info.get('duration')),
+                'video_id': video_id,
+                'url': f'https://youtube.com/watch?v={video_id}'
+            }, SEARCH_CACHE_TTL)
+        return {'stream_url': info['url'], 'title': info.get('title', 'Unknown'), 'video_id': video_id}
+
+    def _extract_stream_sync(self, query):
+        self.stats['extracting'] += 1  # counted until the thread finishes, even after a timeout
+        try:
+            return self._extract_info(query)
+        finally:
+            self.stats['extracting'] -= 1
+
+    @staticmethod
+    def _extract_info(query):
+        import yt_dlp
+
+        ydl_opts = {
+            'format': 'bestaudio[ext=m4a]',
+            'noplaylist': True,
+            'quiet': True,
+            'extract_flat': False,
+        }
+        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            if query.startswith(('http://', 'https://')):
+                return ydl.extract_info(query, download=False)
+            info = ydl.extract_info(f"ytsearch:{query}", download=False)
+            return info['entries'][0] if info.get('entries') else None
+
+    def get_stats(self):
+        stats = dict(self.stats)
+        stats['cached'] = len(self._cache)
+        stats['inflight'] = len(self._inflight)
+        stats['concurrency'] = self.concurrency
+        lookups = stats['hits'] + stats['misses'] + stats['coalesced']
+        stats['hit_rate'] = (stats['hits'] + stats['coalesced']) / lookups * 100 if lookups else 0.0
+        return stats
+
+# Global shared instance
+music_resolver = MusicResolver()
@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+"""
+Participant Cache for VzoelFox Userbot - Per-chat member snapshots
+Fitur: Compact SQLite member rows, streaming first sync, TTL full resync (shorter
+and count-revalidated for large groups), incremental join/leave updates,
+cached user lookup (id/username -> access_hash)
+Founder Userbot: Vzoel Fox's Ltpn 🤩
+Version: 1.0.0 - Participant Snapshot Cache
+"""
+
+import os
+import sys
+import time
+import logging
+from collections import namedtuple
+
+from telethon import events
+from telethon.tl.types import User, InputPeerUser
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.plugin_context import shared_service
+from database import async_db, db_manager
+
+logger = logging.getLogger(__name__)
+
+DB_NAME = "participants"
+PARTICIPANT_CACHE_TTL = int(os.getenv("PARTICIPANT_CACHE_TTL", "21600"))  # full resync after 6 hours
+# Large groups don't deliver every join/leave update, so their snapshots drift:
+# shorter TTL, and a fresh snapshot is only used while the live member count agrees
+LARGE_CHAT_SIZE = 1000
+LARGE_CHAT_TTL = int(os.getenv("PARTICIPANT_LARGE_CHAT_TTL", "1800"))  # 30 minutes
+LARGE_CHAT_DRIFT = 0.01  # tolerated member count difference (fraction of total)
+WRITE_BATCH = 500   # member rows per write while syncing
+READ_PAGE = 1000    # member rows per read from a snapshot
+
+MEMBERS_SCHEMA = """
+    chat_id INTEGER NOT NULL,
+    user_id INTEGER NOT NULL,
+    access_hash INTEGER,
+    username TEXT,
+    first_name TEXT,
+    is_bot INTEGER DEFAULT 0,
+    is_deleted INTEGER DEFAULT 0,
+    updated_at REAL,
+    PRIMARY KEY (chat_id, user_id)
+"""
+
+CHATS_SCHEMA = """
+    chat_id INTEGER PRIMARY KEY,
+    total INTEGER DEFAULT 0,
+    synced_at REAL
+"""
+
+COLUMNS = ('chat_id', 'user_id', 'access_hash', 'username', 'first_name', 'is_bot', 'is_deleted', 'updated_at')
+
+# Lightweight member record (what tagall/checkid need from a User)
+Member = namedtuple('Member', 'id access_hash username first_name bot deleted')
+
+def member_from_user(user):
+    return Member(
+        user.id,
+        getattr(user, 'access_hash', None),
+        getattr(user, 'username', None),
+        getattr(user, 'first_name', None),
+        bool(getattr(user, 'bot', False)),
+        bool(getattr(user, 'deleted', False))
+    )
+
+def member_from_row(row):
+    return Member(row['user_id'], row['access_hash'], row['username'], row['first_name'],
+                  bool(row['is_bot']), bool(row['is_deleted']))
+
+class ParticipantCache:
+    """Per-chat member snapshots in SQLite, refreshed from ChatAction updates"""
+
+    def __init__(self):
+        self._synced = {}   # chat_id -> (synced_at, total) for complete snapshots
+        self._totals = {}   # chat_id -> member count reported by Telegram
+        self._loaded = False
+        self._attached = None
+        self._me_id = None
+        self.stats = {'snapshot_hits': 0, 'live_syncs': 0, 'rows_written': 0,
+                      'incremental_updates': 0, 'user_lookups': 0, 'user_lookup_hits': 0,
+                      'revalidations': 0, 'stale_snapshots': 0}
+
+    def load(self):
+        """Create tables and load snapshot metadata (sync, called at plugin setup)"""
+        if self._loaded:
+            return
+        db_manager.create_table('members', MEMBERS_SCHEMA, DB_NAME)
+        db_manager.create_table('chats', CHATS_SCHEMA, DB_NAME)
+        db_manager.execute_query("CREATE INDEX IF NOT EXISTS idx_members_user ON members (user_id)", db_name=DB_NAME)
+        db_manager.execute_query(
+            "CREATE INDEX IF NOT EXISTS idx_members_username ON members (username COLLATE NOCASE)", db_name=DB_NAME
+        )
+        for row in db_manager.select('chats', db_name=DB_NAME):
+            self._synced[row['chat_id']] = (row['synced_at'], row['total'])
+            self._totals[row['chat_id']] = row['total']
+        self._loaded = True
+
+    @staticmethod
+    def _is_large(total):
+        return (total or 0) >= LARGE_CHAT_SIZE
+
+    def is_fresh(self, chat_id):
+        synced = self._synced.get(chat_id)
+        if not synced:
+            return False
+        ttl = LARGE_CHAT_TTL if self._is_large(synced[1]) else PARTICIPANT_CACHE_TTL
+        return (time.time() - synced[0]) <= ttl
+
+    async def _count_matches(self, client, chat_id):
+        """Large chat: one member count request decides if the snapshot is still usable"""
+        total = self._synced[chat_id][1]
+        if not self._is_large(total):
+            return True  # small chats get every join/leave update
+        self.stats['revalidations'] += 1
+        try:
+            live_total = (await client.get_participants(chat_id, limit=0)).total
+        except Exception as e:
+            logger.debug(f"[ParticipantCache] Member count check failed for {chat_id}: {e}")
+            return True
+        if live_total is None or abs(live_total - total) <= total * LARGE_CHAT_DRIFT:
+            return True
+        self.stats['stale_snapshots'] += 1
+        logger.info(f"[ParticipantCache] Snapshot of {chat_id} drifted ({total} -> {live_total}), resyncing")
+        return False
+
+    def get_total(self, chat_id):
+        """Member count from the last snapshot/live page (None if unknown)"""
+        return self._totals.get(chat_id)
+
+    async def iter_members(self, client, chat_id, force=False):
+        """
+        Async generator of Member records for chat_id.
+        Fresh snapshot -> read from SQLite; otherwise stream iter_participants
+        and write the snapshot as it goes (marked complete only if fully read).
+        """
+        self.load()
+        if not force and self.is_fresh(chat_id) and await self._count_matches(client, chat_id):
+            self.stats['snapshot_hits'] += 1
+            source = self._iter_snapshot(chat_id)
+        else:
+            source = self._iter_live(client, chat_id)
+        try:
+            async for member in source:
+                yield member
+        finally:
+            await source.aclose()
+
+    async def _iter_snapshot(self, chat_id):
+        last_rowid = 0
+        while True:
+            rows = await async_db.execute_query(
+                f"SELECT rowid, * FROM members WHERE chat_id = ? AND rowid > ? ORDER BY rowid LIMIT {READ_PAGE}",
+                (chat_id, last_rowid), DB_NAME, fetch="all"
+            )
+            if not rows:
+                return
+            for row in rows:
+                yield member_from_row(row)
+            last_rowid = rows[-1]['rowid']
+
+    async def _iter_live(self, client, chat_id):
+        started = time.time()
+        participants = client.iter_participants(chat_id)
+        buffer = []
+        count = 0
+        self.stats['live_syncs'] += 1
+        try:
+            async for user in participants:
+                if not isinstance(user, User):
+                    continue
+                member = member_from_user(user)
+                buffer.append(member)
+                count += 1
+                if count == 1 and getattr(participants, 'total', None):
+                    self._totals[chat_id] = participants.total
+                if len(buffer) >= WRITE_BATCH:
+                    await self._write(chat_id, buffer)
+                    buffer = []
+                yield member
+        finally:
+            if buffer:
+                await self._write(chat_id, buffer)
+
+        # Reached the end: snapshot complete, drop members that left meanwhile
+        total = getattr(participants, 'total', None) or count
+        await self._mark_synced(chat_id, started, total)
+        logger.info(f"[ParticipantCache] Synced {count} members of {chat_id} in {time.time() - started:.1f}s")
+
+    async def _write(self, chat_id, members):
+        now = time.time()
+        rows = [(chat_id, m.id, m.access_hash, m.username, m.first_name, int(m.bot), int(m.deleted), now)
+                for m in members]
+        written = await async_db.executemany(
+            f"INSERT OR REPLACE INTO members ({', '.join(COLUMNS)}) VALUES ({', '.join('?' for _ in COLUMNS)})",
+            rows, DB_NAME
+        )
+        if written is not None:
+            self.stats['rows_written'] += len(rows)
+
+    async def _mark_synced(self, chat_id, started, total):
+        def _finish(conn):
+            conn.execute("DELETE FROM members WHERE chat_id = ? AND updated_at < ?", (chat_id, started))
+            conn.execute("INSERT OR REPLACE INTO chats (chat_id, total, synced_at) VALUES (?, ?, ?)",
+                         (chat_id, total, started))
+            conn.commit()
+
+        await async_db.run_in_connection(_finish, DB_NAME)
+        self._synced[chat_id] = (started, total)
+        self._totals[chat_id] = total
+
+    async def invalidate(self, chat_id=None):
+        """Force a full resync on next use (one chat or all)"""
+        self.load()
+        if chat_id is None:
+            self._synced.clear()
+            await async_db.delete('chats', '1 = 1', db_name=DB_NAME)
+        else:
+            self._synced.pop(chat_id, None)
+            await async_db.delete('chats', 'chat_id = ?', (chat_id,), db_name=DB_NAME)
+
+    # ----------------- user lookups -----------------
+
+    async def find_user(self, user_id=None, username=None):
+        """Cached Member by id or username from any snapshot (None if unknown)"""
+        self.load()
+        self.stats['user_lookups'] += 1
+        if user_id is not None:
+            row = await async_db.select_one('members', where='user_id = ? AND access_hash IS NOT NULL',
+                                            where_params=(int(user_id),), db_name=DB_NAME)
+        elif username:
+            row = await async_db.select_one('members', where='username = ? COLLATE NOCASE AND access_hash IS NOT NULL',
+                                            where_params=(username.lstrip('@'),), db_name=DB_NAME)
+        else:
+            return None
+        if row:
+            self.stats['user_lookup_hits'] += 1
+            return member_from_row(row)
+        return None
+
+    @staticmethod
+    def input_user(member):
+        return InputPeerUser(member.id, member.access_hash)
+
+    async def resolve_user(self, client, identifier):
+        """
+        get_entity for a user id/username, using the cached access_hash so
+        unknown ids resolve and usernames skip ResolveUsername.
+        """
+        if isinstance(identifier, str):
+            identifier = identifier.strip().lstrip('@')
+            member = await self.find_user(user_id=int(identifier)) if identifier.isdigit() else \
+                await self.find_user(username=identifier)
+        else:
+            member = await self.find_user(user_id=identifier)
+        if member:
+            try:
+                return await client.get_entity(self.input_user(member))
+            except Exception as e:
+                logger.debug(f"[ParticipantCache] Cached user {member.id} not resolvable: {e}")
+        return await client.get_entity(int(identifier) if str(identifier).isdigit() else identifier)
+
+    async def me_id(self, client):
+        """Own user id (cached after first call)"""
+        if self._me_id is None:
+            self._me_id = (await client.get_me(input_peer=True)).user_id
+        return self._me_id
+
+    # ----------------- incremental updates -----------------
+
+    async def _on_chat_action(self, event):
+        try:
+            chat_id = event.chat_id
+            if chat_id not in self._synced:
+                return  # only chats with a snapshot are maintained
+
+            if event.user_joined or event.user_added:
+                users = [user for user in (await event.get_users() or []) if isinstance(user, User)]
+                if users:
+                    await self._write(chat_id, [member_from_user(user) for user in users])
+                    self._adjust_total(chat_id, len(users))
+                    self.stats['incremental_updates'] += len(users)
+            elif event.user_left or event.user_kicked:
+                user_ids = list(event.user_ids or [])
+                if user_ids:
+                    await async_db.executemany(
+                        "DELETE FROM members WHERE chat_id = ? AND user_id = ?",
+                        [(chat_id, user_id) for user_id in user_ids], DB_NAME
+                    )
+                    self._adjust_total(chat_id, -len(user_ids))
+                    self.stats['incremental_updates'] += len(user_ids)
+        except Exception as e:
+            logger.debug(f"[ParticipantCache] Chat action update error: {e}")
+
+    def _adjust_total(self, chat_id, delta):
+        """Keep the snapshot's member count in step with applied join/leave updates"""
+        synced_at, total = self._synced[chat_id]
+        total = max(0, (total or 0) + delta)
+        self._synced[chat_id] = (synced_at, total)
+        self._totals[chat_id] = total
+
+    def attach(self, client):
+        """Register incremental update handler (idempotent)"""
+        if self._attached is client:
+            return
+        self.load()
+        self._attached = client
+        with shared_service():  # bot-wide, not owned by the plugin that attached first
+            client.add_event_handler(self._on_chat_action, events.ChatAction())
+
+    def get_stats(self):
+        stats = dict(self.stats)
+        stats['chats'] = len(self._synced)
+        stats['fresh_chats'] = sum(1 for chat_id in self._synced if self.is_fresh(chat_id))
+        return stats
+
+# Global shared instance
+participant_cache = ParticipantCache()
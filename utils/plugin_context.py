@@ -0,0 +1,27 @@
+#!/usr/bin/env python3
+"""
+Plugin Context for VzoelFox Userbot - Which plugin owns the running code
+Fitur: Context variable the plugin loader uses to attribute handlers and tasks,
+shared_service() to register bot-wide handlers/tasks outside any plugin
+Founder Userbot: Vzoel Fox's Ltpn 🤩
+Version: 1.0.0 - Plugin Attribution Context
+"""
+
+import contextvars
+from contextlib import contextmanager
+
+# Plugin that owns the code currently running (handler registrations and tasks are attributed to it)
+current_plugin = contextvars.ContextVar('current_plugin', default=None)
+
+@contextmanager
+def shared_service():
+    """
+    Run a shared service's handler registration / task creation outside
+    plugin attribution, so unloading the plugin that happened to call it
+    first does not remove the service's handlers or cancel its tasks.
+    """
+    token = current_plugin.set(None)
+    try:
+        yield
+    finally:
+        current_plugin.reset(token)
@@ -6,8 +6,14 @@ Founder Userbot: Vzoel Fox's Ltpn 🤩
 Version: 1.0.0 - Universal Premium Emoji System
 """
 
+import os
+import re
+from functools import lru_cache
+
 from telethon.tl.types import MessageEntityCustomEmoji
 
+TEMPLATE_CACHE_SIZE = int(os.getenv("EMOJI_TEMPLATE_CACHE", "1024"))
+
 # Premium Emoji Mapping - Vzoel Fox's Collection
 PREMIUM_EMOJIS = {
     "main": {"emoji": "🤩", "custom_emoji_id": "6156784006194009426"},
@@ -28,49 +34,71 @@ def get_emoji_id(emoji_type):
     """Get premium emoji custom ID"""
     return PREMIUM_EMOJIS.get(emoji_type, {}).get('custom_emoji_id', '6156784006194009426')
 
+def utf16_len(text):
+    """Length of text in UTF-16 code units (Telegram entity offsets)"""
+    return len(text.encode('utf-16-le')) // 2
+
+class PremiumEmojiEngine:
+    """
+    Premium emoji matcher compiled once per emoji mapping.
+    All emoji chars are joined into one regex (longest first), offsets are
+    computed in a single pass, and entity spans for repeated texts (status
+    and progress templates) are served from an LRU cache.
+    Accepts both mapping styles used in plugins: {'emoji', 'custom_emoji_id'}
+    and {'char', 'id'}.
+    """
+
+    def __init__(self, emoji_map, cache_size=TEMPLATE_CACHE_SIZE):
+        self._document_ids = {}
+        for emoji_data in emoji_map.values():
+            emoji_char = emoji_data.get('emoji') or emoji_data.get('char')
+            emoji_id = emoji_data.get('custom_emoji_id') or emoji_data.get('id')
+            if not emoji_char or emoji_char in self._document_ids:
+                continue  # first mapping wins, as before
+            try:
+                document_id = int(emoji_id)
+            except (TypeError, ValueError):
+                continue
+            if document_id > 0:
+                self._document_ids[emoji_char] = document_id
+
+        chars = sorted(self._document_ids, key=len, reverse=True)
+        self._pattern = re.compile('|'.join(map(re.escape, chars))) if chars else None
+        self._spans = lru_cache(maxsize=cache_size)(self._compute_spans)
+
+    def _compute_spans(self, text):
+        spans = []
+        utf16_offset = 0
+        position = 0
+        for match in self._pattern.finditer(text):
+            utf16_offset += utf16_len(text[position:match.start()])
+            emoji_char = match.group()
+            length = utf16_len(emoji_char)
+            spans.append((utf16_offset, length, self._document_ids[emoji_char]))
+            utf16_offset += length
+            position = match.end()
+        return tuple(spans)
+
+    def entities(self, text):
+        """Build fresh MessageEntityCustomEmoji list for text"""
+        if not text or self._pattern is None:
+            return []
+        try:
+            return [
+                MessageEntityCustomEmoji(offset=offset, length=length, document_id=document_id)
+                for offset, length, document_id in self._spans(text)
+            ]
+        except Exception:
+            return []
+
+    def cache_info(self):
+        return self._spans.cache_info()
+
+_engine = PremiumEmojiEngine(PREMIUM_EMOJIS)
+
 def create_premium_entities(text):
     """Create premium emoji entities for text with UTF-16 support"""
-    try:
-        entities = []
-        current_offset = 0
-        i = 0
-        
-        while i < len(text):
-            found_emoji = False
-            
-            for emoji_type, emoji_data in PREMIUM_EMOJIS.items():
-                emoji_char = emoji_data['emoji']
-                emoji_id = emoji_data['custom_emoji_id']
-                
-                if text[i:].startswith(emoji_char):
-                    try:
-                        emoji_bytes = emoji_char.encode('utf-16-le')
-                        utf16_length = len(emoji_bytes) // 2
-                        
-                        entities.append(MessageEntityCustomEmoji(
-                            offset=current_offset,
-                            length=utf16_length,
-                            document_id=int(emoji_id)
-                        ))
-                        
-                        i += len(emoji_char)
-                        current_offset += utf16_length
-                        found_emoji = True
-                        break
-                        
-                    except Exception:
-                        break
-            
-            if not found_emoji:
-                char = text[i]
-                char_bytes = char.encode('utf-16-le')
-                char_utf16_length = len(char_bytes) // 2
-                current_offset += char_utf16_length
-                i += 1
-        
-        return entities
-    except Exception:
-        return []
+    return _engine.entities(text)
 
 async def safe_send_premium(event, text, file=None, buttons=None):
     """Send message with premium entities"""
@@ -144,7 +172,7 @@ def inject_premium_emoji_support(plugin_module):
 
 # Export functions
 __all__ = [
-    'get_emoji', 'get_emoji_id', 'create_premium_entities', 
+    'get_emoji', 'get_emoji_id', 'create_premium_entities', 'PremiumEmojiEngine', 'utf16_len',
     'safe_send_premium', 'safe_edit_premium', 'get_vzoel_signature',
     'inject_premium_emoji_support', 'PREMIUM_EMOJIS'
 ]
\ No newline at end of file
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Process Pool for VzoelFox Userbot - Central scheduler for external tools
+Fitur: Concurrency cap per tool (ffmpeg, yt-dlp, git, ...), interactive vs background
+priority, timeouts with kill, cancellation-safe, per-tool stats
+Founder Userbot: Vzoel Fox's Ltpn 🤩
+Version: 1.0.0 - Subprocess Worker Pool
+"""
+
+import os
+import time
+import heapq
+import shlex
+import asyncio
+import itertools
+import contextlib
+import logging
+from collections import namedtuple
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_INTERACTIVE = 0   # a user is waiting on the result (commands)
+PRIORITY_BACKGROUND = 1    # prefetch, maintenance, updates
+
+DEFAULT_TIMEOUT = 300      # seconds
+TOOL_LIMITS = {
+    'ffmpeg': int(os.getenv("FFMPEG_CONCURRENCY", "2")),
+    'ffprobe': 4,
+    'yt-dlp': int(os.getenv("YTDLP_CONCURRENCY", "3")),
+    'yt-dlp-search': int(os.getenv("RESOLVER_CONCURRENCY", "3")),  # music_resolver metadata lookups
+    'git': 1,
+    'pip': 1,
+}
+DEFAULT_TOOL_LIMIT = 2
+
+ProcessResult = namedtuple('ProcessResult', 'returncode stdout stderr timed_out duration')
+
+class _ToolSlots:
+    """Counting semaphore that admits waiters by (priority, arrival)"""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.running = 0
+        self._waiters = []  # heap of (priority, seq, future)
+        self._seq = itertools.count()
+
+    async def acquire(self, priority):
+        if self.running < self.limit and not self._waiters:
+            self.running += 1
+            return
+        future = asyncio.get_event_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), future))
+        try:
+            await future  # slot is handed over by release()
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self.release()  # slot was granted just as we were cancelled
+            raise
+
+    def release(self):
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                future.set_result(None)  # running count stays: slot moves to the waiter
+                return
+        self.running -= 1
+
+    @property
+    def queued(self):
+        return sum(1 for _, _, future in self._waiters if not future.done())
+
+class ProcessPool:
+    """
+    Every external process goes through run(): it waits for a slot of its
+    tool (interactive work first), runs with a timeout, and is killed if the
+    caller is cancelled, so N simultaneous commands never mean N ffmpegs.
+    """
+
+    def __init__(self, limits=None):
+        self.limits = dict(TOOL_LIMITS, **(limits or {}))
+        self._slots = {}
+        self.stats = {}
+
+    def _tool_slots(self, tool):
+        slots = self._slots.get(tool)
+        if slots is None:
+            slots = self._slots[tool] = _ToolSlots(self.limits.get(tool, DEFAULT_TOOL_LIMIT))
+        return slots
+
+    def _tool_stats(self, tool):
+        return self.stats.setdefault(tool, {'runs': 0, 'failed': 0, 'timeouts': 0, 'cancelled': 0,
+                                            'total_time': 0.0, 'total_wait': 0.0, 'max_wait': 0.0})
+
+    @contextlib.asynccontextmanager
+    async def slot(self, tool, priority=PRIORITY_INTERACTIVE):
+        """
+        Hold one slot of tool, for callers that drive the process themselves
+        (streaming stdin/stdout). Yields the tool's stats dict.
+        """
+        slots = self._tool_slots(tool)
+        stats = self._tool_stats(tool)
+
+        queued_at = time.monotonic()
+        try:
+            await slots.acquire(priority)
+        except asyncio.CancelledError:
+            stats['cancelled'] += 1  # gave up while still queued
+            raise
+        started = time.monotonic()
+        wait = started - queued_at
+        stats['total_wait'] += wait
+        stats['max_wait'] = max(stats['max_wait'], wait)
+
+        try:
+            yield stats
+            stats['runs'] += 1
+        except asyncio.CancelledError:
+            stats['cancelled'] += 1
+            raise
+        except Exception:
+            stats['runs'] += 1
+            stats['failed'] += 1
+            raise
+        finally:
+            stats['total_time'] += time.monotonic() - started
+            slots.release()
+
+    async def run(self, cmd, tool=None, priority=PRIORITY_INTERACTIVE, timeout=DEFAULT_TIMEOUT,
+                  input=None, cwd=None, shell=False, text=False):
+        """
+        Run cmd (argv list, or a string with shell=True) and capture output.
+        Returns ProcessResult; timed_out=True means the process was killed.
+        """
+        if tool is None:
+            first = shlex.split(cmd)[0] if shell else cmd[0]
+            tool = os.path.basename(first)
+
+        async with self.slot(tool, priority) as stats:
+            started = time.monotonic()
+            process = None
+            try:
+                stdin = asyncio.subprocess.PIPE if input is not None else asyncio.subprocess.DEVNULL
+                if shell:
+                    process = await asyncio.create_subprocess_shell(
+                        cmd, cwd=cwd, stdin=stdin,
+                        stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+                    )
+                else:
+                    process = await asyncio.create_subprocess_exec(
+                        *cmd, cwd=cwd, stdin=stdin,
+                        stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+                    )
+                timed_out = False
+                try:
+                    stdout, stderr = await asyncio.wait_for(process.communicate(input), timeout)
+                except asyncio.TimeoutError:
+                    timed_out = True
+                    stats['timeouts'] += 1
+                    await self.kill(process)
+                    stdout, stderr = b'', f'{tool} timed out after {timeout}s'.encode()
+                    logger.warning(f"[ProcessPool] {tool} killed after {timeout}s timeout")
+            except asyncio.CancelledError:
+                if process is not None:
+                    await self.kill(process)
+                raise
+
+            if timed_out or process.returncode != 0:
+                stats['failed'] += 1
+            if text:
+                stdout = stdout.decode(errors='replace')
+                stderr = stderr.decode(errors='replace')
+            return ProcessResult(process.returncode, stdout, stderr, timed_out, time.monotonic() - started)
+
+    @staticmethod
+    async def kill(process):
+        """Kill process if still running and reap it"""
+        if process.returncode is None:
+            try:
+                process.kill()
+            except ProcessLookupError:
+                pass
+            await process.wait()
+
+    def get_stats(self):
+        """Per-tool counters plus current running/queued"""
+        rows = {}
+        for tool in set(self.stats) | set(self._slots):
+            stats = dict(self._tool_stats(tool))
+            slots = self._slots.get(tool)
+            stats['limit'] = slots.limit if slots else self.limits.get(tool, DEFAULT_TOOL_LIMIT)
+            stats['running'] = slots.running if slots else 0
+            stats['queued'] = slots.queued if slots else 0
+            stats['avg_time'] = stats['total_time'] / stats['runs'] if stats['runs'] else 0.0
+            stats['avg_wait'] = stats['total_wait'] / stats['runs'] if stats['runs'] else 0.0
+            rows[tool] = stats
+        return rows
+
+# Global shared instance
+process_pool = ProcessPool()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Progress Reporter for VzoelFox Userbot - Throttled, coalescing status message edits
+Fitur: Max one edit per interval, latest text wins, unchanged text skipped, FloodWait backoff
+Founder Userbot: Vzoel Fox's Ltpn 🤩
+Version: 1.0.0 - Shared Progress Reporter
+"""
+
+import os
+import time
+import asyncio
+import logging
+
+from telethon.errors import FloodWaitError, MessageNotModifiedError
+
+logger = logging.getLogger(__name__)
+
+PROGRESS_EDIT_INTERVAL = float(os.getenv("PROGRESS_EDIT_INTERVAL", "3.0"))  # seconds between edits
+FINAL_EDIT_MAX_WAIT = 30  # longest FloodWait finish() will sit out before giving up
+
+class ProgressReporter:
+    """
+    Wraps a status message for long-running commands.
+    update() only records the newest text; a single background task edits the
+    message at most once per interval, so a run costs a constant number of
+    edits no matter how many items it processes.
+    """
+
+    def __init__(self, message, interval=PROGRESS_EDIT_INTERVAL, entities=None):
+        self.message = message
+        self.interval = interval
+        self._entities = entities          # callable(text) -> formatting entities
+        self._pending = None
+        self._last_text = getattr(message, 'raw_text', None)
+        self._last_edit = time.monotonic()  # message was just sent
+        self._not_before = 0.0
+        self._task = None
+        self._closed = False
+        self.stats = {'updates': 0, 'edits': 0, 'skipped': 0, 'flood_waits': 0}
+
+    def update(self, text):
+        """Record latest progress text (never blocks, never edits inline)"""
+        if self._closed or self.message is None:
+            return
+        self.stats['updates'] += 1
+        self._pending = text
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_event_loop().create_task(self._run())
+
+    async def _run(self):
+        while self._pending is not None and not self._closed:
+            now = time.monotonic()
+            wait = max(self._last_edit + self.interval, self._not_before) - now
+            if wait > 0:
+                await asyncio.sleep(wait)
+                continue
+            text, self._pending = self._pending, None
+            await self._edit(text)
+
+    async def _edit(self, text):
+        if text == self._last_text:
+            self.stats['skipped'] += 1
+            return True
+        try:
+            if self._entities:
+                await self.message.edit(text, formatting_entities=self._entities(text))
+            else:
+                await self.message.edit(text)
+            self.stats['edits'] += 1
+        except MessageNotModifiedError:
+            self.stats['skipped'] += 1
+        except FloodWaitError as e:
+            self.stats['flood_waits'] += 1
+            self._not_before = time.monotonic() + e.seconds
+            if self._pending is None:
+                self._pending = text  # retry once the wait is over
+            logger.warning(f"[ProgressReporter] FloodWait {e.seconds}s on progress edit")
+            return False
+        except Exception as e:
+            logger.debug(f"[ProgressReporter] Edit failed: {e}")
+            return False
+        finally:
+            self._last_edit = time.monotonic()
+        self._last_text = text
+        return True
+
+    async def stop(self):
+        """Drop pending updates and stop the background task"""
+        self._closed = True
+        self._pending = None
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def finish(self, text=None):
+        """Stop throttling and write the final text (waits out a short FloodWait)"""
+        final_text = text if text is not None else self._pending
+        await self.stop()
+        if final_text is None or self.message is None:
+            return True
+        wait = self._not_before - time.monotonic()
+        if wait > FINAL_EDIT_MAX_WAIT:
+            return False
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return await self._edit(final_text)
+
+    def get_stats(self):
+        stats = dict(self.stats)
+        stats['coalesced'] = max(0, stats['updates'] - stats['edits'] - stats['skipped'])
+        return stats
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Send Scheduler for VzoelFox Userbot - Adaptive FloodWait-aware rate limiting
+Fitur: Shared token bucket, global FloodWait backoff, gradual ramp-up, per-chat slow mode
+Founder Userbot: Vzoel Fox's Ltpn 🤩
+Version: 1.0.0 - Adaptive Send Scheduler
+"""
+
+import os
+import time
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+SEND_RATE_INITIAL = float(os.getenv("SEND_RATE_INITIAL", "2.0"))  # messages per second
+SEND_RATE_MIN = float(os.getenv("SEND_RATE_MIN", "0.2"))
+SEND_RATE_MAX = float(os.getenv("SEND_RATE_MAX", "8.0"))
+SEND_BURST = int(os.getenv("SEND_BURST", "5"))
+RAMP_UP_AFTER = 20      # successes at current rate before increasing
+RAMP_UP_STEP = 0.25     # messages per second added on ramp up
+BACKOFF_FACTOR = 0.5    # rate multiplier on FloodWait
+MAX_FLOOD_PAUSE = int(os.getenv("SEND_MAX_FLOOD_WAIT", "900"))  # longest global pause, seconds (15 min)
+
+class SendScheduler:
+    """
+    Account-wide token bucket shared by every bulk sender.
+    FloodWaitError pauses *all* senders and halves the rate; after a run of
+    clean sends the rate creeps back up (AIMD), so bulk jobs converge on what
+    Telegram actually allows instead of bursting into errors.
+    The client keeps Telethon's default flood_sleep_threshold, so short waits
+    are slept inside the request and only longer FloodWaits (raised to the
+    scheduled send paths in gcast/tagall/gban) reach on_flood_wait().
+    """
+
+    def __init__(self, rate=SEND_RATE_INITIAL, min_rate=SEND_RATE_MIN,
+                 max_rate=SEND_RATE_MAX, burst=SEND_BURST):
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._last_refill = time.monotonic()
+        self._paused_until = 0.0
+        self._chat_not_before = {}  # chat key -> monotonic time
+        self._clean_streak = 0
+        self._lock = None
+        self.stats = {
+            'acquired': 0,
+            'flood_waits': 0,
+            'flood_wait_seconds': 0,
+            'flood_aborts': 0,
+            'slow_mode_waits': 0,
+            'waited_seconds': 0.0,
+            'ramp_ups': 0
+        }
+
+    def _refill(self, now):
+        elapsed = now - self._last_refill
+        if elapsed > 0:
+            self._tokens = min(float(self.burst), self._tokens + elapsed * self.rate)
+            self._last_refill = now
+
+    @property
+    def paused_for(self):
+        return max(0.0, self._paused_until - time.monotonic())
+
+    def chat_delay(self, chat_key):
+        """
+        Seconds until chat_key may be sent to (slow mode). Callers requeue the
+        target with this not-before time instead of waiting in a worker.
+        """
+        return max(0.0, self._chat_not_before.get(chat_key, 0.0) - time.monotonic())
+
+    async def acquire(self):
+        """Wait until a send is allowed (global pause, token)"""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+
+        started = time.monotonic()
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+
+                self._refill(now)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    break
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+        self.stats['acquired'] += 1
+        self.stats['waited_seconds'] += time.monotonic() - started
+
+    def on_success(self):
+        """Record a clean send; ramp rate up after a streak"""
+        self._clean_streak += 1
+        if self._clean_streak >= RAMP_UP_AFTER and self.rate < self.max_rate:
+            self.rate = min(self.max_rate, self.rate + RAMP_UP_STEP)
+            self._clean_streak = 0
+            self.stats['ramp_ups'] += 1
+
+    def on_flood_wait(self, seconds):
+        """
+        Global backoff: pause every sender (at most MAX_FLOOD_PAUSE) and cut the rate.
+        Returns False when the wait exceeds MAX_FLOOD_PAUSE - the caller should
+        stop its job (checkpoint remaining targets) instead of retrying.
+        """
+        seconds = max(1, int(seconds))
+        pause = min(seconds, MAX_FLOOD_PAUSE)
+        self._paused_until = max(self._paused_until, time.monotonic() + pause)
+        self.rate = max(self.min_rate, self.rate * BACKOFF_FACTOR)
+        self._tokens = 0.0
+        self._clean_streak = 0
+        self.stats['flood_waits'] += 1
+        self.stats['flood_wait_seconds'] += seconds
+        if seconds > MAX_FLOOD_PAUSE:
+            self.stats['flood_aborts'] += 1
+            logger.warning(f"[SendScheduler] FloodWait {seconds}s exceeds {MAX_FLOOD_PAUSE}s limit - "
+                           f"pausing {pause}s, rate now {self.rate:.2f}/s")
+            return False
+        logger.warning(f"[SendScheduler] FloodWait {seconds}s - pausing all sends, rate now {self.rate:.2f}/s")
+        return True
+
+    def on_slow_mode(self, chat_key, seconds):
+        """Per-chat slow mode: only this chat is delayed"""
+        self._chat_not_before[chat_key] = time.monotonic() + max(1, int(seconds))
+        self.stats['slow_mode_waits'] += 1
+
+    def get_stats(self):
+        stats = dict(self.stats)
+        stats['rate'] = self.rate
+        stats['paused_for'] = self.paused_for
+        stats['slow_mode_chats'] = sum(1 for key in self._chat_not_before if self.chat_delay(key) > 0)
+        return stats
+
+# Global shared instance (one budget per account)
+send_scheduler = SendScheduler()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Startup Pipeline for VzoelFox Userbot - Dependency-ordered concurrent init steps
+Fitur: Steps run as soon as their dependencies finish, independent steps in parallel,
+failed dependencies skip dependents, per-step timing report
+Founder Userbot: Vzoel Fox's Ltpn 🤩
+Version: 1.0.0 - Parallel Startup Pipeline
+"""
+
+import os
+import time
+import asyncio
+import inspect
+import logging
+
+logger = logging.getLogger(__name__)
+
+STARTUP_CONCURRENCY = int(os.getenv("STARTUP_CONCURRENCY", "8"))  # steps running at once
+STARTUP_STEP_TIMEOUT = float(os.getenv("STARTUP_STEP_TIMEOUT", "60"))  # seconds per step, 0 = none
+
+class StartupPipeline:
+    """
+    Small dependency graph of init steps.
+    add() registers a step (callable returning a value or awaitable) with the
+    names it must wait for; run() starts every step whose dependencies are
+    done, so slow network steps overlap instead of queueing behind each other.
+    """
+
+    def __init__(self, name="startup", concurrency=STARTUP_CONCURRENCY, timeout=STARTUP_STEP_TIMEOUT):
+        self.name = name
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.steps = {}     # name -> (func, after)
+        self.results = {}   # name -> {'status', 'duration', 'result', 'error'}
+
+    def add(self, name, func, after=()):
+        if name in self.steps:
+            raise ValueError(f"Duplicate startup step: {name}")
+        self.steps[name] = (func, tuple(after))
+        return self
+
+    def _check_graph(self):
+        for name, (_, after) in self.steps.items():
+            for dep in after:
+                if dep not in self.steps:
+                    raise ValueError(f"Startup step {name} depends on unknown step {dep}")
+
+        # Kahn's algorithm: anything left over is part of a cycle
+        pending = {name: set(after) for name, (_, after) in self.steps.items()}
+        ready = [name for name, deps in pending.items() if not deps]
+        while ready:
+            done = ready.pop()
+            del pending[done]
+            for name, deps in pending.items():
+                if done in deps:
+                    deps.discard(done)
+                    if not deps:
+                        ready.append(name)
+        if pending:
+            raise ValueError(f"Startup steps have a dependency cycle: {', '.join(sorted(pending))}")
+
+    async def run(self):
+        """Run all steps; returns results dict (never raises for step errors)"""
+        self._check_graph()
+        started = time.perf_counter()
+        semaphore = asyncio.Semaphore(max(1, self.concurrency))
+        tasks = {}
+
+        async def run_step(name):
+            func, after = self.steps[name]
+            if after:
+                await asyncio.gather(*(tasks[dep] for dep in after))
+            failed = [dep for dep in after if self.results[dep]['status'] != 'ok']
+            if failed:
+                self.results[name] = {'status': 'skipped', 'duration': 0.0, 'result': None,
+                                      'error': f"dependency failed: {', '.join(failed)}"}
+                return
+
+            async with semaphore:
+                step_started = time.perf_counter()
+                try:
+                    result = func()
+                    if inspect.isawaitable(result):
+                        if self.timeout:
+                            result = await asyncio.wait_for(result, self.timeout)
+                        else:
+                            result = await result
+                    self.results[name] = {'status': 'ok', 'result': result, 'error': None,
+                                          'duration': time.perf_counter() - step_started}
+                except Exception as e:
+                    if isinstance(e, asyncio.TimeoutError):
+                        e = f"timed out after {self.timeout:.0f}s"
+                    self.results[name] = {'status': 'failed', 'result': None, 'error': str(e),
+                                          'duration': time.perf_counter() - step_started}
+                    logger.error(f"[{self.name}] Step {name} failed: {e}")
+
+        for name in self.steps:
+            tasks[name] = asyncio.ensure_future(run_step(name))
+        await asyncio.gather(*tasks.values())
+
+        self.elapsed = time.perf_counter() - started
+        return self.results
+
+    def ok(self, name):
+        return self.results.get(name, {}).get('status') == 'ok'
+
+    def result(self, name, default=None):
+        step = self.results.get(name)
+        return step['result'] if step and step['status'] == 'ok' else default
+
+    def report(self):
+        """Rows sorted slowest first"""
+        rows = [{'step': name, **{k: v for k, v in data.items() if k != 'result'}}
+                for name, data in self.results.items()]
+        rows.sort(key=lambda row: row['duration'], reverse=True)
+        return rows
+
+    def log_report(self, limit=None):
+        rows = self.report()
+        serial = sum(row['duration'] for row in rows)
+        logger.info(f"⏱️ [{self.name}] {len(rows)} steps in {getattr(self, 'elapsed', 0.0):.2f}s "
+                    f"(sequential would be ~{serial:.2f}s)")
+        for row in rows[:limit] if limit else rows:
+            status = '' if row['status'] == 'ok' else f" [{row['status']}: {row['error']}]"
+            logger.info(f"   {row['step']}: {row['duration'] * 1000:.0f}ms{status}")
@@ -4,11 +4,17 @@ Handles voice chat connections and audio streaming
 Compatible with premium emoji mapping and markdown
 """
 
+import os
+import shutil
 import asyncio
 import logging
+import itertools
 from typing import Optional, Dict, Any
 from telethon import TelegramClient
 
+from utils.process_pool import process_pool, PRIORITY_BACKGROUND
+from utils.plugin_context import shared_service
+
 # Safe PyTgCalls import dengan fallback
 try:
     from pytgcalls import PyTgCalls
@@ -39,6 +45,14 @@ except ImportError:
     def get_emoji(key: str) -> str:
         return "🎵"
 
+# Queue prefetch: next N tracks are downloaded + transcoded to OGG/Opus while the current one plays
+PREFETCH_AHEAD = int(os.getenv("VC_PREFETCH_AHEAD", "2"))
+PREFETCH_MAX_BYTES = int(os.getenv("VC_PREFETCH_MAX_MB", "300")) * 1024 * 1024
+PREFETCH_RESERVE_BYTES = 10 * 1024 * 1024  # budget held per running transcode (~10 min at 128k Opus)
+PREFETCH_WAIT = 5  # seconds play_next waits for an almost-ready prefetch before streaming the source
+PREFETCH_TIMEOUT = 600  # seconds per transcode
+PREFETCH_DIR = os.path.expanduser("~/vzoelfox/temp/vc_prefetch")
+
 class VoiceChatManager:
     """Voice chat manager dengan premium emoji support"""
     
@@ -47,8 +61,17 @@ class VoiceChatManager:
         self.app = None
         self.active_calls: Dict[int, Dict[str, Any]] = {}
         self.music_queue: Dict[int, list] = {}
+        self.started = False
         self.logger = logging.getLogger(__name__)
         
+        # Prefetch state: track id -> task / ready file
+        self._track_ids = itertools.count(1)
+        self._prefetch_tasks: Dict[int, asyncio.Task] = {}
+        self._ready_files: Dict[int, str] = {}
+        self.prefetch_stats = {'prefetched': 0, 'hits': 0, 'misses': 0, 'cancelled': 0,
+                               'failed': 0, 'skipped_budget': 0}
+        self.prefetch_enabled = PREFETCH_AHEAD > 0 and shutil.which('ffmpeg') is not None
+        
         # Initialize PyTgCalls jika available
         if PYTGCALLS_AVAILABLE:
             try:
@@ -67,6 +90,7 @@ class VoiceChatManager:
             
         try:
             await self.app.start()
+            self.started = True
             self.logger.info(f"{get_emoji('success')} Voice chat manager started")
             return True
         except Exception as e:
@@ -75,6 +99,8 @@ class VoiceChatManager:
     
     async def stop(self):
         """Stop voice chat manager"""
+        for track_id in list(self._prefetch_tasks) + list(self._ready_files):
+            self._discard_track_file(track_id)
         try:
             await self.app.stop()
             self.logger.info(f"{get_emoji('stop')} Voice chat manager stopped")
@@ -113,10 +139,11 @@ class VoiceChatManager:
             
             await self.app.leave_group_call(chat_id)
             
-            if chat_id in self.active_calls:
-                del self.active_calls[chat_id]
-            if chat_id in self.music_queue:
-                del self.music_queue[chat_id]
+            call = self.active_calls.pop(chat_id, None)
+            if call:
+                self._discard_track_file(call.get('current_track_id'))
+            for track in self.music_queue.pop(chat_id, []):
+                self._discard_track_file(track['id'])
             
             self.logger.info(f"{get_emoji('leave')} Left voice chat: {chat_id}")
             return True
@@ -125,7 +152,7 @@ class VoiceChatManager:
             self.logger.error(f"Failed to leave voice chat {chat_id}: {e}")
             return False
     
-    async def play_audio(self, chat_id: int, source: str, title: str = "Unknown") -> bool:
+    async def play_audio(self, chat_id: int, source: str, title: str = "Unknown", track_id: int = None) -> bool:
         """Play audio in voice chat"""
         try:
             if chat_id not in self.active_calls:
@@ -137,7 +164,13 @@ class VoiceChatManager:
                 AudioPiped(source)
             )
             
+            # Previous track's prefetched file is no longer streamed
+            previous_id = self.active_calls[chat_id].get('current_track_id')
+            if previous_id != track_id:
+                self._discard_track_file(previous_id)
+            
             self.active_calls[chat_id]['current_track'] = title
+            self.active_calls[chat_id]['current_track_id'] = track_id
             self.active_calls[chat_id]['status'] = 'playing'
             
             self.logger.info(f"{get_emoji('play')} Playing: {title} in {chat_id}")
@@ -202,32 +235,174 @@ class VoiceChatManager:
             self.music_queue[chat_id] = []
         
         self.music_queue[chat_id].append({
+            'id': next(self._track_ids),
             'source': source,
             'title': title
         })
         
         self.logger.info(f"{get_emoji('queue')} Added to queue: {title}")
+        self.schedule_prefetch(chat_id)
     
     def get_queue(self, chat_id: int) -> list:
         """Get current queue"""
         return self.music_queue.get(chat_id, [])
     
+    def clear_queue(self, chat_id: int) -> int:
+        """Clear queue and cancel its prefetches; returns removed count"""
+        tracks = self.music_queue.get(chat_id, [])
+        self.music_queue[chat_id] = []
+        for track in tracks:
+            self._discard_track_file(track['id'])
+        return len(tracks)
+    
+    def shuffle_queue(self, chat_id: int):
+        """Shuffle queue; prefetches outside the new lookahead window are cancelled"""
+        import random
+        random.shuffle(self.music_queue.get(chat_id, []))
+        self.schedule_prefetch(chat_id)
+    
+    def remove_from_queue(self, chat_id: int, position: int) -> Optional[Dict[str, Any]]:
+        """Remove track at 0-based position (None if out of range)"""
+        queue = self.music_queue.get(chat_id, [])
+        if not 0 <= position < len(queue):
+            return None
+        track = queue.pop(position)
+        self._discard_track_file(track['id'])
+        self.schedule_prefetch(chat_id)
+        return track
+    
     async def play_next(self, chat_id: int) -> bool:
-        """Play next track in queue"""
+        """Play next track in queue (prefetched local file when ready)"""
         try:
             if chat_id not in self.music_queue or not self.music_queue[chat_id]:
                 return False
             
             next_track = self.music_queue[chat_id].pop(0)
+            source = await self._ready_source(next_track)
+            self.schedule_prefetch(chat_id)
             return await self.play_audio(
                 chat_id, 
-                next_track['source'], 
-                next_track['title']
+                source, 
+                next_track['title'],
+                track_id=next_track['id']
             )
         except Exception as e:
             self.logger.error(f"Failed to play next track: {e}")
             return False
     
+    # ----------------- queue prefetch -----------------
+    
+    def schedule_prefetch(self, chat_id: int):
+        """Prefetch the next PREFETCH_AHEAD tracks; cancel prefetches that left that window"""
+        if not self.prefetch_enabled:
+            return
+        queue = self.music_queue.get(chat_id, [])
+        window = queue[:PREFETCH_AHEAD]
+        
+        for track in queue[PREFETCH_AHEAD:]:
+            if track['id'] in self._prefetch_tasks or track['id'] in self._ready_files:
+                self._discard_track_file(track['id'])
+        
+        for track in window:
+            if track['id'] in self._prefetch_tasks or track['id'] in self._ready_files:
+                continue
+            if self._prefetch_bytes() >= PREFETCH_MAX_BYTES:
+                self.prefetch_stats['skipped_budget'] += 1
+                break  # over disk budget: these tracks stream from source
+            with shared_service():  # queue-owned, survives reload of the plugin that queued it
+                task = asyncio.get_event_loop().create_task(self._prefetch_track(track))
+            self._prefetch_tasks[track['id']] = task
+            task.add_done_callback(lambda _, track_id=track['id']: self._prefetch_tasks.pop(track_id, None))
+    
+    @staticmethod
+    def _prefetch_path(track_id: int) -> str:
+        return os.path.join(PREFETCH_DIR, f"track_{track_id}.ogg")
+    
+    async def _prefetch_track(self, track: Dict[str, Any]):
+        os.makedirs(PREFETCH_DIR, exist_ok=True)
+        target = self._prefetch_path(track['id'])
+        partial = target + ".part"
+        try:
+            # Background priority: a user's .play/.download ffmpeg goes first
+            result = await process_pool.run(
+                ['ffmpeg', '-nostdin', '-y', '-loglevel', 'error', '-i', track['source'],
+                 '-vn', '-ac', '2', '-ar', '48000', '-c:a', 'libopus', '-b:a', '128k', '-f', 'ogg', partial],
+                tool='ffmpeg', priority=PRIORITY_BACKGROUND, timeout=PREFETCH_TIMEOUT
+            )
+            if result.returncode != 0:
+                raise RuntimeError(result.stderr.decode(errors='ignore').strip()[-200:] or f"ffmpeg exit {result.returncode}")
+            os.replace(partial, target)
+            self._ready_files[track['id']] = target
+            self.prefetch_stats['prefetched'] += 1
+            self.logger.info(f"{get_emoji('queue')} Prefetched: {track['title']}")
+        except asyncio.CancelledError:
+            self.prefetch_stats['cancelled'] += 1
+            raise
+        except Exception as e:
+            self.prefetch_stats['failed'] += 1
+            self.logger.warning(f"Prefetch failed for {track['title']}: {e}")
+        finally:
+            if os.path.exists(partial):
+                os.remove(partial)
+    
+    async def _ready_source(self, track: Dict[str, Any]) -> str:
+        """Local prefetched file if ready (briefly waiting for an in-flight one), else the source"""
+        task = self._prefetch_tasks.get(track['id'])
+        if task and track['id'] not in self._ready_files:
+            try:
+                await asyncio.wait_for(asyncio.shield(task), PREFETCH_WAIT)
+            except (asyncio.TimeoutError, asyncio.CancelledError):
+                pass
+        path = self._ready_files.get(track['id'])
+        if path and os.path.exists(path):
+            self.prefetch_stats['hits'] += 1
+            return path
+        self._discard_track_file(track['id'])
+        self.prefetch_stats['misses'] += 1
+        return track['source']
+    
+    def _discard_track_file(self, track_id: Optional[int]):
+        """Cancel a track's prefetch and delete its file"""
+        if track_id is None:
+            return
+        task = self._prefetch_tasks.pop(track_id, None)
+        if task and not task.done():
+            task.cancel()
+        path = self._ready_files.pop(track_id, None)
+        if path:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+    
+    def _prefetch_bytes(self) -> int:
+        """Disk used by ready files plus running transcodes (their .part size, at least PREFETCH_RESERVE_BYTES)"""
+        total = 0
+        for path in self._ready_files.values():
+            try:
+                total += os.path.getsize(path)
+            except OSError:
+                pass
+        for track_id in self._prefetch_tasks:
+            if track_id in self._ready_files:
+                continue
+            try:
+                written = os.path.getsize(self._prefetch_path(track_id) + ".part")
+            except OSError:
+                written = 0
+            total += max(written, PREFETCH_RESERVE_BYTES)
+        return total
+    
+    def get_prefetch_status(self, chat_id: int) -> Dict[str, Any]:
+        queue = self.music_queue.get(chat_id, [])
+        return {
+            'enabled': self.prefetch_enabled,
+            'ready': sum(1 for track in queue if track['id'] in self._ready_files),
+            'in_flight': sum(1 for track in queue if track['id'] in self._prefetch_tasks),
+            'disk_mb': self._prefetch_bytes() / (1024 * 1024),
+            **self.prefetch_stats
+        }
+    
     def get_voice_chat_info(self, chat_id: int) -> Optional[Dict[str, Any]]:
         """Get voice chat status info"""
         return self.active_calls.get(chat_id)
@@ -250,6 +425,8 @@ def get_voice_manager() -> Optional[VoiceChatManager]:
 async def initialize_voice_manager(client: TelegramClient) -> bool:
     """Initialize voice manager"""
     global voice_manager
+    if voice_manager and voice_manager.started:
+        return True  # already running (main startup and voice_chat setup both call this)
     try:
         voice_manager = VoiceChatManager(client)
         if not PYTGCALLS_AVAILABLE: